@@ -0,0 +1,5 @@
+"""
+Microbenchmarks for the AI core.
+
+Run ``python -m benchmarks`` from the ai_core directory.
+"""
@@ -0,0 +1,53 @@
+"""
+Command line entry point: ``python -m benchmarks [prefix ...]``.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from . import bench_deconstructor, bench_serialization  # noqa: F401  (registers benchmarks)
+from .runner import (
+    BASELINE_PATH,
+    DEFAULT_REGRESSION_THRESHOLD,
+    compare,
+    format_report,
+    load_baseline,
+    run,
+    save_baseline,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the ai_core microbenchmarks")
+    parser.add_argument("prefixes", nargs="*", help="only run benchmarks starting with these prefixes")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each benchmark")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="relative p50 slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    # Keep the per-call warnings out of the report
+    logging.disable(logging.WARNING)
+
+    results = run(args.prefixes, min_time=args.min_time)
+    rows = compare(results, load_baseline(args.baseline), threshold=args.threshold)
+    print(format_report(rows))
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline written to {args.baseline}")
+
+    regressions = [row["name"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
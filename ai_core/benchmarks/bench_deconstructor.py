@@ -0,0 +1,134 @@
+"""
+Per-stage benchmarks for the Hypothesis Deconstructor.
+"""
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.metrics import DeconstructorMetrics
+from core.schema_catalog import load_catalog
+from core.tracing import Tracer, current_span
+
+from .corpus import HEADLINE, LONG, SCHEMA_CONTEXT, SHORT, all_short, warehouse_schema
+from .runner import benchmark
+
+
+def _cycle(fn, inputs):
+    """Callable applying ``fn`` to each input in turn"""
+    items = list(inputs)
+    state = {"i": 0}
+
+    def call():
+        index = state["i"]
+        state["i"] = (index + 1) % len(items)
+        return fn(items[index])
+
+    return call
+
+
+def _register_identify_pattern():
+    for pattern_type, hypotheses in SHORT.items():
+        @benchmark(f"identify_pattern.short.{pattern_type}")
+        def setup(hypotheses=hypotheses):
+            return _cycle(HypothesisDeconstructor()._identify_pattern, hypotheses)
+
+    for memo_name, memo in LONG.items():
+        @benchmark(f"identify_pattern.long.{memo_name}")
+        def setup(memo=memo):
+            deconstructor = HypothesisDeconstructor()
+            return lambda: deconstructor._identify_pattern(memo)
+
+
+_register_identify_pattern()
+
+
+@benchmark("extract_entities.short")
+def _extract_entities_short():
+    return _cycle(HypothesisDeconstructor()._extract_entities, all_short())
+
+
+@benchmark("extract_entities.long")
+def _extract_entities_long():
+    return _cycle(HypothesisDeconstructor()._extract_entities, LONG.values())
+
+
+@benchmark("generate_sql_queries.comparison")
+def _generate_sql_comparison():
+    deconstructor = HypothesisDeconstructor()
+    entities = deconstructor._extract_entities(HEADLINE)
+    return lambda: deconstructor._generate_sql_queries(entities, "comparison")
+
+
+@benchmark("generate_sql_queries.correlation")
+def _generate_sql_correlation():
+    deconstructor = HypothesisDeconstructor()
+    entities = deconstructor._extract_entities(SHORT["correlation"][0])
+    return lambda: deconstructor._generate_sql_queries(entities, "correlation")
+
+
+@benchmark("schema_catalog.generate_sql_queries.comparison_10k_tables")
+def _generate_sql_comparison_catalog():
+    deconstructor = HypothesisDeconstructor()
+    entities = deconstructor._extract_entities(HEADLINE)
+    catalog = load_catalog(warehouse_schema())
+    return lambda: deconstructor._generate_sql_queries(entities, "comparison", catalog)
+
+
+@benchmark("schema_catalog.load.cached_10k_tables")
+def _load_catalog_cached():
+    schema = warehouse_schema()
+    load_catalog(schema)
+    return lambda: load_catalog(schema)
+
+
+@benchmark("test_plan.to_dict")
+def _test_plan_to_dict():
+    plan = HypothesisDeconstructor().deconstruct_hypothesis(HEADLINE).test_plan
+    return plan.to_dict
+
+
+@benchmark("test_plan.freeze")
+def _test_plan_freeze():
+    plan = HypothesisDeconstructor().deconstruct_hypothesis(HEADLINE).test_plan
+    return plan.freeze
+
+
+@benchmark("deconstruct.short")
+def _deconstruct_short():
+    return _cycle(HypothesisDeconstructor().deconstruct_hypothesis, all_short())
+
+
+# deconstruct.short with no request timed or traced: the gap between the
+# two is the instrumentation's cost, budgeted at 1%
+@benchmark("deconstruct.short.uninstrumented")
+def _deconstruct_short_uninstrumented():
+    deconstructor = HypothesisDeconstructor(metrics=DeconstructorMetrics(sample_every=0),
+                                            tracer=Tracer(sample_every=0))
+    return _cycle(deconstructor.deconstruct_hypothesis, all_short())
+
+
+# The hooks an unsampled request runs: the joint sampling draw, the trace
+# check and its request count. Budgeted at 1% of
+# deconstruct.short.uninstrumented; a call runs them for 100 requests, since
+# one request's hooks take less time than the clock reads around them
+@benchmark("instrumentation.unsampled.100_requests")
+def _unsampled_instrumentation():
+    deconstructor = HypothesisDeconstructor(metrics=DeconstructorMetrics(sample_every=0),
+                                            tracer=Tracer(sample_every=0))
+    sample_request, requests = deconstructor._sample_request, deconstructor._rule_based_requests
+
+    def call():
+        for _ in range(100):
+            if sample_request() is None and current_span() is None:
+                requests["segment"].inc()
+
+    return call
+
+
+@benchmark("deconstruct.short.with_schema")
+def _deconstruct_short_with_schema():
+    deconstructor = HypothesisDeconstructor()
+    return _cycle(lambda h: deconstructor.deconstruct_hypothesis(h, SCHEMA_CONTEXT), all_short())
+
+
+@benchmark("deconstruct.long")
+def _deconstruct_long():
+    return _cycle(HypothesisDeconstructor().deconstruct_hypothesis, LONG.values())
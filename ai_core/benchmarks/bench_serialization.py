@@ -0,0 +1,40 @@
+"""
+Encode and decode benchmarks for test plan serialization.
+
+Compare against deconstruct.short: a round trip should stay a small share
+of generating the plan.
+"""
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.serialization import decode_binary, decode_json, encode_binary, encode_json
+
+from .corpus import HEADLINE, SCHEMA_CONTEXT
+from .runner import benchmark
+
+
+def _plan():
+    return HypothesisDeconstructor().deconstruct_hypothesis(HEADLINE, SCHEMA_CONTEXT).test_plan
+
+
+@benchmark("serialization.json.encode")
+def _json_encode():
+    plan = _plan()
+    return lambda: encode_json(plan)
+
+
+@benchmark("serialization.json.decode")
+def _json_decode():
+    payload = encode_json(_plan())
+    return lambda: decode_json(payload)
+
+
+@benchmark("serialization.binary.encode")
+def _binary_encode():
+    plan = _plan()
+    return lambda: encode_binary(plan)
+
+
+@benchmark("serialization.binary.decode")
+def _binary_decode():
+    payload = encode_binary(_plan())
+    return lambda: decode_binary(payload)
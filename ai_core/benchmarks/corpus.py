@@ -0,0 +1,85 @@
+"""
+Hypothesis corpus used by the benchmarks.
+
+Covers every pattern type, short questions and long pasted memos, so a
+change that only helps one shape of input shows up as such.
+"""
+
+from typing import Dict, List
+
+SHORT: Dict[str, List[str]] = {
+    "correlation": [
+        "Customer satisfaction correlates with revenue",
+        "Discount depth is associated with churn",
+    ],
+    "trend": [
+        "Revenue is increasing over time",
+        "Average basket size is shrinking quarter over quarter",
+    ],
+    "comparison": [
+        "Revenue is higher than expected",
+        "Online orders are less profitable than store orders",
+    ],
+    "segment": [
+        "Customers from Texas buy premium plans",
+        "customers from the midwest renew early",
+    ],
+    "performance": [
+        "Sales performance depends on the rep",
+        "Profit per order varies by channel",
+    ],
+    "general": [
+        "Some random business question",
+        "What drives renewals",
+    ],
+}
+
+_MEMO_PARAGRAPH = (
+    "During the quarterly review the regional leads walked through pipeline "
+    "coverage, staffing, onboarding delays and the new pricing rollout. Several "
+    "accounts asked for extended payment terms and the finance team flagged "
+    "exposure in the enterprise segment. "
+)
+
+LONG: Dict[str, str] = {
+    # Cue near the end forces a scan of the whole memo
+    "memo_late_cue": _MEMO_PARAGRAPH * 12 + "We believe churn correlates with onboarding delays.",
+    # No cue at all: the worst case for pattern matching
+    "memo_no_cue": _MEMO_PARAGRAPH * 12,
+}
+
+SCHEMA_CONTEXT = """
+Database Schema:
+Table: customers
+  - customer_id: INTEGER
+  - name: TEXT
+  - state: TEXT
+  - revenue: REAL
+Table: sales
+  - sale_id: INTEGER
+  - customer_id: INTEGER
+  - amount: REAL
+  - date: TEXT
+"""
+
+
+def warehouse_schema(table_count: int = 10000) -> str:
+    """Schema listing for a wide warehouse, with the sample tables at the end"""
+    lines = []
+    for index in range(table_count):
+        lines.append(f"Table: fact_{index:05d}")
+        lines.extend([
+            f"  - fact_{index:05d}_id: INTEGER",
+            f"  - metric_{index % 97}: REAL",
+            f"  - dim_{index % 89}: TEXT",
+            "  - loaded_at: TEXT",
+        ])
+    return "\n".join(lines) + SCHEMA_CONTEXT
+
+
+HEADLINE = "Customers from California are more profitable than customers from New York"
+
+
+def all_short() -> List[str]:
+    """Every short hypothesis, in pattern order"""
+    return [hypothesis for hypotheses in SHORT.values() for hypothesis in hypotheses]
@@ -0,0 +1,165 @@
+"""
+Measurement and baseline comparison for the microbenchmarks.
+
+A benchmark is registered with ``@benchmark("group.name")`` on a setup
+function that returns the zero-argument callable to time. Each case reports
+throughput, p50/p99 latency and the peak memory allocated by a single call,
+and can be compared against a stored JSON baseline.
+"""
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Relative p50 slowdown, against the baseline, reported as a regression
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+_REGISTRY: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function returning the callable to measure"""
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        if name in _REGISTRY:
+            raise ValueError(f"duplicate benchmark: {name}")
+        _REGISTRY[name] = setup
+        return setup
+    return decorator
+
+
+def registered() -> Dict[str, Callable[[], Callable[[], object]]]:
+    """All registered benchmarks, in registration order"""
+    return dict(_REGISTRY)
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing and allocation figures for one benchmark"""
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    alloc_peak_bytes: int
+
+
+def measure(name: str, fn: Callable[[], object], min_time: float = 0.2,
+            min_iterations: int = 20, alloc_iterations: int = 20) -> BenchmarkResult:
+    """
+    Time a callable until ``min_time`` seconds and ``min_iterations`` calls have elapsed.
+
+    Latency percentiles come from per-call timings; throughput from the total.
+    Allocation is measured in a separate, shorter pass because tracemalloc
+    slows every allocation down.
+    """
+    for _ in range(3):
+        fn()
+
+    timings: List[int] = []
+    clock = time.perf_counter_ns
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = clock() + int(min_time * 1e9)
+        while len(timings) < min_iterations or clock() < deadline:
+            start = clock()
+            fn()
+            timings.append(clock() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        peak = 0
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    total_s = sum(timings) / 1e9
+    return BenchmarkResult(
+        name=name,
+        iterations=len(timings),
+        ops_per_sec=len(timings) / total_s if total_s else float("inf"),
+        p50_us=statistics.median(timings) / 1e3,
+        p99_us=timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1e3,
+        alloc_peak_bytes=peak,
+    )
+
+
+def run(selected: Optional[List[str]] = None, min_time: float = 0.2,
+        min_iterations: int = 20) -> List[BenchmarkResult]:
+    """Run the registered benchmarks whose names start with any selected prefix"""
+    results = []
+    for name, setup in _REGISTRY.items():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        results.append(measure(name, setup(), min_time=min_time, min_iterations=min_iterations))
+    return results
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    """Read a stored baseline; an absent file is an empty baseline"""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())["results"]
+
+
+def save_baseline(results: List[BenchmarkResult], path: Path = BASELINE_PATH) -> None:
+    """Write results as the new baseline"""
+    payload = {"results": {result.name: asdict(result) for result in results}}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: List[BenchmarkResult], baseline: Dict[str, Dict[str, float]],
+            threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict[str, object]]:
+    """
+    Compare results with a baseline.
+
+    Returns one row per result with the relative p50 change (positive means
+    slower) and whether it exceeds the regression threshold.
+    """
+    rows = []
+    for result in results:
+        reference = baseline.get(result.name)
+        change = None
+        if reference and reference.get("p50_us"):
+            change = (result.p50_us - reference["p50_us"]) / reference["p50_us"]
+        rows.append({
+            "name": result.name,
+            "result": result,
+            "baseline_p50_us": reference["p50_us"] if reference else None,
+            "p50_change": change,
+            "regression": change is not None and change > threshold,
+        })
+    return rows
+
+
+def format_report(rows: List[Dict[str, object]]) -> str:
+    """Render comparison rows as a fixed-width table"""
+    header = f"{'benchmark':<48} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak B':>9} {'vs base':>9}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        result = row["result"]
+        change = row["p50_change"]
+        delta = "new" if change is None else f"{change * 100:+.1f}%"
+        if row["regression"]:
+            delta += " !"
+        lines.append(
+            f"{result.name:<48} {result.ops_per_sec:>12,.0f} {result.p50_us:>10.2f} "
+            f"{result.p99_us:>10.2f} {result.alloc_peak_bytes:>9,} {delta:>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+"""
+Stand-in inference backend for tests and benchmarks.
+
+StandInModel is a small deterministic NumPy model with the cost profile of
+a real one, for code that exercises batched generation without
+downloading weights::
+
+    with MicroBatcher(StandInModel(), max_batch_size=16) as batcher:
+        deconstructor = HypothesisDeconstructor(batcher=batcher)
+"""
+
+import time
+import zlib
+from typing import List, Sequence
+
+import numpy as np
+
+# Words StandInModel generates from; plan-shaped so the output reads like a
+# (poor) model answer
+STAND_IN_VOCABULARY = (
+    "SELECT", "FROM", "WHERE", "GROUP", "BY", "AVG", "COUNT", "SUM",
+    "customers", "orders", "revenue", "profit", "state", "segment", "region", "month",
+    "t_test", "anova", "correlation", "regression", "chi_square", "descriptive", "mean", "variance",
+    "higher", "lower", "than", "and", "or", "is", "significant", "expected",
+)
+
+
+class StandInModel:
+    """
+    Deterministic CPU model with the cost profile of a real one.
+
+    A prompt is hashed into a bag-of-bytes vector and each generated token
+    is one forward pass through ``layers`` dense layers of width ``width``,
+    picked greedily from STAND_IN_VOCABULARY. A batch runs as one matrix
+    product per layer, so like a real model it costs little more than a
+    single prompt. ``pass_seconds`` adds a fixed cost to every forward
+    pass, standing in for a model too large for the cache that streams its
+    weights from memory once per pass.
+
+    A prompt's text does not depend on the batch it runs in.
+    """
+
+    def __init__(self, width: int = 256, layers: int = 4, new_tokens: int = 16,
+                 pass_seconds: float = 0.0, seed: int = 0):
+        """
+        Args:
+            width: Hidden size of each layer
+            layers: Dense layers per forward pass
+            new_tokens: Tokens generated after the prompt, within max_length
+            pass_seconds: Fixed cost added to every forward pass
+            seed: Seed of the random weights
+        """
+        if width < 1 or layers < 1 or new_tokens < 1:
+            raise ValueError("width, layers and new_tokens must be at least 1")
+        if pass_seconds < 0:
+            raise ValueError("pass_seconds must not be negative")
+        self.width = width
+        self.new_tokens = new_tokens
+        # Models differing in anything that changes their text have different names
+        self.name = f"stand-in:{width}x{layers}:{new_tokens}:{seed}"
+        self.pass_seconds = pass_seconds
+        generator = np.random.default_rng(seed)
+        scale = 2.0 / np.sqrt(width)
+        self.weights = [generator.normal(0.0, scale, (width, width)) for _ in range(layers)]
+        self.output = generator.normal(0.0, scale, (width, len(STAND_IN_VOCABULARY)))
+        self.forward_passes = 0
+
+    def generate(self, prompts: Sequence[str], max_length: int) -> List[str]:
+        encoded = [prompt.encode("utf-8") for prompt in prompts]
+        hidden = np.stack([self._embed(prompt) for prompt in encoded])
+        # The prompt's bytes stand in for its tokens in the length budget
+        budgets = [min(self.new_tokens, max(0, max_length - len(prompt))) for prompt in encoded]
+        tokens = []
+        for _ in range(max(budgets)):
+            for weight in self.weights:
+                hidden = np.tanh(hidden @ weight)
+            tokens.append(np.argmax(hidden @ self.output, axis=1))
+            self.forward_passes += 1
+            if self.pass_seconds:
+                time.sleep(self.pass_seconds)
+        return [
+            " ".join([prompt, *(STAND_IN_VOCABULARY[step[row]] for step in tokens[:budget])])
+            for row, (prompt, budget) in enumerate(zip(prompts, budgets))
+        ]
+
+    def _embed(self, prompt: bytes) -> np.ndarray:
+        codes = np.frombuffer(prompt, dtype=np.uint8).astype(np.int64)
+        # Mixing in each byte's position makes the vector depend on word order
+        buckets = (codes * 31 + np.arange(len(codes)) % 7) % self.width
+        counts = np.bincount(buckets, minlength=self.width).astype(np.float64)
+        vector = counts / max(1, len(codes))
+        vector[zlib.crc32(prompt) % self.width] += 1.0
+        return vector
@@ -1,9 +1,56 @@
 """
 Core AI functionality for Shelby Data Artisan.
+
+Components are imported lazily on first attribute access (PEP 562), so
+``import core`` stays cheap and a component whose module or dependencies
+are missing only fails when it is actually used.
 """
 
-from .oracle import Oracle
-from .data_processor import DataProcessor
-from .hypothesis_deconstructor import HypothesisDeconstructor
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .batch import deconstruct_many
+    from .batch_planner import BatchPlanner
+    from .connection_pool import ConnectionPool
+    from .entity_extractor import EntityExtractor
+    from .hypothesis_deconstructor import HypothesisDeconstructor
+    from .plan_cache import PlanCache
+    from .plan_executor import PlanExecutor
+    from .plan_scheduler import PlanScheduler
+    from .plan_store import PersistentPlanStore
+    from .result_cache import ResultCache
+    from .schema_catalog import SchemaCatalog
+    from .stats_engine import StatsEngine
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "HypothesisDeconstructor": ".hypothesis_deconstructor",
+    "deconstruct_many": ".batch",
+    "BatchPlanner": ".batch_planner",
+    "PlanCache": ".plan_cache",
+    "PersistentPlanStore": ".plan_store",
+    "EntityExtractor": ".entity_extractor",
+    "SchemaCatalog": ".schema_catalog",
+    "ConnectionPool": ".connection_pool",
+    "PlanExecutor": ".plan_executor",
+    "PlanScheduler": ".plan_scheduler",
+    "ResultCache": ".result_cache",
+    "StatsEngine": ".stats_engine",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining ``name`` the first time it is requested"""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ["Oracle", "DataProcessor", "HypothesisDeconstructor"]
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
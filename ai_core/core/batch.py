@@ -0,0 +1,141 @@
+"""
+Batch hypothesis deconstruction.
+
+Nightly jobs push tens of thousands of analyst hypotheses through the
+Hypothesis Deconstructor. This module fans that work out over a process
+pool, with one deconstructor per worker process, and hands the responses
+back in input order.
+"""
+
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .hypothesis_deconstructor import DeconstructionResponse, HypothesisDeconstructor
+from .log import DEFAULT_RATE_LIMIT, get_logger
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+# A batch item is either a bare hypothesis or a (hypothesis, schema_context) pair
+BatchItem = Union[str, Tuple[str, Optional[str]]]
+
+DEFAULT_CHUNKSIZE = 64
+
+# Per-process deconstructor, created once by the pool initializer
+_worker_deconstructor: Optional[HypothesisDeconstructor] = None
+
+
+def _init_worker(model_name: str, initialize_model: bool) -> None:
+    """Create the deconstructor owned by this worker process"""
+    global _worker_deconstructor
+    _worker_deconstructor = HypothesisDeconstructor(model_name=model_name)
+    if initialize_model:
+        asyncio.run(_worker_deconstructor.initialize_model())
+
+
+def _deconstruct_item(deconstructor: HypothesisDeconstructor, item: Any,
+                      schema_context: Optional[str]) -> DeconstructionResponse:
+    """Deconstruct one batch item, turning any failure into an error response"""
+    try:
+        if isinstance(item, tuple):
+            hypothesis, item_schema = item
+        else:
+            hypothesis, item_schema = item, schema_context
+        return deconstructor.deconstruct_hypothesis(hypothesis, item_schema)
+    except Exception as e:
+        logger.error("batch_item_failed", error=str(e))
+        return DeconstructionResponse(
+            success=False,
+            message="Internal error during deconstruction",
+            error=str(e)
+        )
+
+
+def _deconstruct_chunk(chunk: List[BatchItem], schema_context: Optional[str]) -> List[DeconstructionResponse]:
+    """Deconstruct a chunk of items with this worker's deconstructor"""
+    return [_deconstruct_item(_worker_deconstructor, item, schema_context) for item in chunk]
+
+
+def _chunks(items: Iterable[BatchItem], chunksize: int) -> Iterator[List[BatchItem]]:
+    """Split an iterable into lists of at most ``chunksize`` items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def deconstruct_many(
+    hypotheses: Iterable[BatchItem],
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    schema_context: Optional[str] = None,
+    model_name: str = "microsoft/DialoGPT-medium",
+    initialize_model: bool = False,
+) -> Iterator[DeconstructionResponse]:
+    """
+    Deconstruct many hypotheses over a process pool.
+
+    Args:
+        hypotheses: Hypotheses, or (hypothesis, schema_context) pairs
+        workers: Worker processes; None uses the CPU count, 1 runs inline
+        chunksize: Hypotheses sent to a worker per task
+        schema_context: Schema context for items that don't carry their own
+        model_name: Model name for each worker's deconstructor
+        initialize_model: Run initialize_model once in every worker
+
+    Yields:
+        DeconstructionResponse: One response per input, in input order
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        deconstructor = HypothesisDeconstructor(model_name=model_name)
+        if initialize_model:
+            asyncio.run(deconstructor.initialize_model())
+        for item in hypotheses:
+            yield _deconstruct_item(deconstructor, item, schema_context)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_name, initialize_model),
+    ) as executor:
+        # Keep a bounded window of chunks in flight so huge inputs are
+        # streamed through the pool rather than submitted all at once
+        max_in_flight = 2 * workers
+        pending = deque()
+        chunks = _chunks(hypotheses, chunksize)
+
+        for chunk in islice(chunks, max_in_flight):
+            pending.append((chunk, executor.submit(_deconstruct_chunk, chunk, schema_context)))
+
+        while pending:
+            chunk, future = pending.popleft()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append((next_chunk, executor.submit(_deconstruct_chunk, next_chunk, schema_context)))
+
+            try:
+                responses = future.result()
+            except Exception as e:
+                logger.error("batch_worker_failed", error=str(e), items=len(chunk))
+                responses = [
+                    DeconstructionResponse(
+                        success=False,
+                        message="Internal error during deconstruction",
+                        error=str(e)
+                    )
+                    for _ in chunk
+                ]
+
+            yield from responses
@@ -0,0 +1,683 @@
+"""
+Cross-plan query optimization for batch runs.
+
+A batch of hypotheses produces thousands of test plans whose queries hit
+the same few tables: every comparison against customer_sales_data is a
+GROUP BY state with a different ``state IN (...)`` filter, and every plan
+on revenue asks for the same moments. BatchPlanner gathers the queries of
+all plans and
+
+- runs each distinct query once (identical after normalize_sql) and hands
+  its result to every plan that asked for it;
+- merges compatible aggregate queries into one shared scan. SQLite has no
+  GROUPING SETS, so the scan groups by the union of the queries'
+  dimensions, computing each distinct aggregate once, and every query is
+  rolled up from that finest grouping in Python.
+
+Queries are compatible when they read the same source with the same
+residual filter, i.e. the WHERE conjuncts left after dimension filters
+(``col IN (...)``, ``col = 'literal'``, ``group_col IS NOT NULL``), which
+are applied during the roll-up instead. Only COUNT, SUM, MIN, MAX and AVG
+are merged, since they decompose over partial groups. A query the
+planner does not recognise is run verbatim, so merging never changes
+which queries can be answered. Rolled-up floating-point sums may differ
+from SQLite's in the last few bits, as they are added in another order.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+from .connection_pool import ConnectionPool
+from .hypothesis_deconstructor import TestPlan
+from .log import get_logger
+from .plan_executor import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_PREVIEW_ROWS,
+    PlanExecutionResult,
+    PlanExecutor,
+    QueryResult,
+    ResultAccumulator,
+)
+from .result_cache import ResultCache, normalize_sql
+from .stats_engine import StatsEngine, StatsReport, summaries_from_results
+from .sufficient_statistics import METHOD_STATISTICS
+
+logger = get_logger(__name__)
+
+# Dimensions one shared scan may group by; more would multiply the number
+# of groups the scan returns
+MAX_SHARED_DIMENSIONS = 4
+
+# Called with (plan index, query name, column names, batch of rows)
+BatchRowSink = Callable[[int, str, Sequence[str], List[Tuple[Any, ...]]], None]
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?$")
+_AGGREGATE_RE = re.compile(r"(COUNT|SUM|MIN|MAX|AVG)\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_ALIAS_RE = re.compile(r"\s+AS\s+([A-Za-z_][A-Za-z0-9_]*)\s*$", re.IGNORECASE)
+_CLAUSE_RE = re.compile(r"\b(FROM|WHERE|GROUP\s+BY|ORDER\s+BY)\b", re.IGNORECASE)
+_UNSUPPORTED_RE = re.compile(
+    r"\b(WITH|DISTINCT|HAVING|LIMIT|OFFSET|UNION|INTERSECT|EXCEPT|WINDOW|OVER|NULLS|COLLATE)\b|--|/\*",
+    re.IGNORECASE
+)
+_ORDER_ITEM_RE = re.compile(r"(.*?)(?:\s+(ASC|DESC))?$", re.IGNORECASE | re.DOTALL)
+_IN_RE = re.compile(r"(\S+)\s+IN\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_EQUALS_RE = re.compile(r"(\S+)\s*=\s*(.+)$", re.DOTALL)
+_NOT_NULL_RE = re.compile(r"(\S+)\s+IS\s+NOT\s+NULL$", re.IGNORECASE)
+_INTEGER_RE = re.compile(r"-?\d+$")
+_FLOAT_RE = re.compile(r"-?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$")
+
+
+def _mask(sql: str) -> str:
+    """
+    Same-length copy of the SQL with quoted text and parenthesized content
+    blanked out, so keywords and separators can be searched at top level.
+    """
+    masked = []
+    depth = 0
+    quote = None
+    for char in sql:
+        if quote is not None:
+            masked.append("_")
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+            masked.append("_")
+        elif char == "(":
+            depth += 1
+            masked.append(char if depth == 1 else "_")
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                raise ValueError("unbalanced parentheses")
+            masked.append(char if depth == 0 else "_")
+        else:
+            masked.append(char if depth == 0 else "_")
+    if quote is not None or depth:
+        raise ValueError("unterminated quote or parenthesis")
+    return "".join(masked)
+
+
+def _split(text: str, separator: str) -> List[str]:
+    """Split on a top-level separator regex"""
+    parts, start = [], 0
+    for match in re.finditer(separator, _mask(text), re.IGNORECASE):
+        parts.append(text[start:match.start()].strip())
+        start = match.end()
+    parts.append(text[start:].strip())
+    return parts
+
+
+def _literal(text: str) -> Tuple[bool, Any]:
+    """Parse a SQL string or number literal; returns (ok, value)"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == "'" and "'" not in text[1:-1].replace("''", ""):
+        return True, text[1:-1].replace("''", "'")
+    if _INTEGER_RE.match(text):
+        return True, int(text)
+    if _FLOAT_RE.match(text):
+        return True, float(text)
+    return False, None
+
+
+def _render_literal(value: Any) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """SQLite's ordering across storage classes: NULL < numbers < text < blobs"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+
+def _output_name(expression: str) -> str:
+    """Column name SQLite gives an unaliased result column"""
+    if _IDENTIFIER_RE.match(expression):
+        return expression.rsplit(".", 1)[-1]
+    return expression
+
+
+@dataclass
+class _AggregateQuery:
+    """An aggregate query taken apart for merging"""
+    source: str
+    residual: Tuple[str, ...]
+    groups: List[str]
+    # Dimension -> allowed values, or None when it must only be non-null
+    filters: Dict[str, Optional[FrozenSet[Any]]]
+    # (output name, aggregate function or None for a group column, argument)
+    items: List[Tuple[str, Optional[str], str]]
+    order: List[Tuple[int, bool]]
+
+    @property
+    def dimensions(self) -> List[str]:
+        return self.groups + [name for name in self.filters if name not in self.groups]
+
+
+def parse_aggregate_query(sql: str) -> Optional[_AggregateQuery]:
+    """
+    Take apart a ``SELECT ... FROM ... [WHERE] [GROUP BY] [ORDER BY]``
+    aggregate query, or return None if it cannot be merged safely.
+    """
+    text = sql.strip().rstrip(";").strip()
+    try:
+        mask = _mask(text)
+    except ValueError:
+        return None
+    if not re.match(r"\s*SELECT\b", mask, re.IGNORECASE) or _UNSUPPORTED_RE.search(mask):
+        return None
+
+    clauses: Dict[str, str] = {}
+    matches = list(_CLAUSE_RE.finditer(mask))
+    names = [re.sub(r"\s+", " ", match.group(1).upper()) for match in matches]
+    if names[:1] != ["FROM"] or len(set(names)) != len(names) or names != sorted(
+        names, key=["FROM", "WHERE", "GROUP BY", "ORDER BY"].index
+    ):
+        return None
+    select_list = text[re.match(r"\s*SELECT\b", mask, re.IGNORECASE).end():matches[0].start()]
+    for index, (name, match) in enumerate(zip(names, matches)):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        clauses[name] = text[match.end():end].strip()
+
+    groups = _split(clauses["GROUP BY"], ",") if "GROUP BY" in clauses else []
+    if not all(_IDENTIFIER_RE.match(group) for group in groups):
+        return None
+
+    items: List[Tuple[str, Optional[str], str]] = []
+    for item in _split(select_list, ","):
+        alias = _ALIAS_RE.search(_mask(item))
+        expression = item[:alias.start()].strip() if alias else item
+        name = alias.group(1) if alias else _output_name(expression)
+        if expression in groups:
+            items.append((name, None, expression))
+            continue
+        aggregate = _AGGREGATE_RE.match(expression)
+        if aggregate is None:
+            return None
+        function, argument = aggregate.group(1).upper(), aggregate.group(2).strip()
+        try:
+            _mask(argument)
+        except ValueError:
+            # COUNT(a) + SUM(b) is not one call
+            return None
+        if argument == "*" and function != "COUNT":
+            return None
+        if re.match(r"DISTINCT\b", argument, re.IGNORECASE):
+            # Distinct counts do not add up across partial groups
+            return None
+        items.append((name, function, argument))
+    if not groups and all(function is None for _, function, _ in items):
+        return None
+
+    residual: List[str] = []
+    filters: Dict[str, Optional[FrozenSet[Any]]] = {}
+    where = clauses.get("WHERE")
+    if where:
+        if re.search(r"\b(OR|BETWEEN)\b", _mask(where), re.IGNORECASE):
+            conjuncts = [where]
+        else:
+            conjuncts = _split(where, r"\bAND\b")
+        for conjunct in conjuncts:
+            column, allowed = _dimension_filter(conjunct, groups)
+            if column is None:
+                residual.append(normalize_sql(conjunct))
+            elif allowed is None:
+                filters.setdefault(column, None)
+            else:
+                current = filters.get(column)
+                filters[column] = allowed if current is None else current & allowed
+
+    order: List[Tuple[int, bool]] = []
+    if "ORDER BY" in clauses:
+        names_by_key = {}
+        for position, (name, function, argument) in enumerate(items):
+            names_by_key.setdefault(name, position)
+            expression = argument if function is None else f"{function}({argument})"
+            names_by_key.setdefault(normalize_sql(expression).upper(), position)
+        for item in _split(clauses["ORDER BY"], ","):
+            match = _ORDER_ITEM_RE.match(item)
+            key = match.group(1).strip()
+            if _INTEGER_RE.match(key) and 1 <= int(key) <= len(items):
+                position = int(key) - 1
+            else:
+                position = names_by_key.get(key, names_by_key.get(normalize_sql(key).upper()))
+            if position is None:
+                return None
+            order.append((position, (match.group(2) or "").upper() == "DESC"))
+
+    return _AggregateQuery(
+        source=normalize_sql(clauses["FROM"]),
+        residual=tuple(sorted(residual)),
+        groups=groups,
+        filters=filters,
+        items=items,
+        order=order
+    )
+
+
+def _dimension_filter(conjunct: str, groups: Sequence[str]) -> Tuple[Optional[str], Optional[FrozenSet[Any]]]:
+    """
+    Recognise a conjunct the roll-up can apply on a dimension.
+
+    Returns (column, allowed values) for IN and equality filters, (column,
+    None) for IS NOT NULL on a grouping column and (None, None) otherwise.
+    Equality with a number on a column that is not grouped (an id lookup,
+    say) stays in the scan, where it does not add a dimension.
+    """
+    match = _IN_RE.match(conjunct)
+    if match and _IDENTIFIER_RE.match(match.group(1)):
+        values = [_literal(value) for value in _split(match.group(2), ",")]
+        if values and all(ok for ok, _ in values):
+            if match.group(1) in groups or all(isinstance(value, str) for _, value in values):
+                return match.group(1), frozenset(value for _, value in values)
+        return None, None
+    match = _EQUALS_RE.match(conjunct)
+    if match and _IDENTIFIER_RE.match(match.group(1).strip()):
+        column = match.group(1).strip()
+        ok, value = _literal(match.group(2))
+        if ok and (column in groups or isinstance(value, str)):
+            return column, frozenset([value])
+        return None, None
+    match = _NOT_NULL_RE.match(conjunct)
+    if match and match.group(1) in groups:
+        return match.group(1), None
+    return None, None
+
+
+@dataclass
+class QueryRoute:
+    """A plan query answered by a shared scan"""
+    plan_index: int
+    name: str
+    sql: str
+
+
+@dataclass
+class SharedScan:
+    """
+    One query run on behalf of several plan queries.
+
+    A merged scan groups by the union of its queries' dimensions and each
+    route is rolled up from its rows; an unmerged scan is a query run
+    verbatim whose result is copied to every route.
+    """
+    name: str
+    sql: str
+    source: Optional[str]
+    routes: List[QueryRoute]
+    merged: bool = False
+    dimensions: List[str] = field(default_factory=list)
+    aggregates: List[Tuple[str, str]] = field(default_factory=list)
+    specs: List[Optional[_AggregateQuery]] = field(default_factory=list, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "sql": self.sql,
+            "source": self.source,
+            "merged": self.merged,
+            "routes": [{"plan_index": route.plan_index, "name": route.name} for route in self.routes],
+        }
+
+
+@dataclass
+class BatchPlan:
+    """The shared scans answering every query of a batch of plans"""
+    plans: List[TestPlan]
+    scans: List[SharedScan]
+
+    @property
+    def query_count(self) -> int:
+        return sum(len(plan.sql_queries) for plan in self.plans)
+
+    def scans_per_source(self) -> Dict[str, int]:
+        """How many scans read each source; unparsed queries are left out"""
+        counts: Dict[str, int] = {}
+        for scan in self.scans:
+            if scan.source is not None:
+                counts[scan.source] = counts.get(scan.source, 0) + 1
+        return counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "plans": len(self.plans),
+            "queries": self.query_count,
+            "scans": [scan.to_dict() for scan in self.scans],
+        }
+
+
+class BatchPlanner:
+    """
+    Runs the queries of many test plans as a few shared scans.
+
+    ``plan`` computes the shared scans; ``run`` executes them and returns
+    one PlanExecutionResult per plan, as PlanExecutor would have;
+    ``evaluate`` also computes each plan's statistics from the routed
+    rows.
+    """
+
+    def __init__(self, database: Optional[Union[str, Path]] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, preview_rows: int = DEFAULT_PREVIEW_ROWS,
+                 summarize: bool = True, pool: Optional[ConnectionPool] = None,
+                 cache: Optional[ResultCache] = None, max_dimensions: int = MAX_SHARED_DIMENSIONS):
+        """
+        Args:
+            database: SQLite database file, opened read-only; not needed
+                when a pool is given
+            batch_size: Rows fetched per fetchmany call
+            preview_rows: Leading rows of each routed result kept
+            summarize: Compute column statistics of each routed result
+            pool: Connection pool to run scans on
+            cache: Optional result cache for the database
+            max_dimensions: Dimensions one merged scan may group by
+        """
+        if database is None and pool is None:
+            raise ValueError("BatchPlanner needs a database or a connection pool")
+        if max_dimensions < 1:
+            raise ValueError("max_dimensions must be at least 1")
+        self.batch_size = batch_size
+        self.preview_rows = preview_rows
+        self.summarize = summarize
+        self.cache = cache
+        self.max_dimensions = max_dimensions
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool.for_sqlite(Path(database), max_size=1)
+
+    def close(self) -> None:
+        """Close the planner's own pool; a pool passed in is left open"""
+        if self._owns_pool:
+            self.pool.close()
+
+    def __enter__(self) -> "BatchPlanner":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def plan(self, plans: Sequence[TestPlan]) -> BatchPlan:
+        """
+        Deduplicate and merge the queries of a batch of plans.
+
+        Args:
+            plans: Test plans of the batch
+
+        Returns:
+            BatchPlan: Shared scans, each listing the plan queries it answers
+        """
+        verbatim: Dict[str, SharedScan] = {}
+        # (source, residual) -> merged scans being filled
+        buckets: Dict[Tuple[str, Tuple[str, ...]], List[SharedScan]] = {}
+        parsed: Dict[str, Optional[_AggregateQuery]] = {}
+        normalized_by_sql: Dict[str, str] = {}
+
+        for plan_index, plan in enumerate(plans):
+            for query_index, query in enumerate(plan.sql_queries):
+                route = QueryRoute(plan_index, query.get("name", f"query_{query_index}"), query["sql"])
+                normalized = normalized_by_sql.get(query["sql"])
+                if normalized is None:
+                    normalized = normalized_by_sql[query["sql"]] = normalize_sql(query["sql"])
+                if normalized not in parsed:
+                    parsed[normalized] = parse_aggregate_query(query["sql"])
+                spec = parsed[normalized]
+                if spec is None:
+                    scan = verbatim.get(normalized)
+                    if scan is None:
+                        scan = verbatim[normalized] = SharedScan(
+                            name="", sql=query["sql"], source=_source_of(query["sql"]), routes=[]
+                        )
+                    scan.routes.append(route)
+                    continue
+
+                scans = buckets.setdefault((spec.source, spec.residual), [])
+                for scan in scans:
+                    combined = set(scan.dimensions) | set(spec.dimensions)
+                    if len(combined) <= self.max_dimensions:
+                        break
+                else:
+                    scan = SharedScan(name="", sql="", source=spec.source, routes=[], merged=True)
+                    scans.append(scan)
+                for dimension in spec.dimensions:
+                    if dimension not in scan.dimensions:
+                        scan.dimensions.append(dimension)
+                scan.routes.append(route)
+                scan.specs.append(spec)
+
+        shared = list(verbatim.values()) + [scan for scans in buckets.values() for scan in scans]
+        for index, scan in enumerate(shared):
+            scan.name = f"shared_scan_{index}"
+            if scan.merged:
+                scan.sql = self._scan_sql(scan)
+            else:
+                scan.specs = [None] * len(scan.routes)
+        batch = BatchPlan(plans=list(plans), scans=shared)
+        logger.info("batch_planned", plans=len(plans), queries=batch.query_count, scans=len(shared))
+        return batch
+
+    def _scan_sql(self, scan: SharedScan) -> str:
+        """SQL of a merged scan: every needed aggregate at the finest grouping"""
+        aggregates: List[Tuple[str, str]] = []
+        for spec in scan.specs:
+            for _, function, argument in spec.items:
+                if function is None:
+                    continue
+                needed = [("SUM", argument), ("COUNT", argument)] if function == "AVG" else [(function, argument)]
+                for aggregate in needed:
+                    if aggregate not in aggregates:
+                        aggregates.append(aggregate)
+        scan.aggregates = aggregates
+
+        conditions = list(scan.specs[0].residual)
+        for dimension in scan.dimensions:
+            restrictions = [spec.filters.get(dimension, ()) for spec in scan.specs]
+            if any(restriction == () for restriction in restrictions):
+                continue
+            if any(restriction is None for restriction in restrictions):
+                conditions.append(f"{dimension} IS NOT NULL")
+            else:
+                values = sorted(frozenset().union(*restrictions), key=_sort_key)
+                conditions.append(f"{dimension} IN ({', '.join(map(_render_literal, values))})")
+
+        selected = [f"{dimension} AS d{index}" for index, dimension in enumerate(scan.dimensions)]
+        selected += [f"{function}({argument}) AS a{index}" for index, (function, argument) in enumerate(aggregates)]
+        sql = f"SELECT {', '.join(selected)} FROM {scan.source}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        if scan.dimensions:
+            sql += f" GROUP BY {', '.join(scan.dimensions)}"
+        return sql
+
+    def run(self, plans: Union[Sequence[TestPlan], BatchPlan],
+            row_sink: Optional[BatchRowSink] = None) -> List[PlanExecutionResult]:
+        """
+        Execute a batch and route the results back to each plan.
+
+        Args:
+            plans: Test plans, or a BatchPlan already computed for them
+            row_sink: Optional callback receiving each plan query's rows
+
+        Returns:
+            List[PlanExecutionResult]: One per plan, queries in plan order
+        """
+        batch = plans if isinstance(plans, BatchPlan) else self.plan(plans)
+        routed: List[Dict[str, QueryResult]] = [{} for _ in batch.plans]
+        scan_rows: List[Tuple[Any, ...]] = []
+        verbatim_routes: List[QueryRoute] = []
+
+        def collect(name: str, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+            scan_rows.extend(rows)
+
+        def fan_out(name: str, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+            for route in verbatim_routes:
+                row_sink(route.plan_index, route.name, columns, rows)
+
+        scanner = PlanExecutor(batch_size=self.batch_size, preview_rows=0, row_sink=collect,
+                               summarize=False, pool=self.pool, cache=self.cache)
+        runner = PlanExecutor(batch_size=self.batch_size, preview_rows=self.preview_rows,
+                              row_sink=fan_out if row_sink is not None else None,
+                              summarize=self.summarize, pool=self.pool, cache=self.cache)
+
+        start = time.perf_counter()
+        for scan in batch.scans:
+            if not scan.merged:
+                verbatim_routes[:] = scan.routes
+                result = runner.execute_query(scan.name, scan.sql)
+                for route in scan.routes:
+                    routed[route.plan_index][route.name] = result.copy(name=route.name, sql=route.sql)
+                continue
+
+            scan_rows.clear()
+            result = scanner.execute_query(scan.name, scan.sql)
+            # Plans asking the same question share one parsed spec; roll it up once
+            rolled: Dict[int, Tuple[QueryResult, List[Tuple[Any, ...]]]] = {}
+            for route, spec in zip(scan.routes, scan.specs):
+                if id(spec) not in rolled:
+                    rolled[id(spec)] = self._roll_up_result(scan, spec, result, scan_rows)
+                query_result, rows = rolled[id(spec)]
+                routed[route.plan_index][route.name] = query_result.copy(name=route.name, sql=route.sql)
+                if row_sink is not None and rows:
+                    row_sink(route.plan_index, route.name, query_result.columns, rows)
+        elapsed = time.perf_counter() - start
+        logger.info("batch_executed", scans=len(batch.scans), plans=len(batch.plans), seconds=elapsed)
+
+        executions = []
+        for plan_index, plan in enumerate(batch.plans):
+            results = [
+                routed[plan_index][query.get("name", f"query_{index}")]
+                for index, query in enumerate(plan.sql_queries)
+            ]
+            executions.append(PlanExecutionResult(
+                hypothesis=plan.hypothesis,
+                results=results,
+                elapsed_seconds=sum(result.elapsed_seconds for result in results)
+            ))
+        return executions
+
+    def evaluate(self, plans: Union[Sequence[TestPlan], BatchPlan],
+                 engine: Optional[StatsEngine] = None) -> List[StatsReport]:
+        """Run a batch and evaluate each plan's statistical methods from its routed rows"""
+        batch = plans if isinstance(plans, BatchPlan) else self.plan(plans)
+        rows: List[Dict[str, List[Tuple[Any, ...]]]] = [{} for _ in batch.plans]
+        wanted = [
+            {query["name"] for query in plan.sql_queries if query.get("statistics") is not None}
+            for plan in batch.plans
+        ]
+
+        def collect(plan_index: int, name: str, columns: Sequence[str], batch_rows: List[Tuple[Any, ...]]) -> None:
+            if name in wanted[plan_index]:
+                rows[plan_index].setdefault(name, []).extend(batch_rows)
+
+        executions = self.run(batch, row_sink=collect)
+        engine = engine or StatsEngine()
+        reports = []
+        for plan_index, (plan, execution) in enumerate(zip(batch.plans, executions)):
+            for result in execution.results:
+                if result.success and result.name in wanted[plan_index]:
+                    rows[plan_index].setdefault(result.name, [])
+            report = engine.evaluate_summaries(plan, summaries_from_results(plan, rows[plan_index]))
+            failures = {
+                query.get("statistics"): result.error
+                for query, result in zip(plan.sql_queries, execution.results)
+                if not result.success and query.get("statistics") is not None
+            }
+            for method_result in report.results:
+                error = failures.get(METHOD_STATISTICS[method_result.method.value])
+                if error is not None:
+                    method_result.error = error
+            reports.append(report)
+        return reports
+
+    def _roll_up_result(self, scan: SharedScan, spec: _AggregateQuery, scanned: QueryResult,
+                        scan_rows: List[Tuple[Any, ...]]) -> Tuple[QueryResult, List[Tuple[Any, ...]]]:
+        """Roll one query up from its shared scan's rows; returns its result and rows"""
+        start = time.perf_counter()
+        columns = [name for name, _, _ in spec.items]
+        result = QueryResult(name="", sql="", columns=columns)
+        if not scanned.success:
+            result.error = scanned.error
+            return result, []
+
+        rows = _roll_up(scan, spec, scan_rows)
+        if rows:
+            accumulator = ResultAccumulator(result, self.preview_rows, self.summarize)
+            accumulator.add(rows)
+            accumulator.finish()
+        result.elapsed_seconds = scanned.elapsed_seconds + time.perf_counter() - start
+        return result, rows
+
+
+def _source_of(sql: str) -> Optional[str]:
+    """FROM clause of a query that could not be merged, when it has a plain one"""
+    try:
+        mask = _mask(sql)
+    except ValueError:
+        return None
+    matches = list(_CLAUSE_RE.finditer(mask))
+    if not matches or matches[0].group(1).upper() != "FROM" or _UNSUPPORTED_RE.search(mask):
+        return None
+    end = matches[1].start() if len(matches) > 1 else len(sql.rstrip().rstrip(";"))
+    return normalize_sql(sql[matches[0].end():end])
+
+
+def _combine(function: str, values: List[Any]) -> Any:
+    present = [value for value in values if value is not None]
+    if function == "COUNT":
+        return sum(present)
+    if not present:
+        return None
+    if function == "SUM":
+        return sum(present)
+    if function == "MIN":
+        return min(present, key=_sort_key)
+    return max(present, key=_sort_key)
+
+
+def _roll_up(scan: SharedScan, spec: _AggregateQuery,
+             scan_rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+    """Filter a merged scan's rows to one query and re-aggregate them at its grouping"""
+    position = {dimension: index for index, dimension in enumerate(scan.dimensions)}
+    offset = len(scan.dimensions)
+    aggregate_position = {aggregate: offset + index for index, aggregate in enumerate(scan.aggregates)}
+    checks = [(position[column], allowed) for column, allowed in spec.filters.items()]
+    group_positions = [position[group] for group in spec.groups]
+
+    groups: Dict[Tuple[Any, ...], List[Tuple[Any, ...]]] = {}
+    for row in scan_rows:
+        if all(row[index] is not None and (allowed is None or row[index] in allowed)
+               for index, allowed in checks):
+            groups.setdefault(tuple(row[index] for index in group_positions), []).append(row)
+    if not spec.groups and not groups:
+        # A global aggregate returns one row even over no input
+        groups[()] = []
+
+    output = []
+    for key, rows in groups.items():
+        values = dict(zip(spec.groups, key))
+        out = []
+        for _, function, argument in spec.items:
+            if function is None:
+                out.append(values[argument])
+            elif function == "AVG":
+                total = _combine("SUM", [row[aggregate_position[("SUM", argument)]] for row in rows])
+                count = _combine("COUNT", [row[aggregate_position[("COUNT", argument)]] for row in rows])
+                out.append(total / count if count else None)
+            else:
+                out.append(_combine(function, [row[aggregate_position[(function, argument)]] for row in rows]))
+        output.append(tuple(out))
+
+    if spec.order:
+        for index, descending in reversed(spec.order):
+            output.sort(key=lambda row: _sort_key(row[index]), reverse=descending)
+    else:
+        group_columns = [index for index, (_, function, _) in enumerate(spec.items) if function is None]
+        output.sort(key=lambda row: [_sort_key(row[index]) for index in group_columns])
+    return output
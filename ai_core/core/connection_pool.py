@@ -0,0 +1,304 @@
+"""
+Bounded pool of database connections for plan execution.
+
+Opening a SQLite connection, applying its PRAGMAs and warming its page
+cache costs far more than a small analytical query, so PlanExecutor and
+PlanScheduler check connections out of a ConnectionPool and return them
+afterwards. Idle connections are reused most-recently-returned first,
+which keeps the warmest page cache in use.
+
+The pool only needs a zero-argument factory returning a DB-API 2.0
+connection, so another driver can be plugged in by passing its own
+factory and its ``Error`` class; ``sqlite_factory`` builds the one used for
+local files.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from .log import DEFAULT_RATE_LIMIT, get_logger
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CHECKOUT_TIMEOUT = 30.0
+
+# Idle connections are probed before reuse once they have sat this long
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+
+# Applied to every new SQLite connection: a 64 MiB page cache, 256 MiB of
+# memory-mapped I/O and in-memory temporary tables for sorts and GROUP BY
+DEFAULT_SQLITE_PRAGMAS: Dict[str, Union[int, str]] = {
+    "cache_size": -65536,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+}
+
+ConnectionFactory = Callable[[], Any]
+
+
+class PoolTimeoutError(TimeoutError):
+    """No connection became available within the checkout timeout"""
+
+
+@dataclass
+class PoolStats:
+    """Counters describing how a pool has been used"""
+    created: int = 0
+    reused: int = 0
+    discarded: int = 0
+    waits: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "waits": self.waits,
+        }
+
+
+def enable_wal(database: Union[str, Path]) -> str:
+    """
+    Switch a database to write-ahead logging.
+
+    Readers never block each other in SQLite; WAL additionally lets readers
+    run while another process writes. The journal mode is stored in the
+    file, so this needs a writable connection once.
+
+    Returns:
+        str: The journal mode now in effect
+    """
+    connection = sqlite3.connect(Path(database))
+    try:
+        return connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def sqlite_factory(database: Union[str, Path], read_only: bool = True,
+                   pragmas: Optional[Dict[str, Union[int, str]]] = None,
+                   wal: bool = False) -> ConnectionFactory:
+    """
+    Factory of SQLite connections for a ConnectionPool.
+
+    Args:
+        database: SQLite database file
+        read_only: Open connections with ``mode=ro`` so queries cannot
+            modify the data
+        pragmas: PRAGMAs run on each new connection; defaults to
+            DEFAULT_SQLITE_PRAGMAS
+        wal: Switch the database to WAL mode once, before the first
+            connection is made
+
+    Returns:
+        ConnectionFactory: Zero-argument callable opening a configured
+        connection
+    """
+    path = Path(database)
+    settings = list((DEFAULT_SQLITE_PRAGMAS if pragmas is None else pragmas).items())
+    if wal:
+        enable_wal(path)
+
+    def connect() -> sqlite3.Connection:
+        if read_only:
+            connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        else:
+            connection = sqlite3.connect(path, check_same_thread=False)
+        for name, value in settings:
+            connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    return connect
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most ``max_size`` connections.
+
+    Connections are created on demand up to the bound; past it, a checkout
+    waits for one to be returned and raises PoolTimeoutError after
+    ``timeout`` seconds. A connection idle for longer than
+    ``health_check_interval`` is probed with ``health_check_sql`` before it
+    is handed out, and replaced if the probe fails.
+    """
+
+    def __init__(self, factory: ConnectionFactory, max_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+                 health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+                 health_check_sql: str = "SELECT 1",
+                 errors: Tuple[Type[BaseException], ...] = (sqlite3.Error,)):
+        """
+        Args:
+            factory: Zero-argument callable returning a new DB-API connection
+            max_size: Maximum number of open connections
+            timeout: Seconds a checkout waits for a free connection
+            health_check_interval: Idle seconds after which a connection is
+                probed before reuse; 0 probes on every checkout
+            health_check_sql: Statement used as the probe
+            errors: The driver's exception classes, caught by callers that
+                report query failures
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_sql = health_check_sql
+        self.errors = errors
+        self.stats = PoolStats()
+
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+
+    @classmethod
+    def for_sqlite(cls, database: Union[str, Path], max_size: int = DEFAULT_POOL_SIZE,
+                   read_only: bool = True, wal: bool = False, **kwargs: Any) -> "ConnectionPool":
+        """Pool over a local SQLite file; extra arguments go to the constructor"""
+        return cls(sqlite_factory(database, read_only=read_only, wal=wal), max_size=max_size, **kwargs)
+
+    @property
+    def size(self) -> int:
+        """Connections currently open, idle or checked out"""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """
+        Check a connection out of the pool.
+
+        Args:
+            timeout: Seconds to wait for a free connection; defaults to the
+                pool's timeout
+
+        Raises:
+            PoolTimeoutError: If no connection became free in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._available:
+                connection = self._take_idle(deadline, timeout)
+                if connection is None:
+                    # A slot is free: reserve it and connect outside the lock
+                    self._size += 1
+                    self.stats.created += 1
+            if connection is None:
+                return self._create()
+            if self._healthy(*connection):
+                with self._available:
+                    self.stats.reused += 1
+                return connection[0]
+            self._discard(connection[0])
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """Return a connection; ``discard`` closes it instead of reusing it"""
+        if not discard:
+            try:
+                connection.rollback()
+            except self.errors:
+                discard = True
+        with self._available:
+            if not discard and not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._available.notify()
+                return
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Check out a connection for the duration of a ``with`` block"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except BaseException:
+            # The connection may be mid-statement; do not hand it out again
+            self.release(connection, discard=True)
+            raise
+        self.release(connection)
+
+    def close(self) -> None:
+        """Close the idle connections; checked-out ones are closed on release"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _take_idle(self, deadline: float, timeout: float) -> Optional[Tuple[Any, float]]:
+        """Pop an idle connection, or return None when a new one may be opened (lock held)"""
+        waited = False
+        while True:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeoutError(
+                    f"No connection available within {timeout}s ({self.max_size} in use)"
+                )
+            if not waited:
+                self.stats.waits += 1
+                waited = True
+            self._available.wait(remaining)
+
+    def _create(self) -> Any:
+        try:
+            return self.factory()
+        except BaseException:
+            with self._available:
+                self._size -= 1
+                self.stats.created -= 1
+                self._available.notify()
+            raise
+
+    def _healthy(self, connection: Any, returned_at: float) -> bool:
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchall()
+            return True
+        except self.errors as e:
+            logger.warning("pooled_connection_unhealthy", error=str(e))
+            return False
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except self.errors:
+                    pass
+
+    def _discard(self, connection: Any) -> None:
+        try:
+            connection.close()
+        except self.errors:
+            pass
+        with self._available:
+            self._size -= 1
+            self.stats.discarded += 1
+            self._available.notify()
@@ -0,0 +1,259 @@
+"""
+Dictionary-driven entity extraction.
+
+Metrics, dimensions, comparisons and data sources are described by a
+vocabulary file instead of hard-coded substring checks. Every term in the
+vocabulary is compiled into one Aho-Corasick automaton, so a hypothesis is
+lowercased once and scanned once no matter how many terms the vocabulary
+holds.
+
+Vocabulary files are JSON::
+
+    {
+      "version": 1,
+      "concepts": [
+        {
+          "name": "revenue",
+          "terms": ["revenue", "profit"],
+          "entities": {"metrics": ["revenue"], "data_sources": ["sales_data"]}
+        }
+      ]
+    }
+
+A concept is matched when any of its terms occurs anywhere in the
+lowercased hypothesis (so "profit" also matches "profitable"), and then
+contributes its entities. Entities are reported in vocabulary order,
+without duplicates. The terms of a concept yielding a dimension are also
+the values of that dimension the vocabulary knows, spelled as written.
+
+Tiny vocabularies are cheaper to check with a handful of C-level substring
+searches than with a per-character automaton walk, so below
+AUTOMATON_MIN_TERMS terms the extractor does that instead; both give the
+same results.
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_VOCABULARY_PATH = Path(__file__).with_name("data") / "vocabulary.json"
+
+# Entity categories always present in extraction results
+ENTITY_CATEGORIES = ("metrics", "dimensions", "comparisons", "data_sources")
+
+# Vocabularies with fewer terms are matched with plain substring checks
+AUTOMATON_MIN_TERMS = 48
+
+# Distinct sets of matched concepts whose merged entities are remembered
+MERGED_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Concept:
+    """A vocabulary entry: the terms that signal it and the entities it yields"""
+    name: str
+    terms: Tuple[str, ...]
+    entities: Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton mapping keywords to payload ids.
+
+    ``search`` reports the payloads of every keyword occurring in the text,
+    including overlapping and nested occurrences, in a single left-to-right
+    pass.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+
+        for keyword, payload in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(payload)
+
+        # Breadth-first failure links; each state inherits its fallback's outputs
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state] |= outputs[self._fail[next_state]]
+
+        self._outputs: List[Optional[FrozenSet[int]]] = [
+            frozenset(output) if output else None for output in outputs
+        ]
+        self.payload_count = len(set().union(*outputs))
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def search(self, text: str) -> Set[int]:
+        """Payloads of every keyword occurring in ``text``"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        wanted = self.payload_count
+        found: Set[int] = set()
+        state = 0
+
+        for char in text:
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            output = outputs[state]
+            if output is not None:
+                found |= output
+                if len(found) == wanted:
+                    break
+
+        return found
+
+
+class EntityExtractor:
+    """Extracts entities from hypotheses using a compiled vocabulary"""
+
+    def __init__(self, concepts: Iterable[Concept]):
+        self.concepts: Tuple[Concept, ...] = tuple(concepts)
+        # Content hash of the vocabulary; plans built from entities are
+        # cached under it, so editing the vocabulary retires them
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [[concept.name, concept.terms, concept.entities] for concept in self.concepts]
+        ).encode("utf-8")).hexdigest()[:16]
+        self._terms = [
+            (term.lower(), index)
+            for index, concept in enumerate(self.concepts)
+            for term in concept.terms
+            if term
+        ]
+        self._automaton: Optional[KeywordAutomaton] = None
+        if len(self._terms) >= AUTOMATON_MIN_TERMS:
+            self._automaton = KeywordAutomaton(self._terms)
+        self._term_bits = [(term, 1 << index) for term, index in self._terms]
+        # Hypotheses tend to hit the same few concept combinations; keyed by
+        # a bitmask of matched concept indexes
+        self._merged: Dict[int, Tuple[Tuple[str, Tuple[str, ...]], ...]] = {}
+        self._dimension_values: Dict[str, Dict[str, str]] = {}
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "EntityExtractor":
+        """Build an extractor from a vocabulary JSON file"""
+        with open(path, encoding="utf-8") as handle:
+            return cls.from_dict(json.load(handle))
+
+    @classmethod
+    def from_dict(cls, vocabulary: Dict[str, Any]) -> "EntityExtractor":
+        """Build an extractor from a parsed vocabulary document"""
+        concepts = []
+        for entry in vocabulary.get("concepts", []):
+            if not entry.get("terms"):
+                raise ValueError(f"vocabulary concept {entry.get('name')!r} has no terms")
+            concepts.append(Concept(
+                name=entry.get("name", ""),
+                terms=tuple(entry["terms"]),
+                entities=tuple(
+                    (category, tuple(values))
+                    for category, values in entry.get("entities", {}).items()
+                )
+            ))
+        return cls(concepts)
+
+    def extract(self, hypothesis: str) -> Dict[str, List[str]]:
+        """Extract key entities from a hypothesis"""
+        matched = self._match_concepts(hypothesis.lower())
+        merged = self._merged.get(matched)
+        if merged is None:
+            merged = self._merge(matched)
+            if len(self._merged) < MERGED_CACHE_SIZE:
+                self._merged[matched] = merged
+        return {category: list(values) for category, values in merged}
+
+    def dimension_values(self, dimension: str) -> Dict[str, str]:
+        """
+        Known values of a dimension: the terms of the concepts yielding it,
+        keyed by their lowercase form and spelled as in the vocabulary.
+        """
+        values = self._dimension_values.get(dimension)
+        if values is None:
+            values = {}
+            for concept in self.concepts:
+                if dimension in dict(concept.entities).get("dimensions", ()):
+                    for term in concept.terms:
+                        if term:
+                            values.setdefault(" ".join(term.lower().split()), term)
+            self._dimension_values[dimension] = values
+        return values
+
+    def _merge(self, matched: int) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        """Entities contributed by the matched concepts, in vocabulary order"""
+        entities: Dict[str, List[str]] = {category: [] for category in ENTITY_CATEGORIES}
+        remaining = matched
+        while remaining:
+            lowest = remaining & -remaining
+            remaining ^= lowest
+            for category, values in self.concepts[lowest.bit_length() - 1].entities:
+                bucket = entities.setdefault(category, [])
+                for value in values:
+                    if value not in bucket:
+                        bucket.append(value)
+        return tuple((category, tuple(values)) for category, values in entities.items())
+
+    def _match_concepts(self, text: str) -> int:
+        """Bitmask of the concepts with a term occurring in ``text``"""
+        matched = 0
+        if self._automaton is not None:
+            for index in self._automaton.search(text):
+                matched |= 1 << index
+            return matched
+
+        for term, bit in self._term_bits:
+            if term in text:
+                matched |= bit
+        return matched
+
+
+_default_extractor: Optional[EntityExtractor] = None
+
+
+def default_entity_extractor() -> EntityExtractor:
+    """
+    Shared extractor for the vocabulary named by SHELBY_VOCABULARY, or the
+    bundled default vocabulary, built on first use.
+    """
+    global _default_extractor
+    if _default_extractor is None:
+        path = os.environ.get("SHELBY_VOCABULARY") or DEFAULT_VOCABULARY_PATH
+        _default_extractor = EntityExtractor.from_file(path)
+        logger.info("entity_vocabulary_loaded", path=path)
+    return _default_extractor
@@ -8,18 +8,94 @@ that can be executed by the Symbiotic Analysis Environment.
 THE VOW AGAINST HOLLOWNESS: This is real LLM integration for strategic planning.
 """
 
+import asyncio
+import functools
 import json
-import logging
 import re
-from typing import Dict, Any, Optional, List
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Mapping, Sequence, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 # Disable transformers for testing to avoid hanging
 TRANSFORMERS_AVAILABLE = False
-logging.warning("Transformers disabled for testing, using rule-based system")
 
-logger = logging.getLogger(__name__)
+# AutoTokenizer, AutoModelForCausalLM and pipeline are bound at module level
+# by _import_transformers on the first model load, keeping the slow import
+# off the import path of every process that never loads a model.
+
+from .entity_extractor import EntityExtractor, default_entity_extractor
+from .inference import (DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher, PipelineBackend,
+                        backend_name)
+from .log import DEFAULT_RATE_LIMIT, get_logger, joint_sampler
+from .metrics import DeconstructorMetrics, StageTimer, default_metrics
+from .schema_catalog import Column, SchemaCatalog, load_catalog, quote_identifier
+from .sufficient_statistics import (
+    CO_MOMENTS,
+    GROUPED_MOMENTS,
+    METHOD_STATISTICS,
+    MOMENTS,
+    co_moments_query,
+    grouped_moments_query,
+    moments_query,
+)
+from .tracing import Span, Tracer, current_span, default_tracer
+
+if TYPE_CHECKING:
+    from .plan_cache import PlanCache
+
+# Bump whenever rule or prompt changes alter the plans produced for the same
+# input, so persisted plans from older versions are not served
+DECONSTRUCTOR_VERSION = "4"
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+# One request in this many logs its hypothesis and pattern at INFO
+REQUEST_LOG_SAMPLE_EVERY = 100
+
+# Variables summarized together by a co-moment query; its cross-product
+# terms grow quadratically
+MAX_CO_MOMENT_VARIABLES = 5
+
+# Words introducing the groups a comparison is drawn between, as in
+# "customers from California ... customers from New York"
+_COMPARED_GROUP_PREFIX = r"\b(?:from|in)\s+"
+
+# Model lifecycle reported by HypothesisDeconstructor.model_status
+MODEL_NOT_STARTED = "not_started"
+MODEL_LOADING = "loading"
+MODEL_READY = "ready"
+MODEL_FAILED = "failed"
+MODEL_UNAVAILABLE = "unavailable"
+
+# Hypotheses longer than this are classified on their leading text only;
+# analysts paste whole memos and the pattern cues live in the opening lines.
+MAX_PATTERN_SCAN_LENGTH = 4096
+
+
+def _compile_pattern_classifier(patterns: Dict[str, str]) -> "re.Pattern[str]":
+    """
+    Fold the priority-ordered hypothesis patterns into a single regex.
+
+    Every template is ``.*(<cues>).*`` searched anywhere in the text, so the
+    ``.*`` affixes only add backtracking. Each stripped body is wrapped in a
+    zero-width lookahead and the bodies are joined in priority order; one
+    ``finditer`` pass then reports, for every position, the best pattern that
+    starts there, and the best pattern overall is the one ``re.search`` over
+    the ordered templates would have picked.
+    """
+    alternatives = []
+    for index, pattern_regex in enumerate(patterns.values()):
+        body = pattern_regex
+        if body.startswith(".*"):
+            body = body[2:]
+        if body.endswith(".*") and not body.endswith("\\.*"):
+            body = body[:-2]
+        alternatives.append(f"(?=(?P<p{index}>{body}))")
+    return re.compile("|".join(alternatives))
 
 
 class StatisticalMethod(Enum):
@@ -32,7 +108,74 @@ class StatisticalMethod(Enum):
     DESCRIPTIVE = "descriptive"
 
 
-@dataclass
+_METHODS_BY_VALUE = {method.value: method for method in StatisticalMethod}
+
+
+class _FrozenDict(dict):
+    """Read-only dict used for the SQL query entries of frozen test plans"""
+    
+    __slots__ = ()
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("frozen test plan queries are read-only")
+    
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+    
+    def __reduce__(self):
+        # Unpickled queries (e.g. from worker processes) rejoin the intern table
+        return (_intern_query, (dict(self),))
+
+
+# Frozen plans generated from the same templates share their query entries,
+# SQL text and method tuples through this table. Past the bound it is
+# cleared; already-frozen plans keep their (no longer shared) values.
+MAX_INTERNED_VALUES = 65536
+
+_interned: Dict[Any, Any] = {}
+_intern_lock = threading.Lock()
+
+
+def _intern(key: Any, value: Any) -> Any:
+    """Return the canonical object for ``key``, registering ``value`` if new"""
+    with _intern_lock:
+        existing = _interned.get(key)
+        if existing is not None:
+            return existing
+        if len(_interned) >= MAX_INTERNED_VALUES:
+            _interned.clear()
+        _interned[key] = value
+        return value
+
+
+def _intern_text(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _query_items(query: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((_intern_text(key), _intern_text(value)) for key, value in query.items())
+
+
+def _intern_query(query: Dict[str, str]) -> _FrozenDict:
+    return _intern_query_items(_query_items(query))
+
+
+def _intern_query_items(items: Tuple[Tuple[str, str], ...]) -> _FrozenDict:
+    return _intern(("query", items), _FrozenDict(items))
+
+
+def _intern_queries(queries: Any) -> Tuple[_FrozenDict, ...]:
+    items = tuple(_query_items(query) for query in queries)
+    return _intern(("sql_queries", items), tuple(_intern_query_items(query) for query in items))
+
+
+def _intern_tuple(kind: str, values: Any) -> Tuple[Any, ...]:
+    values = tuple(values)
+    return _intern((kind, values), values)
+
+
+@dataclass(slots=True)
 class TestPlan:
     """Structured test plan for hypothesis validation"""
     hypothesis: str
@@ -44,17 +187,174 @@ class TestPlan:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
-        return {
-            "hypothesis": self.hypothesis,
-            "required_data": self.required_data,
-            "sql_queries": self.sql_queries,
-            "statistical_methods": [method.value for method in self.statistical_methods],
-            "expected_outcome": self.expected_outcome,
-            "confidence_threshold": self.confidence_threshold
-        }
+        return _plan_to_dict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TestPlan":
+        """
+        Rebuild a TestPlan from the output of to_dict.
+        
+        Raises:
+            ValueError: If a field is missing or has the wrong type, a
+                statistical method is unknown, or the confidence threshold is
+                outside (0, 1]
+        """
+        if not isinstance(data, dict):
+            raise ValueError("test plan must be a mapping")
+        threshold = data.get("confidence_threshold", 0.05)
+        if type(threshold) not in (int, float) or not 0 < threshold <= 1:
+            raise ValueError(f"test plan confidence_threshold must be in (0, 1], got {threshold!r}")
+        methods = []
+        for value in _plan_field(data, "statistical_methods", list):
+            method = _METHODS_BY_VALUE.get(value) if isinstance(value, str) else None
+            if method is None:
+                raise ValueError(f"test plan has an unknown statistical method: {value!r}")
+            methods.append(method)
+        return cls(
+            hypothesis=_plan_field(data, "hypothesis", str),
+            required_data=_string_list(data, "required_data"),
+            sql_queries=[_plan_query(query) for query in _plan_field(data, "sql_queries", list)],
+            statistical_methods=methods,
+            expected_outcome=_plan_field(data, "expected_outcome", str),
+            confidence_threshold=float(threshold)
+        )
+    
+    def freeze(self) -> "FrozenTestPlan":
+        """
+        Return an immutable, compact copy of the plan.
+        
+        Query entries, SQL text, data sources and method tuples are interned,
+        so frozen plans built from the same templates share them and cost
+        little more than their hypothesis text.
+        """
+        return FrozenTestPlan(
+            hypothesis=self.hypothesis,
+            required_data=_intern_tuple("required_data", map(_intern_text, self.required_data)),
+            sql_queries=_intern_queries(self.sql_queries),
+            statistical_methods=_intern_tuple("statistical_methods", self.statistical_methods),
+            expected_outcome=_intern_text(self.expected_outcome),
+            confidence_threshold=self.confidence_threshold
+        )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class FrozenTestPlan:
+    """
+    Immutable test plan whose contents are shared with other frozen plans.
+    
+    Produced by TestPlan.freeze and held by the plan caches; ``thaw`` hands
+    callers an ordinary TestPlan of their own.
+    """
+    hypothesis: str
+    required_data: Tuple[str, ...]
+    sql_queries: Tuple[Mapping[str, str], ...]
+    statistical_methods: Tuple[StatisticalMethod, ...]
+    expected_outcome: str
+    confidence_threshold: float = 0.05
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization"""
+        return _plan_to_dict(self)
+    
+    def freeze(self) -> "FrozenTestPlan":
+        return self
+    
+    def thaw(self, hypothesis: Optional[str] = None) -> TestPlan:
+        """
+        Return a TestPlan with this plan's contents.
+        
+        Its fields are new lists and query dicts, the same types a freshly
+        generated plan has, so callers may mutate them without touching the
+        cached plan; only the interned strings are shared.
+        
+        Args:
+            hypothesis: Hypothesis text for the returned plan; defaults to
+                the frozen plan's own
+        """
+        return TestPlan(
+            hypothesis=self.hypothesis if hypothesis is None else hypothesis,
+            required_data=list(self.required_data),
+            sql_queries=[dict(query) for query in self.sql_queries],
+            statistical_methods=list(self.statistical_methods),
+            expected_outcome=self.expected_outcome,
+            confidence_threshold=self.confidence_threshold
+        )
+    
+    def __reduce__(self):
+        return (_thaw_frozen_plan, (self.thaw().to_dict(),))
+
+
+def _thaw_frozen_plan(data: Dict[str, Any]) -> FrozenTestPlan:
+    """Unpickle a frozen plan, re-interning its contents"""
+    return TestPlan.from_dict(data).freeze()
+
+
+def _plan_field(data: Dict[str, Any], name: str, kind: type) -> Any:
+    """A required field of a serialized plan, checked against its type"""
+    if name not in data:
+        raise ValueError(f"test plan is missing {name}")
+    value = data[name]
+    if kind is list and isinstance(value, tuple):
+        return list(value)
+    if not isinstance(value, kind):
+        raise ValueError(f"test plan {name} must be a {kind.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _string_list(data: Dict[str, Any], name: str) -> List[str]:
+    values = _plan_field(data, name, list)
+    for value in values:
+        if not isinstance(value, str):
+            raise ValueError(f"test plan {name} must contain only strings")
+    return list(values)
+
+
+def _plan_query(query: Any) -> Dict[str, str]:
+    """A serialized SQL query entry: string keys and values, with a name and sql"""
+    if not isinstance(query, dict):
+        raise ValueError("test plan sql_queries entries must be mappings")
+    for key, value in query.items():
+        if not isinstance(key, str) or not isinstance(value, str):
+            raise ValueError("test plan sql_queries entries must map strings to strings")
+    if "name" not in query or "sql" not in query:
+        raise ValueError("test plan sql_queries entries need a name and sql")
+    return dict(query)
+
+
+def _plan_to_dict(plan: Any) -> Dict[str, Any]:
+    return {
+        "hypothesis": plan.hypothesis,
+        "required_data": list(plan.required_data),
+        "sql_queries": [dict(query) for query in plan.sql_queries],
+        "statistical_methods": [method.value for method in plan.statistical_methods],
+        "expected_outcome": plan.expected_outcome,
+        "confidence_threshold": plan.confidence_threshold
+    }
+
+
+class _StageMarks:
+    """Marks stage ends on both a sampled StageTimer and a traced span"""
+    
+    __slots__ = ("timer", "span")
+    
+    def __init__(self, timer: StageTimer, span: Span):
+        self.timer = timer
+        self.span = span
+    
+    def mark(self, stage: str) -> None:
+        self.timer.mark(stage)
+        self.span.mark(stage)
+
+
+# Whatever a request's stage ends are marked on, if anything
+StageMarker = Union[StageTimer, Span, _StageMarks]
+
+
+def _traced_stages(timer: Optional[StageTimer], span: Span) -> StageMarker:
+    return span if timer is None else _StageMarks(timer, span)
+
+
+@dataclass(slots=True)
 class DeconstructionResponse:
     """Response from hypothesis deconstruction"""
     success: bool
@@ -62,6 +362,127 @@ class DeconstructionResponse:
     message: str = ""
     error: Optional[str] = None
     confidence: float = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            "success": self.success,
+            "test_plan": self.test_plan.to_dict() if self.test_plan else None,
+            "message": self.message,
+            "error": self.error,
+            "confidence": self.confidence
+        }
+
+
+class _Request:
+    """
+    One deconstruction, with the steps its sync and async paths share.
+    
+    Entering draws whether the request is timed, traced and logged; only a
+    request that is sampled or inside a trace goes on to start a timer or
+    span. ``start`` runs every step before model generation, and builds the
+    rule-based plan itself when no model is ready. Exiting answers an
+    escaping exception with an internal-error response, then finishes the
+    timer and span.
+    """
+    
+    __slots__ = ("deconstructor", "hypothesis", "schema_context", "timer", "span", "stages",
+                 "logged", "pattern_type", "response")
+    
+    def __init__(self, deconstructor: "HypothesisDeconstructor", hypothesis: str,
+                 schema_context: Optional[str]):
+        self.deconstructor = deconstructor
+        self.hypothesis = hypothesis
+        self.schema_context = schema_context
+        self.pattern_type = ""
+        self.response: Optional[DeconstructionResponse] = None
+    
+    def __enter__(self) -> "_Request":
+        deconstructor = self.deconstructor
+        sampling = deconstructor._sample_request()
+        span = current_span()
+        if sampling is None and span is None:
+            self.timer = self.span = self.stages = None
+            self.logged = False
+            return self
+        timed, traced, self.logged = sampling or (False, False, False)
+        self.timer = timer = deconstructor.metrics.stage_timer() if timed else None
+        # Tracer.start_span inlined, with the draw already made
+        if span is not None:
+            span = span.child("deconstruct_hypothesis")
+        elif traced:
+            span = deconstructor.tracer.start_trace("deconstruct_hypothesis")
+        self.span = span
+        self.stages = timer if span is None else _traced_stages(timer, span)
+        return self
+    
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> bool:
+        failed = isinstance(exc, Exception)
+        if failed:
+            if self.span is not None:
+                self.span.record_error(str(exc))
+            self.response = self.deconstructor._internal_error_response(exc)
+        if self.timer is not None:
+            self.timer.finish()
+        if self.span is not None:
+            self.span.end()
+        return failed
+    
+    def start(self) -> bool:
+        """
+        Run the steps before model generation.
+        
+        Returns:
+            bool: True if the model is to generate the plan; False once
+                ``response`` is set, for blank, cached and rule-based requests
+        """
+        deconstructor = self.deconstructor
+        hypothesis = self.hypothesis
+        if not hypothesis or not hypothesis.strip():
+            self.response = deconstructor._empty_hypothesis_response()
+            return False
+        self.hypothesis = hypothesis = hypothesis.strip()
+        
+        cached_plan = deconstructor._get_cached_plan(hypothesis, self.schema_context, self.stages)
+        if cached_plan is not None:
+            self.response = deconstructor._test_plan_response(cached_plan)
+            return False
+        
+        # Analyze hypothesis pattern
+        self.pattern_type = pattern_type = deconstructor._identify_pattern(hypothesis)
+        if self.stages is not None:
+            self.stages.mark("identify_pattern")
+        if self.span is not None:
+            self.span.set_attribute("pattern", pattern_type)
+        if self.logged:
+            deconstructor._log_request(hypothesis, pattern_type)
+        
+        if deconstructor._uses_model():
+            deconstructor._ai_requests[pattern_type].inc()
+            return True
+        deconstructor._rule_based_requests[pattern_type].inc()
+        test_plan = deconstructor._generate_rule_based_test_plan(hypothesis, pattern_type, self.schema_context,
+                                                                 self.stages)
+        self.finish(test_plan, deconstructor.rule_based_variant)
+        return False
+    
+    def finish(self, test_plan: Optional[TestPlan], variant: str) -> None:
+        """Cache a generated plan under its generator's variant and answer with it"""
+        test_plan = self.deconstructor._cache_plan(self.hypothesis, self.schema_context, test_plan, variant)
+        self.response = self.deconstructor._test_plan_response(test_plan)
+    
+    def fall_back(self, error: Exception) -> None:
+        """Answer with a rule-based plan after a failed model generation"""
+        deconstructor = self.deconstructor
+        test_plan = deconstructor._ai_fallback_test_plan(error, self.hypothesis, self.pattern_type,
+                                                         self.schema_context, self.stages)
+        self.finish(test_plan, deconstructor.rule_based_variant)
+
+
+def _import_transformers() -> None:
+    """Bind AutoTokenizer, AutoModelForCausalLM and pipeline at module level"""
+    global AutoTokenizer, AutoModelForCausalLM, pipeline
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 
 
 class HypothesisDeconstructor:
@@ -72,13 +493,72 @@ class HypothesisDeconstructor:
     executable test plans with SQL queries and statistical methods.
     """
     
-    def __init__(self, model_name: str = "microsoft/DialoGPT-medium"):
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium", max_concurrency: int = 4,
+                 plan_cache: Optional["PlanCache"] = None,
+                 entity_extractor: Optional[EntityExtractor] = None,
+                 metrics: Optional[DeconstructorMetrics] = None,
+                 tracer: Optional[Tracer] = None,
+                 batcher: Optional[MicroBatcher] = None,
+                 batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 batch_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 schema_database_dirs: Sequence[str] = ()):
         """Initialize the Hypothesis Deconstructor"""
         self.model_name = model_name
+        # A schema_context naming a SQLite file is only read inside these
+        # directories; by default no local file is ever opened
+        self.schema_database_dirs = tuple(schema_database_dirs)
+        self.plan_cache = plan_cache
+        self.entity_extractor = entity_extractor or default_entity_extractor()
+        # Plan cache variants: what built a plan is part of its key, so plans
+        # built while the model warms up are not served once it is ready, and
+        # rule-based plans from an edited vocabulary are not served at all
+        self.rule_based_variant = f"rules:{self.entity_extractor.fingerprint}"
+        # Pattern finding the known values of a group dimension, by dimension
+        self._group_patterns: Dict[str, Optional[re.Pattern]] = {}
+        # A caller-supplied batcher generates with its own backend, whatever
+        # model_name says
+        self.model_variant = f"model:{model_name if batcher is None else backend_name(batcher.backend)}"
+        self.metrics = metrics or default_metrics()
+        self._rule_based_requests = self.metrics.requests.children("rule_based")
+        self._ai_requests = self.metrics.requests.children("ai")
+        self._cached_requests = self.metrics.requests.labels("cache", "")
+        self.tracer = tracer or default_tracer()
+        # Whether a request is timed, traced and logged, in one draw
+        self._sample_request = joint_sampler(self.metrics.sample_every, self.tracer.sample_every,
+                                             REQUEST_LOG_SAMPLE_EVERY)
         self.model = None
         self.tokenizer = None
         self.pipeline = None
-        self.initialized = False
+        # Runs model generations in micro-batches shared with concurrent
+        # requests. A caller-supplied batcher is a ready model, owned and
+        # closed by the caller; otherwise a successful model load wraps its
+        # pipeline in one of batch_size prompts and batch_wait_ms.
+        self.batcher = batcher
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self._owns_batcher = False
+        # Whether model initialization has finished. Without transformers it
+        # finishes with no model, which model_status reports as unavailable;
+        # plans come from a model only once one can serve them
+        self.initialized = batcher is not None
+        
+        # Bounds concurrent model-backed generations on the async path
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # One model load shared by every caller that asks for it; requests
+        # take the rule-based path until it has finished
+        self._init_lock = threading.Lock()
+        self._init_future: Optional["Future[bool]"] = None
+        self._init_error: Optional[str] = None
+        self._model_unavailable = False
+        if batcher is not None:
+            self._init_future = Future()
+            self._init_future.set_result(True)
         
         # Hypothesis pattern templates (order matters - more specific first)
         self.hypothesis_patterns = {
@@ -88,25 +568,119 @@ class HypothesisDeconstructor:
             "segment": r"customers?\s+from\s+\w+.*",
             "performance": r".*(perform|revenue|profit|sales).*"
         }
+        self._pattern_names = list(self.hypothesis_patterns)
+        self._pattern_classifier = _compile_pattern_classifier(self.hypothesis_patterns)
         
-        logger.info(f"HypothesisDeconstructor initialized with model: {model_name}")
+        logger.info("deconstructor_initialized", model=model_name)
     
     async def initialize_model(self) -> bool:
-        """Initialize the AI model asynchronously"""
+        """
+        Initialize the AI model without blocking the event loop.
+        
+        The model loads on a background thread, and concurrent callers share
+        the same load (see ``start_model_initialization``).
+        
+        Returns:
+            bool: Whether initialization succeeded; also True without
+            transformers, where the rule-based system serves every request
+            and ``model_status`` is MODEL_UNAVAILABLE
+        """
+        return await asyncio.wrap_future(self.start_model_initialization())
+    
+    def start_model_initialization(self) -> "Future[bool]":
+        """
+        Start loading the model in the background, unless a load has already started.
+        
+        Every caller gets the future of the same load, resolving to what
+        ``initialize_model`` returns; only a failed load is retried by a
+        later call.
+        Requests are served by the rule-based system until the load succeeds,
+        and for good if transformers is not installed. A deconstructor given
+        a batcher has nothing to load.
+        
+        Returns:
+            Future[bool]: Completes when the load has finished
+        """
+        with self._init_lock:
+            future = self._init_future
+            if future is not None and not (future.done() and not future.result()):
+                return future
+            loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hypothesis-model-load")
+            self._init_future = future = loader.submit(self._load_model)
+            # The load still runs; the thread exits once it is done
+            loader.shutdown(wait=False)
+            return future
+    
+    @property
+    def model_status(self) -> str:
+        """One of MODEL_NOT_STARTED, MODEL_LOADING, MODEL_READY, MODEL_FAILED or MODEL_UNAVAILABLE"""
+        if self._model_unavailable:
+            return MODEL_UNAVAILABLE
+        if self.initialized:
+            return MODEL_READY
+        future = self._init_future
+        if future is None:
+            return MODEL_NOT_STARTED
+        if not future.done():
+            return MODEL_LOADING
+        return MODEL_FAILED
+    
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Readiness of the engine, for health checks.
+        
+        The engine always serves requests; ``path`` says whether plans
+        currently come from the model or, while it loads, after it has
+        failed or without transformers, from the rule-based system. A
+        model is ``ready`` exactly when plans come from it.
+        """
+        status = self.model_status
+        return {
+            "model": self.model_name,
+            "status": status,
+            "ready": status == MODEL_READY,
+            "path": "ai" if self._uses_model() else "rule_based",
+            "error": self._init_error,
+        }
+    
+    def _load_model(self) -> bool:
+        """Load the tokenizer, model and pipeline behind a MicroBatcher; runs on the loader thread"""
         try:
             if not TRANSFORMERS_AVAILABLE:
-                logger.warning("Transformers not available, using rule-based fallback")
+                logger.warning("transformers_unavailable", fallback="rule_based")
+                self._model_unavailable = True
+                self._init_error = "transformers is not installed"
                 self.initialized = True
                 return True
-
-            # This code path should not be reached in testing
-            logger.info(f"Loading model: {self.model_name}")
+            
+            logger.info("model_loading", model=self.model_name)
+            started = time.perf_counter()
+            if "pipeline" not in globals():
+                _import_transformers()
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            generator = pipeline(
+                "text-generation",
+                model=model,
+                tokenizer=tokenizer,
+                max_length=512,
+                temperature=0.7,
+                do_sample=True
+            )
+            batcher = MicroBatcher(PipelineBackend(generator), max_batch_size=self.batch_size,
+                                   max_wait_ms=self.batch_wait_ms)
+            # Published before the flag, so a request that sees the model
+            # ready also sees the pipeline and its batcher
+            self.tokenizer, self.model, self.pipeline = tokenizer, model, generator
+            self.batcher, self._owns_batcher = batcher, True
+            self._init_error, self._model_unavailable = None, False
             self.initialized = True
-            logger.info("Model loaded successfully")
+            logger.info("model_loaded", model=self.model_name, seconds=time.perf_counter() - started)
             return True
-
+        
         except Exception as e:
-            logger.error(f"Failed to initialize model: {str(e)}")
+            logger.error("model_initialization_failed", model=self.model_name, error=str(e))
+            self._init_error = str(e)
             self.initialized = False
             return False
     
@@ -121,71 +695,181 @@ class HypothesisDeconstructor:
         Returns:
             DeconstructionResponse: Structured test plan or error
         """
-        try:
-            if not hypothesis or not hypothesis.strip():
-                return DeconstructionResponse(
-                    success=False,
-                    message="Empty hypothesis provided",
-                    error="EMPTY_HYPOTHESIS"
-                )
-            
-            hypothesis = hypothesis.strip()
-            logger.info(f"Deconstructing hypothesis: {hypothesis}")
-            
-            # Analyze hypothesis pattern
-            pattern_type = self._identify_pattern(hypothesis)
-            
-            # Generate test plan based on pattern
-            if self.initialized and TRANSFORMERS_AVAILABLE:
-                test_plan = self._generate_ai_test_plan(hypothesis, pattern_type, schema_context)
-            else:
-                test_plan = self._generate_rule_based_test_plan(hypothesis, pattern_type)
+        with _Request(self, hypothesis, schema_context) as request:
+            if request.start():
+                try:
+                    test_plan = self._generate_ai_test_plan(request.hypothesis, request.pattern_type,
+                                                            schema_context, request.stages)
+                except Exception as e:
+                    request.fall_back(e)
+                else:
+                    request.finish(test_plan, self.model_variant)
+        return request.response
+    
+    async def deconstruct_hypothesis_async(self, hypothesis: str,
+                                           schema_context: Optional[str] = None) -> DeconstructionResponse:
+        """
+        Deconstruct a hypothesis without blocking the event loop.
+        
+        Rule-based plans are cheap and built inline. Model-backed generation
+        runs on a thread pool, and at most ``max_concurrency`` generations are
+        in flight at once so a slow model call cannot stall other requests.
+        With a MicroBatcher the generation is awaited instead, batched with
+        those of concurrent requests.
+        
+        Args:
+            hypothesis: Natural language hypothesis to deconstruct
+            schema_context: Optional database schema context
             
-            if test_plan:
-                return DeconstructionResponse(
-                    success=True,
-                    test_plan=test_plan,
-                    message="Hypothesis successfully deconstructed",
-                    confidence=0.85
-                )
-            else:
-                return DeconstructionResponse(
-                    success=False,
-                    message="Failed to generate test plan",
-                    error="GENERATION_FAILED"
-                )
-                
-        except Exception as e:
-            logger.error(f"Error deconstructing hypothesis: {str(e)}")
+        Returns:
+            DeconstructionResponse: Structured test plan or error
+        """
+        with _Request(self, hypothesis, schema_context) as request:
+            if request.start():
+                try:
+                    test_plan = await self._generate_ai_test_plan_async(request.hypothesis, request.pattern_type,
+                                                                        schema_context, request.stages)
+                except Exception as e:
+                    request.fall_back(e)
+                else:
+                    request.finish(test_plan, self.model_variant)
+        return request.response
+    
+    def close(self) -> None:
+        """Shut down the thread pool used for model-backed generation and the loaded model's batcher"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._owns_batcher and self.batcher is not None:
+            self.batcher.close()
+    
+    def _get_cached_plan(self, hypothesis: str, schema_context: Optional[str],
+                         timer: Optional[StageMarker] = None) -> Optional[TestPlan]:
+        """Look the hypothesis up in the plan cache, if one is configured"""
+        if self.plan_cache is None:
+            return None
+        variant = self.model_variant if self._uses_model() else self.rule_based_variant
+        plan = self.plan_cache.get(hypothesis, schema_context, variant)
+        if timer is not None:
+            timer.mark("plan_cache")
+        if plan is not None:
+            self._cached_requests.inc()
+        return plan
+    
+    def _cache_plan(self, hypothesis: str, schema_context: Optional[str],
+                    test_plan: Optional[TestPlan], variant: str) -> Optional[TestPlan]:
+        """Store a freshly generated plan under its generator's variant, if a plan cache is configured"""
+        if self.plan_cache is None or test_plan is None:
+            return test_plan
+        return self.plan_cache.put(hypothesis, schema_context, test_plan, variant)
+    
+    def _uses_model(self) -> bool:
+        """Whether plans come from the model rather than the rule-based system"""
+        return self.initialized and not self._model_unavailable
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the thread pool for model calls, creating it on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="hypothesis-model"
+            )
+        return self._executor
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    def _log_request(self, hypothesis: str, pattern_type: str) -> None:
+        """Log a sampled request; the hypothesis is cut short when the record is rendered"""
+        logger.info("deconstructing_hypothesis", pattern=pattern_type, length=len(hypothesis),
+                    hypothesis=hypothesis, sample_every=REQUEST_LOG_SAMPLE_EVERY)
+    
+    def _empty_hypothesis_response(self) -> DeconstructionResponse:
+        """Response for a missing or blank hypothesis"""
+        self.metrics.errors.inc("EMPTY_HYPOTHESIS")
+        return DeconstructionResponse(
+            success=False,
+            message="Empty hypothesis provided",
+            error="EMPTY_HYPOTHESIS"
+        )
+    
+    def _test_plan_response(self, test_plan: Optional[TestPlan]) -> DeconstructionResponse:
+        """Wrap a generated test plan, or its absence, in a response"""
+        if test_plan:
+            return DeconstructionResponse(
+                success=True,
+                test_plan=test_plan,
+                message="Hypothesis successfully deconstructed",
+                confidence=0.85
+            )
+        else:
+            self.metrics.errors.inc("GENERATION_FAILED")
             return DeconstructionResponse(
                 success=False,
-                message="Internal error during deconstruction",
-                error=str(e)
+                message="Failed to generate test plan",
+                error="GENERATION_FAILED"
             )
     
+    def _internal_error_response(self, error: Exception) -> DeconstructionResponse:
+        """Response for an unexpected error during deconstruction"""
+        logger.error("deconstruction_failed", error=str(error))
+        self.metrics.errors.inc("INTERNAL_ERROR")
+        return DeconstructionResponse(
+            success=False,
+            message="Internal error during deconstruction",
+            error=str(error)
+        )
+    
     def _identify_pattern(self, hypothesis: str) -> str:
         """Identify the pattern type of the hypothesis"""
-        hypothesis_lower = hypothesis.lower()
+        hypothesis_lower = hypothesis[:MAX_PATTERN_SCAN_LENGTH].lower()
         
-        for pattern_name, pattern_regex in self.hypothesis_patterns.items():
-            if re.search(pattern_regex, hypothesis_lower):
-                logger.info(f"Identified pattern: {pattern_name}")
-                return pattern_name
+        best_index = None
+        for match in self._pattern_classifier.finditer(hypothesis_lower):
+            index = int(match.lastgroup[1:])
+            if best_index is None or index < best_index:
+                best_index = index
+                if index == 0:
+                    break
         
-        logger.info("No specific pattern identified, using general approach")
+        if best_index is not None:
+            return self._pattern_names[best_index]
         return "general"
     
-    def _generate_rule_based_test_plan(self, hypothesis: str, pattern_type: str) -> Optional[TestPlan]:
+    def _generate_rule_based_test_plan(self, hypothesis: str, pattern_type: str,
+                                       schema_context: Optional[str] = None,
+                                       timer: Optional[StageMarker] = None) -> Optional[TestPlan]:
         """Generate test plan using rule-based approach"""
         try:
             # Extract key entities from hypothesis
             entities = self._extract_entities(hypothesis)
+            if timer is not None:
+                timer.mark("extract_entities")
             
-            # Generate SQL queries based on pattern
-            sql_queries = self._generate_sql_queries(entities, pattern_type)
+            # Generate SQL queries based on pattern, against the real schema when known
+            catalog = self._load_catalog(schema_context)
+            if timer is not None:
+                timer.mark("load_catalog")
+            sql_queries = self._generate_sql_queries(entities, pattern_type, catalog)
+            if timer is not None:
+                timer.mark("generate_sql_queries")
             
             # Determine statistical methods
             statistical_methods = self._determine_statistical_methods(pattern_type)
+            if timer is not None:
+                timer.mark("determine_statistical_methods")
+            
+            # Push the methods' sufficient statistics down into SQL aggregates
+            sql_queries += self._generate_statistics_queries(
+                entities, pattern_type, statistical_methods, catalog, hypothesis
+            )
+            if timer is not None:
+                timer.mark("generate_statistics_queries")
             
             # Generate expected outcome
             expected_outcome = self._generate_expected_outcome(hypothesis, pattern_type)
@@ -200,53 +884,119 @@ class HypothesisDeconstructor:
             )
             
         except Exception as e:
-            logger.error(f"Error generating rule-based test plan: {str(e)}")
+            logger.error("rule_based_generation_failed", pattern=pattern_type, error=str(e))
             return None
     
-    def _generate_ai_test_plan(self, hypothesis: str, pattern_type: str, schema_context: Optional[str]) -> Optional[TestPlan]:
-        """Generate test plan using AI model"""
-        try:
-            # Create prompt for AI
-            prompt = self._create_ai_prompt(hypothesis, pattern_type, schema_context)
-            
-            # Generate response using AI
+    def _generate_ai_test_plan(self, hypothesis: str, pattern_type: str, schema_context: Optional[str],
+                               timer: Optional[StageMarker] = None) -> Optional[TestPlan]:
+        """Generate test plan using AI model; a failed generation raises"""
+        # Create prompt for AI
+        prompt = self._create_ai_prompt(hypothesis, pattern_type, schema_context)
+        
+        # Generate response using AI
+        if self.batcher is not None:
+            ai_output = self.batcher.generate(prompt)
+        else:
             response = self.pipeline(prompt, max_length=400, num_return_sequences=1)
             ai_output = response[0]['generated_text']
-            
-            # Parse AI output into structured test plan
-            return self._parse_ai_output(ai_output, hypothesis)
-            
-        except Exception as e:
-            logger.error(f"Error generating AI test plan: {str(e)}")
-            # Fallback to rule-based approach
-            return self._generate_rule_based_test_plan(hypothesis, pattern_type)
+        return self._ai_output_test_plan(ai_output, hypothesis, timer)
+    
+    async def _generate_ai_test_plan_async(self, hypothesis: str, pattern_type: str,
+                                           schema_context: Optional[str],
+                                           timer: Optional[StageMarker] = None) -> Optional[TestPlan]:
+        """
+        Generate test plan using AI model without blocking the event loop.
+
+        A MicroBatcher's generation is awaited, batched with those of
+        concurrent requests, and holds no thread. Otherwise the pipeline
+        runs on the thread pool, at most ``max_concurrency`` calls at once.
+        """
+        if self.batcher is not None:
+            prompt = self._create_ai_prompt(hypothesis, pattern_type, schema_context)
+            ai_output = await self.batcher.generate_async(prompt)
+            return self._ai_output_test_plan(ai_output, hypothesis, timer)
+        async with self._get_semaphore():
+            if timer is not None:
+                timer.mark("model_queue")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(),
+                functools.partial(self._generate_ai_test_plan, hypothesis, pattern_type, schema_context, timer)
+            )
+    
+    def _ai_output_test_plan(self, ai_output: str, hypothesis: str,
+                             timer: Optional[StageMarker]) -> Optional[TestPlan]:
+        """Parse AI output into structured test plan"""
+        if timer is not None:
+            timer.mark("model")
+        test_plan = self._parse_ai_output(ai_output, hypothesis)
+        if timer is not None:
+            timer.mark("parse_ai_output")
+        return test_plan
+    
+    def _ai_fallback_test_plan(self, error: Exception, hypothesis: str, pattern_type: str,
+                               schema_context: Optional[str],
+                               timer: Optional[StageMarker]) -> Optional[TestPlan]:
+        """Fallback to rule-based approach after a failed model generation"""
+        logger.error("ai_generation_failed", pattern=pattern_type, error=str(error), fallback="rule_based")
+        self.metrics.fallbacks.inc("model_error")
+        return self._generate_rule_based_test_plan(hypothesis, pattern_type, schema_context, timer)
     
     def _extract_entities(self, hypothesis: str) -> Dict[str, Any]:
         """Extract key entities from hypothesis"""
-        entities = {
-            "metrics": [],
-            "dimensions": [],
-            "comparisons": [],
-            "data_sources": []
-        }
-        
-        # Simple entity extraction patterns
-        if "revenue" in hypothesis.lower() or "profit" in hypothesis.lower():
-            entities["metrics"].append("revenue")
-            entities["data_sources"].append("sales_data")
-        
-        if "customer" in hypothesis.lower():
-            entities["dimensions"].append("customer")
-            entities["data_sources"].append("customer_data")
-        
-        if "california" in hypothesis.lower() or "new york" in hypothesis.lower():
-            entities["dimensions"].append("state")
-            entities["comparisons"].append("geographic")
-        
-        return entities
+        return self.entity_extractor.extract(hypothesis)
+
+    def _compared_groups(self, hypothesis: str, dimension: str) -> List[str]:
+        """
+        The two values of ``dimension`` a comparison names, in order; empty unless there are two.
+
+        Only values the entity vocabulary knows count, matched regardless of
+        case and spelled as in the vocabulary. "Revenue in Q1" names no state,
+        and hypotheses differing only in case, which share a plan cache
+        entry, compare the same groups.
+        """
+        if dimension not in self._group_patterns:
+            values = sorted(self.entity_extractor.dimension_values(dimension), key=len, reverse=True)
+            self._group_patterns[dimension] = re.compile(
+                _COMPARED_GROUP_PREFIX + "(" + "|".join(
+                    r"\s+".join(re.escape(word) for word in value.split()) for value in values
+                ) + r")\b",
+                re.IGNORECASE
+            ) if values else None
+        pattern = self._group_patterns[dimension]
+        if pattern is None:
+            return []
+
+        spellings = self.entity_extractor.dimension_values(dimension)
+        groups: List[str] = []
+        for match in pattern.finditer(hypothesis):
+            group = spellings[" ".join(match.group(1).lower().split())]
+            if group not in groups:
+                groups.append(group)
+        return groups[:2] if len(groups) >= 2 else []
+
+    def _load_catalog(self, schema_context: Optional[str]) -> Optional[SchemaCatalog]:
+        """Parsed catalog for the schema context; None if absent or unreadable"""
+        try:
+            return load_catalog(schema_context, self.schema_database_dirs)
+        except Exception as e:
+            logger.warning("schema_context_unreadable", error=str(e))
+            return None
+
+    def _generate_sql_queries(self, entities: Dict[str, Any], pattern_type: str,
+                              catalog: Optional[SchemaCatalog] = None) -> List[Dict[str, str]]:
+        """
+        Generate SQL queries based on entities and pattern.
+
+        With a schema catalog, entities are resolved to real tables and
+        columns; patterns the catalog cannot satisfy fall back to the generic
+        query templates.
+        """
+        if catalog is not None:
+            queries = self._generate_catalog_sql_queries(entities, pattern_type, catalog)
+            if queries:
+                return queries
 
-    def _generate_sql_queries(self, entities: Dict[str, Any], pattern_type: str) -> List[Dict[str, str]]:
-        """Generate SQL queries based on entities and pattern"""
         queries = []
 
         if pattern_type == "comparison" or pattern_type == "segment":
@@ -285,6 +1035,209 @@ class HypothesisDeconstructor:
 
         return queries
 
+    def _generate_catalog_sql_queries(self, entities: Dict[str, Any], pattern_type: str,
+                                      catalog: SchemaCatalog) -> List[Dict[str, str]]:
+        """Generate SQL queries against the tables and columns of a schema catalog"""
+        if pattern_type == "comparison" or pattern_type == "segment":
+            binding = self._catalog_comparison_binding(entities, catalog)
+            if binding is None:
+                return []
+            source, measure_sql, group_sql, metric = binding
+            average, total = quote_identifier(f"avg_{metric}"), quote_identifier(f"total_{metric}")
+            return [{
+                "name": "comparison_analysis",
+                "sql": f"""
+                SELECT
+                    {group_sql},
+                    COUNT(*) as row_count,
+                    AVG({measure_sql}) as {average},
+                    SUM({measure_sql}) as {total}
+                FROM {source}
+                GROUP BY {group_sql}
+                ORDER BY {average} DESC
+                """
+            }]
+
+        if pattern_type == "correlation":
+            binding = self._catalog_correlation_binding(entities, catalog)
+            if binding is None:
+                return []
+            source, variables, keys = binding
+            selected = ",\n                    ".join(keys[:1] + variables)
+            measure_sql = variables[0]
+            return [{
+                "name": "correlation_analysis",
+                "sql": f"""
+                SELECT
+                    {selected}
+                FROM {source}
+                WHERE {measure_sql} IS NOT NULL
+                ORDER BY {measure_sql} DESC
+                """
+            }]
+
+        return []
+
+    def _catalog_comparison_binding(self, entities: Dict[str, Any],
+                                    catalog: SchemaCatalog) -> Optional[Tuple[str, str, str, str]]:
+        """Resolve a comparison to (FROM clause, measure SQL, group SQL, metric name)"""
+        metric = (entities.get("metrics") or ["revenue"])[0]
+        dimension = self._group_dimension(entities)
+        resolved = catalog.resolve([metric, dimension], self._preferred_tables(entities, catalog),
+                                   numeric_first=True)
+        if metric not in resolved or dimension not in resolved:
+            return None
+
+        measure, group = resolved[metric], resolved[dimension]
+        source = self._catalog_source(catalog, measure, group)
+        if source is None:
+            return None
+        measure_sql, group_sql = quote_identifier(measure.name), quote_identifier(group.name)
+        if measure.table != group.table:
+            measure_sql = f"{quote_identifier(measure.table)}.{measure_sql}"
+            group_sql = f"{quote_identifier(group.table)}.{group_sql}"
+        return source, measure_sql, group_sql, metric
+
+    def _group_dimension(self, entities: Dict[str, Any]) -> str:
+        """The dimension a comparison groups by: state, unless the entities name only others"""
+        dimensions = entities.get("dimensions") or []
+        return "state" if "state" in dimensions or not dimensions else dimensions[0]
+
+    def _catalog_correlation_binding(self, entities: Dict[str, Any],
+                                     catalog: SchemaCatalog) -> Optional[Tuple[str, List[str], List[str]]]:
+        """Resolve a correlation to (FROM clause, variable SQL with the measure first, key SQL)"""
+        metric = (entities.get("metrics") or ["revenue"])[0]
+        resolved = catalog.resolve([metric], self._preferred_tables(entities, catalog), numeric_first=True)
+        measure = resolved.get(metric)
+        if measure is None:
+            return None
+
+        variables = [measure] + [
+            column for column in catalog.numeric_columns(measure.table)
+            if column != measure and not column.name.endswith("_id") and column.name != "id"
+        ]
+        if len(variables) < 2:
+            return None
+        keys = [column for column in catalog.columns_for("customer") if column.table == measure.table]
+        return (
+            quote_identifier(measure.table),
+            [quote_identifier(column.name) for column in variables],
+            [quote_identifier(column.name) for column in keys],
+        )
+
+    def _catalog_measure(self, entities: Dict[str, Any], catalog: SchemaCatalog) -> Optional[Column]:
+        """The numeric column holding the hypothesis's metric, if the catalog has one"""
+        metric = (entities.get("metrics") or ["revenue"])[0]
+        resolved = catalog.resolve([metric], self._preferred_tables(entities, catalog), numeric_first=True)
+        measure = resolved.get(metric)
+        return measure if measure is not None and measure.is_numeric else None
+
+    def _catalog_measure_binding(self, entities: Dict[str, Any],
+                                 catalog: SchemaCatalog) -> Optional[Tuple[str, str, str]]:
+        """Resolve the hypothesis's metric to (FROM clause, measure SQL, metric name)"""
+        measure = self._catalog_measure(entities, catalog)
+        if measure is None:
+            return None
+        metric = (entities.get("metrics") or ["revenue"])[0]
+        return quote_identifier(measure.table), quote_identifier(measure.name), metric
+
+    def _catalog_trend_binding(self, entities: Dict[str, Any],
+                               catalog: SchemaCatalog) -> Optional[Tuple[str, str, str, str, str]]:
+        """
+        Resolve a trend to (FROM clause, measure SQL, regressor SQL, metric name, regressor name).
+
+        The regressor is the measure table's first date or time column, as a
+        Julian day unless it is already numeric; a table without one is
+        regressed on rowid, its insertion order.
+        """
+        measure = self._catalog_measure(entities, catalog)
+        if measure is None:
+            return None
+        metric = (entities.get("metrics") or ["revenue"])[0]
+        source, measure_sql = quote_identifier(measure.table), quote_identifier(measure.name)
+        times = catalog.time_columns(measure.table)
+        if not times:
+            return source, measure_sql, "rowid", metric, "row_order"
+        time_sql = quote_identifier(times[0].name)
+        if not times[0].is_numeric:
+            time_sql = f"julianday({time_sql})"
+        return source, measure_sql, time_sql, metric, times[0].name
+
+    def _preferred_tables(self, entities: Dict[str, Any], catalog: SchemaCatalog) -> List[str]:
+        """Catalog tables matching the entities' data sources"""
+        return [table for source in entities.get("data_sources", []) for table in catalog.tables_for(source)]
+
+    def _generate_statistics_queries(self, entities: Dict[str, Any], pattern_type: str,
+                                     methods: List[StatisticalMethod],
+                                     catalog: Optional[SchemaCatalog] = None,
+                                     hypothesis: str = "") -> List[Dict[str, str]]:
+        """
+        Generate aggregate queries returning the sufficient statistics of the methods.
+
+        They read the same tables and columns as the analysis queries (the
+        catalog's when it resolves, the generic templates' otherwise), so the
+        stats engine can run every test from O(groups) rows. A comparison
+        naming two known values of its group column is restricted to them,
+        and the t-test compares them by label.
+        """
+        wanted = {METHOD_STATISTICS[method.value] for method in methods}
+        queries = []
+
+        if pattern_type == "comparison" or pattern_type == "segment":
+            binding = self._catalog_comparison_binding(entities, catalog) if catalog is not None else None
+            dimension = self._group_dimension(entities)
+            if binding is None:
+                binding, dimension = ("customer_sales_data", "revenue", "state", "revenue"), "state"
+            source, measure_sql, group_sql, metric = binding
+            groups = self._compared_groups(hypothesis, dimension)
+            if GROUPED_MOMENTS in wanted:
+                queries.append(grouped_moments_query(source, measure_sql, group_sql, [metric], groups))
+            if MOMENTS in wanted:
+                queries.append(moments_query(source, measure_sql, [metric], group_sql, groups))
+
+        elif pattern_type == "correlation":
+            binding = self._catalog_correlation_binding(entities, catalog) if catalog is not None else None
+            if binding is None:
+                binding = ("customer_metrics", ["revenue", "order_frequency", "customer_lifetime_value"], [])
+            source, variables, _ = binding
+            variables = variables[:MAX_CO_MOMENT_VARIABLES]
+            labels = [variable.strip('"') for variable in variables]
+            if CO_MOMENTS in wanted:
+                queries.append(co_moments_query(source, variables, labels))
+            if MOMENTS in wanted:
+                queries.append(moments_query(source, variables[0], labels[:1]))
+
+        elif pattern_type == "trend":
+            binding = self._catalog_trend_binding(entities, catalog) if catalog is not None else None
+            if binding is None:
+                binding = ("customer_sales_data", "revenue", "rowid", "revenue", "row_order")
+            source, measure_sql, time_sql, metric, time_label = binding
+            if CO_MOMENTS in wanted:
+                queries.append(co_moments_query(source, [measure_sql, time_sql], [metric, time_label]))
+            if MOMENTS in wanted:
+                queries.append(moments_query(source, measure_sql, [metric]))
+
+        elif MOMENTS in wanted:
+            binding = self._catalog_measure_binding(entities, catalog) if catalog is not None else None
+            if binding is None:
+                binding = ("customer_sales_data", "revenue", "revenue")
+            source, measure_sql, metric = binding
+            queries.append(moments_query(source, measure_sql, [metric]))
+
+        return queries
+
+    def _catalog_source(self, catalog: SchemaCatalog, measure: Any, group: Any) -> Optional[str]:
+        """FROM clause covering the tables of two resolved columns, joining them if needed"""
+        if measure.table == group.table:
+            return quote_identifier(measure.table)
+        key = catalog.join_key(measure.table, group.table)
+        if key is None:
+            return None
+        left, right, key_sql = (
+            quote_identifier(measure.table), quote_identifier(group.table), quote_identifier(key)
+        )
+        return f"{left} JOIN {right} ON {left}.{key_sql} = {right}.{key_sql}"
+
     def _determine_statistical_methods(self, pattern_type: str) -> List[StatisticalMethod]:
         """Determine appropriate statistical methods"""
         methods = []
@@ -348,5 +1301,5 @@ class HypothesisDeconstructor:
                 confidence_threshold=0.05
             )
         except Exception as e:
-            logger.error(f"Error parsing AI output: {str(e)}")
+            logger.error("ai_output_unparseable", error=str(e))
             return None
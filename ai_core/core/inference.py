@@ -0,0 +1,245 @@
+"""
+Pluggable inference backends and a micro-batching scheduler for the
+model-backed plan path.
+
+A local model does nearly the same work for a batch of prompts as for one:
+each forward pass reads the weights once and only widens its matrix
+products, so on a CPU throughput grows with the batch size. MicroBatcher
+takes advantage of this. Each caller submits one prompt. A worker thread
+collects the prompts that arrive within ``max_wait_ms`` of the first, up to
+``max_batch_size`` of them, runs them through the backend as one batch and
+resolves each caller's future with its own text. Under light load a prompt
+waits at most ``max_wait_ms`` longer than it would alone; under heavy load
+the queue fills batches immediately and nothing waits on the timer.
+
+A backend is any object with ``generate(prompts, max_length)`` returning one
+text per prompt, and optionally a ``name`` identifying its model.
+PipelineBackend adapts a transformers text-generation pipeline::
+
+    with MicroBatcher(PipelineBackend(generator), max_batch_size=16) as batcher:
+        deconstructor = HypothesisDeconstructor(batcher=batcher)
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from .log import DEFAULT_RATE_LIMIT, get_logger
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Token budget of a generation, prompt included, as the deconstructor has
+# always asked of the pipeline
+DEFAULT_MAX_LENGTH = 400
+
+
+class InferenceBackend(Protocol):
+    """
+    A model that turns a batch of prompts into one generated text each.
+
+    A backend may also have a ``name`` naming its model, which keys the
+    plans generated through it (see backend_name).
+    """
+
+    def generate(self, prompts: Sequence[str], max_length: int) -> List[str]:
+        """
+        Args:
+            prompts: Prompts run together as one batch
+            max_length: Token budget of each generation, prompt included
+
+        Returns:
+            List[str]: Generated text for each prompt, in order
+        """
+        ...
+
+
+class PipelineBackend:
+    """
+    Runs batches through a transformers text-generation pipeline.
+
+    Batched generation pads the prompts of a batch to the same length, so
+    the tokenizer is given a pad token if it lacks one, and pads on the left
+    since decoder-only models continue from the right.
+    """
+
+    def __init__(self, pipeline: Any):
+        """
+        Args:
+            pipeline: A transformers ``text-generation`` pipeline
+        """
+        self.pipeline = pipeline
+        # The checkpoint the pipeline's model was loaded from
+        self.name = getattr(getattr(pipeline, "model", None), "name_or_path", None)
+        tokenizer = getattr(pipeline, "tokenizer", None)
+        if tokenizer is not None:
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = "left"
+
+    def generate(self, prompts: Sequence[str], max_length: int) -> List[str]:
+        outputs = self.pipeline(list(prompts), max_length=max_length, num_return_sequences=1,
+                                batch_size=len(prompts))
+        return [output[0]["generated_text"] for output in outputs]
+
+
+def backend_name(backend: InferenceBackend) -> str:
+    """The backend's ``name`` when it has one, otherwise its class's qualified name"""
+    name = getattr(backend, "name", None)
+    if isinstance(name, str) and name:
+        return name
+    kind = type(backend)
+    return f"{kind.__module__}.{kind.__qualname__}"
+
+
+@dataclass
+class BatcherStats:
+    """Counters describing the batches a MicroBatcher has run"""
+    batches: int = 0
+    prompts: int = 0
+    largest_batch: int = 0
+    failed_batches: int = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.prompts / self.batches if self.batches else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "mean_batch_size": self.mean_batch_size,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prompts into batches for an inference backend.
+
+    ``submit`` is thread-safe and returns a future, ``generate`` blocks on
+    it and ``generate_async`` awaits it, so synchronous request threads and
+    event-loop coroutines share the same batches. One worker thread runs
+    the backend, started by the first prompt; a failed batch fails the
+    futures of all its prompts.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_length: int = DEFAULT_MAX_LENGTH):
+        """
+        Args:
+            backend: Model the batches are run through
+            max_batch_size: Most prompts run in one batch
+            max_wait_ms: Longest a batch waits for more prompts after its
+                first; 0 runs whatever is already queued
+            max_length: Token budget of each generation, prompt included
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_length = max_length
+        self.stats = BatcherStats()
+
+        # (prompt, future) pairs; None tells the worker to stop
+        self._queue: "queue.SimpleQueue[Optional[Tuple[str, Future]]]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, prompt: str) -> "Future[str]":
+        """
+        Queue a prompt for the next batch.
+
+        Returns:
+            Future[str]: Resolves to the generated text
+
+        Raises:
+            RuntimeError: If the batcher is closed
+        """
+        future: "Future[str]" = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("micro-batcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._worker.start()
+            self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate text for one prompt, blocking until its batch has run"""
+        return self.submit(prompt).result(timeout)
+
+    async def generate_async(self, prompt: str) -> str:
+        """Generate text for one prompt without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(prompt))
+
+    def close(self) -> None:
+        """Run the prompts already queued, then stop the worker"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            self._queue.put(None)
+        if worker is not None:
+            worker.join()
+
+    def __enter__(self) -> "MicroBatcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline, prompts already queued still join the batch
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[str, "Future[str]"]]) -> None:
+        # Callers that gave up on their future are dropped from the batch
+        batch = [(prompt, future) for prompt, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            outputs = self.backend.generate([prompt for prompt, _ in batch], self.max_length)
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"backend returned {len(outputs)} texts for {len(batch)} prompts")
+        except Exception as e:
+            self.stats.failed_batches += 1
+            logger.error("inference_batch_failed", size=len(batch), error=str(e))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.stats.batches += 1
+        self.stats.prompts += len(batch)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+        for (_, future), text in zip(batch, outputs):
+            future.set_result(text)
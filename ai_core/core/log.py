@@ -0,0 +1,203 @@
+"""
+Structured, lazily formatted logging for ai_core.
+
+Records still go through the standard logging module, so handlers, levels
+and ``logging.disable`` apply as usual, but a record is an event name plus
+key/value fields rather than a preformatted string::
+
+    logger = get_logger(__name__)
+    logger.info("query_streamed", query=name, rows=result.row_count)
+
+- Nothing is formatted unless a handler writes the record. The message is
+  rendered on demand as ``query_streamed query=... rows=...``, and the
+  fields are attached as ``record.event`` and ``record.fields`` for
+  StructuredFormatter, which writes one JSON object per line.
+- A call at a disabled level costs the level check: no string is built.
+- Hot paths that log once per request draw from a ``sampler`` first, a
+  C-level call, so with logging disabled they pay almost nothing, and with
+  it enabled they log one request in ``sample_every``. A path sampled by
+  several policies draws from one ``joint_sampler`` instead.
+- A logger built with ``per_second`` rate-limits each event with a token
+  bucket. Dropped records are counted and reported as ``suppressed`` on
+  the next record of that event, so a failure storm cannot flood the log.
+"""
+
+import itertools
+import json
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Records of one event allowed back to back by a rate-limited logger
+DEFAULT_BURST = 10
+
+# Records per second of one event allowed after the burst by the ai_core
+# loggers on paths that can fail once per request
+DEFAULT_RATE_LIMIT = 1.0
+
+# Field values are cut to this many characters in the rendered message
+MAX_VALUE_LENGTH = 200
+
+# Longest cycle of decisions a joint_sampler precomputes
+MAX_JOINT_CYCLE = 1 << 16
+
+
+def sampler(sample_every: int) -> Callable[[], bool]:
+    """
+    A C-level callable that is True once in every ``sample_every`` calls.
+
+    0 never samples and 1 always does.
+    """
+    if sample_every < 0:
+        raise ValueError("sample_every must not be negative")
+    return itertools.cycle((False,) * (sample_every - 1) + (True,) if sample_every else (False,)).__next__
+
+
+def joint_sampler(*sample_every: int) -> Callable[[], Optional[Tuple[bool, ...]]]:
+    """
+    One draw from several samplers, each as ``sampler(n)`` would decide.
+
+    The callable returns None when no sampler fires, and otherwise a tuple
+    of every sampler's decision, so an unsampled call costs one C-level
+    call however many policies sample it. The decisions repeat over the
+    least common multiple of the rates; when that exceeds MAX_JOINT_CYCLE
+    each sampler is drawn from in turn instead.
+    """
+    samplers = [sampler(every) for every in sample_every]
+    rates = [every for every in sample_every if every]
+    period = math.lcm(*rates) if rates else 1
+    if period > MAX_JOINT_CYCLE:
+        def draw() -> Optional[Tuple[bool, ...]]:
+            decisions = tuple(sample() for sample in samplers)
+            return decisions if any(decisions) else None
+        return draw
+    cycle = []
+    for _ in range(period):
+        decisions = tuple(sample() for sample in samplers)
+        cycle.append(decisions if any(decisions) else None)
+    return itertools.cycle(cycle).__next__
+
+
+def _render_value(value: Any) -> str:
+    text = str(value)
+    if len(text) > MAX_VALUE_LENGTH:
+        text = f"{text[:MAX_VALUE_LENGTH]}...(+{len(text) - MAX_VALUE_LENGTH} chars)"
+    if not text or any(character in text for character in ' ="\n\t'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class _Message:
+    """Record message rendered as ``event key=value ...`` only when a handler formats it"""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: Dict[str, Any]):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self) -> str:
+        if not self.fields:
+            return self.event
+        pairs = " ".join(f"{key}={_render_value(value)}" for key, value in self.fields.items())
+        return f"{self.event} {pairs}"
+
+
+class Logger:
+    """Structured front end to a standard library logger"""
+
+    def __init__(self, logger: logging.Logger, per_second: Optional[float] = None,
+                 burst: int = DEFAULT_BURST):
+        """
+        Args:
+            logger: Standard library logger records are emitted through
+            per_second: Records per second allowed for each event after the
+                burst; None disables rate limiting
+            burst: Records of one event allowed back to back
+        """
+        if per_second is not None and per_second <= 0:
+            raise ValueError("per_second must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.logger = logger
+        self.per_second = per_second
+        self.burst = burst
+        # event -> (tokens, last refill, records suppressed since the last one emitted)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def is_enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._emit(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, event, fields)
+
+    def _emit(self, level: int, event: str, fields: Dict[str, Any]) -> None:
+        if self.per_second is not None:
+            suppressed = self._admit(event)
+            if suppressed is None:
+                return
+            if suppressed:
+                fields["suppressed"] = suppressed
+        # stacklevel 3 attributes the record to the caller of info() and friends
+        self.logger.log(level, _Message(event, fields), extra={"event": event, "fields": fields}, stacklevel=3)
+
+    def _admit(self, event: str) -> Optional[int]:
+        """Take a token for the event; None if there is none, else the count suppressed before it"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, refilled, suppressed = self._buckets.get(event, (float(self.burst), now, 0))
+            tokens = min(float(self.burst), tokens + (now - refilled) * self.per_second)
+            if tokens < 1:
+                self._buckets[event] = (tokens, now, suppressed + 1)
+                return None
+            self._buckets[event] = (tokens - 1, now, 0)
+            return suppressed
+
+
+def get_logger(name: str, per_second: Optional[float] = None, burst: int = DEFAULT_BURST) -> Logger:
+    """
+    Structured logger for a module.
+
+    Args:
+        name: Logger name, normally ``__name__``
+        per_second: Rate limit per event, for loggers on paths that can
+            fail once per request
+        burst: Records of one event allowed back to back
+    """
+    return Logger(logging.getLogger(name), per_second, burst)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as JSON lines; structured records keep their fields as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields is not None:
+            document["event"] = record.event
+            document.update(fields)
+        else:
+            document["message"] = record.getMessage()
+        if record.exc_info:
+            document["exception"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str, ensure_ascii=False)
@@ -0,0 +1,345 @@
+"""
+Latency histograms and counters in the Prometheus text exposition format.
+
+A deconstruction runs in tens of microseconds, so the instrumentation has to
+cost a fraction of a microsecond per request. Counters are exact and cost a
+dictionary lookup and an integer add on a per-thread shard. Stage latencies
+are sampled: one request in ``sample_every`` gets a StageTimer, whose marks
+are the only clock reads made; other requests only pay an ``is None`` check
+per stage.
+
+``MetricsRegistry.render`` produces the exposition text served by the
+service's ``/metrics`` endpoint, and can be called directly to dump the
+current values.
+"""
+
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from threading import get_ident
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Prometheus text format version served with the exposition
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# From 10 microseconds (a cached lookup) to 10 seconds (a slow model call)
+DEFAULT_LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# One request in this many has its stage latencies recorded
+DEFAULT_SAMPLE_EVERY = 128
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: Union[int, float]) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+class CounterSeries:
+    """
+    Count of one label combination, kept as a plain int per thread.
+
+    Each thread increments its own shard, so ``inc`` takes no lock and
+    costs a dictionary lookup and an integer add; ``value`` sums the
+    shards. A shard outlives its thread, so counts are never lost.
+    """
+
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards: Dict[int, List[int]] = {}
+
+    def inc(self) -> None:
+        """Add one to the count"""
+        try:
+            self._shards[get_ident()][0] += 1
+        except KeyError:
+            self._shards[get_ident()] = [1]
+
+    @property
+    def value(self) -> int:
+        return sum(shard[0] for shard in self._shards.copy().values())
+
+
+class Counter:
+    """
+    Monotonic count per label combination.
+
+    Hot paths hold a series from ``labels`` or ``children`` and call its
+    ``inc`` directly, skipping the label lookup.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Labels, CounterSeries] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str) -> None:
+        """Add one to the series for these label values"""
+        self.labels(*labels).inc()
+
+    def labels(self, *labels: str) -> CounterSeries:
+        """The series for these label values"""
+        series = self._series.get(labels)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(labels, CounterSeries())
+        return series
+
+    def children(self, *prefix: str) -> Dict[str, CounterSeries]:
+        """Series keyed by the last label, the others fixed to ``prefix``"""
+        return _Children(self, prefix)
+
+    def value(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else series.value
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {count.value}"
+                for labels, count in series]
+
+
+class _Children(dict):
+    """Lazily filled mapping from the last label value to a counter series"""
+
+    def __init__(self, counter: Counter, prefix: Labels):
+        super().__init__()
+        self.counter = counter
+        self.prefix = prefix
+
+    def __missing__(self, label: str) -> CounterSeries:
+        series = self[label] = self.counter.labels(*self.prefix, label)
+        return series
+
+
+class _Series:
+    """Bucket counts, sum and count of one histogram label combination"""
+
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        bounds = sorted(buckets)
+        if not bounds:
+            raise ValueError("a histogram needs at least one bucket")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(bounds)
+        self._series: Dict[Labels, _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation in the series for these label values"""
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = _Series(len(self.bounds) + 1)
+            series.buckets[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def observe_many(self, observations: Sequence[Tuple[str, float]]) -> None:
+        """Record (label, value) pairs of a single-label histogram under one lock"""
+        with self._lock:
+            for label, value in observations:
+                series = self._series.get((label,))
+                if series is None:
+                    series = self._series[(label,)] = _Series(len(self.bounds) + 1)
+                series.buckets[bisect_left(self.bounds, value)] += 1
+                series.sum += value
+                series.count += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else series.count
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted(
+                (labels, list(series.buckets), series.sum, series.count)
+                for labels, series in self._series.items()
+            )
+        names = self.labelnames + ("le",)
+        lines = []
+        for labels, buckets, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float("inf"),), buckets):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} "
+                             f"{cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+Metric = Union[Counter, Histogram]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register a counter, or return the one already registered under ``name``"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        """Register a histogram, or return the one already registered under ``name``"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"metric {metric.name} is already registered with a different type or labels")
+        return existing
+
+
+class StageTimer:
+    """
+    Times consecutive stages of one sampled request.
+
+    Each ``mark`` notes the time the named stage ended; ``finish`` records
+    every stage's duration (since the previous mark, or the start) and the
+    whole request as ``total``, in one histogram update.
+    """
+
+    __slots__ = ("_histogram", "_marks")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._marks: List[Tuple[str, float]] = [("", time.perf_counter())]
+
+    def mark(self, stage: str) -> None:
+        self._marks.append((stage, time.perf_counter()))
+
+    def finish(self) -> None:
+        marks = self._marks
+        marks.append(("total", time.perf_counter()))
+        durations = [(stage, end - start) for (_, start), (stage, end) in zip(marks, marks[1:])]
+        durations[-1] = ("total", marks[-1][1] - marks[0][1])
+        self._histogram.observe_many(durations)
+
+
+class DeconstructorMetrics:
+    """
+    Metrics of a HypothesisDeconstructor.
+
+    - ``deconstructor_stage_seconds{stage}``: sampled latency of each stage
+      and of whole requests (``stage="total"``)
+    - ``deconstructor_requests_total{path, pattern}``: requests by path
+      (``rule_based``, ``ai`` or ``cache``) and hypothesis pattern
+    - ``deconstructor_fallbacks_total{reason}``: model generations that
+      fell back to the rule-based plan
+    - ``deconstructor_errors_total{error}``: failed requests by error code
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None,
+                 sample_every: int = DEFAULT_SAMPLE_EVERY):
+        """
+        Args:
+            registry: Registry the metrics are added to; defaults to a new one
+            sample_every: Record stage latencies for one request in this
+                many; 1 records every request, 0 none
+        """
+        if sample_every < 0:
+            raise ValueError("sample_every must not be negative")
+        self.registry = registry or MetricsRegistry()
+        self.sample_every = sample_every
+        # True for one call in sample_every; a C-level call, so hot paths test
+        # it before paying for a Python method call
+        self.sampled = itertools.cycle(
+            (False,) * (sample_every - 1) + (True,) if sample_every else (False,)
+        ).__next__
+        self.stage_seconds = self.registry.histogram(
+            "deconstructor_stage_seconds",
+            f"Latency of deconstruction stages, sampled 1 in {sample_every} requests",
+            ("stage",)
+        )
+        self.requests = self.registry.counter(
+            "deconstructor_requests_total", "Deconstruction requests by path and pattern", ("path", "pattern")
+        )
+        self.fallbacks = self.registry.counter(
+            "deconstructor_fallbacks_total", "Model generations that fell back to rules", ("reason",)
+        )
+        self.errors = self.registry.counter(
+            "deconstructor_errors_total", "Failed deconstruction requests by error code", ("error",)
+        )
+
+    def timer(self) -> Optional[StageTimer]:
+        """A StageTimer when this request is sampled, otherwise None"""
+        return self.stage_timer() if self.sampled() else None
+
+    def stage_timer(self) -> StageTimer:
+        """A StageTimer for a request already known to be sampled"""
+        return StageTimer(self.stage_seconds)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+_default_metrics: Optional[DeconstructorMetrics] = None
+
+
+def default_metrics() -> DeconstructorMetrics:
+    """Process-wide deconstructor metrics, shared by deconstructors built without their own"""
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = DeconstructorMetrics()
+    return _default_metrics
+
@@ -0,0 +1,186 @@
+"""
+In-process memoization of deconstructed test plans.
+
+Analysts resubmit the same, or trivially reworded, hypotheses all day. The
+PlanCache sits in front of HypothesisDeconstructor.deconstruct_hypothesis and
+returns the stored plan for a hypothesis it has already seen against the same
+schema, skipping pattern matching, entity extraction, SQL generation and any
+model call.
+"""
+
+import hashlib
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .hypothesis_deconstructor import FrozenTestPlan, TestPlan
+from .log import get_logger
+
+if TYPE_CHECKING:
+    from .plan_store import PersistentPlanStore
+
+logger = get_logger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_CHARACTERS = string.punctuation + " "
+
+
+def normalize_hypothesis(hypothesis: str) -> str:
+    """
+    Normalize a hypothesis for cache lookups.
+
+    Lowercases, collapses whitespace runs and strips punctuation from both
+    ends, so "Revenue is growing." and "  revenue is   growing" share an entry.
+    Punctuation inside the text is kept because it can change which pattern
+    a hypothesis matches.
+    """
+    return _WHITESPACE_RE.sub(" ", hypothesis.lower()).strip(_EDGE_CHARACTERS)
+
+
+def schema_fingerprint(schema_context: Optional[str]) -> str:
+    """Stable hash of the schema context; empty and missing schemas are equal"""
+    return hashlib.sha256((schema_context or "").encode("utf-8")).hexdigest()
+
+
+def plan_cache_key(hypothesis: str, schema_context: Optional[str], variant: str = "") -> str:
+    """
+    Cache key for a hypothesis deconstructed against a schema.
+
+    ``variant`` names what generated the plan, e.g. a model or the rules
+    with a given entity vocabulary (see HypothesisDeconstructor), so plans
+    from different generators never stand in for each other.
+    """
+    material = f"{normalize_hypothesis(hypothesis)}\x00{schema_fingerprint(schema_context)}\x00{variant}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    Thread-safe LRU cache of frozen test plans with an optional TTL.
+
+    Entries are stored frozen (see TestPlan.freeze) and every lookup returns
+    a fresh TestPlan object carrying the caller's hypothesis text, so callers
+    can neither mutate nor rebind the shared cached state. Frozen entries
+    share their queries and method tuples, so an entry costs little more
+    than its hypothesis text.
+
+    An optional PersistentPlanStore acts as a second tier: memory misses are
+    looked up in the store and promoted, and new plans are written through.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600.0,
+                 store: Optional["PersistentPlanStore"] = None):
+        """
+        Args:
+            max_entries: Maximum number of plans kept before LRU eviction
+            ttl_seconds: Seconds a plan stays valid; None keeps plans until evicted
+            store: Optional persistent tier consulted on memory misses
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self._entries: "OrderedDict[str, Tuple[FrozenTestPlan, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store_hits = 0
+
+    def get(self, hypothesis: str, schema_context: Optional[str] = None,
+            variant: str = "") -> Optional[TestPlan]:
+        """Return the cached plan for a hypothesis, or None on a miss"""
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                plan, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return plan.thaw(hypothesis)
+                del self._entries[key]
+
+        if self.store is not None:
+            plan = self.store.get(hypothesis, schema_context, variant)
+            if plan is not None:
+                self._insert(key, plan.freeze())
+                with self._lock:
+                    self.hits += 1
+                    self.store_hits += 1
+                return plan
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, hypothesis: str, schema_context: Optional[str], plan: TestPlan,
+            variant: str = "") -> TestPlan:
+        """
+        Cache a plan and return a frozen copy of it for the caller.
+
+        The stored plan is frozen first, so later changes to the plan that was
+        passed in do not leak into the cache.
+        """
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        frozen = plan.freeze()
+        self._insert(key, frozen)
+        if self.store is not None:
+            self.store.put(hypothesis, schema_context, frozen, variant)
+        return frozen.thaw()
+
+    def _insert(self, key: str, frozen: FrozenTestPlan) -> None:
+        """Store a frozen plan under a key, evicting the LRU entries past capacity"""
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (frozen, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, hypothesis: str, schema_context: Optional[str] = None,
+                   variant: str = "") -> bool:
+        """Drop the entry for one hypothesis; returns whether it was cached"""
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        if self.store is not None:
+            removed = self.store.invalidate(hypothesis, schema_context, variant) or removed
+        return removed
+
+    def clear(self) -> None:
+        """Drop every cached plan, including the persistent tier, and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.store_hits = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "store_hits": self.store_hits,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,472 @@
+"""
+Local execution of a test plan's SQL queries.
+
+PlanExecutor runs each query in TestPlan.sql_queries against a local SQLite
+database, on connections checked out of a ConnectionPool, and streams the
+result set with ``fetchmany`` in fixed-size batches. Column statistics (count, mean, variance, min, max) and pairwise
+co-moments between numeric columns are folded in batch by batch, so a
+query over tens of millions of rows holds at most one batch, plus a short
+preview, in Python memory.
+"""
+
+import math
+import time
+from dataclasses import dataclass, field, replace
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .connection_pool import ConnectionPool
+from .hypothesis_deconstructor import TestPlan
+from .log import DEFAULT_RATE_LIMIT, get_logger
+from .result_cache import CachedResult, ResultCache
+from .tracing import child_span, current_span
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Leading rows of each result kept for display
+DEFAULT_PREVIEW_ROWS = 20
+
+# Co-moments are tracked between the leading columns only, so a wide
+# SELECT * does not cost a quadratic number of pairs per batch
+MAX_COVARIANCE_COLUMNS = 16
+
+_NUMERIC_TYPES = frozenset({int, float})
+
+# Called with (query name, column names, batch of rows) for every fetched batch
+RowSink = Callable[[str, Sequence[str], List[Tuple[Any, ...]]], None]
+
+
+@dataclass
+class RunningStats:
+    """
+    Online count, mean, variance, min and max of a numeric column.
+
+    Batches are folded in with Chan et al.'s parallel update, which is as
+    stable as Welford's one-value-at-a-time recurrence but does its inner
+    loops in C-level builtins.
+    """
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+    def add_batch(self, values: Sequence[float]) -> None:
+        """Fold a batch of non-null values into the statistics"""
+        n = len(values)
+        if not n:
+            return
+        batch_mean = math.fsum(values) / n
+        batch_m2 = math.fsum([(value - batch_mean) ** 2 for value in values])
+        self.merge(RunningStats(n, batch_mean, batch_m2, min(values), max(values)))
+
+    def merge(self, other: "RunningStats") -> None:
+        """Combine another set of statistics into this one"""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance, or None with fewer than two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    @property
+    def total(self) -> float:
+        return self.mean * self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "variance": self.variance,
+            "stddev": self.stddev,
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+
+@dataclass
+class RunningCovariance:
+    """Online co-moment of two numeric columns over rows where both are non-null"""
+    count: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    m2_x: float = 0.0
+    m2_y: float = 0.0
+    c_xy: float = 0.0
+
+    def add_batch(self, xs: Sequence[float], ys: Sequence[float]) -> None:
+        """Fold a batch of paired non-null values into the co-moment"""
+        n = len(xs)
+        if not n:
+            return
+        mean_x = math.fsum(xs) / n
+        mean_y = math.fsum(ys) / n
+        dx = [x - mean_x for x in xs]
+        dy = [y - mean_y for y in ys]
+        m2_x = math.fsum([d * d for d in dx])
+        m2_y = math.fsum([d * d for d in dy])
+        c_xy = math.fsum([a * b for a, b in zip(dx, dy)])
+
+        if not self.count:
+            self.count, self.mean_x, self.mean_y = n, mean_x, mean_y
+            self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+            return
+        total = self.count + n
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        weight = self.count * n / total
+        self.m2_x += m2_x + delta_x * delta_x * weight
+        self.m2_y += m2_y + delta_y * delta_y * weight
+        self.c_xy += c_xy + delta_x * delta_y * weight
+        self.mean_x += delta_x * n / total
+        self.mean_y += delta_y * n / total
+        self.count = total
+
+    @property
+    def covariance(self) -> Optional[float]:
+        """Sample covariance, or None with fewer than two pairs"""
+        return self.c_xy / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def correlation(self) -> Optional[float]:
+        """Pearson correlation, or None when either column is constant"""
+        if self.count < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "covariance": self.covariance, "correlation": self.correlation}
+
+
+@dataclass
+class QueryResult:
+    """Streaming summary of one executed query"""
+    name: str
+    sql: str
+    columns: List[str] = field(default_factory=list)
+    row_count: int = 0
+    column_stats: Dict[str, RunningStats] = field(default_factory=dict)
+    covariances: Dict[Tuple[str, str], RunningCovariance] = field(default_factory=dict)
+    preview: List[Tuple[Any, ...]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    def copy(self, **changes: Any) -> "QueryResult":
+        """Independent copy; rows are tuples, so only the containers are copied"""
+        copied = replace(
+            self,
+            columns=list(self.columns),
+            preview=list(self.preview),
+            column_stats={name: replace(stats) for name, stats in self.column_stats.items()},
+            covariances={pair: replace(covariance) for pair, covariance in self.covariances.items()}
+        )
+        for name, value in changes.items():
+            setattr(copied, name, value)
+        return copied
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "sql": self.sql,
+            "columns": list(self.columns),
+            "row_count": self.row_count,
+            "column_stats": {name: stats.to_dict() for name, stats in self.column_stats.items()},
+            "covariances": [
+                {"columns": list(pair), **covariance.to_dict()}
+                for pair, covariance in self.covariances.items()
+            ],
+            "preview": [list(row) for row in self.preview],
+            "elapsed_seconds": self.elapsed_seconds,
+            "error": self.error,
+        }
+
+
+@dataclass
+class PlanExecutionResult:
+    """Results of every query in a test plan, in plan order"""
+    hypothesis: str
+    results: List[QueryResult]
+    elapsed_seconds: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return all(result.success for result in self.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hypothesis": self.hypothesis,
+            "success": self.success,
+            "results": [result.to_dict() for result in self.results],
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+class ResultAccumulator:
+    """
+    Folds batches of rows into a QueryResult.
+
+    Used by PlanExecutor for fetched batches, and by callers that produce a
+    query's rows some other way (BatchPlanner's roll-ups) to summarize them
+    the same way.
+    """
+
+    def __init__(self, result: QueryResult, preview_rows: int, summarize: bool = True):
+        """
+        Args:
+            result: Result to fill; its columns must already be set
+            preview_rows: Leading rows kept in the result
+            summarize: Compute column statistics and co-moments
+        """
+        self.result = result
+        self.preview_rows = preview_rows
+        width = len(result.columns)
+        # Columns stay candidates for statistics until a non-numeric value shows up
+        self.numeric = [summarize] * width
+        self.stats = [RunningStats() for _ in range(width)]
+        self.pairs = {
+            pair: RunningCovariance()
+            for pair in combinations(range(min(width, MAX_COVARIANCE_COLUMNS)), 2)
+        } if summarize else {}
+
+    def add(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Fold a batch of rows into the result"""
+        result = self.result
+        result.row_count += len(rows)
+        if len(result.preview) < self.preview_rows:
+            result.preview.extend(rows[:self.preview_rows - len(result.preview)])
+        if not self.pairs and not any(self.numeric):
+            return
+
+        columns = list(zip(*rows))
+        values: List[Optional[List[float]]] = []
+        for index, column in enumerate(columns):
+            present = None
+            if self.numeric[index]:
+                present = [value for value in column if value is not None]
+                if _NUMERIC_TYPES.issuperset(map(type, present)):
+                    self.stats[index].add_batch(present)
+                else:
+                    self.numeric[index] = False
+                    present = None
+            values.append(present)
+
+        for (left, right), covariance in self.pairs.items():
+            if values[left] is None or values[right] is None:
+                continue
+            if len(values[left]) == len(rows) and len(values[right]) == len(rows):
+                covariance.add_batch(values[left], values[right])
+            else:
+                paired = [
+                    (x, y) for x, y in zip(columns[left], columns[right])
+                    if x is not None and y is not None
+                ]
+                if paired:
+                    xs, ys = zip(*paired)
+                    covariance.add_batch(xs, ys)
+
+    def finish(self) -> QueryResult:
+        """Store the statistics of the numeric columns in the result and return it"""
+        result = self.result
+        names = result.columns
+        result.column_stats = {
+            names[index]: stats for index, stats in enumerate(self.stats) if self.numeric[index]
+        }
+        result.covariances = {
+            (names[left], names[right]): covariance
+            for (left, right), covariance in self.pairs.items()
+            if self.numeric[left] and self.numeric[right]
+        }
+        return result
+
+
+class PlanExecutor:
+    """
+    Runs test plan queries against a local SQLite database.
+
+    Each query's rows are fetched ``batch_size`` at a time and summarized
+    online; only a preview of the first rows is retained. An optional row
+    sink receives every batch as it is fetched, for callers that need the
+    rows themselves (exporting to CSV, say) without buffering them.
+
+    Connections come from ``pool``, which may be shared with other
+    executors; without one the executor keeps a small read-only pool of its
+    own, so repeated executions reuse warm connections.
+
+    With a ResultCache, a query whose normalized SQL was already run against
+    the same version of the data returns the cached result, and its cached
+    rows are replayed to the row sink.
+    """
+
+    def __init__(self, database: Optional[Union[str, Path]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 preview_rows: int = DEFAULT_PREVIEW_ROWS, row_sink: Optional[RowSink] = None,
+                 summarize: bool = True, pool: Optional[ConnectionPool] = None,
+                 cache: Optional[ResultCache] = None):
+        """
+        Args:
+            database: SQLite database file, opened read-only; not needed
+                when a pool is given
+            batch_size: Rows fetched per fetchmany call
+            preview_rows: Leading rows of each result kept in the result
+            row_sink: Optional callback receiving every fetched batch
+            summarize: Compute column statistics; sinks that do their own
+                analysis can turn this off
+            pool: Connection pool to run queries on
+            cache: Optional result cache for the database
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if preview_rows < 0:
+            raise ValueError("preview_rows must not be negative")
+        if database is None and pool is None:
+            raise ValueError("PlanExecutor needs a database or a connection pool")
+        self.database = Path(database) if database is not None else None
+        self.batch_size = batch_size
+        self.preview_rows = preview_rows
+        self.row_sink = row_sink
+        self.summarize = summarize
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool.for_sqlite(self.database, max_size=1)
+        self.cache = cache
+
+    def close(self) -> None:
+        """Close the executor's own pool; a pool passed in is left open"""
+        if self._owns_pool:
+            self.pool.close()
+
+    def __enter__(self) -> "PlanExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def execute(self, plan: TestPlan) -> PlanExecutionResult:
+        """
+        Run every query of a test plan.
+
+        A failing query is reported in its QueryResult and does not stop the
+        remaining queries.
+        """
+        start = time.perf_counter()
+        span = child_span("execute_plan")
+        try:
+            with self.pool.connection() as connection:
+                results = [
+                    self._run(connection, query.get("name", f"query_{index}"), query["sql"])
+                    for index, query in enumerate(plan.sql_queries)
+                ]
+        finally:
+            if span is not None:
+                span.end()
+        return PlanExecutionResult(
+            hypothesis=plan.hypothesis,
+            results=results,
+            elapsed_seconds=time.perf_counter() - start
+        )
+
+    def execute_query(self, name: str, sql: str, parameters: Sequence[Any] = ()) -> QueryResult:
+        """
+        Run a single query on a pooled connection and summarize its result set.
+
+        Driver errors are reported in the QueryResult; a pool that has no
+        connection to hand out raises PoolTimeoutError.
+        """
+        with self.pool.connection() as connection:
+            return self._run(connection, name, sql, parameters)
+
+    def _run(self, connection: Any, name: str, sql: str,
+             parameters: Sequence[Any] = ()) -> QueryResult:
+        """Run one query, inside a span when the caller's trace is recorded"""
+        span = child_span("sql_query", {"query.name": name, "db.statement": sql})
+        if span is None:
+            return self._run_query(connection, name, sql, parameters)
+        try:
+            result = self._run_query(connection, name, sql, parameters)
+            span.set_attribute("db.rows", result.row_count)
+            if result.error is not None:
+                span.record_error(result.error)
+            return result
+        finally:
+            span.end()
+
+    def _run_query(self, connection: Any, name: str, sql: str,
+                   parameters: Sequence[Any] = ()) -> QueryResult:
+        """Stream one query's rows through an accumulator, or replay them from the cache"""
+        start = time.perf_counter()
+        variant = (self.summarize, self.preview_rows)
+        version = None
+        if self.cache is not None:
+            version = self.cache.version()
+            cached = self.cache.get(sql, parameters, variant, self.row_sink is not None, version)
+            if cached is not None:
+                return self._replay(name, cached, start)
+
+        result = QueryResult(name=name, sql=sql)
+        # Rows are kept for the cache until there are too many to cache
+        kept: Optional[List[Tuple[Any, ...]]] = [] if self.cache is not None else None
+        cursor = connection.cursor()
+        try:
+            cursor.arraysize = self.batch_size
+            cursor.execute(sql, parameters)
+            result.columns = [description[0] for description in cursor.description or ()]
+            accumulator = ResultAccumulator(result, self.preview_rows, self.summarize)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                accumulator.add(rows)
+                if kept is not None:
+                    kept.extend(rows)
+                    if len(kept) > self.cache.max_rows_per_entry:
+                        kept = None
+                if self.row_sink is not None:
+                    self.row_sink(name, result.columns, rows)
+            accumulator.finish()
+        except self.pool.errors as e:
+            logger.error("query_failed", query=name, error=str(e))
+            result.error = str(e)
+        finally:
+            cursor.close()
+        result.elapsed_seconds = time.perf_counter() - start
+        logger.info("query_streamed", query=name, rows=result.row_count, seconds=result.elapsed_seconds)
+        if self.cache is not None:
+            self.cache.put(sql, parameters, result, kept, variant, version)
+        return result
+
+    def _replay(self, name: str, cached: CachedResult, start: float) -> QueryResult:
+        """Hand a cached result, and its rows, to the caller as if just executed"""
+        result = cached.result
+        result.name = name
+        span = current_span()
+        if span is not None:
+            span.set_attribute("cache.hit", True)
+        if self.row_sink is not None:
+            rows = cached.rows
+            for offset in range(0, len(rows), self.batch_size):
+                self.row_sink(name, result.columns, rows[offset:offset + self.batch_size])
+        result.elapsed_seconds = time.perf_counter() - start
+        logger.info("query_result_cached", query=name, seconds=result.elapsed_seconds)
+        return result
@@ -0,0 +1,367 @@
+"""
+Parallel, dependency-aware execution of a test plan.
+
+A plan becomes a DAG of steps: one query step per entry in
+TestPlan.sql_queries and one stats step per statistical method. A stats
+step depends on the statistics queries it is computed from (see
+core.sufficient_statistics); a query may also name other queries it must
+follow in an optional comma-separated ``depends_on`` key.
+
+PlanScheduler runs ready steps on a thread pool; each query step checks a
+read-only connection out of a ConnectionPool sized to the workers, kept
+across runs so repeated plans start on warm connections. sqlite3 releases the GIL while a
+statement runs, so independent queries proceed concurrently and the plan
+takes about as long as its slowest dependency chain rather than the sum of
+its queries. Each stats step is submitted as soon as its last input query
+finishes.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .connection_pool import ConnectionPool
+from .hypothesis_deconstructor import StatisticalMethod, TestPlan
+from .log import get_logger
+from .plan_executor import DEFAULT_BATCH_SIZE, DEFAULT_PREVIEW_ROWS, PlanExecutor, QueryResult
+from .result_cache import ResultCache
+from .stats_engine import MethodResult, StatsEngine, StatsReport, summaries_from_results
+from .sufficient_statistics import METHOD_STATISTICS
+from .tracing import Span, child_span
+
+logger = get_logger(__name__)
+
+QUERY_STEP = "query"
+STATS_STEP = "stats"
+
+DEFAULT_MAX_WORKERS = 4
+
+
+@dataclass
+class PlanStep:
+    """One node of a plan's execution DAG"""
+    name: str
+    kind: str
+    depends_on: Tuple[str, ...] = ()
+    query: Optional[Dict[str, str]] = None
+    method: Optional[StatisticalMethod] = None
+
+
+@dataclass
+class StepTiming:
+    """When a step ran, relative to the start of the plan"""
+    started: float
+    finished: float
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"started": self.started, "finished": self.finished}
+
+
+@dataclass
+class ScheduledPlanResult:
+    """Query results in plan order, the stats report, and per-step timings"""
+    hypothesis: str
+    results: List[QueryResult]
+    stats: StatsReport
+    timings: Dict[str, StepTiming] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return all(result.success for result in self.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hypothesis": self.hypothesis,
+            "success": self.success,
+            "results": [result.to_dict() for result in self.results],
+            "stats": self.stats.to_dict(),
+            "timings": {name: timing.to_dict() for name, timing in self.timings.items()},
+            "elapsed_seconds": self.elapsed_seconds,
+        }
+
+
+def stats_step_name(method: StatisticalMethod) -> str:
+    return f"stats:{method.value}"
+
+
+def build_steps(plan: TestPlan) -> List[PlanStep]:
+    """
+    Build the execution DAG of a plan.
+
+    Args:
+        plan: Test plan whose queries and methods become steps
+
+    Returns:
+        List[PlanStep]: Query steps in plan order, then stats steps in
+        method order
+
+    Raises:
+        ValueError: If query names repeat, a dependency is unknown, or the
+            dependencies form a cycle
+    """
+    steps: List[PlanStep] = []
+    names = set()
+    for index, query in enumerate(plan.sql_queries):
+        name = query.get("name", f"query_{index}")
+        if name in names:
+            raise ValueError(f"Duplicate query name in plan: {name}")
+        names.add(name)
+        depends_on = tuple(dep.strip() for dep in query.get("depends_on", "").split(",") if dep.strip())
+        steps.append(PlanStep(name=name, kind=QUERY_STEP, depends_on=depends_on, query=query))
+
+    queries = list(steps)
+    for method in plan.statistical_methods:
+        kind = METHOD_STATISTICS[method.value]
+        inputs = tuple(step.name for step in queries if step.query.get("statistics") == kind)
+        steps.append(PlanStep(name=stats_step_name(method), kind=STATS_STEP, depends_on=inputs, method=method))
+
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in names:
+                raise ValueError(f"Step {step.name} depends on unknown query {dependency}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps: Sequence[PlanStep]) -> None:
+    """Raise ValueError when the dependencies contain a cycle"""
+    dependencies = {step.name: step.depends_on for step in steps}
+    done = set()
+    for root in dependencies:
+        path = [root]
+        stack = [(root, iter(dependencies[root]))]
+        on_path = {root}
+        while stack:
+            name, remaining = stack[-1]
+            dependency = next(remaining, None)
+            if dependency is None:
+                stack.pop()
+                on_path.discard(name)
+                path.pop()
+                done.add(name)
+            elif dependency in on_path:
+                cycle = path[path.index(dependency):] + [dependency]
+                raise ValueError(f"Dependency cycle in plan: {' -> '.join(cycle)}")
+            elif dependency not in done:
+                stack.append((dependency, iter(dependencies[dependency])))
+                on_path.add(dependency)
+                path.append(dependency)
+
+
+class PlanScheduler:
+    """
+    Runs a test plan's query and stats steps concurrently.
+
+    Independent queries run at the same time on up to ``max_workers``
+    threads; stats steps run as soon as their statistics queries finish.
+    A failing query is reported in its QueryResult, and a step that raises
+    is reported as failed with the exception's message; steps depending on
+    either are not run and carry the failure instead.
+    """
+
+    def __init__(self, database: Optional[Union[str, Path]] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 batch_size: int = DEFAULT_BATCH_SIZE, preview_rows: int = DEFAULT_PREVIEW_ROWS,
+                 engine: Optional[StatsEngine] = None, wal: bool = False,
+                 pool: Optional[ConnectionPool] = None, cache: Optional[ResultCache] = None):
+        """
+        Args:
+            database: SQLite database file, opened read-only; not needed
+                when a pool is given
+            max_workers: Threads running steps, and the size of the
+                scheduler's own pool
+            batch_size: Rows fetched per fetchmany call
+            preview_rows: Leading rows of each query result kept
+            engine: Stats engine evaluating the stats steps
+            wal: Switch the database to WAL mode before the first run
+            pool: Connection pool to run queries on
+            cache: Optional result cache for the database
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if database is None and pool is None:
+            raise ValueError("PlanScheduler needs a database or a connection pool")
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.preview_rows = preview_rows
+        self.engine = engine or StatsEngine()
+        self.cache = cache
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool.for_sqlite(
+            Path(database), max_size=max_workers, wal=wal
+        )
+
+    def close(self) -> None:
+        """Close the scheduler's own pool; a pool passed in is left open"""
+        if self._owns_pool:
+            self.pool.close()
+
+    def __enter__(self) -> "PlanScheduler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def run(self, plan: TestPlan) -> ScheduledPlanResult:
+        """
+        Execute every step of a plan.
+
+        Args:
+            plan: Test plan to run
+
+        Returns:
+            ScheduledPlanResult: Query results in plan order and the stats
+            report in method order
+        """
+        steps = build_steps(plan)
+        run = _PlanRun(self, plan, steps)
+        return run.execute()
+
+
+class _PlanRun:
+    """State of one scheduled plan execution"""
+
+    def __init__(self, scheduler: PlanScheduler, plan: TestPlan, steps: List[PlanStep]):
+        self.scheduler = scheduler
+        self.plan = plan
+        self.steps = {step.name: step for step in steps}
+        self.order = [step.name for step in steps]
+        self.waiting = {step.name: len(step.depends_on) for step in steps}
+        self.dependents: Dict[str, List[str]] = {name: [] for name in self.steps}
+        for step in steps:
+            for dependency in step.depends_on:
+                self.dependents[dependency].append(step.name)
+
+        self.query_results: Dict[str, QueryResult] = {}
+        self.method_results: Dict[str, MethodResult] = {}
+        self.failures: Dict[str, str] = {}
+        self.timings: Dict[str, StepTiming] = {}
+        self.rows: Dict[str, List[Tuple[Any, ...]]] = {}
+        self.start = 0.0
+        self.span: Optional[Span] = None
+
+        # Exploratory queries are summarized; statistics queries hand their
+        # few aggregate rows to the stats steps instead
+        self.explorer = PlanExecutor(
+            batch_size=scheduler.batch_size, preview_rows=scheduler.preview_rows,
+            pool=scheduler.pool, cache=scheduler.cache
+        )
+        self.collector = PlanExecutor(
+            batch_size=scheduler.batch_size, preview_rows=scheduler.preview_rows,
+            row_sink=self._collect, summarize=False,
+            pool=scheduler.pool, cache=scheduler.cache
+        )
+
+    def execute(self) -> ScheduledPlanResult:
+        self.start = time.perf_counter()
+        self.span = child_span("schedule_plan")
+        try:
+            self._execute_steps()
+        finally:
+            if self.span is not None:
+                self.span.end()
+
+        stats = StatsReport(self.plan.hypothesis, self.plan.confidence_threshold, [
+            self.method_results[stats_step_name(method)] for method in self.plan.statistical_methods
+        ])
+        elapsed = time.perf_counter() - self.start
+        logger.info("plan_scheduled", steps=len(self.steps), seconds=elapsed)
+        return ScheduledPlanResult(
+            hypothesis=self.plan.hypothesis,
+            results=[self.query_results[name] for name in self.order if name in self.query_results],
+            stats=stats,
+            timings={name: self.timings[name] for name in self.order if name in self.timings},
+            elapsed_seconds=elapsed
+        )
+
+    def _execute_steps(self) -> None:
+        pending: Dict[Future, str] = {}
+        workers = max(1, min(self.scheduler.max_workers, len(self.steps)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan-step") as pool:
+            ready = [name for name in self.order if not self.waiting[name]]
+            while ready or pending:
+                for name in ready:
+                    pending[pool.submit(self._run_step, self.steps[name])] = name
+                ready = []
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = pending.pop(future)
+                    future.result()
+                    ready.extend(self._complete(name))
+
+    def _complete(self, name: str) -> List[str]:
+        """Release the dependents of a finished step; return those now ready"""
+        ready = []
+        for dependent in self.dependents[name]:
+            if name in self.failures:
+                self.failures.setdefault(dependent, self.failures[name])
+            self.waiting[dependent] -= 1
+            if not self.waiting[dependent]:
+                ready.append(dependent)
+        return ready
+
+    def _collect(self, name: str, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+        # Each query name is written by a single worker
+        self.rows[name].extend(rows)
+
+    def _run_step(self, step: PlanStep) -> None:
+        started = time.perf_counter() - self.start
+        # Worker threads do not inherit the caller's context, so the step
+        # span is started from the plan span explicitly
+        span = None
+        if self.span is not None:
+            span = self.span.child("plan_step", {"step.name": step.name, "step.kind": step.kind})
+        try:
+            if step.kind == QUERY_STEP:
+                self._run_query(step)
+            else:
+                self._run_stats(step)
+        except Exception as e:
+            # A pool timeout, driver or engine error fails this step and its
+            # dependents, not the whole run
+            logger.error("plan_step_failed", step=step.name, error=str(e))
+            self._fail(step, str(e) or type(e).__name__)
+        finally:
+            if span is not None:
+                if step.name in self.failures:
+                    span.record_error(self.failures[step.name])
+                span.end()
+        self.timings[step.name] = StepTiming(started, time.perf_counter() - self.start)
+
+    def _run_query(self, step: PlanStep) -> None:
+        query = step.query
+        if step.name in self.failures:
+            result = QueryResult(name=step.name, sql=query["sql"], error=self.failures[step.name])
+        else:
+            executor = self.explorer
+            if query.get("statistics") is not None:
+                self.rows[step.name] = []
+                executor = self.collector
+            result = executor.execute_query(step.name, query["sql"])
+        if not result.success:
+            self.failures[step.name] = result.error
+        self.query_results[step.name] = result
+
+    def _fail(self, step: PlanStep, error: str) -> None:
+        """Record a step that raised as failed, with a result carrying its error"""
+        self.failures[step.name] = error
+        if step.kind == QUERY_STEP:
+            self.query_results[step.name] = QueryResult(name=step.name, sql=step.query["sql"], error=error)
+        else:
+            self.method_results[step.name] = MethodResult(method=step.method, error=error)
+
+    def _run_stats(self, step: PlanStep) -> None:
+        method = step.method
+        error = self.failures.get(step.name)
+        if error is None:
+            inputs = {name: self.rows[name] for name in step.depends_on}
+            summary = summaries_from_results(self.plan, inputs).get(METHOD_STATISTICS[method.value])
+            if summary is not None:
+                self.method_results[step.name] = self.scheduler.engine.run_method_on_summary(
+                    method, summary, self.plan.confidence_threshold
+                )
+                return
+            error = "no sufficient statistics for this method"
+        self.method_results[step.name] = MethodResult(method=method, error=error)
@@ -0,0 +1,209 @@
+"""
+Persistent, on-disk store for deconstructed test plans.
+
+The desktop shell starts a fresh Python process for each call, so an
+in-memory cache is gone as soon as the call returns. PersistentPlanStore
+keeps plans in a small SQLite file keyed on the hypothesis/schema fingerprint
+and the deconstructor version, so a cold process can answer a repeat
+hypothesis with a single indexed read.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .hypothesis_deconstructor import DECONSTRUCTOR_VERSION, FrozenTestPlan, TestPlan
+from .log import DEFAULT_RATE_LIMIT, get_logger
+from .plan_cache import plan_cache_key
+from .serialization import decode_plan, encode_json
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+# Hits refresh an entry's recency at most this often, so repeat reads
+# don't turn into a write each time
+_TOUCH_INTERVAL_SECONDS = 60.0
+
+
+def default_plan_store_path() -> Path:
+    """Location of the shared plan store, overridable via SHELBY_PLAN_STORE"""
+    override = os.environ.get("SHELBY_PLAN_STORE")
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "shelby_ai_core" / "plans.sqlite3"
+
+
+class PersistentPlanStore:
+    """
+    SQLite-backed plan store with size-bounded LRU eviction.
+
+    Every write runs in its own transaction, so a crash leaves either the
+    old entry or the new one, never a partial plan. Plans written by another
+    deconstructor version are ignored; they are overwritten by a new plan
+    for the same key or pruned as least recently used. The get/put
+    interface matches PlanCache, so a store can be used as the deconstructor's
+    plan cache directly or as the backing tier of a PlanCache.
+
+    The store only ever saves work: a SQLite error in get or put (a locked,
+    full or corrupt file) is logged and treated as a miss or a skipped
+    write, never raised into the request.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None, max_entries: int = 10000,
+                 version: str = DECONSTRUCTOR_VERSION):
+        """
+        Args:
+            path: SQLite file to use; defaults to default_plan_store_path()
+            max_entries: Maximum number of plans kept before LRU eviction
+            version: Deconstructor version the stored plans must match
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.path = Path(path) if path is not None else default_plan_store_path()
+        self.max_entries = max_entries
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction():
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS plans (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    plan TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+
+    def _transaction(self):
+        """Context manager wrapping statements in one IMMEDIATE transaction"""
+        return _Transaction(self._conn)
+
+    def get(self, hypothesis: str, schema_context: Optional[str] = None,
+            variant: str = "") -> Optional[TestPlan]:
+        """Return the stored plan for a hypothesis, or None on a miss"""
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        with self._lock:
+            try:
+                plan = self._read(key)
+            except sqlite3.Error as e:
+                logger.error("plan_store_read_failed", path=str(self.path), error=str(e))
+                plan = None
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return plan.thaw(hypothesis)
+
+    def _read(self, key: str) -> Optional[FrozenTestPlan]:
+        """The current version's plan under a key, refreshing its recency; None if absent or unreadable"""
+        row = self._conn.execute(
+            "SELECT plan, last_used FROM plans WHERE key = ? AND version = ?",
+            (key, self.version)
+        ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            plan = decode_plan(row[0]).freeze()
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("stored_plan_unreadable", error=str(e))
+            self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+            return None
+
+        now = time.time()
+        if now - row[1] > _TOUCH_INTERVAL_SECONDS:
+            self._conn.execute("UPDATE plans SET last_used = ? WHERE key = ?", (now, key))
+        return plan
+
+    def put(self, hypothesis: str, schema_context: Optional[str], plan: TestPlan,
+            variant: str = "") -> TestPlan:
+        """Persist a plan and return a frozen copy of it for the caller"""
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        payload = encode_json(plan).decode("utf-8")
+        with self._lock:
+            try:
+                with self._transaction():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO plans (key, version, plan, last_used) VALUES (?, ?, ?, ?)",
+                        (key, self.version, payload, time.time())
+                    )
+                    self._conn.execute(
+                        """
+                        DELETE FROM plans WHERE key IN (
+                            SELECT key FROM plans ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.max_entries,)
+                    )
+            except sqlite3.Error as e:
+                logger.error("plan_store_write_failed", path=str(self.path), error=str(e))
+        return plan.freeze().thaw()
+
+    def invalidate(self, hypothesis: str, schema_context: Optional[str] = None,
+                   variant: str = "") -> bool:
+        """Drop the stored plan for one hypothesis; returns whether it existed"""
+        key = plan_cache_key(hypothesis, schema_context, variant)
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+            return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        """Drop every stored plan and reset the counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM plans")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            size = self._count()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": size,
+                "max_entries": self.max_entries,
+                "path": str(self.path)
+            }
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def _count(self) -> int:
+        """Plans of the current version"""
+        return self._conn.execute("SELECT COUNT(*) FROM plans WHERE version = ?", (self.version,)).fetchone()[0]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolling back if the block raises"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
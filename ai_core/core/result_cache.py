@@ -0,0 +1,412 @@
+"""
+Cache of executed query results, invalidated by data changes.
+
+Many hypotheses map to exactly the same generated SQL, so the same
+aggregate is computed over and over against data that has not changed.
+ResultCache remembers each QueryResult, and the rows small enough to keep,
+under the normalized SQL text and its parameters. Each entry records the
+data-version token of its source at the time it was computed; a lookup
+made after the data changed sees a different token and misses.
+
+Entries live in a memory-bounded LRU. Entries evicted from memory can
+spill to a SQLite file, and a later lookup brings them back into memory.
+Spilled entries are plain JSON, so whoever can write the file can at worst
+make a lookup miss.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import astuple, dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from .log import DEFAULT_RATE_LIMIT, get_logger
+
+if TYPE_CHECKING:
+    from .plan_executor import QueryResult
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_SPILL_BYTES = 512 * 1024 * 1024
+
+# Results with more rows than this are cached without their rows; they can
+# still answer lookups that only need the summary
+DEFAULT_MAX_ROWS_PER_ENTRY = 10000
+
+# Rows measured to estimate an entry's size
+_SIZE_SAMPLE_ROWS = 32
+
+# String literals and quoted identifiers, kept verbatim by normalization
+_SQL_TOKEN_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|(\s+)")
+
+VersionToken = Callable[[], Hashable]
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize SQL text for cache lookups.
+
+    Whitespace runs outside quotes collapse to one space and trailing
+    semicolons are dropped, so the same query generated with different
+    indentation shares an entry. Case is kept, since it matters inside
+    literals.
+    """
+    collapsed = _SQL_TOKEN_RE.sub(lambda match: match.group(1) or " ", sql)
+    return collapsed.strip().rstrip(";").rstrip()
+
+
+def result_cache_key(sql: str, parameters: Sequence[Any] = (), variant: Hashable = None) -> str:
+    """Cache key for a query, its parameters and how its result was summarized"""
+    material = f"{normalize_sql(sql)}\x00{tuple(parameters)!r}\x00{variant!r}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def sqlite_data_version(database: Union[str, Path]) -> Tuple[int, ...]:
+    """
+    Data-version token of a SQLite file.
+
+    Size and modification time of the database and of its write-ahead log,
+    where committed WAL-mode writes land first. ``PRAGMA data_version`` is
+    not used because its value is only comparable within one connection,
+    and results are shared across pooled connections and processes.
+    """
+    token: List[int] = []
+    for path in (str(database), f"{database}-wal"):
+        try:
+            stat = os.stat(path)
+            token += [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            token += [-1, -1]
+    return tuple(token)
+
+
+def _estimate_bytes(result: "QueryResult", rows: Optional[List[Tuple[Any, ...]]]) -> int:
+    """Approximate memory held by a cached result, from a sample of its rows"""
+    size = 1024 + sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in result.preview)
+    if rows:
+        sample = rows[:_SIZE_SAMPLE_ROWS]
+        per_row = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in sample) / len(sample)
+        size += int(per_row * len(rows)) + sys.getsizeof(rows)
+    return size
+
+
+@dataclass
+class CachedResult:
+    """A QueryResult with, when it was small enough, all of its rows"""
+    result: "QueryResult"
+    rows: Optional[List[Tuple[Any, ...]]]
+    version: Hashable
+    size: int
+
+
+class ResultCache:
+    """
+    Thread-safe, memory-bounded LRU cache of query results for one data source.
+
+    ``version`` returns the source's current data-version token; it is
+    checked on every lookup, so the cache never serves results computed
+    from older data. With ``spill_path``, entries evicted from memory are
+    kept in a SQLite file bounded by ``max_spill_bytes``.
+    """
+
+    def __init__(self, version: VersionToken, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_rows_per_entry: int = DEFAULT_MAX_ROWS_PER_ENTRY,
+                 spill_path: Union[str, Path, None] = None,
+                 max_spill_bytes: int = DEFAULT_MAX_SPILL_BYTES):
+        """
+        Args:
+            version: Callable returning the data source's version token
+            max_bytes: Approximate memory the cached entries may hold
+            max_rows_per_entry: Results with more rows keep only their summary
+            spill_path: Optional SQLite file receiving entries evicted from memory
+            max_spill_bytes: Size bound of the spill file's entries
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        if max_rows_per_entry < 0:
+            raise ValueError("max_rows_per_entry must not be negative")
+
+        self.version = version
+        self.max_bytes = max_bytes
+        self.max_rows_per_entry = max_rows_per_entry
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.spill = _SpillStore(Path(spill_path), max_spill_bytes) if spill_path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.spill_hits = 0
+
+    @classmethod
+    def for_sqlite(cls, database: Union[str, Path], **kwargs: Any) -> "ResultCache":
+        """Cache for a SQLite file, versioned by sqlite_data_version"""
+        path = Path(database)
+        return cls(lambda: sqlite_data_version(path), **kwargs)
+
+    def get(self, sql: str, parameters: Sequence[Any] = (), variant: Hashable = None,
+            need_rows: bool = False, version: Hashable = None) -> Optional[CachedResult]:
+        """
+        Return the cached result of a query, or None on a miss.
+
+        Args:
+            sql: Query text; normalized before lookup
+            parameters: Query parameters
+            variant: Anything else the result depends on, such as how it
+                was summarized
+            need_rows: Only accept entries that kept every row
+            version: Current data-version token, if the caller already read it
+
+        Returns:
+            Optional[CachedResult]: A copy the caller may modify
+        """
+        key = result_cache_key(sql, parameters, variant)
+        if version is None:
+            version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                self._remove(key)
+                self.stale += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.spill is not None:
+            entry = self.spill.take(key, version)
+            if entry is not None:
+                with self._lock:
+                    self.spill_hits += 1
+                self._insert(key, entry)
+
+        with self._lock:
+            if entry is None or (need_rows and entry.rows is None):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return replace(entry, result=entry.result.copy())
+
+    def put(self, sql: str, parameters: Sequence[Any], result: "QueryResult",
+            rows: Optional[List[Tuple[Any, ...]]] = None, variant: Hashable = None,
+            version: Hashable = None) -> None:
+        """
+        Cache a successful query result.
+
+        Args:
+            sql: Query text
+            parameters: Query parameters
+            result: Result to cache; failed results are not cached
+            rows: Every row of the result, or None when they were not kept
+            variant: As for get()
+            version: Data-version token read before the query ran; defaults
+                to the current one
+        """
+        if not result.success:
+            return
+        if rows is not None and len(rows) > self.max_rows_per_entry:
+            rows = None
+        entry = CachedResult(
+            result=result.copy(),
+            rows=list(rows) if rows is not None else None,
+            version=self.version() if version is None else version,
+            size=_estimate_bytes(result, rows)
+        )
+        if entry.size > self.max_bytes:
+            logger.info("result_too_large_to_cache", query=result.name, bytes=entry.size)
+            return
+        self._insert(result_cache_key(sql, parameters, variant), entry)
+
+    def _insert(self, key: str, entry: CachedResult) -> None:
+        evicted: List[Tuple[str, CachedResult]] = []
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._bytes -= old_entry.size
+                self.evictions += 1
+                evicted.append((old_key, old_entry))
+        if self.spill is not None:
+            for old_key, old_entry in evicted:
+                self.spill.put(old_key, old_entry)
+
+    def _remove(self, key: str) -> None:
+        """Drop a memory entry (lock held)"""
+        self._bytes -= self._entries.pop(key).size
+
+    def clear(self) -> None:
+        """Drop every cached result, including the spilled ones, and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.stale = self.evictions = self.spill_hits = 0
+        if self.spill is not None:
+            self.spill.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "spill_hits": self.spill_hits,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+        if self.spill is not None:
+            stats["spilled"] = len(self.spill)
+        return stats
+
+    def close(self) -> None:
+        if self.spill is not None:
+            self.spill.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class _SpillStore:
+    """SQLite file holding entries evicted from memory, with size-bounded LRU eviction"""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def put(self, key: str, entry: CachedResult) -> None:
+        payload = _encode_spilled(entry)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, version, payload, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, repr(entry.version), payload, len(payload), time.time())
+                )
+                # Drop the least recently spilled entries past the size bound
+                self._conn.execute(
+                    """
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                            FROM results
+                        ) WHERE running > ?
+                    )
+                    """,
+                    (self.max_bytes,)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def take(self, key: str, version: Hashable) -> Optional[CachedResult]:
+        """Remove and return a spilled entry if it matches the current version"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, payload FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        if row[0] != repr(version):
+            return None
+        try:
+            return _decode_spilled(row[1], version)
+        except (TypeError, ValueError) as e:
+            logger.warning("spilled_result_unreadable", error=str(e))
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+# A spilled entry is one JSON array of the result's fields, its running
+# statistics as arrays of their fields, its rows and its size. Row values
+# are SQLite's None, int, float, str or bytes; bytes, the only value JSON
+# lacks, are written as {"bytes": base64}, and nothing else in the
+# document is an object.
+def _encode_bytes(value: Any) -> Dict[str, str]:
+    if isinstance(value, bytes):
+        return {"bytes": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"cannot spill a value of type {type(value).__name__}")
+
+
+def _decode_bytes(document: Dict[str, Any]) -> bytes:
+    return base64.b64decode(document["bytes"], validate=True)
+
+
+def _encode_spilled(entry: CachedResult) -> bytes:
+    result = entry.result
+    return json.dumps([
+        result.name, result.sql, result.columns, result.row_count,
+        [[name, *astuple(stats)] for name, stats in result.column_stats.items()],
+        [[*pair, *astuple(covariance)] for pair, covariance in result.covariances.items()],
+        result.preview, result.elapsed_seconds, entry.rows, entry.size,
+    ], default=_encode_bytes, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_spilled(payload: bytes, version: Hashable) -> CachedResult:
+    """Rebuild a spilled entry; malformed payloads raise TypeError or ValueError"""
+    # plan_executor imports this module
+    from .plan_executor import QueryResult, RunningCovariance, RunningStats
+
+    try:
+        (name, sql, columns, row_count, column_stats, covariances,
+         preview, elapsed_seconds, rows, size) = json.loads(payload, object_hook=_decode_bytes)
+        result = QueryResult(
+            name=name, sql=sql, columns=list(columns), row_count=row_count,
+            column_stats={stats[0]: RunningStats(*stats[1:]) for stats in column_stats},
+            covariances={(pair[0], pair[1]): RunningCovariance(*pair[2:]) for pair in covariances},
+            preview=[tuple(row) for row in preview], elapsed_seconds=elapsed_seconds
+        )
+    except KeyError as e:
+        raise ValueError(f"unexpected object in spilled result: {str(e)}") from e
+    return CachedResult(
+        result=result,
+        rows=[tuple(row) for row in rows] if rows is not None else None,
+        version=version,
+        size=size
+    )
@@ -0,0 +1,420 @@
+"""
+Indexed catalog of the tables and columns described by a schema context.
+
+``schema_context`` arrives as free text ("Table: x" / "- column: TYPE"
+listings or CREATE TABLE statements) or as the path of a SQLite database.
+Paths are honoured only inside directories the caller allow-lists, so a
+schema context from an untrusted client cannot make the process open
+arbitrary local files; anywhere else a path is just text.
+It is parsed once into a SchemaCatalog, cached by content, whose
+inverted indexes map column names, table names and synonyms to qualified
+columns. Resolving an entity to a real column is then a dictionary lookup
+rather than a scan, however many tables the warehouse has.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Parsed catalogs kept in memory, most recently used last
+CATALOG_CACHE_SIZE = 32
+
+# Distinct resolve() requests remembered per catalog
+RESOLVE_CACHE_SIZE = 1024
+
+# Column types treated as numeric when choosing measures
+NUMERIC_TYPES = frozenset({
+    "INTEGER", "INT", "BIGINT", "SMALLINT", "TINYINT", "REAL", "FLOAT",
+    "DOUBLE", "DECIMAL", "NUMERIC", "NUMBER",
+})
+
+# Column types and name tokens treated as time when choosing a trend's regressor
+TEMPORAL_TYPES = frozenset({"DATE", "DATETIME", "TIMESTAMP", "TIME"})
+TEMPORAL_NAME_TOKENS = frozenset({
+    "date", "time", "timestamp", "day", "week", "month", "quarter", "year", "period",
+})
+
+# Entity -> column names that commonly hold it
+DEFAULT_SYNONYMS: Mapping[str, Tuple[str, ...]] = {
+    "revenue": ("revenue", "sales", "amount", "total", "profit", "price", "net_sales"),
+    "customer": ("customer", "customer_id", "client", "client_id", "account_id"),
+    "state": ("state", "region", "province", "territory"),
+    "sales_data": ("sales", "orders", "transactions", "sales_data"),
+    "customer_data": ("customers", "clients", "accounts", "customer_data"),
+}
+
+_TABLE_LINE_RE = re.compile(r"^\s*table\s*:\s*([\w.\"`\[\]]+)", re.IGNORECASE)
+_COLUMN_LINE_RE = re.compile(r"^\s*[-*]\s*([\w\"`\[\]]+)\s*(?::\s*(\w+))?")
+_CREATE_TABLE_RE = re.compile(
+    r"create\s+table\s+(?:if\s+not\s+exists\s+)?([\w.\"`\[\]]+)\s*\((.*?)\)\s*;",
+    re.IGNORECASE | re.DOTALL,
+)
+_DDL_CONSTRAINTS = {"primary", "foreign", "unique", "constraint", "check", "key", "index"}
+_NAME_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_MAX_PATH_LENGTH = 4096
+_PLAIN_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def quote_identifier(name: str) -> str:
+    """Quote an identifier for SQL unless it is a plain lowercase name"""
+    if _PLAIN_IDENTIFIER_RE.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass(frozen=True)
+class Column:
+    """A column of a catalogued table"""
+    table: str
+    name: str
+    type: str = ""
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.table}.{self.name}"
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.type.upper() in NUMERIC_TYPES
+
+    @property
+    def is_temporal(self) -> bool:
+        """Whether the column holds a date or time, by type or failing that by name"""
+        return (self.type.upper() in TEMPORAL_TYPES
+                or not TEMPORAL_NAME_TOKENS.isdisjoint(_NAME_TOKEN_RE.findall(self.name)))
+
+
+def _normalize_name(name: str) -> str:
+    """Lowercase an identifier and drop quoting"""
+    return name.strip("\"`[]").lower()
+
+
+def _name_keys(name: str) -> List[str]:
+    """Index keys for an identifier: the name, its tokens and their singulars"""
+    keys = [name]
+    tokens = _NAME_TOKEN_RE.findall(name)
+    if len(tokens) > 1:
+        keys.extend(tokens)
+    for key in list(keys):
+        if len(key) > 3 and key.endswith("s"):
+            keys.append(key[:-1])
+    return keys
+
+
+class SchemaCatalog:
+    """
+    Tables and columns of a schema with inverted indexes for entity lookup.
+
+    Indexes are built once on construction:
+
+    - column name (and its underscore tokens, singularized) -> columns
+    - table name (and its tokens, singularized) -> tables
+    - synonym -> columns / tables, from ``synonyms``
+    """
+
+    def __init__(self, tables: Mapping[str, Sequence[Column]],
+                 synonyms: Optional[Mapping[str, Iterable[str]]] = None):
+        self.tables: Dict[str, Tuple[Column, ...]] = {
+            table: tuple(columns) for table, columns in tables.items()
+        }
+        self._table_order = {table: rank for rank, table in enumerate(self.tables)}
+        self._exact_columns: Dict[str, List[Column]] = {}
+        self._token_columns: Dict[str, List[Column]] = {}
+        self._tables_by_key: Dict[str, List[str]] = {}
+
+        for table, columns in self.tables.items():
+            for key in _name_keys(table):
+                self._tables_by_key.setdefault(key, []).append(table)
+            for column in columns:
+                keys = _name_keys(column.name)
+                self._exact_columns.setdefault(keys[0], []).append(column)
+                for key in keys[1:]:
+                    self._token_columns.setdefault(key, []).append(column)
+
+        # Synonyms point at whatever their target names already index
+        self._synonym_columns: Dict[str, List[Column]] = {}
+        self._synonym_tables: Dict[str, List[str]] = {}
+        for entity, names in (DEFAULT_SYNONYMS if synonyms is None else synonyms).items():
+            columns: List[Column] = []
+            tables_for: List[str] = []
+            for name in names:
+                name = name.lower()
+                columns.extend(self._exact_columns.get(name, ()))
+                tables_for.extend(self._tables_by_key.get(name, ()))
+            if columns:
+                self._synonym_columns[entity.lower()] = columns
+            if tables_for:
+                self._synonym_tables[entity.lower()] = list(dict.fromkeys(tables_for))
+
+        # The catalog never changes, so resolutions can be remembered
+        self._resolved: Dict[Tuple[Tuple[str, ...], Tuple[str, ...], bool], Dict[str, Column]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    @property
+    def column_count(self) -> int:
+        return sum(len(columns) for columns in self.tables.values())
+
+    def columns_for(self, term: str) -> List[Column]:
+        """
+        Columns that may hold ``term``, best match first.
+
+        Exact column names rank above synonyms, which rank above columns
+        that merely contain the term as an underscore-separated token.
+        """
+        key = term.lower()
+        ranked: Dict[Column, None] = {}
+        for index in (self._exact_columns, self._synonym_columns, self._token_columns):
+            for column in index.get(key, ()):
+                ranked.setdefault(column)
+        if not ranked and key.endswith("s"):
+            return self.columns_for(key[:-1])
+        return list(ranked)
+
+    def tables_for(self, term: str) -> List[str]:
+        """Tables whose name, or a synonym of it, matches ``term``"""
+        key = term.lower()
+        found = self._tables_by_key.get(key, []) + self._synonym_tables.get(key, [])
+        return list(dict.fromkeys(found))
+
+    def numeric_columns(self, table: str) -> List[Column]:
+        """Numeric columns of a table, in declaration order"""
+        return [column for column in self.tables.get(table, ()) if column.is_numeric]
+
+    def time_columns(self, table: str) -> List[Column]:
+        """Date and time columns of a table, in declaration order"""
+        return [column for column in self.tables.get(table, ()) if column.is_temporal]
+
+    def join_key(self, left: str, right: str) -> Optional[str]:
+        """Column name shared by two tables to join them on, preferring ids"""
+        right_names = {column.name for column in self.tables.get(right, ())}
+        shared = [column.name for column in self.tables.get(left, ()) if column.name in right_names]
+        if not shared:
+            return None
+        ids = [name for name in shared if name == "id" or name.endswith("_id")]
+        return (ids or shared)[0]
+
+    def resolve(self, terms: Sequence[str], preferred_tables: Sequence[str] = (),
+                numeric_first: bool = False) -> Dict[str, Column]:
+        """
+        Resolve several terms to columns, keeping them in as few tables as possible.
+
+        The primary table is the one covering the most terms, with ties broken
+        in favour of ``preferred_tables`` and then catalog order. A term the
+        primary table cannot cover resolves to its best column in a table
+        that can be joined to the primary one (see join_key).
+
+        Args:
+            terms: Entity names to resolve, e.g. ``["revenue", "state"]``
+            preferred_tables: Tables to favour, e.g. resolved data sources
+            numeric_first: Rank numeric columns first for the first term
+
+        Returns:
+            Dict[str, Column]: Term -> column for every term that resolves
+        """
+        key = (tuple(terms), tuple(preferred_tables), numeric_first)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = self._resolve(terms, preferred_tables, numeric_first)
+            if len(self._resolved) < RESOLVE_CACHE_SIZE:
+                self._resolved[key] = resolved
+        return dict(resolved)
+
+    def _resolve(self, terms: Sequence[str], preferred_tables: Sequence[str],
+                 numeric_first: bool) -> Dict[str, Column]:
+        """Uncached body of resolve"""
+        candidates = {term: self.columns_for(term) for term in terms}
+        if terms and numeric_first:
+            first = terms[0]
+            candidates[first] = sorted(candidates[first], key=lambda column: not column.is_numeric)
+
+        coverage: Dict[str, int] = {}
+        for columns in candidates.values():
+            for table in dict.fromkeys(column.table for column in columns):
+                coverage[table] = coverage.get(table, 0) + 1
+        if not coverage:
+            return {}
+
+        preference = {table: rank for rank, table in enumerate(preferred_tables)}
+        primary = min(coverage, key=lambda name: (
+            -coverage[name], preference.get(name, len(preference)), self._table_order[name]
+        ))
+
+        resolved: Dict[str, Column] = {}
+        for term, columns in candidates.items():
+            in_primary = [column for column in columns if column.table == primary]
+            if in_primary:
+                resolved[term] = in_primary[0]
+                continue
+            for column in columns:
+                if self.join_key(primary, column.table):
+                    resolved[term] = column
+                    break
+        return resolved
+
+
+def parse_schema_text(text: str) -> Dict[str, List[Column]]:
+    """
+    Parse a schema listing into table -> columns.
+
+    Understands CREATE TABLE statements and the listing format used in
+    prompts::
+
+        Table: customers
+          - customer_id: INTEGER
+          - state: TEXT
+    """
+    tables: Dict[str, List[Column]] = {}
+
+    for match in _CREATE_TABLE_RE.finditer(text):
+        table = _normalize_name(match.group(1))
+        columns = tables.setdefault(table, [])
+        for definition in _split_ddl_columns(match.group(2)):
+            parts = definition.split()
+            if not parts or parts[0].lower() in _DDL_CONSTRAINTS:
+                continue
+            column_type = parts[1].split("(")[0].upper() if len(parts) > 1 else ""
+            columns.append(Column(table, _normalize_name(parts[0]), column_type))
+
+    current: Optional[str] = None
+    for line in text.splitlines():
+        table_match = _TABLE_LINE_RE.match(line)
+        if table_match:
+            current = _normalize_name(table_match.group(1))
+            tables.setdefault(current, [])
+            continue
+        if current is None:
+            continue
+        column_match = _COLUMN_LINE_RE.match(line)
+        if column_match:
+            tables[current].append(Column(
+                current, _normalize_name(column_match.group(1)), (column_match.group(2) or "").upper()
+            ))
+
+    return tables
+
+
+def _split_ddl_columns(body: str) -> List[str]:
+    """Split a CREATE TABLE body on top-level commas"""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(body[start:index].strip())
+            start = index + 1
+    parts.append(body[start:].strip())
+    return parts
+
+
+def read_sqlite_schema(path: str) -> Dict[str, List[Column]]:
+    """Read table -> columns from a SQLite database file, opened read-only"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables: Dict[str, List[Column]] = {}
+        names = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        )]
+        for table in names:
+            quoted = table.replace('"', '""')
+            tables[table.lower()] = [
+                Column(table.lower(), name.lower(), (column_type or "").split("(")[0].upper())
+                for _, name, column_type, *_ in connection.execute(f'PRAGMA table_info("{quoted}")')
+            ]
+        return tables
+    finally:
+        connection.close()
+
+
+def _is_sqlite_path(schema_context: str, database_dirs: Sequence[str] = ()) -> bool:
+    """Whether the schema context names a SQLite database file inside an allowed directory"""
+    if not database_dirs or len(schema_context) > _MAX_PATH_LENGTH:
+        return False
+    candidate = schema_context.strip()
+    if "\n" in candidate or not candidate.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        return False
+    # Symlinks and ".." are resolved before the directory check
+    path = os.path.realpath(candidate)
+    return os.path.isfile(path) and any(
+        os.path.commonpath([path, os.path.realpath(directory)]) == os.path.realpath(directory)
+        for directory in database_dirs
+    )
+
+
+_catalogs: "OrderedDict[Hashable, Optional[SchemaCatalog]]" = OrderedDict()
+_catalogs_lock = threading.Lock()
+
+
+def catalog_key(schema_context: str, database_dirs: Sequence[str] = ()) -> Hashable:
+    """
+    Cache key identifying a schema context's content.
+
+    Schema text is its own key: dictionary lookups compare it by hash (which
+    Python caches on the string) and then by content, so a caller reusing
+    the same schema string pays no rehashing. A SQLite path is keyed on the
+    path together with the file's size and modification time, so an altered
+    database is re-read.
+    """
+    if _is_sqlite_path(schema_context, database_dirs):
+        path = os.path.realpath(schema_context.strip())
+        stat = os.stat(path)
+        return ("sqlite", path, stat.st_size, stat.st_mtime_ns)
+    return schema_context
+
+
+def load_catalog(schema_context: Optional[str],
+                 database_dirs: Sequence[str] = ()) -> Optional[SchemaCatalog]:
+    """
+    Parsed catalog for a schema context, built once per distinct content.
+
+    Args:
+        schema_context: Schema text, or the path of a SQLite database
+        database_dirs: Directories whose SQLite databases may be read; a
+            path anywhere else is parsed as schema text
+
+    Returns:
+        Optional[SchemaCatalog]: None when there is no schema context or it
+        describes no tables
+    """
+    if not schema_context or schema_context.isspace():
+        return None
+
+    key = catalog_key(schema_context, database_dirs)
+    with _catalogs_lock:
+        if key in _catalogs:
+            _catalogs.move_to_end(key)
+            return _catalogs[key]
+
+    if isinstance(key, tuple):
+        # Read the resolved path that passed the directory check
+        tables = read_sqlite_schema(key[1])
+    else:
+        tables = parse_schema_text(schema_context)
+    catalog = SchemaCatalog(tables) if tables else None
+    if catalog is not None:
+        logger.info("schema_catalogued", tables=len(catalog), columns=catalog.column_count)
+
+    with _catalogs_lock:
+        _catalogs[key] = catalog
+        _catalogs.move_to_end(key)
+        while len(_catalogs) > CATALOG_CACHE_SIZE:
+            _catalogs.popitem(last=False)
+    return catalog
+
+
+def clear_catalog_cache() -> None:
+    """Forget every parsed catalog"""
+    with _catalogs_lock:
+        _catalogs.clear()
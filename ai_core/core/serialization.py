@@ -0,0 +1,317 @@
+"""
+Versioned wire formats for test plans.
+
+Plans cross process boundaries (batch workers), are persisted by
+PersistentPlanStore and are returned over the API, so they need encodings
+that are cheap next to generating a plan. Two are provided:
+
+- JSON, written with orjson when it is installed and with the standard
+  library otherwise; both produce the same document.
+- A compact binary encoding in the MessagePack format, for IPC and on-disk
+  caches. msgpack is optional (the ``fast`` extra) and is used whenever it
+  is importable. Without it a small pure-Python codec writes byte-identical
+  output, but decoding is slow: about 41 µs a plan, twice the cost of a
+  whole rule-based deconstruction, so deployments that decode binary plans
+  on a serving path should install the extra.
+
+Every payload carries ``schema_version``. Payloads without one are the
+plain TestPlan.to_dict output written before versioning and are read as
+version 1; payloads from a newer schema are rejected rather than guessed
+at. Decoding always goes through the validating TestPlan.from_dict.
+"""
+
+import json
+import struct
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from .hypothesis_deconstructor import FrozenTestPlan, TestPlan
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+PLAN_SCHEMA_VERSION = 1
+
+SCHEMA_VERSION_KEY = "schema_version"
+
+AnyPlan = Union[TestPlan, FrozenTestPlan]
+
+# Upgrades a payload of schema version N (the key) to version N + 1
+_MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+class SerializationError(ValueError):
+    """A payload is malformed, from an unknown schema, or not a valid plan"""
+
+
+def plan_payload(plan: AnyPlan) -> Dict[str, Any]:
+    """The versioned document both encodings write"""
+    payload = plan.to_dict()
+    payload[SCHEMA_VERSION_KEY] = PLAN_SCHEMA_VERSION
+    return payload
+
+
+def plan_from_payload(payload: Any) -> TestPlan:
+    """
+    Rebuild a plan from a decoded payload, upgrading older schemas.
+
+    Raises:
+        SerializationError: If the schema version is unknown or the payload
+            is not a valid test plan
+    """
+    if not isinstance(payload, dict):
+        raise SerializationError("test plan payload must be a mapping")
+    version = payload.get(SCHEMA_VERSION_KEY, 1)
+    if type(version) is not int or version < 1:
+        raise SerializationError(f"invalid plan schema version: {version!r}")
+    if version > PLAN_SCHEMA_VERSION:
+        raise SerializationError(
+            f"plan schema version {version} is newer than supported version {PLAN_SCHEMA_VERSION}"
+        )
+    while version < PLAN_SCHEMA_VERSION:
+        payload = _MIGRATIONS[version](payload)
+        version += 1
+    try:
+        return TestPlan.from_dict(payload)
+    except ValueError as e:
+        raise SerializationError(str(e)) from e
+
+
+def encode_json(plan: AnyPlan) -> bytes:
+    """Encode a plan as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(plan_payload(plan))
+    return json.dumps(plan_payload(plan), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_json(data: Union[bytes, str]) -> TestPlan:
+    """
+    Decode a plan written by encode_json or by json.dumps(plan.to_dict()).
+
+    Raises:
+        SerializationError: If the data is not valid JSON or not a valid plan
+    """
+    try:
+        payload = orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError as e:
+        raise SerializationError(f"invalid plan JSON: {str(e)}") from e
+    return plan_from_payload(payload)
+
+
+def encode_binary(plan: AnyPlan) -> bytes:
+    """Encode a plan in the MessagePack format"""
+    if msgpack is not None:
+        return msgpack.packb(plan_payload(plan), use_bin_type=True)
+    return _pack_plan(plan)
+
+
+def decode_binary(data: bytes) -> TestPlan:
+    """
+    Decode a plan written by encode_binary.
+
+    Raises:
+        SerializationError: If the data is truncated, not MessagePack, or
+            not a valid plan, or nests too deeply
+    """
+    if msgpack is not None:
+        try:
+            payload = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (TypeError, ValueError, msgpack.UnpackException) as e:
+            raise SerializationError(f"invalid plan binary: {str(e)}") from e
+        return plan_from_payload(payload)
+    try:
+        payload, end = _unpack(bytes(data), 0, 0)
+    # TypeError: a map key that is itself a map or array (unhashable)
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e:
+        raise SerializationError(f"invalid plan binary: {str(e)}") from e
+    if end != len(data):
+        raise SerializationError("invalid plan binary: trailing bytes")
+    return plan_from_payload(payload)
+
+
+def decode_plan(data: Union[bytes, str]) -> TestPlan:
+    """Decode either encoding; JSON documents start with ``{``, binary ones never do"""
+    if isinstance(data, str):
+        return decode_json(data)
+    head = bytes(data[:1])
+    if head in (b"{", b" ", b"\n", b"\t", b"\r"):
+        return decode_json(data)
+    return decode_binary(data)
+
+
+# Minimal MessagePack: a writer for plan payloads and a reader for the
+# value types they contain (None, bool, int, float, str, arrays and maps).
+# Output matches msgpack.packb(plan_payload(plan), use_bin_type=True).
+
+# Plans nest three deep (plan map, sql_queries array, query map); deeper
+# payloads are rejected before they can exhaust the stack
+MAX_NESTING = 8
+
+# Query text, data sources and keys repeat across plans; their packed form
+# is kept here, and the table is cleared when it reaches the bound
+MAX_PACKED_STRINGS = 4096
+
+_packed_strings: Dict[str, bytes] = {}
+
+_PACK_FLOAT = struct.Struct(">Bd").pack
+
+
+def _pack_str(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    size = len(encoded)
+    if size < 32:
+        return bytes((0xa0 | size,)) + encoded
+    if size < 0x100:
+        return bytes((0xd9, size)) + encoded
+    if size < 0x10000:
+        return struct.pack(">BH", 0xda, size) + encoded
+    return struct.pack(">BI", 0xdb, size) + encoded
+
+
+def _packed_str(value: str) -> bytes:
+    packed = _packed_strings.get(value)
+    if packed is None:
+        packed = _pack_str(value)
+        if len(_packed_strings) >= MAX_PACKED_STRINGS:
+            _packed_strings.clear()
+        _packed_strings[value] = packed
+    return packed
+
+
+def _pack_header(size: int, fix: int, wide: int) -> bytes:
+    """Array or map header: fix form below 16 entries, then 16- or 32-bit"""
+    if size < 16:
+        return bytes((fix | size,))
+    if size < 0x10000:
+        return struct.pack(">BH", wide, size)
+    return struct.pack(">BI", wide + 1, size)
+
+
+def _pack_int(value: int) -> bytes:
+    """Non-negative integers in the narrowest form, as msgpack writes them"""
+    if 0 <= value < 0x80:
+        return bytes((value,))
+    for high, tag, fmt in ((1 << 8, 0xcc, ">BB"), (1 << 16, 0xcd, ">BH"),
+                           (1 << 32, 0xce, ">BI"), (1 << 64, 0xcf, ">BQ")):
+        if 0 <= value < high:
+            return struct.pack(fmt, tag, value)
+    raise SerializationError("integer out of range for a plan payload")
+
+
+def _pack_plan(plan: AnyPlan) -> bytes:
+    """MessagePack map of plan_payload(plan), without building the payload"""
+    parts = [b"\x87", _packed_str("hypothesis"), _pack_str(plan.hypothesis),
+             _packed_str("required_data"), _pack_header(len(plan.required_data), 0x90, 0xdc)]
+    parts += map(_packed_str, plan.required_data)
+    parts += (_packed_str("sql_queries"), _pack_header(len(plan.sql_queries), 0x90, 0xdc))
+    for query in plan.sql_queries:
+        parts.append(_pack_header(len(query), 0x80, 0xde))
+        for key, value in query.items():
+            parts += (_packed_str(key), _packed_str(value))
+    parts += (_packed_str("statistical_methods"), _pack_header(len(plan.statistical_methods), 0x90, 0xdc))
+    parts += (_packed_str(method.value) for method in plan.statistical_methods)
+    parts += (_packed_str("expected_outcome"), _packed_str(plan.expected_outcome),
+              _packed_str("confidence_threshold"), _PACK_FLOAT(0xcb, float(plan.confidence_threshold)),
+              _packed_str(SCHEMA_VERSION_KEY), _pack_int(PLAN_SCHEMA_VERSION))
+    return b"".join(parts)
+
+
+def _unpack(data: bytes, offset: int, depth: int) -> Tuple[Any, int]:
+    """Decode the value at ``offset``, ``depth`` containers deep; returns (value, offset after it)"""
+    tag = data[offset]
+    offset += 1
+    # Strings dominate plan payloads, so they are tested first
+    if 0xa0 <= tag <= 0xbf:
+        return _unpack_str(data, offset, tag & 0x1f)
+    if tag == 0xd9:
+        return _unpack_str(data, offset + 1, data[offset])
+    if 0x80 <= tag <= 0x8f:
+        return _unpack_map(data, offset, tag & 0x0f, depth)
+    if 0x90 <= tag <= 0x9f:
+        return _unpack_array(data, offset, tag & 0x0f, depth)
+    if tag < 0x80:
+        return tag, offset
+    if tag >= 0xe0:
+        return tag - 0x100, offset
+    if tag == 0xc0:
+        return None, offset
+    if tag == 0xc2:
+        return False, offset
+    if tag == 0xc3:
+        return True, offset
+    if tag in _FIXED_WIDTH:
+        reader = _FIXED_WIDTH[tag]
+        return reader.unpack_from(data, offset)[0], offset + reader.size
+    if tag in _STR_LENGTHS:
+        reader = _STR_LENGTHS[tag]
+        size = reader.unpack_from(data, offset)[0]
+        return _unpack_str(data, offset + reader.size, size)
+    if tag in _CONTAINER_LENGTHS:
+        reader, read = _CONTAINER_LENGTHS[tag]
+        size = reader.unpack_from(data, offset)[0]
+        return read(data, offset + reader.size, size, depth)
+    raise SerializationError(f"unsupported MessagePack type 0x{tag:02x}")
+
+
+def _unpack_str(data: bytes, offset: int, size: int) -> Tuple[str, int]:
+    end = offset + size
+    if end > len(data):
+        raise IndexError("string runs past the end of the payload")
+    return data[offset:end].decode("utf-8"), end
+
+
+def _nested(depth: int) -> int:
+    if depth >= MAX_NESTING:
+        raise SerializationError(f"invalid plan binary: nested deeper than {MAX_NESTING}")
+    return depth + 1
+
+
+def _unpack_array(data: bytes, offset: int, size: int, depth: int) -> Tuple[List[Any], int]:
+    depth = _nested(depth)
+    items = []
+    for _ in range(size):
+        item, offset = _unpack(data, offset, depth)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(data: bytes, offset: int, size: int, depth: int) -> Tuple[Dict[Any, Any], int]:
+    depth = _nested(depth)
+    mapping = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset, depth)
+        mapping[key], offset = _unpack(data, offset, depth)
+    return mapping, offset
+
+
+_FIXED_WIDTH = {
+    0xca: struct.Struct(">f"),
+    0xcb: struct.Struct(">d"),
+    0xcc: struct.Struct(">B"),
+    0xcd: struct.Struct(">H"),
+    0xce: struct.Struct(">I"),
+    0xcf: struct.Struct(">Q"),
+    0xd0: struct.Struct(">b"),
+    0xd1: struct.Struct(">h"),
+    0xd2: struct.Struct(">i"),
+    0xd3: struct.Struct(">q"),
+}
+
+_STR_LENGTHS = {
+    0xd9: struct.Struct(">B"),
+    0xda: struct.Struct(">H"),
+    0xdb: struct.Struct(">I"),
+}
+
+_CONTAINER_LENGTHS = {
+    0xdc: (struct.Struct(">H"), _unpack_array),
+    0xdd: (struct.Struct(">I"), _unpack_array),
+    0xde: (struct.Struct(">H"), _unpack_map),
+    0xdf: (struct.Struct(">I"), _unpack_map),
+}
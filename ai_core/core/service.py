@@ -0,0 +1,135 @@
+"""
+HTTP service for hypothesis deconstruction.
+
+Wraps a single HypothesisDeconstructor per worker process, warmed once at
+startup, so analysts and batch jobs share a warm engine instead of each
+starting their own. The model loads in the background: requests are
+answered by the rule-based system from the first one, and ``/ready`` reports
+when model-backed plans take over.
+
+Run with ``python -m core.service --workers 4`` from the ai_core directory,
+or point uvicorn at ``core.service:app``.
+"""
+
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from .hypothesis_deconstructor import MODEL_READY, HypothesisDeconstructor
+from .log import get_logger
+from .metrics import CONTENT_TYPE
+from .plan_cache import PlanCache
+
+logger = get_logger(__name__)
+
+# Upper bound on hypotheses accepted by one /deconstruct/batch call
+MAX_BATCH_SIZE = 1000
+
+
+class DeconstructRequest(BaseModel):
+    """Body of a /deconstruct request"""
+    hypothesis: str
+    schema_context: Optional[str] = None
+
+
+class BatchDeconstructRequest(BaseModel):
+    """Body of a /deconstruct/batch request"""
+    hypotheses: List[str] = Field(default_factory=list)
+    schema_context: Optional[str] = None
+
+
+def create_app(deconstructor: Optional[HypothesisDeconstructor] = None) -> FastAPI:
+    """
+    Build the FastAPI application.
+
+    Args:
+        deconstructor: Engine to serve; defaults to a plan-cached HypothesisDeconstructor
+
+    Returns:
+        FastAPI: Application whose startup starts warming the model once
+    """
+    engine = deconstructor or HypothesisDeconstructor(plan_cache=PlanCache())
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Not awaited: startup never waits for the model
+        engine.start_model_initialization()
+        yield
+        engine.close()
+
+    app = FastAPI(title="Shelby AI Core", version="0.1.0", lifespan=lifespan)
+    app.state.deconstructor = engine
+
+    @app.get("/health")
+    async def health(request: Request) -> Dict[str, Any]:
+        engine = request.app.state.deconstructor
+        model_status = engine.model_status
+        return {
+            "status": "ok",
+            "model_ready": model_status == MODEL_READY,
+            "model_status": model_status,
+            "pid": os.getpid(),
+        }
+
+    @app.get("/ready")
+    async def ready(request: Request, model: bool = False) -> JSONResponse:
+        # Requests are served while the model loads, so only a probe that
+        # asks for the model (?model=true) is refused until it is ready
+        readiness = request.app.state.deconstructor.readiness()
+        status_code = 503 if model and not readiness["ready"] else 200
+        return JSONResponse(readiness, status_code=status_code)
+
+    @app.get("/metrics")
+    async def metrics(request: Request) -> PlainTextResponse:
+        # Each uvicorn worker process keeps its own metrics
+        return PlainTextResponse(request.app.state.deconstructor.metrics.render(), media_type=CONTENT_TYPE)
+
+    @app.post("/deconstruct")
+    async def deconstruct(body: DeconstructRequest, request: Request) -> Dict[str, Any]:
+        response = await request.app.state.deconstructor.deconstruct_hypothesis_async(
+            body.hypothesis, body.schema_context
+        )
+        return response.to_dict()
+
+    @app.post("/deconstruct/batch")
+    async def deconstruct_batch(body: BatchDeconstructRequest, request: Request) -> Dict[str, Any]:
+        if len(body.hypotheses) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"batch of {len(body.hypotheses)} exceeds limit of {MAX_BATCH_SIZE}"
+            )
+        engine = request.app.state.deconstructor
+        responses = await asyncio.gather(*[
+            engine.deconstruct_hypothesis_async(hypothesis, body.schema_context)
+            for hypothesis in body.hypotheses
+        ])
+        return {"responses": [response.to_dict() for response in responses]}
+
+    return app
+
+
+app = create_app()
+
+
+def main() -> None:
+    """Run the service under uvicorn, optionally with several worker processes"""
+    parser = argparse.ArgumentParser(description="Serve hypothesis deconstruction over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn worker processes, each with its own warm engine")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run("core.service:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Long-lived Python worker for the Tauri desktop shell.
+
+Starting an interpreter and importing ai_core for every UI action costs
+hundreds of milliseconds. The shell instead starts this worker once and
+talks to it over stdin/stdout using length-prefixed JSON frames:
+
+    <4-byte big-endian payload length><UTF-8 JSON payload>
+
+Requests look like ``{"id": 1, "method": "deconstruct", "params": {...}}``
+and every request gets exactly one response carrying the same id, either
+``{"id": 1, "result": ...}`` or ``{"id": 1, "error": {"code": ..., "message": ...}}``.
+Callers may pipeline: send several requests before reading any response.
+Responses are written in request order.
+
+Run with ``python -m core.sidecar`` from the ai_core directory.
+"""
+
+import importlib
+import json
+import logging
+import struct
+import sys
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+from .hypothesis_deconstructor import HypothesisDeconstructor
+from .log import DEFAULT_RATE_LIMIT, get_logger
+from .plan_cache import PlanCache
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+_HEADER = struct.Struct(">I")
+
+# Frames above this size are rejected rather than buffered
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when the byte stream does not contain a valid frame"""
+
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one JSON frame; returns None on a clean end of stream"""
+    header = stream.read(_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _HEADER.size:
+        raise ProtocolError("truncated frame header")
+
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"frame of {length} bytes exceeds limit")
+
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ProtocolError("truncated frame payload")
+    return json.loads(payload)
+
+
+def write_frame(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    """Write one JSON frame and flush it"""
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+class Sidecar:
+    """Dispatches framed requests to a single warm HypothesisDeconstructor"""
+
+    def __init__(self, deconstructor: Optional[HypothesisDeconstructor] = None):
+        self.deconstructor = deconstructor or HypothesisDeconstructor(plan_cache=PlanCache())
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "ping": self._ping,
+            "hello": self._hello,
+            "deconstruct": self._deconstruct,
+            "deconstruct_batch": self._deconstruct_batch,
+        }
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """Handle one request, always producing a response frame"""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                return self._error(request_id, "INVALID_REQUEST", "request must be an object with a method")
+
+            handler = self.methods.get(request["method"])
+            if handler is None:
+                return self._error(request_id, "UNKNOWN_METHOD", f"unknown method: {request['method']}")
+
+            params = request.get("params")
+            if params is None:
+                params = {}
+            if not isinstance(params, dict):
+                return self._error(request_id, "INVALID_PARAMS", "params must be an object")
+
+            return {"id": request_id, "result": handler(params)}
+
+        except Exception as e:
+            logger.error("sidecar_request_failed", id=request_id, error=str(e))
+            return self._error(request_id, "INTERNAL_ERROR", str(e))
+
+    def serve(self, stdin: BinaryIO, stdout: BinaryIO) -> None:
+        """Answer requests until stdin is closed"""
+        while True:
+            try:
+                request = read_frame(stdin)
+            except (ProtocolError, ValueError) as e:
+                # The stream can't be resynchronised after a bad frame
+                logger.error("sidecar_protocol_error", error=str(e))
+                write_frame(stdout, self._error(None, "PROTOCOL_ERROR", str(e)))
+                return
+            if request is None:
+                return
+            write_frame(stdout, self.handle(request))
+
+    def _error(self, request_id: Any, code: str, message: str) -> Dict[str, Any]:
+        return {"id": request_id, "error": {"code": code, "message": message}}
+
+    def _ping(self, params: Dict[str, Any]) -> str:
+        return "pong"
+
+    def _hello(self, params: Dict[str, Any]) -> str:
+        return importlib.import_module("hello").main()
+
+    def _deconstruct(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.deconstructor.deconstruct_hypothesis(
+            params.get("hypothesis", ""),
+            params.get("schema_context")
+        )
+        return response.to_dict()
+
+    def _deconstruct_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        schema_context = params.get("schema_context")
+        return {
+            "responses": [
+                self.deconstructor.deconstruct_hypothesis(hypothesis, schema_context).to_dict()
+                for hypothesis in params.get("hypotheses", [])
+            ]
+        }
+
+
+def main() -> None:
+    """Serve framed requests on the process's stdin/stdout"""
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # Anything printed by library code must not corrupt the frame stream
+    sys.stdout = sys.stderr
+    Sidecar().serve(stdin, stdout)
+
+
+if __name__ == "__main__":
+    main()
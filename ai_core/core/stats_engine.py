@@ -0,0 +1,710 @@
+"""
+Vectorized evaluation of the statistical methods chosen for a test plan.
+
+Every method is computed from its sufficient statistics: per-group moments
+for t-tests and ANOVA, a cross-product matrix for correlation and
+regression, a contingency table for chi-square. Those summaries come from
+one of two places:
+
+- the aggregate queries the deconstructor adds to a plan (see
+  core.sufficient_statistics), run inside the database so only one row per
+  group comes back;
+- column arrays collected from raw rows, summarized with whole-array NumPy
+  operations (``bincount`` for per-group sums, one matrix product for the
+  cross-products) rather than a Python loop per row.
+
+p-values come from core.distributions and are compared with
+TestPlan.confidence_threshold.
+"""
+
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .distributions import chi2_sf, f_sf, t_two_sided_p
+from .hypothesis_deconstructor import StatisticalMethod, TestPlan
+from .log import DEFAULT_RATE_LIMIT, get_logger
+from .plan_executor import DEFAULT_BATCH_SIZE, PlanExecutor
+from .sufficient_statistics import CO_MOMENTS, CONTINGENCY, GROUPED_MOMENTS, METHOD_STATISTICS, MOMENTS
+from .tracing import child_span
+
+logger = get_logger(__name__, per_second=DEFAULT_RATE_LIMIT)
+
+
+class StatsError(ValueError):
+    """The data cannot support the requested statistical method"""
+
+
+@dataclass
+class ColumnData:
+    """
+    Column-oriented query result.
+
+    ``numeric`` maps column names to float64 arrays (NaN for NULL);
+    ``categorical`` maps column names to ``(codes, labels)`` where codes are
+    int64 indexes into labels and -1 marks NULL. ``order`` keeps the
+    columns in result order.
+    """
+    numeric: Dict[str, np.ndarray] = field(default_factory=dict)
+    categorical: Dict[str, Tuple[np.ndarray, List[Any]]] = field(default_factory=dict)
+    order: List[str] = field(default_factory=list)
+
+    @property
+    def row_count(self) -> int:
+        for values in self.numeric.values():
+            return len(values)
+        for codes, _ in self.categorical.values():
+            return len(codes)
+        return 0
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> "ColumnData":
+        """Build column data from an in-memory list of rows"""
+        collector = ColumnCollector()
+        if rows:
+            collector("rows", columns, list(rows))
+        return collector.finish(columns)
+
+
+class ColumnCollector:
+    """
+    Row sink for PlanExecutor that accumulates batches as column arrays.
+
+    A column's kind is fixed by its first non-null value: numbers make a
+    float64 column, anything else a categorical column factorized through
+    a label dictionary as batches arrive.
+    """
+
+    def __init__(self):
+        self._kinds: Dict[int, str] = {}
+        self._chunks: Dict[int, List[np.ndarray]] = {}
+        self._labels: Dict[int, Dict[Any, int]] = {}
+        self._width = 0
+
+    def __call__(self, name: str, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+        self._width = len(columns)
+        for index, column in enumerate(zip(*rows)):
+            kind = self._kinds.get(index)
+            if kind is None:
+                first = next((value for value in column if value is not None), None)
+                if first is None:
+                    # All NULL so far; remember the gap as NaNs until the kind is known
+                    self._chunks.setdefault(index, []).append(np.full(len(column), np.nan))
+                    continue
+                kind = "numeric" if isinstance(first, (int, float)) else "categorical"
+                self._kinds[index] = kind
+                if kind == "categorical":
+                    self._chunks[index] = [
+                        np.full(len(chunk), -1, dtype=np.int64) for chunk in self._chunks.get(index, [])
+                    ]
+            self._chunks.setdefault(index, []).append(self._convert(index, kind, column))
+
+    def _convert(self, index: int, kind: str, column: Tuple[Any, ...]) -> np.ndarray:
+        """Convert one batch of a column to its array form"""
+        if kind == "numeric":
+            try:
+                return np.array(column, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise StatsError(f"column {index} mixes numeric and text values")
+        labels = self._labels.setdefault(index, {})
+        return np.fromiter(
+            (-1 if value is None else labels.setdefault(value, len(labels)) for value in column),
+            dtype=np.int64, count=len(column)
+        )
+
+    def finish(self, columns: Sequence[str]) -> ColumnData:
+        """Concatenate the collected batches into ColumnData"""
+        data = ColumnData(order=list(columns))
+        for index, name in enumerate(columns):
+            chunks = self._chunks.get(index, [])
+            kind = self._kinds.get(index, "numeric")
+            values = np.concatenate(chunks) if chunks else np.empty(0)
+            if kind == "numeric":
+                data.numeric[name] = values.astype(np.float64, copy=False)
+            else:
+                labels = self._labels.get(index, {})
+                data.categorical[name] = (values.astype(np.int64, copy=False), list(labels))
+        return data
+
+
+def collect_columns(database: Union[str, Path], sql: str,
+                    batch_size: int = DEFAULT_BATCH_SIZE) -> ColumnData:
+    """Run a query on a SQLite database and return its result as column arrays"""
+    collector = ColumnCollector()
+    with PlanExecutor(database, batch_size=batch_size, preview_rows=0,
+                      row_sink=collector, summarize=False) as executor:
+        result = executor.execute_query("collect", sql)
+    if not result.success:
+        raise StatsError(result.error)
+    return collector.finish(result.columns)
+
+
+@dataclass
+class GroupedMoments:
+    """
+    Count, mean and sum of squared deviations of a measure, per group.
+
+    ``compared`` holds the labels of the groups a hypothesis names, in
+    order; a t-test compares those rather than the two largest groups.
+    """
+    variable: str
+    labels: List[Any]
+    counts: np.ndarray
+    means: np.ndarray
+    m2: np.ndarray
+    compared: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_sums(cls, variable: str, rows: Sequence[Sequence[Any]],
+                  compared: Sequence[str] = ()) -> "GroupedMoments":
+        """Build from (group, n, Σd, Σd², pivot) rows of a grouped_moments query"""
+        rows = [row for row in rows if row[1]]
+        counts = np.array([row[1] for row in rows], dtype=np.float64)
+        sums = np.array([row[2] for row in rows], dtype=np.float64)
+        squares = np.array([row[3] for row in rows], dtype=np.float64)
+        pivots = np.array([row[4] for row in rows], dtype=np.float64)
+        shifts = sums / counts if len(rows) else sums
+        return cls(variable, [row[0] for row in rows], counts, pivots + shifts,
+                   np.maximum(squares - sums * shifts, 0.0), tuple(compared))
+
+
+@dataclass
+class Moments:
+    """Count, mean, sum of squared deviations and range of one measure"""
+    variable: str
+    count: int
+    mean: float
+    m2: float
+    minimum: float
+    maximum: float
+    quartiles: Optional[Tuple[float, float, float]] = None
+
+    @classmethod
+    def from_sums(cls, variable: str, row: Sequence[Any]) -> "Moments":
+        """Build from the (n, Σd, Σd², min, max, pivot) row of a moments query"""
+        count, total, squares, minimum, maximum, pivot = row
+        if not count:
+            return cls(variable, 0, math.nan, 0.0, math.nan, math.nan)
+        shift = total / count
+        return cls(variable, int(count), pivot + shift, max(squares - total * shift, 0.0), minimum, maximum)
+
+
+@dataclass
+class CoMoments:
+    """Means and centered cross-product matrix of several measures over complete rows"""
+    variables: List[str]
+    count: int
+    means: np.ndarray
+    cross: np.ndarray
+
+    @classmethod
+    def from_sums(cls, variables: Sequence[str], row: Sequence[Any]) -> "CoMoments":
+        """Build from the (n, Σdᵢ..., Σdᵢdⱼ..., pivotᵢ...) row of a co_moments query"""
+        size = len(variables)
+        count = int(row[0] or 0)
+        sums = np.array([value or 0.0 for value in row[1:1 + size]], dtype=np.float64)
+        raw = np.zeros((size, size))
+        products = iter(row[1 + size:])
+        for i in range(size):
+            for j in range(i, size):
+                raw[i, j] = raw[j, i] = next(products) or 0.0
+        pivots = np.array([value or 0.0 for value in row[-size:]], dtype=np.float64)
+        shifts = sums / count if count else sums
+        return cls(list(variables), count, pivots + shifts, raw - count * np.outer(shifts, shifts))
+
+
+@dataclass
+class Contingency:
+    """Counts of every (row, column) category pair"""
+    variables: List[str]
+    row_labels: List[Any]
+    column_labels: List[Any]
+    table: np.ndarray
+
+    @classmethod
+    def from_counts(cls, variables: Sequence[str], rows: Sequence[Sequence[Any]]) -> "Contingency":
+        """Build from (row value, column value, n) rows of a contingency query"""
+        row_labels = list(dict.fromkeys(row[0] for row in rows))
+        column_labels = list(dict.fromkeys(row[1] for row in rows))
+        row_index = {label: index for index, label in enumerate(row_labels)}
+        column_index = {label: index for index, label in enumerate(column_labels)}
+        table = np.zeros((len(row_labels), len(column_labels)))
+        for row_value, column_value, count in rows:
+            table[row_index[row_value], column_index[column_value]] += count
+        return cls(list(variables), row_labels, column_labels, table)
+
+
+@dataclass
+class MethodResult:
+    """Outcome of one statistical method"""
+    method: StatisticalMethod
+    statistic: Optional[float] = None
+    p_value: Optional[float] = None
+    significant: Optional[bool] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method.value,
+            "statistic": self.statistic,
+            "p_value": self.p_value,
+            "significant": self.significant,
+            "details": self.details,
+            "error": self.error,
+        }
+
+
+@dataclass
+class StatsReport:
+    """Results of every statistical method of a test plan"""
+    hypothesis: str
+    confidence_threshold: float
+    results: List[MethodResult]
+
+    @property
+    def supported(self) -> Optional[bool]:
+        """Whether any significance test rejected its null hypothesis; None if none ran"""
+        tested = [result.significant for result in self.results if result.significant is not None]
+        return any(tested) if tested else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hypothesis": self.hypothesis,
+            "confidence_threshold": self.confidence_threshold,
+            "supported": self.supported,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+
+def _is_identifier_column(name: str) -> bool:
+    """Id columns are keys, not measures"""
+    return name == "id" or name.endswith("_id")
+
+
+def summaries_from_results(plan: TestPlan,
+                           rows_by_query: Dict[str, Sequence[Sequence[Any]]]) -> Dict[str, Any]:
+    """
+    Parse the rows of a plan's statistics queries into summaries by kind.
+
+    Args:
+        plan: Plan whose sql_queries carry ``statistics`` entries
+        rows_by_query: Query name -> rows it returned
+
+    Returns:
+        Dict[str, Any]: Summary kind -> GroupedMoments, CoMoments,
+        Contingency, or a list of Moments
+    """
+    summaries: Dict[str, Any] = {}
+    for query in plan.sql_queries:
+        kind = query.get("statistics")
+        rows = rows_by_query.get(query.get("name"))
+        if kind is None or rows is None:
+            continue
+        variables = [name for name in query.get("variables", "").split(",") if name]
+        if kind == GROUPED_MOMENTS:
+            compared = [name for name in query.get("groups", "").split(",") if name]
+            summaries[kind] = GroupedMoments.from_sums(variables[0], rows, compared)
+        elif kind == MOMENTS:
+            summaries.setdefault(kind, []).extend(Moments.from_sums(variables[0], row) for row in rows[:1])
+        elif kind == CO_MOMENTS:
+            summaries[kind] = CoMoments.from_sums(variables, rows[0])
+        elif kind == CONTINGENCY:
+            summaries[kind] = Contingency.from_counts(variables, rows)
+    return summaries
+
+
+class StatsEngine:
+    """
+    Evaluates StatisticalMethods from sufficient statistics.
+
+    Every test is computed from a small summary (GroupedMoments, CoMoments,
+    Contingency or Moments). Summaries come either from column arrays, via
+    ``evaluate``/``run_method``, or from the aggregate queries the
+    deconstructor adds to a plan, via ``evaluate_in_database``, which never
+    moves more than one row per group out of the database.
+
+    For column arrays, roles are inferred: the measure is the first numeric
+    column that is not an id, the grouping column the first categorical one.
+    ``roles`` overrides any of ``value``, ``group``, ``x``, ``y``, ``row``
+    and ``column``; ``groups`` names the compared groups, comma-separated,
+    and defaults to those the plan's grouped statistics query names.
+    """
+
+    def evaluate(self, plan: TestPlan, data: ColumnData,
+                 roles: Optional[Dict[str, str]] = None) -> StatsReport:
+        """Run every method of a plan against column data"""
+        grouped = next((query for query in plan.sql_queries
+                        if query.get("statistics") == GROUPED_MOMENTS and query.get("groups")), None)
+        if grouped is not None:
+            roles = {"groups": grouped["groups"], **(roles or {})}
+        results = [
+            self.run_method(method, data, plan.confidence_threshold, roles)
+            for method in plan.statistical_methods
+        ]
+        return StatsReport(plan.hypothesis, plan.confidence_threshold, results)
+
+    def evaluate_summaries(self, plan: TestPlan, summaries: Dict[str, Any]) -> StatsReport:
+        """Run every method of a plan against summaries keyed by kind"""
+        results = []
+        for method in plan.statistical_methods:
+            summary = summaries.get(METHOD_STATISTICS[method.value])
+            if summary is None:
+                results.append(MethodResult(method=method, error="no sufficient statistics for this method"))
+            else:
+                results.append(self.run_method_on_summary(method, summary, plan.confidence_threshold))
+        return StatsReport(plan.hypothesis, plan.confidence_threshold, results)
+
+    def evaluate_in_database(self, plan: TestPlan, database: Union[str, Path]) -> StatsReport:
+        """
+        Run a plan's statistics queries on a SQLite database and evaluate its methods.
+
+        Only the aggregate rows (one per group at most) leave the database.
+        """
+        rows_by_query: Dict[str, List[Tuple[Any, ...]]] = {}
+
+        def collect(name: str, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+            rows_by_query.setdefault(name, []).extend(rows)
+
+        failures = {}
+        span = child_span("evaluate_in_database")
+        try:
+            with PlanExecutor(database, preview_rows=0, row_sink=collect, summarize=False) as executor:
+                for query in plan.sql_queries:
+                    if query.get("statistics") is None:
+                        continue
+                    result = executor.execute_query(query["name"], query["sql"])
+                    if result.success:
+                        rows_by_query.setdefault(query["name"], [])
+                    else:
+                        failures[query["statistics"]] = result.error
+
+            report = self.evaluate_summaries(plan, summaries_from_results(plan, rows_by_query))
+        finally:
+            if span is not None:
+                span.end()
+        for result in report.results:
+            error = failures.get(METHOD_STATISTICS[result.method.value])
+            if error is not None:
+                result.error = error
+        return report
+
+    def run_method(self, method: StatisticalMethod, data: ColumnData, alpha: float = 0.05,
+                   roles: Optional[Dict[str, str]] = None) -> MethodResult:
+        """Run one method on column data; data that cannot support it yields an error result"""
+        try:
+            summary = self._summarize(method, data, roles or {})
+        except StatsError as e:
+            logger.info("stats_method_skipped", method=method.value, reason=str(e))
+            return MethodResult(method=method, error=str(e))
+        return self.run_method_on_summary(method, summary, alpha)
+
+    def run_method_on_summary(self, method: StatisticalMethod, summary: Any,
+                              alpha: float = 0.05) -> MethodResult:
+        """Run one method on its sufficient statistics"""
+        span = child_span("stats_method", {"stats.method": method.value})
+        if span is None:
+            return self._run_on_summary(method, summary, alpha)
+        try:
+            result = self._run_on_summary(method, summary, alpha)
+            if result.error is not None:
+                span.record_error(result.error)
+            return result
+        finally:
+            span.end()
+
+    def _run_on_summary(self, method: StatisticalMethod, summary: Any, alpha: float) -> MethodResult:
+        handler = {
+            StatisticalMethod.T_TEST: self._t_test,
+            StatisticalMethod.ANOVA: self._anova,
+            StatisticalMethod.CHI_SQUARE: self._chi_square,
+            StatisticalMethod.CORRELATION: self._correlation,
+            StatisticalMethod.REGRESSION: self._regression,
+            StatisticalMethod.DESCRIPTIVE: self._descriptive,
+        }[method]
+        try:
+            result = handler(summary)
+        except StatsError as e:
+            logger.info("stats_method_skipped", method=method.value, reason=str(e))
+            return MethodResult(method=method, error=str(e))
+        # Plain floats and bools keep reports JSON-serializable
+        if result.statistic is not None:
+            result.statistic = float(result.statistic)
+        if result.p_value is not None:
+            result.p_value = float(result.p_value)
+            if not math.isnan(result.p_value):
+                result.significant = result.p_value < alpha
+        return result
+
+    # Summaries of column data
+
+    def _summarize(self, method: StatisticalMethod, data: ColumnData, roles: Dict[str, str]) -> Any:
+        """Sufficient statistics of column data for one method"""
+        if method in (StatisticalMethod.T_TEST, StatisticalMethod.ANOVA):
+            return self._grouped_moments(data, roles)
+        if method == StatisticalMethod.CHI_SQUARE:
+            return self._contingency(data, roles)
+        if method == StatisticalMethod.CORRELATION:
+            measures = self._measures(data, roles)
+            x_name, y_name = roles.get("x"), roles.get("y")
+            x_name = x_name or next((name for name in measures if name != y_name), None)
+            y_name = y_name or next((name for name in measures if name != x_name), None)
+            if x_name not in data.numeric or y_name not in data.numeric:
+                raise StatsError("needs two numeric columns")
+            return self._co_moments([x_name, y_name], [data.numeric[x_name], data.numeric[y_name]])
+        if method == StatisticalMethod.REGRESSION:
+            return self._regression_co_moments(data, roles)
+        return self._moments(data, roles)
+
+    def _measures(self, data: ColumnData, roles: Dict[str, str]) -> List[str]:
+        """Numeric non-id columns, preferred ones first"""
+        names = [name for name in data.order if name in data.numeric and not _is_identifier_column(name)]
+        for role in ("x", "y", "value"):
+            name = roles.get(role)
+            if name in data.numeric and name in names:
+                names.remove(name)
+                names.insert(0, name)
+        return names
+
+    def _group_column(self, data: ColumnData, roles: Dict[str, str],
+                      role: str = "group", exclude: Optional[str] = None) -> Tuple[str, np.ndarray, List[Any]]:
+        name = roles.get(role)
+        if name is None:
+            name = next((column for column in data.order
+                         if column in data.categorical and column != exclude), None)
+        if name not in data.categorical:
+            raise StatsError("needs a categorical grouping column")
+        codes, labels = data.categorical[name]
+        return name, codes, labels
+
+    def _grouped_moments(self, data: ColumnData, roles: Dict[str, str]) -> GroupedMoments:
+        """Per-group moments of the measure, via bincount"""
+        name = roles.get("value") or next(iter(self._measures(data, roles)), None)
+        if name not in data.numeric:
+            raise StatsError("needs a numeric measure column")
+        values = data.numeric[name]
+        _, codes, labels = self._group_column(data, roles)
+        valid = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        size = len(labels)
+        counts = np.bincount(codes, minlength=size).astype(np.float64)
+        # Summed as offsets from one value so a large mean does not swamp the spread
+        pivot = values[0] if len(values) else 0.0
+        sums = np.bincount(codes, weights=values - pivot, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = pivot + sums / counts
+        squares = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=size)
+        present = np.flatnonzero(counts > 0)
+        compared = tuple(label for label in roles.get("groups", "").split(",") if label)
+        return GroupedMoments(name, [labels[index] for index in present],
+                              counts[present], means[present], squares[present], compared)
+
+    def _contingency(self, data: ColumnData, roles: Dict[str, str]) -> Contingency:
+        """Contingency table of two categorical columns, via bincount"""
+        row_name, rows, row_labels = self._group_column(data, roles, "row")
+        column_name, columns, column_labels = self._group_column(data, roles, "column", exclude=row_name)
+        valid = (rows >= 0) & (columns >= 0)
+        shape = (len(row_labels), len(column_labels))
+        table = np.bincount(
+            rows[valid] * shape[1] + columns[valid], minlength=shape[0] * shape[1]
+        ).reshape(shape).astype(np.float64)
+        return Contingency([row_name, column_name], row_labels, column_labels, table)
+
+    def _co_moments(self, names: List[str], columns: List[np.ndarray]) -> CoMoments:
+        """Means and centered cross-products over rows where every column is present"""
+        matrix = np.column_stack(columns)
+        matrix = matrix[~np.isnan(matrix).any(axis=1)]
+        means = matrix.mean(axis=0) if len(matrix) else np.zeros(len(names))
+        centered = matrix - means
+        return CoMoments(names, len(matrix), means, centered.T @ centered)
+
+    def _regression_co_moments(self, data: ColumnData, roles: Dict[str, str]) -> CoMoments:
+        """
+        Co-moments of the measure (first) and its predictors.
+
+        The predictors are the other numeric columns; with a single numeric
+        column the measure is regressed on row order, which is how a trend
+        over an ordered query shows up.
+        """
+        measures = self._measures(data, roles)
+        y_name = roles.get("y") or roles.get("value") or next(iter(measures), None)
+        if y_name not in data.numeric:
+            raise StatsError("needs a numeric measure column")
+        predictors = [roles["x"]] if roles.get("x") else [name for name in measures if name != y_name]
+        if any(name not in data.numeric for name in predictors):
+            raise StatsError("predictors must be numeric columns")
+        y = data.numeric[y_name]
+        if predictors:
+            return self._co_moments([y_name] + predictors, [y] + [data.numeric[name] for name in predictors])
+        return self._co_moments([y_name, "row_order"], [y, np.arange(len(y), dtype=np.float64)])
+
+    def _moments(self, data: ColumnData, roles: Dict[str, str]) -> List[Moments]:
+        """Moments and quartiles of every numeric measure"""
+        summaries = []
+        for name in self._measures(data, roles):
+            values = data.numeric[name]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                continue
+            mean = float(values.mean())
+            q1, median, q3 = np.percentile(values, [25, 50, 75])
+            summaries.append(Moments(
+                name, len(values), mean, float(((values - mean) ** 2).sum()),
+                float(values.min()), float(values.max()), (float(q1), float(median), float(q3))
+            ))
+        return summaries
+
+    # Tests on sufficient statistics
+
+    def _t_test(self, moments: GroupedMoments) -> MethodResult:
+        """Welch's t-test between the two compared groups, or else the two largest"""
+        labels, counts, means, squares = moments.labels, moments.counts, moments.means, moments.m2
+        if len(moments.compared) >= 2:
+            positions = {str(label): index for index, label in enumerate(labels)}
+            missing = [name for name in moments.compared[:2] if name not in positions]
+            if missing:
+                raise StatsError(f"no values for group {missing[0]!r}")
+            first, second = (positions[name] for name in moments.compared[:2])
+        elif len(labels) < 2:
+            raise StatsError("needs at least two groups")
+        else:
+            first, second = np.argsort(-counts, kind="stable")[:2]
+        n1, n2 = counts[first], counts[second]
+        if n1 < 2 or n2 < 2:
+            raise StatsError("needs at least two values per group")
+        v1, v2 = squares[first] / (n1 - 1), squares[second] / (n2 - 1)
+        se2 = v1 / n1 + v2 / n2
+        if se2 == 0:
+            raise StatsError("both groups are constant")
+        t = float((means[first] - means[second]) / math.sqrt(se2))
+        df = float(se2 ** 2 / ((v1 / n1) ** 2 / (n1 - 1) + (v2 / n2) ** 2 / (n2 - 1)))
+        return MethodResult(
+            method=StatisticalMethod.T_TEST,
+            statistic=t,
+            p_value=t_two_sided_p(t, df),
+            details={
+                "variable": moments.variable,
+                "groups": [labels[first], labels[second]],
+                "means": [float(means[first]), float(means[second])],
+                "counts": [int(n1), int(n2)],
+                "df": df,
+            }
+        )
+
+    def _anova(self, moments: GroupedMoments) -> MethodResult:
+        """One-way ANOVA across every group"""
+        counts, means = moments.counts, moments.means
+        groups, total = len(moments.labels), float(counts.sum())
+        if groups < 2 or total <= groups:
+            raise StatsError("needs at least two groups and more values than groups")
+        grand_mean = float((counts * means).sum() / total)
+        between = float((counts * (means - grand_mean) ** 2).sum())
+        within = float(moments.m2.sum())
+        df_between, df_within = groups - 1, total - groups
+        if within == 0:
+            raise StatsError("no variation within groups")
+        f = (between / df_between) / (within / df_within)
+        return MethodResult(
+            method=StatisticalMethod.ANOVA,
+            statistic=f,
+            p_value=f_sf(f, df_between, df_within),
+            details={
+                "variable": moments.variable,
+                "groups": list(moments.labels),
+                "df_between": int(df_between),
+                "df_within": int(df_within),
+            }
+        )
+
+    def _chi_square(self, contingency: Contingency) -> MethodResult:
+        """Chi-square test of independence"""
+        table = contingency.table
+        table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+        if table.shape[0] < 2 or table.shape[1] < 2:
+            raise StatsError("needs at least two categories in each column")
+        expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+        statistic = float(((table - expected) ** 2 / expected).sum())
+        df = (table.shape[0] - 1) * (table.shape[1] - 1)
+        return MethodResult(
+            method=StatisticalMethod.CHI_SQUARE,
+            statistic=statistic,
+            p_value=chi2_sf(statistic, df),
+            details={"columns": list(contingency.variables), "df": df, "table_shape": list(table.shape)}
+        )
+
+    def _correlation(self, co_moments: CoMoments) -> MethodResult:
+        """Pearson correlation between the first two variables"""
+        if len(co_moments.variables) < 2:
+            raise StatsError("needs two numeric columns")
+        n = co_moments.count
+        if n < 3:
+            raise StatsError("needs at least three complete rows")
+        sxx, syy, sxy = co_moments.cross[0, 0], co_moments.cross[1, 1], co_moments.cross[0, 1]
+        if sxx <= 0 or syy <= 0:
+            raise StatsError("a column is constant")
+        r = max(-1.0, min(1.0, float(sxy / math.sqrt(sxx * syy))))
+        t = math.inf if abs(r) == 1.0 else r * math.sqrt((n - 2) / (1 - r * r))
+        return MethodResult(
+            method=StatisticalMethod.CORRELATION,
+            statistic=r,
+            p_value=t_two_sided_p(t, n - 2),
+            details={"columns": co_moments.variables[:2], "n": n}
+        )
+
+    def _regression(self, co_moments: CoMoments) -> MethodResult:
+        """Least-squares regression of the first variable on the others"""
+        predictors = co_moments.variables[1:]
+        n, k = co_moments.count, len(predictors)
+        if not k:
+            raise StatsError("needs at least one predictor")
+        if n <= k + 1:
+            raise StatsError("needs more complete rows than coefficients")
+
+        cross = co_moments.cross
+        sxx, sxy, syy = cross[1:, 1:], cross[1:, 0], float(cross[0, 0])
+        if syy <= 0:
+            raise StatsError("the measure is constant")
+        slopes, _, rank, _ = np.linalg.lstsq(sxx, sxy, rcond=None)
+        if rank < 1:
+            raise StatsError("predictors are constant")
+        residual = max(0.0, float(syy - 2 * slopes @ sxy + slopes @ sxx @ slopes))
+        explained = max(0.0, syy - residual)
+        intercept = float(co_moments.means[0] - co_moments.means[1:] @ slopes)
+        df_model, df_residual = int(rank), n - int(rank) - 1
+        f = math.inf if residual == 0 else (explained / df_model) / (residual / df_residual)
+        return MethodResult(
+            method=StatisticalMethod.REGRESSION,
+            statistic=f,
+            p_value=f_sf(f, df_model, df_residual),
+            details={
+                "response": co_moments.variables[0],
+                "predictors": predictors,
+                "intercept": intercept,
+                "coefficients": dict(zip(predictors, map(float, slopes))),
+                "r_squared": explained / syy,
+                "n": n,
+            }
+        )
+
+    def _descriptive(self, moments: List[Moments]) -> MethodResult:
+        """Summary statistics of every measure; no significance test"""
+        summary = {}
+        for item in moments:
+            if not item.count:
+                continue
+            summary[item.variable] = {
+                "count": item.count,
+                "mean": float(item.mean),
+                "stddev": math.sqrt(item.m2 / (item.count - 1)) if item.count > 1 else None,
+                "min": float(item.minimum),
+                "max": float(item.maximum),
+            }
+            if item.quartiles is not None:
+                q1, median, q3 = item.quartiles
+                summary[item.variable].update({"q1": q1, "median": median, "q3": q3})
+        if not summary:
+            raise StatsError("needs a numeric measure column")
+        return MethodResult(method=StatisticalMethod.DESCRIPTIVE, details={"columns": summary})
@@ -0,0 +1,147 @@
+"""
+SQL aggregates carrying the sufficient statistics of each statistical method.
+
+A t-test, ANOVA, correlation or regression over millions of rows only needs
+a handful of sums: per-group n, Σx and Σx²; the n, Σxᵢ and Σxᵢxⱼ
+cross-products of the variables; or a contingency table of counts. The
+queries built here compute exactly those inside the database, so the stats
+engine receives O(groups) rows instead of O(rows).
+
+Each query is a regular TestPlan.sql_queries entry with two extra keys:
+``statistics`` names the kind of summary it returns and ``variables`` lists
+the variables it summarizes, comma-separated, in output order. A grouped
+query restricted to the groups a hypothesis names also lists them,
+comma-separated, under ``groups``, so the stats engine compares those
+groups rather than whichever are largest.
+
+Sums multiply by 1.0 so integer columns are accumulated as floating point
+and cannot overflow. Each measure is first shifted by a pivot, one of its
+own values picked by a scalar subquery, and the pivot is returned with the
+sums: Σx² - (Σx)²/n loses every significant digit once the mean is large
+against the spread (revenue near 10⁹ varying by cents), while the same
+formula over x - pivot keeps them.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+# Kinds of summary a statistics query returns
+GROUPED_MOMENTS = "grouped_moments"
+MOMENTS = "moments"
+CO_MOMENTS = "co_moments"
+CONTINGENCY = "contingency"
+
+# StatisticalMethod value -> summary kind it is computed from
+METHOD_STATISTICS: Dict[str, str] = {
+    "t_test": GROUPED_MOMENTS,
+    "anova": GROUPED_MOMENTS,
+    "chi_square": CONTINGENCY,
+    "correlation": CO_MOMENTS,
+    "regression": CO_MOMENTS,
+    "descriptive": MOMENTS,
+}
+
+
+def _query(name: str, kind: str, variables: Sequence[str], sql: str) -> Dict[str, str]:
+    return {"name": name, "sql": sql, "statistics": kind, "variables": ",".join(variables)}
+
+
+def _group_filter(group_sql: Optional[str], groups: Sequence[str]) -> str:
+    """``AND group IN (...)`` restricting a query to the named groups, or nothing"""
+    if group_sql is None or not groups:
+        return ""
+    values = ", ".join("'" + value.replace("'", "''") + "'" for value in groups)
+    return f" AND {group_sql} IN ({values})"
+
+
+def _pivot(source: str, value_sql: str, where: str) -> str:
+    """Scalar subquery picking one value of a measure to shift its sums by"""
+    return f"(SELECT {value_sql} FROM {source} WHERE {where} LIMIT 1)"
+
+
+def grouped_moments_query(source: str, value_sql: str, group_sql: str,
+                          variables: Sequence[str], groups: Sequence[str] = ()) -> Dict[str, str]:
+    """
+    Per-group n, Σd and Σd² of a measure shifted by a pivot, d = x - pivot.
+
+    Rows are (group, n, sum_d, sum_d2, pivot). With ``groups``, only those
+    groups are summarized and the query records them, in order, under
+    ``groups``.
+    """
+    where = f"{value_sql} IS NOT NULL AND {group_sql} IS NOT NULL{_group_filter(group_sql, groups)}"
+    pivot = _pivot(source, value_sql, where)
+    query = _query("grouped_moments", GROUPED_MOMENTS, variables, f"""
+                SELECT
+                    {group_sql} AS group_value,
+                    COUNT({value_sql}) AS n,
+                    SUM(1.0 * {value_sql} - {pivot}) AS sum_d,
+                    SUM((1.0 * {value_sql} - {pivot}) * (1.0 * {value_sql} - {pivot})) AS sum_d2,
+                    MIN({pivot}) AS pivot
+                FROM {source}
+                WHERE {where}
+                GROUP BY {group_sql}
+                """)
+    if groups:
+        query["groups"] = ",".join(groups)
+    return query
+
+
+def moments_query(source: str, value_sql: str, variables: Sequence[str],
+                  group_sql: Optional[str] = None, groups: Sequence[str] = ()) -> Dict[str, str]:
+    """
+    n, Σd, Σd², min and max of a measure, d = x - pivot, over the named
+    groups if any; one row (n, sum_d, sum_d2, min_x, max_x, pivot).
+    """
+    where = f"{value_sql} IS NOT NULL{_group_filter(group_sql, groups)}"
+    pivot = _pivot(source, value_sql, where)
+    return _query("moments", MOMENTS, variables, f"""
+                SELECT
+                    COUNT({value_sql}) AS n,
+                    SUM(1.0 * {value_sql} - {pivot}) AS sum_d,
+                    SUM((1.0 * {value_sql} - {pivot}) * (1.0 * {value_sql} - {pivot})) AS sum_d2,
+                    MIN({value_sql}) AS min_x,
+                    MAX({value_sql}) AS max_x,
+                    MIN({pivot}) AS pivot
+                FROM {source}
+                WHERE {where}
+                """)
+
+
+def co_moments_query(source: str, value_sqls: Sequence[str], variables: Sequence[str]) -> Dict[str, str]:
+    """
+    n, Σdᵢ and Σdᵢdⱼ (i <= j) over rows where every variable is present,
+    each variable shifted by its value in one such row, dᵢ = xᵢ - pivotᵢ.
+
+    One row: n, then the k sums, then the upper triangle of the
+    cross-product matrix row by row, then the k pivots.
+    """
+    count = len(value_sqls)
+    present = " AND ".join(f"{value} IS NOT NULL" for value in value_sqls)
+    shifted = [f"(1.0 * {value} - {_pivot(source, value, present)})" for value in value_sqls]
+    terms: List[str] = ["COUNT(*) AS n"]
+    terms += [f"SUM{value} AS s{index}" for index, value in enumerate(shifted)]
+    terms += [
+        f"SUM({shifted[i]} * {shifted[j]}) AS s{i}_{j}"
+        for i in range(count) for j in range(i, count)
+    ]
+    terms += [f"MIN({_pivot(source, value, present)}) AS p{index}" for index, value in enumerate(value_sqls)]
+    selected = ",\n                    ".join(terms)
+    return _query("co_moments", CO_MOMENTS, variables, f"""
+                SELECT
+                    {selected}
+                FROM {source}
+                WHERE {present}
+                """)
+
+
+def contingency_query(source: str, row_sql: str, column_sql: str,
+                      variables: Sequence[str]) -> Dict[str, str]:
+    """Counts per (row, column) category pair; rows are (row, column, n)"""
+    return _query("contingency", CONTINGENCY, variables, f"""
+                SELECT
+                    {row_sql} AS row_value,
+                    {column_sql} AS column_value,
+                    COUNT(*) AS n
+                FROM {source}
+                WHERE {row_sql} IS NOT NULL AND {column_sql} IS NOT NULL
+                GROUP BY {row_sql}, {column_sql}
+                """)
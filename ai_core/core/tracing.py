@@ -0,0 +1,321 @@
+"""
+Sampled tracing spans exported as OTLP JSON.
+
+A trace is a tree of spans: the root is started by a Tracer, which decides
+once per trace whether it is recorded (head-based sampling), and every
+component below it starts child spans of whatever span is current. The
+current span lives in a context variable, so it follows a request through
+nested calls and across ``await``; thread pools do not copy it, so work
+handed to a pool starts its spans from an explicit parent with
+``Span.child``.
+
+Run deconstruction, plan execution and statistics inside one root span to
+get their timeline as a single trace::
+
+    with default_tracer().span("analysis"):
+        response = deconstructor.deconstruct_hypothesis(hypothesis)
+        scheduler.run(response.test_plan)
+
+Unsampled traces create no spans at all: ``start_span`` and ``child_span``
+return None and callers skip their span bookkeeping. Finished spans go to a
+RingBufferExporter, which keeps the most recent ones in memory and writes
+them on demand as an OTLP/JSON ``ExportTraceServiceRequest`` document, which
+collectors and trace viewers can import without a live collector.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+# One root trace in this many is recorded
+DEFAULT_SAMPLE_EVERY = 100
+
+# Finished spans kept by a RingBufferExporter
+DEFAULT_BUFFER_SPANS = 4096
+
+SERVICE_NAME = "shelby-ai-core"
+
+# OTLP span kind and status codes
+_SPAN_KIND_INTERNAL = 1
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+Attributes = Dict[str, Union[str, int, float, bool]]
+
+
+# The span active in this context, if its trace is being recorded; bound
+# directly to the C-level getter since hot paths call it on every request
+current_span: Callable[[], Optional["Span"]] = _current_span.get
+
+
+def child_span(name: str, attributes: Optional[Attributes] = None) -> Optional["Span"]:
+    """Start a child of the current span, or return None outside a recorded trace"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return parent.child(name, attributes)
+
+
+class Span:
+    """
+    One timed operation of a recorded trace.
+
+    A started span is current in its context until ``end``. ``mark`` closes
+    consecutive stages of the operation as child spans, the same way
+    StageTimer marks stage ends for the latency histograms.
+    """
+
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start_ns", "end_ns", "status", "message", "_last_mark", "_token")
+
+    def __init__(self, tracer: "Tracer", trace_id: int, parent_id: Optional[int], name: str,
+                 attributes: Optional[Attributes] = None, start_ns: Optional[int] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes: Attributes = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.status = _STATUS_UNSET
+        self.message = ""
+        self._last_mark = self.start_ns
+        self._token: Optional[contextvars.Token] = None
+
+    def child(self, name: str, attributes: Optional[Attributes] = None) -> "Span":
+        """Start a child span and make it current in the calling context"""
+        span = Span(self.tracer, self.trace_id, self.span_id, name, attributes)
+        span._token = _current_span.set(span)
+        return span
+
+    def set_attribute(self, key: str, value: Union[str, int, float, bool]) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, message: str) -> None:
+        """Mark the operation as failed"""
+        self.status = _STATUS_ERROR
+        self.message = message
+
+    def mark(self, stage: str) -> None:
+        """Record the stage that ends now, since the previous mark, as a finished child span"""
+        now = time.time_ns()
+        stage_span = Span(self.tracer, self.trace_id, self.span_id, stage, start_ns=self._last_mark)
+        stage_span.end_ns = now
+        self._last_mark = now
+        self.tracer.exporter.export(stage_span)
+
+    def end(self) -> None:
+        """Finish the span, restore the previously current span and export it"""
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context than it was started in
+                pass
+            self._token = None
+        self.tracer.exporter.export(self)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc is not None:
+            self.record_error(str(exc))
+        self.end()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span as an OTLP/JSON span object"""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns if self.end_ns is not None else self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.message:
+            span["status"]["message"] = self.message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    # bool is tested before int, which it subclasses
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON carries 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class RingBufferExporter:
+    """
+    Keeps the most recent finished spans in memory.
+
+    Exporting a span is a deque append, so recording spans never touches
+    the disk; ``write`` saves the buffer as an OTLP/JSON document when a
+    trace is wanted.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SPANS, path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            capacity: Spans kept; older spans are dropped as new ones finish
+            path: Default file written by ``write``
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.path = Path(path) if path is not None else None
+        self._spans: "deque[Span]" = deque(maxlen=capacity)
+        self._write_lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        """Buffered spans, oldest first"""
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def to_otlp(self, service_name: str = SERVICE_NAME) -> Dict[str, Any]:
+        """Buffered spans as an OTLP/JSON ExportTraceServiceRequest"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in self.spans()],
+                }],
+            }],
+        }
+
+    def write(self, path: Optional[Union[str, Path]] = None, service_name: str = SERVICE_NAME) -> Path:
+        """
+        Write the buffered spans to a file as OTLP/JSON.
+
+        The file is replaced atomically, so readers never see a partial
+        document.
+
+        Args:
+            path: File to write; defaults to the exporter's path
+            service_name: ``service.name`` resource attribute
+
+        Returns:
+            Path: The file written
+
+        Raises:
+            ValueError: If neither ``path`` nor the exporter's path is set
+        """
+        target = Path(path) if path is not None else self.path
+        if target is None:
+            raise ValueError("no path to write traces to")
+        document = json.dumps(self.to_otlp(service_name), separators=(",", ":"))
+        with self._write_lock:
+            descriptor, temporary = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+            try:
+                with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+                    handle.write(document)
+                os.replace(temporary, target)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        return target
+
+
+class Tracer:
+    """
+    Starts root spans, sampling one trace in ``sample_every``.
+
+    A span started while another is current joins that trace whatever this
+    tracer's sampling decision would have been, so the decision made at the
+    root holds for the whole trace.
+    """
+
+    def __init__(self, exporter: Optional[RingBufferExporter] = None,
+                 sample_every: int = DEFAULT_SAMPLE_EVERY):
+        """
+        Args:
+            exporter: Receives finished spans; defaults to a new ring buffer
+            sample_every: Record one root trace in this many; 1 records
+                every trace, 0 none
+        """
+        if sample_every < 0:
+            raise ValueError("sample_every must not be negative")
+        self.exporter = exporter or RingBufferExporter()
+        self.sample_every = sample_every
+        # A C-level call, like DeconstructorMetrics.sampled
+        self.sampled = itertools.cycle(
+            (False,) * (sample_every - 1) + (True,) if sample_every else (False,)
+        ).__next__
+
+    def start_span(self, name: str, attributes: Optional[Attributes] = None) -> Optional[Span]:
+        """
+        Start a span and make it current, or return None if it is not recorded.
+
+        The span is a child of the current span when there is one, and
+        otherwise the root of a new trace if this trace is sampled. The
+        caller must ``end`` a returned span.
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            return parent.child(name, attributes)
+        if not self.sampled():
+            return None
+        return self.start_trace(name, attributes)
+
+    def start_trace(self, name: str, attributes: Optional[Attributes] = None) -> Span:
+        """
+        Start the root span of a new recorded trace and make it current.
+
+        For callers that have already drawn ``sampled()`` themselves.
+        """
+        span = Span(self, random.getrandbits(128) or 1, None, name, attributes)
+        span._token = _current_span.set(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Attributes] = None) -> Iterator[Optional[Span]]:
+        """``start_span`` as a context manager; an escaping exception marks the span failed"""
+        span = self.start_span(name, attributes)
+        if span is None:
+            yield None
+            return
+        with span:
+            yield span
+
+
+_default_tracer: Optional[Tracer] = None
+
+
+def default_tracer() -> Tracer:
+    """Process-wide tracer, shared by deconstructors built without their own"""
+    global _default_tracer
+    if _default_tracer is None:
+        _default_tracer = Tracer()
+    return _default_tracer
@@ -1,4 +1,9 @@
+mod sidecar;
+
+use serde_json::Value;
+use sidecar::Sidecar;
 use std::{fs, path::PathBuf, process::Command};
+use tauri::Manager;
 
 fn find_python() -> (PathBuf, PathBuf) {
   // return (python_exe, script_path)
@@ -34,14 +39,45 @@ pub fn run_python_hello_sync() -> Result<String, String> {
   Ok(s)
 }
 
+fn new_sidecar() -> Sidecar {
+  let (py, script) = find_python();
+  let ai_core = script
+    .parent()
+    .map(PathBuf::from)
+    .unwrap_or_else(|| PathBuf::from("ai_core"));
+  Sidecar::new(py, ai_core)
+}
+
+async fn call_sidecar(sidecar: Sidecar, method: String, params: Value) -> Result<Value, String> {
+  tauri::async_runtime::spawn_blocking(move || {
+    sidecar.call(&method, params, sidecar::DEFAULT_TIMEOUT)
+  })
+  .await
+  .map_err(|e| e.to_string())?
+}
+
 #[tauri::command]
-async fn py_hello() -> Result<String, String> {
-  run_python_hello_sync()
+async fn py_hello(sidecar: tauri::State<'_, Sidecar>) -> Result<String, String> {
+  match call_sidecar(sidecar.inner().clone(), "hello".into(), Value::Null).await {
+    Ok(Value::String(s)) => Ok(s),
+    // Fall back to a one-off interpreter if the sidecar is unavailable
+    _ => run_python_hello_sync(),
+  }
+}
+
+#[tauri::command]
+async fn py_call(
+  sidecar: tauri::State<'_, Sidecar>,
+  method: String,
+  params: Option<Value>,
+) -> Result<Value, String> {
+  call_sidecar(sidecar.inner().clone(), method, params.unwrap_or(Value::Null)).await
 }
 
 #[cfg_attr(mobile, tauri::mobile_entry_point)]
 pub fn run() {
   tauri::Builder::default()
+    .manage(new_sidecar())
     .setup(|app| {
       if cfg!(debug_assertions) {
         app.handle().plugin(
@@ -50,9 +86,13 @@ pub fn run() {
             .build(),
         )?;
       }
+      // Warm the Python worker once; calls restart it if it dies later
+      if let Err(e) = app.state::<Sidecar>().start() {
+        log::warn!("python sidecar failed to start: {e}");
+      }
       Ok(())
     })
-    .invoke_handler(tauri::generate_handler![py_hello])
+    .invoke_handler(tauri::generate_handler![py_hello, py_call])
     .run(tauri::generate_context!())
     .expect("error while running tauri application");
 }
@@ -65,4 +105,19 @@ mod tests {
     let out = run_python_hello_sync().expect("python hello should run");
     assert!(out.to_lowercase().contains("hello"));
   }
+
+  #[test]
+  fn sidecar_serves_calls_and_restarts() {
+    let sidecar = new_sidecar();
+    let timeout = sidecar::DEFAULT_TIMEOUT;
+    let pong = sidecar.call("ping", Value::Null, timeout).expect("sidecar should answer");
+    assert_eq!(pong, Value::String("pong".into()));
+
+    sidecar.shutdown();
+    let params = serde_json::json!({ "hypothesis": "Revenue is increasing over time" });
+    let plan = sidecar
+      .call("deconstruct", params, timeout)
+      .expect("sidecar should restart");
+    assert_eq!(plan["success"], Value::Bool(true));
+  }
 }
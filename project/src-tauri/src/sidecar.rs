@@ -0,0 +1,214 @@
+//! Long-lived Python worker (`python -m core.sidecar`) shared by all invokes.
+//!
+//! Frames on both pipes are a 4-byte big-endian length followed by a UTF-8
+//! JSON payload. Each request carries an id; a reader thread routes every
+//! response back to the caller waiting on that id, so many requests can be
+//! pipelined on the one pipe. If the worker dies, pending callers get an
+//! error and the next call starts a fresh worker.
+
+use serde_json::{json, Value};
+use std::{
+  collections::HashMap,
+  io::{self, BufReader, Read, Write},
+  path::PathBuf,
+  process::{Child, ChildStdin, ChildStdout, Command, Stdio},
+  sync::{
+    atomic::{AtomicBool, AtomicU64, Ordering},
+    mpsc, Arc, Mutex,
+  },
+  thread,
+  time::Duration,
+};
+
+type Pending = Arc<Mutex<HashMap<u64, mpsc::Sender<Result<Value, String>>>>>;
+
+pub const DEFAULT_TIMEOUT: Duration = Duration::from_secs(30);
+
+struct Worker {
+  child: Child,
+  stdin: ChildStdin,
+  alive: Arc<AtomicBool>,
+  pending: Pending,
+}
+
+struct Inner {
+  python: PathBuf,
+  workdir: PathBuf,
+  next_id: AtomicU64,
+  worker: Mutex<Option<Worker>>,
+}
+
+#[derive(Clone)]
+pub struct Sidecar {
+  inner: Arc<Inner>,
+}
+
+pub fn write_frame<W: Write>(out: &mut W, message: &Value) -> io::Result<()> {
+  let payload = serde_json::to_vec(message)?;
+  let len = u32::try_from(payload.len())
+    .map_err(|_| io::Error::new(io::ErrorKind::InvalidInput, "frame too large"))?;
+  out.write_all(&len.to_be_bytes())?;
+  out.write_all(&payload)?;
+  out.flush()
+}
+
+pub fn read_frame<R: Read>(input: &mut R) -> io::Result<Value> {
+  let mut header = [0u8; 4];
+  input.read_exact(&mut header)?;
+  let mut payload = vec![0u8; u32::from_be_bytes(header) as usize];
+  input.read_exact(&mut payload)?;
+  serde_json::from_slice(&payload).map_err(|e| io::Error::new(io::ErrorKind::InvalidData, e))
+}
+
+fn fail_pending(pending: &Pending, reason: &str) {
+  let mut waiting = pending.lock().unwrap();
+  for (_, tx) in waiting.drain() {
+    let _ = tx.send(Err(reason.to_string()));
+  }
+}
+
+fn spawn_reader(stdout: ChildStdout, pending: Pending, alive: Arc<AtomicBool>) {
+  thread::spawn(move || {
+    let mut reader = BufReader::new(stdout);
+    while let Ok(message) = read_frame(&mut reader) {
+      let Some(id) = message.get("id").and_then(Value::as_u64) else {
+        continue;
+      };
+      let result = match message.get("error") {
+        Some(error) => Err(
+          error
+            .get("message")
+            .and_then(Value::as_str)
+            .unwrap_or("python sidecar error")
+            .to_string(),
+        ),
+        None => Ok(message.get("result").cloned().unwrap_or(Value::Null)),
+      };
+      if let Some(tx) = pending.lock().unwrap().remove(&id) {
+        let _ = tx.send(result);
+      }
+    }
+    alive.store(false, Ordering::SeqCst);
+    fail_pending(&pending, "python sidecar exited");
+  });
+}
+
+impl Sidecar {
+  pub fn new(python: PathBuf, workdir: PathBuf) -> Self {
+    Sidecar {
+      inner: Arc::new(Inner {
+        python,
+        workdir,
+        next_id: AtomicU64::new(1),
+        worker: Mutex::new(None),
+      }),
+    }
+  }
+
+  fn spawn_worker(&self) -> io::Result<Worker> {
+    let mut child = Command::new(&self.inner.python)
+      .args(["-m", "core.sidecar"])
+      .current_dir(&self.inner.workdir)
+      .stdin(Stdio::piped())
+      .stdout(Stdio::piped())
+      .stderr(Stdio::inherit())
+      .spawn()?;
+    let stdin = child.stdin.take().expect("sidecar stdin is piped");
+    let stdout = child.stdout.take().expect("sidecar stdout is piped");
+    let alive = Arc::new(AtomicBool::new(true));
+    let pending: Pending = Arc::new(Mutex::new(HashMap::new()));
+    spawn_reader(stdout, pending.clone(), alive.clone());
+    Ok(Worker {
+      child,
+      stdin,
+      alive,
+      pending,
+    })
+  }
+
+  /// Start the worker now rather than on the first call.
+  pub fn start(&self) -> Result<(), String> {
+    let mut worker = self.inner.worker.lock().unwrap();
+    self.ensure_running(&mut worker)
+  }
+
+  fn ensure_running(&self, worker: &mut Option<Worker>) -> Result<(), String> {
+    let running = worker
+      .as_ref()
+      .map(|w| w.alive.load(Ordering::SeqCst))
+      .unwrap_or(false);
+    if !running {
+      if let Some(mut dead) = worker.take() {
+        let _ = dead.child.kill();
+        let _ = dead.child.wait();
+      }
+      *worker = Some(self.spawn_worker().map_err(|e| e.to_string())?);
+    }
+    Ok(())
+  }
+
+  fn send(&self, id: u64, request: &Value) -> Result<mpsc::Receiver<Result<Value, String>>, String> {
+    let mut worker = self.inner.worker.lock().unwrap();
+    self.ensure_running(&mut worker)?;
+    let w = worker.as_mut().expect("worker is running");
+    let (tx, rx) = mpsc::channel();
+    w.pending.lock().unwrap().insert(id, tx);
+    if let Err(e) = write_frame(&mut w.stdin, request) {
+      // Broken pipe: the worker died between health check and write
+      w.pending.lock().unwrap().remove(&id);
+      w.alive.store(false, Ordering::SeqCst);
+      return Err(e.to_string());
+    }
+    Ok(rx)
+  }
+
+  /// Call a sidecar method and wait for its result.
+  pub fn call(&self, method: &str, params: Value, timeout: Duration) -> Result<Value, String> {
+    let id = self.inner.next_id.fetch_add(1, Ordering::SeqCst);
+    let request = json!({ "id": id, "method": method, "params": params });
+    // A dead worker is replaced inside send; retry once on the fresh one
+    let rx = match self.send(id, &request) {
+      Ok(rx) => rx,
+      Err(_) => self.send(id, &request)?,
+    };
+
+    match rx.recv_timeout(timeout) {
+      Ok(result) => result,
+      Err(_) => {
+        if let Some(w) = self.inner.worker.lock().unwrap().as_ref() {
+          w.pending.lock().unwrap().remove(&id);
+        }
+        Err(format!("python sidecar timed out after {:?}", timeout))
+      }
+    }
+  }
+
+  /// Stop the worker; it is restarted by the next call.
+  pub fn shutdown(&self) {
+    if let Some(mut worker) = self.inner.worker.lock().unwrap().take() {
+      let _ = worker.child.kill();
+      let _ = worker.child.wait();
+    }
+  }
+}
+
+#[cfg(test)]
+mod tests {
+  use super::*;
+  use std::io::Cursor;
+
+  #[test]
+  fn frames_round_trip() {
+    let mut buf = Vec::new();
+    write_frame(&mut buf, &json!({"id": 1, "method": "ping"})).unwrap();
+    assert_eq!(u32::from_be_bytes([buf[0], buf[1], buf[2], buf[3]]) as usize, buf.len() - 4);
+    let back = read_frame(&mut Cursor::new(buf)).unwrap();
+    assert_eq!(back["method"], "ping");
+  }
+
+  #[test]
+  fn truncated_frame_is_an_error() {
+    let mut input = Cursor::new(vec![0u8, 0, 0, 9, b'{']);
+    assert!(read_frame(&mut input).is_err());
+  }
+}
@@ -1,10 +1,13 @@
-import { describe, it, expect, vi } from 'vitest'
+import { describe, it, expect, vi, beforeEach } from 'vitest'
 
 vi.mock('@tauri-apps/api/core', () => ({
   invoke: vi.fn().mockResolvedValue('Hello from ai_core')
 }))
 
-import { pyHello } from './bridge'
+import { invoke } from '@tauri-apps/api/core'
+import { pyHello, deconstructHypothesis, deconstructHypotheses } from './bridge'
+
+const mockedInvoke = vi.mocked(invoke)
 
 describe('bridge.pyHello', () => {
   it('invokes tauri command and resolves', async () => {
@@ -12,3 +15,29 @@ describe('bridge.pyHello', () => {
   })
 })
 
+describe('bridge.deconstructHypothesis', () => {
+  beforeEach(() => {
+    mockedInvoke.mockClear()
+  })
+
+  it('calls the deconstruct method on the sidecar', async () => {
+    const response = { success: true, test_plan: null, message: '', error: null, confidence: 0.85 }
+    mockedInvoke.mockResolvedValueOnce(response)
+
+    await expect(deconstructHypothesis('Revenue is increasing')).resolves.toEqual(response)
+    expect(mockedInvoke).toHaveBeenCalledWith('py_call', {
+      method: 'deconstruct',
+      params: { hypothesis: 'Revenue is increasing', schema_context: null }
+    })
+  })
+
+  it('unwraps batch responses', async () => {
+    mockedInvoke.mockResolvedValueOnce({ responses: [{ success: false }] })
+
+    await expect(deconstructHypotheses([''], 'Table: sales')).resolves.toEqual([{ success: false }])
+    expect(mockedInvoke).toHaveBeenCalledWith('py_call', {
+      method: 'deconstruct_batch',
+      params: { hypotheses: [''], schema_context: 'Table: sales' }
+    })
+  })
+})
@@ -1,6 +1,56 @@
 import { invoke } from '@tauri-apps/api/core'
 
+export interface SqlQuery {
+  name: string
+  sql: string
+  // Set on aggregate queries returning a method's sufficient statistics
+  statistics?: 'grouped_moments' | 'moments' | 'co_moments' | 'contingency'
+  variables?: string
+}
+
+export interface TestPlan {
+  hypothesis: string
+  required_data: string[]
+  sql_queries: SqlQuery[]
+  statistical_methods: string[]
+  expected_outcome: string
+  confidence_threshold: number
+}
+
+export interface DeconstructionResponse {
+  success: boolean
+  test_plan: TestPlan | null
+  message: string
+  error: string | null
+  confidence: number
+}
+
 export async function pyHello(): Promise<string> {
   return invoke<string>('py_hello')
 }
 
+// Calls a method on the long-lived ai_core sidecar
+export async function pyCall<T>(method: string, params?: Record<string, unknown>): Promise<T> {
+  return invoke<T>('py_call', { method, params })
+}
+
+export async function deconstructHypothesis(
+  hypothesis: string,
+  schemaContext?: string
+): Promise<DeconstructionResponse> {
+  return pyCall<DeconstructionResponse>('deconstruct', {
+    hypothesis,
+    schema_context: schemaContext ?? null
+  })
+}
+
+export async function deconstructHypotheses(
+  hypotheses: string[],
+  schemaContext?: string
+): Promise<DeconstructionResponse[]> {
+  const result = await pyCall<{ responses: DeconstructionResponse[] }>('deconstruct_batch', {
+    hypotheses,
+    schema_context: schemaContext ?? null
+  })
+  return result.responses
+}
@@ -0,0 +1,58 @@
+"""
+Unit tests for batch hypothesis deconstruction
+"""
+
+import pytest
+
+from core.batch import deconstruct_many
+from core.hypothesis_deconstructor import DeconstructionResponse
+
+
+HYPOTHESES = [
+    "Customers from California are more profitable than customers from New York",
+    "",
+    "Customer satisfaction correlates with revenue",
+    "Revenue is increasing over time",
+    "Some random business question",
+]
+
+
+class TestDeconstructMany:
+    """Test suite for deconstruct_many"""
+
+    def test_inline_preserves_order(self):
+        """Test single-worker batches run inline and keep input order"""
+        responses = list(deconstruct_many(HYPOTHESES, workers=1))
+
+        assert len(responses) == len(HYPOTHESES)
+        assert all(isinstance(r, DeconstructionResponse) for r in responses)
+        assert responses[0].test_plan.hypothesis == HYPOTHESES[0]
+        assert responses[2].test_plan.hypothesis == HYPOTHESES[2]
+
+    def test_process_pool_preserves_order(self):
+        """Test pooled batches yield responses in input order"""
+        hypotheses = HYPOTHESES * 7
+        responses = list(deconstruct_many(hypotheses, workers=2, chunksize=3))
+
+        assert len(responses) == len(hypotheses)
+        for hypothesis, response in zip(hypotheses, responses):
+            if hypothesis:
+                assert response.success
+                assert response.test_plan.hypothesis == hypothesis
+            else:
+                assert response.error == "EMPTY_HYPOTHESIS"
+
+    def test_per_item_errors_are_isolated(self):
+        """Test a bad item produces an error response without failing the batch"""
+        items = ["Revenue is increasing over time", 42, ("Sales performance varies", "Table: sales")]
+        responses = list(deconstruct_many(items, workers=1))
+
+        assert responses[0].success
+        assert not responses[1].success
+        assert responses[1].error is not None
+        assert responses[2].success
+
+    def test_invalid_chunksize(self):
+        """Test chunksize must be positive"""
+        with pytest.raises(ValueError):
+            list(deconstruct_many(HYPOTHESES, chunksize=0))
@@ -0,0 +1,207 @@
+"""
+Unit tests for cross-plan batch planning
+"""
+
+import sqlite3
+from itertools import combinations
+
+import pytest
+
+from core.batch_planner import BatchPlanner, parse_aggregate_query
+from core.hypothesis_deconstructor import StatisticalMethod, TestPlan
+from core.plan_executor import PlanExecutor
+from core.stats_engine import StatsEngine
+from core.sufficient_statistics import grouped_moments_query, moments_query
+
+
+STATES = ["California", "New York", "Texas", "Ohio", "Florida"]
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Sales table with a few NULL states and measures"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE customer_sales_data (customer_id INTEGER, state TEXT, segment TEXT, revenue REAL, profit INTEGER)"
+    )
+    connection.executemany("INSERT INTO customer_sales_data VALUES (?, ?, ?, ?, ?)", [
+        (index,
+         None if index % 41 == 0 else STATES[index % len(STATES)],
+         ["premium", "standard", "o'brien"][index % 3],
+         None if index % 13 == 0 else 100.0 + (index * 37) % 91 + 0.25 * (index % 4),
+         (index * 11) % 29)
+        for index in range(1, 1501)
+    ])
+    connection.commit()
+    connection.close()
+    return path
+
+
+def _comparison_sql(first, second, measure="revenue"):
+    return f"""
+        SELECT
+            state,
+            COUNT(*) as customer_count,
+            AVG({measure}) as avg_{measure},
+            SUM({measure}) as total_{measure}
+        FROM customer_sales_data
+        WHERE state IN ('{first}', '{second}')
+        GROUP BY state
+        ORDER BY avg_{measure} DESC
+    """
+
+
+def _plan(first, second, measure="revenue"):
+    queries = [
+        {"name": "comparison_analysis", "sql": _comparison_sql(first, second, measure)},
+        grouped_moments_query("customer_sales_data", measure, "state", [measure]),
+        moments_query("customer_sales_data", measure, [measure]),
+    ]
+    return TestPlan(
+        hypothesis=f"Customers from {first} spend more than customers from {second}",
+        required_data=["customer_sales_data"],
+        sql_queries=queries,
+        statistical_methods=[StatisticalMethod.T_TEST, StatisticalMethod.DESCRIPTIVE],
+        expected_outcome="",
+        confidence_threshold=0.05
+    )
+
+
+def _batch():
+    return [
+        _plan(first, second, measure)
+        for measure in ("revenue", "profit")
+        for first, second in combinations(STATES, 2)
+    ]
+
+
+def _assert_same_result(routed, direct):
+    assert routed.success and direct.success
+    assert routed.columns == direct.columns
+    assert routed.row_count == direct.row_count
+    for routed_row, direct_row in zip(routed.preview, direct.preview):
+        assert routed_row == pytest.approx(direct_row) if any(
+            isinstance(value, float) for value in direct_row
+        ) else routed_row == direct_row
+
+
+class TestParseAggregateQuery:
+    """Test suite for recognising mergeable queries"""
+
+    def test_comparison_query(self):
+        spec = parse_aggregate_query(_comparison_sql("Texas", "Ohio"))
+
+        assert spec.source == "customer_sales_data"
+        assert spec.groups == ["state"]
+        assert spec.filters == {"state": frozenset({"Texas", "Ohio"})}
+        assert [name for name, _, _ in spec.items] == ["state", "customer_count", "avg_revenue", "total_revenue"]
+        assert spec.order == [(2, True)]
+
+    def test_residual_conditions(self):
+        spec = parse_aggregate_query(grouped_moments_query("t", "revenue", "state", ["revenue"])["sql"])
+
+        assert spec.residual == ("revenue IS NOT NULL",)
+        assert spec.filters == {"state": None}
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT customer_id, revenue FROM customer_sales_data ORDER BY revenue DESC",
+        "SELECT state, COUNT(DISTINCT customer_id) FROM t GROUP BY state",
+        "SELECT state, COUNT(*) FROM t GROUP BY state LIMIT 5",
+        "SELECT state, COUNT(*) FROM t GROUP BY state HAVING COUNT(*) > 1",
+        "SELECT state, COUNT(a) + SUM(b) FROM t GROUP BY state",
+        "SELECT UPPER(state), COUNT(*) FROM t GROUP BY UPPER(state)",
+        "SELECT state, COUNT(*) FROM t GROUP BY state ORDER BY RANDOM()",
+    ])
+    def test_unsupported_queries(self, sql):
+        assert parse_aggregate_query(sql) is None
+
+
+class TestBatchPlanner:
+    """Test suite for BatchPlanner"""
+
+    def test_queries_collapse_into_few_scans(self, database):
+        """Test a batch reads each table a few times, not once per query"""
+        plans = _batch()
+
+        batch = BatchPlanner(database).plan(plans)
+
+        assert batch.query_count == 60
+        assert batch.scans_per_source() == {"customer_sales_data": 3}
+        assert all(scan.merged for scan in batch.scans)
+
+    def test_routed_results_match_direct_execution(self, database):
+        """Test every plan gets the results it would have got on its own"""
+        plans = _batch()
+
+        executions = BatchPlanner(database).run(plans)
+
+        with PlanExecutor(database) as executor:
+            for plan, execution in zip(plans, executions):
+                direct = executor.execute(plan)
+                assert [result.name for result in execution.results] == [
+                    result.name for result in direct.results
+                ]
+                for routed, expected in zip(execution.results, direct.results):
+                    _assert_same_result(routed, expected)
+                    assert routed.sql == expected.sql
+                    for name, stats in expected.column_stats.items():
+                        assert routed.column_stats[name].mean == pytest.approx(stats.mean)
+
+    def test_evaluate_matches_per_plan_statistics(self, database):
+        plans = _batch()[:4]
+
+        reports = BatchPlanner(database).evaluate(plans)
+
+        engine = StatsEngine()
+        for plan, report in zip(plans, reports):
+            expected = engine.evaluate_in_database(plan, database)
+            for batched, direct in zip(report.results, expected.results):
+                assert batched.error is None
+                assert batched.statistic == pytest.approx(direct.statistic)
+                assert batched.p_value == pytest.approx(direct.p_value)
+
+    def test_identical_unmergeable_queries_run_once(self, database):
+        sql = "SELECT customer_id, revenue FROM customer_sales_data WHERE revenue > 150 ORDER BY customer_id"
+        plans = [_plan("Texas", "Ohio") for _ in range(3)]
+        for plan in plans:
+            plan.sql_queries = [{"name": "raw", "sql": sql}]
+        batches = []
+
+        planner = BatchPlanner(database, batch_size=100)
+        batch = planner.plan(plans)
+        executions = planner.run(batch, row_sink=lambda index, name, columns, rows: batches.append((index, rows)))
+
+        assert len(batch.scans) == 1 and not batch.scans[0].merged
+        assert len({execution.results[0].row_count for execution in executions}) == 1
+        assert sorted({index for index, _ in batches}) == [0, 1, 2]
+
+    def test_filters_nulls_and_empty_groups(self, database):
+        """Test literal filters, NULL groups and empty global aggregates roll up like SQLite"""
+        queries = [
+            "SELECT segment, MIN(revenue) AS low, MAX(revenue) AS high FROM customer_sales_data "
+            "WHERE segment = 'o''brien' GROUP BY segment",
+            "SELECT state, COUNT(*) FROM customer_sales_data GROUP BY state ORDER BY 2 DESC, state",
+            "SELECT COUNT(*) AS n, SUM(revenue) AS total, AVG(revenue) AS mean FROM customer_sales_data "
+            "WHERE state IN ('Atlantis')",
+            "SELECT state, segment, SUM(profit) AS profit FROM customer_sales_data "
+            "WHERE state IS NOT NULL GROUP BY state, segment",
+        ]
+        plan = _plan("Texas", "Ohio")
+        plan.sql_queries = [{"name": f"q{index}", "sql": sql} for index, sql in enumerate(queries)]
+
+        batch = BatchPlanner(database).plan([plan])
+        execution = BatchPlanner(database).run(batch)[0]
+        direct = PlanExecutor(database).execute(plan)
+
+        assert len(batch.scans) == 1
+        for routed, expected in zip(execution.results, direct.results):
+            _assert_same_result(routed, expected)
+        assert execution.results[2].preview == [(0, None, None)]
+
+    def test_failed_scan_is_reported_to_every_route(self, database):
+        plans = [_plan("Texas", "Ohio", measure="missing_column") for _ in range(2)]
+
+        executions = BatchPlanner(database).run(plans)
+
+        assert all("no such column" in result.error for execution in executions for result in execution.results)
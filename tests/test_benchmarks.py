@@ -0,0 +1,58 @@
+"""
+Smoke tests for the microbenchmark suite
+"""
+
+from benchmarks import bench_deconstructor  # noqa: F401  (registers benchmarks)
+from benchmarks.runner import (
+    BenchmarkResult,
+    compare,
+    format_report,
+    load_baseline,
+    measure,
+    registered,
+    run,
+)
+
+
+class TestBenchmarks:
+    """Test suite for the benchmark runner"""
+
+    def test_every_stage_is_covered(self):
+        """Test each deconstruction stage has at least one benchmark"""
+        names = list(registered())
+        for stage in ["identify_pattern.", "extract_entities.", "generate_sql_queries.",
+                      "test_plan.to_dict", "deconstruct."]:
+            assert any(name.startswith(stage) for name in names), stage
+
+    def test_stored_baseline_covers_registered_benchmarks(self):
+        """Test the committed baseline has an entry for every benchmark"""
+        baseline = load_baseline()
+        assert set(registered()) <= set(baseline)
+
+    def test_measure_reports_latency_and_allocations(self):
+        """Test a measurement produces sane figures"""
+        result = measure("alloc", lambda: [0] * 1000, min_time=0.0, min_iterations=5, alloc_iterations=3)
+
+        assert result.iterations >= 5
+        assert result.ops_per_sec > 0
+        assert result.p99_us >= result.p50_us > 0
+        assert result.alloc_peak_bytes >= 8000
+
+    def test_run_selects_by_prefix(self):
+        """Test prefixes limit which benchmarks run"""
+        results = run(["generate_sql_queries."], min_time=0.0, min_iterations=3)
+
+        assert {r.name for r in results} == {"generate_sql_queries.comparison",
+                                             "generate_sql_queries.correlation"}
+
+    def test_compare_flags_regressions(self):
+        """Test slowdowns beyond the threshold are reported as regressions"""
+        fast = BenchmarkResult("case", 10, 1000.0, 10.0, 12.0, 0)
+        slow = BenchmarkResult("case", 10, 500.0, 20.0, 24.0, 0)
+        baseline = {"case": {"p50_us": 10.0}}
+
+        assert not compare([fast], baseline)[0]["regression"]
+        rows = compare([slow], baseline, threshold=0.25)
+        assert rows[0]["regression"]
+        assert rows[0]["p50_change"] == 1.0
+        assert "+100.0% !" in format_report(rows)
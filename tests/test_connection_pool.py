@@ -0,0 +1,150 @@
+"""
+Unit tests for the connection pool
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from core.connection_pool import ConnectionPool, PoolTimeoutError, sqlite_factory
+from core.plan_executor import PlanExecutor
+
+
+@pytest.fixture
+def database(tmp_path):
+    """SQLite database with a small table"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE customers (customer_id INTEGER, revenue REAL)")
+    connection.executemany("INSERT INTO customers VALUES (?, ?)", [(index, index * 1.5) for index in range(100)])
+    connection.commit()
+    connection.close()
+    return path
+
+
+class TestSqliteFactory:
+    """Test suite for the SQLite connection factory"""
+
+    def test_pragmas_are_applied(self, database):
+        connection = sqlite_factory(database, pragmas={"cache_size": -2048, "mmap_size": 1048576})()
+
+        assert connection.execute("PRAGMA cache_size").fetchone() == (-2048,)
+        assert connection.execute("PRAGMA mmap_size").fetchone() == (1048576,)
+
+    def test_read_only(self, database):
+        connection = sqlite_factory(database)()
+
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            connection.execute("DELETE FROM customers")
+
+    def test_wal(self, database):
+        connection = sqlite_factory(database, wal=True)()
+
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+class TestConnectionPool:
+    """Test suite for ConnectionPool"""
+
+    def test_connections_are_reused(self, database):
+        """Test returned connections are handed out again instead of reopened"""
+        pool = ConnectionPool.for_sqlite(database, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert (pool.stats.created, pool.stats.reused) == (1, 1)
+
+    def test_bounded_with_timeout(self, database):
+        """Test checkouts past the bound wait and then time out"""
+        pool = ConnectionPool.for_sqlite(database, max_size=1, timeout=0.05)
+        held = pool.acquire()
+
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+        assert pool.size == 1
+
+        pool.release(held)
+        assert pool.acquire() is held
+
+    def test_waiter_gets_released_connection(self, database):
+        pool = ConnectionPool.for_sqlite(database, max_size=1, timeout=5)
+        held = pool.acquire()
+        received = []
+
+        waiter = threading.Thread(target=lambda: received.append(pool.acquire()))
+        waiter.start()
+        pool.release(held)
+        waiter.join(5)
+
+        assert received == [held]
+        assert pool.stats.waits == 1
+
+    def test_unhealthy_connection_is_replaced(self, database):
+        """Test a connection failing its health check is discarded"""
+        pool = ConnectionPool.for_sqlite(database, health_check_interval=0)
+        broken = pool.acquire()
+        pool.release(broken)
+        broken.close()
+
+        replacement = pool.acquire()
+
+        assert replacement is not broken
+        assert replacement.execute("SELECT COUNT(*) FROM customers").fetchone() == (100,)
+        assert (pool.stats.created, pool.stats.discarded, pool.size) == (2, 1, 1)
+
+    def test_error_in_block_discards_connection(self, database):
+        pool = ConnectionPool.for_sqlite(database)
+
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                raise RuntimeError("boom")
+
+        assert (pool.size, pool.idle) == (0, 0)
+
+    def test_failed_factory_frees_its_slot(self):
+        def factory():
+            raise sqlite3.OperationalError("unreachable")
+
+        pool = ConnectionPool(factory, max_size=1)
+
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+        assert pool.size == 0
+
+    def test_pluggable_factory(self):
+        """Test any DB-API connection factory can back the pool"""
+        pool = ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False))
+
+        executor = PlanExecutor(pool=pool)
+        result = executor.execute_query("one", "SELECT 1 AS one")
+
+        assert result.preview == [(1,)]
+        assert pool.idle == 1
+
+    def test_executor_reuses_connections(self, database):
+        """Test repeated queries on an executor run on one warm connection"""
+        pool = ConnectionPool.for_sqlite(database)
+        executor = PlanExecutor(pool=pool)
+
+        for _ in range(5):
+            assert executor.execute_query("n", "SELECT COUNT(*) FROM customers").preview == [(100,)]
+
+        assert (pool.stats.created, pool.stats.reused) == (1, 4)
+
+    def test_close(self, database):
+        pool = ConnectionPool.for_sqlite(database)
+        held = pool.acquire()
+        with pool.connection():
+            pass
+
+        pool.close()
+        pool.release(held)
+
+        assert (pool.size, pool.idle) == (0, 0)
+        with pytest.raises(RuntimeError, match="closed"):
+            pool.acquire()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the lazily loaded core package
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import core
+
+# Generous enough for a cold CI box, far below eagerly importing every component
+IMPORT_BUDGET_MS = 50.0
+
+_MEASURE_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import core
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({
+    "elapsed_ms": elapsed_ms,
+    "loaded": sorted(name for name in sys.modules if name.startswith("core."))
+}))
+"""
+
+
+class TestCorePackage:
+    """Test suite for the core package entry point"""
+
+    @pytest.fixture
+    def import_result(self):
+        """Import core in a fresh interpreter and report timing and loaded modules"""
+        package_root = Path(core.__file__).resolve().parent.parent
+        output = subprocess.run(
+            [sys.executable, "-c", _MEASURE_IMPORT],
+            cwd=package_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output)
+
+    def test_import_loads_no_components(self, import_result):
+        """Test importing core does not import any component module"""
+        assert import_result["loaded"] == []
+
+    def test_import_time_budget(self, import_result):
+        """Test importing core stays within the cold start budget"""
+        assert import_result["elapsed_ms"] < IMPORT_BUDGET_MS
+
+    def test_lazy_attribute_access(self):
+        """Test components resolve to their defining modules on first use"""
+        from core.hypothesis_deconstructor import HypothesisDeconstructor
+
+        assert core.HypothesisDeconstructor is HypothesisDeconstructor
+        assert "HypothesisDeconstructor" in dir(core)
+
+    def test_every_exported_name_resolves(self):
+        """Test each name in __all__ is defined by its module, so ``from core import *`` works"""
+        for name in core.__all__:
+            assert getattr(core, name) is not None
+
+    def test_missing_component_fails_in_isolation(self, monkeypatch):
+        """Test a missing component only fails when it is accessed"""
+        monkeypatch.setitem(core._LAZY_ATTRIBUTES, "Missing", ".missing_component")
+        with pytest.raises(ImportError):
+            core.Missing
+        assert core.PlanCache is not None
+
+    def test_unknown_attribute(self):
+        """Test unknown names raise AttributeError"""
+        with pytest.raises(AttributeError):
+            core.DoesNotExist
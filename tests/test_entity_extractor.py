@@ -0,0 +1,109 @@
+"""
+Unit tests for the dictionary-driven entity extractor
+"""
+
+import json
+import random
+
+import pytest
+
+import core.entity_extractor as entity_extractor_module
+from core.entity_extractor import (
+    AUTOMATON_MIN_TERMS,
+    EntityExtractor,
+    KeywordAutomaton,
+    default_entity_extractor,
+)
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+
+
+class TestKeywordAutomaton:
+    """Test suite for KeywordAutomaton"""
+
+    def test_finds_overlapping_and_nested_keywords(self):
+        """Test every keyword occurrence is reported, including ones inside others"""
+        automaton = KeywordAutomaton([("he", 0), ("she", 1), ("hers", 2), ("his", 3)])
+
+        assert automaton.search("ushers") == {0, 1, 2}
+        assert automaton.search("this") == {3}
+        assert automaton.search("nothing") == set()
+
+    def test_keyword_inside_failed_prefix(self):
+        """Test a keyword is found after a longer partial match fails"""
+        automaton = KeywordAutomaton([("abcd", 0), ("bc", 1)])
+
+        assert automaton.search("xabcx") == {1}
+
+
+class TestEntityExtractor:
+    """Test suite for EntityExtractor"""
+
+    def test_default_vocabulary_matches_legacy_rules(self):
+        """Test the bundled vocabulary reproduces the original extraction"""
+        extractor = default_entity_extractor()
+
+        assert extractor.extract("Customers from California are more profitable than New York") == {
+            "metrics": ["revenue"],
+            "dimensions": ["customer", "state"],
+            "comparisons": ["geographic"],
+            "data_sources": ["sales_data", "customer_data"],
+        }
+        assert extractor.extract("Nothing relevant here") == {
+            "metrics": [], "dimensions": [], "comparisons": [], "data_sources": []
+        }
+
+    def test_results_are_independent_copies(self):
+        """Test mutating one result does not leak into the next"""
+        extractor = default_entity_extractor()
+
+        first = extractor.extract("revenue is growing")
+        first["metrics"].append("mutated")
+
+        assert extractor.extract("revenue is growing")["metrics"] == ["revenue"]
+
+    def test_entities_are_deduplicated_in_vocabulary_order(self):
+        """Test entities shared by several concepts appear once, in vocabulary order"""
+        extractor = EntityExtractor.from_dict({"concepts": [
+            {"name": "sales", "terms": ["sales"], "entities": {"data_sources": ["sales_data"]}},
+            {"name": "orders", "terms": ["order"], "entities": {
+                "metrics": ["order_count"], "data_sources": ["orders", "sales_data"]
+            }},
+        ]})
+
+        assert extractor.extract("Order volume lifts sales")["data_sources"] == ["sales_data", "orders"]
+
+    def test_large_vocabulary_uses_automaton(self):
+        """Test large vocabularies are compiled and agree with plain substring checks"""
+        rng = random.Random(7)
+        words = sorted({
+            "".join(rng.choice("abcdefgh") for _ in range(rng.randint(2, 6)))
+            for _ in range(AUTOMATON_MIN_TERMS * 4)
+        })
+        extractor = EntityExtractor.from_dict({"concepts": [
+            {"name": word, "terms": [word], "entities": {"metrics": [word]}} for word in words
+        ]})
+        assert extractor._automaton is not None
+
+        for _ in range(200):
+            text = "".join(rng.choice("abcdefgh ") for _ in range(40))
+            expected = [word for word in words if word in text]
+            assert extractor.extract(text)["metrics"] == expected
+
+    def test_concept_without_terms_is_rejected(self):
+        """Test a vocabulary entry that could never match is an error"""
+        with pytest.raises(ValueError):
+            EntityExtractor.from_dict({"concepts": [{"name": "empty", "terms": []}]})
+
+    def test_custom_vocabulary_file(self, tmp_path, monkeypatch):
+        """Test SHELBY_VOCABULARY selects the default vocabulary file"""
+        path = tmp_path / "vocabulary.json"
+        path.write_text(json.dumps({"version": 1, "concepts": [
+            {"name": "churn", "terms": ["churn"], "entities": {"metrics": ["churn_rate"]}}
+        ]}))
+        monkeypatch.setenv("SHELBY_VOCABULARY", str(path))
+        monkeypatch.setattr(entity_extractor_module, "_default_extractor", None)
+
+        deconstructor = HypothesisDeconstructor()
+
+        assert deconstructor._extract_entities("Churn rises in winter")["metrics"] == ["churn_rate"]
+        assert deconstructor._extract_entities("revenue grows")["metrics"] == []
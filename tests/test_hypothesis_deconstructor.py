@@ -85,6 +85,34 @@ class TestHypothesisDeconstructor:
         pattern = deconstructor._identify_pattern(hypothesis)
         assert pattern == "general"
     
+    def test_pattern_identification_matches_template_priority(self, deconstructor):
+        """Test the compiled classifier agrees with searching the templates in order"""
+        import re
+
+        hypotheses = [
+            "Revenue is higher than expected",
+            "customers from trend-setting regions buy more",
+            "Customers from Texas are associated with lower churn",
+            "Sales performance is better\nthan last quarter",
+            "customers   from\tOhio",
+            "Profit margins",
+            "more  than",
+            "",
+        ]
+
+        for hypothesis in hypotheses:
+            expected = "general"
+            for pattern_name, pattern_regex in deconstructor.hypothesis_patterns.items():
+                if re.search(pattern_regex, hypothesis.lower()):
+                    expected = pattern_name
+                    break
+            assert deconstructor._identify_pattern(hypothesis) == expected
+
+    def test_pattern_identification_long_input(self, deconstructor):
+        """Test long pasted hypotheses are classified on their leading text"""
+        memo = "Revenue is increasing " + "x" * 200000 + " and correlates with churn"
+        assert deconstructor._identify_pattern(memo) == "trend"
+    
     def test_entity_extraction_revenue(self, deconstructor):
         """Test extraction of revenue-related entities"""
         hypothesis = "Customers from California have higher revenue"
@@ -220,6 +248,76 @@ class TestHypothesisDeconstructor:
         assert response.success
         assert response.test_plan is not None
     
+    @pytest.mark.asyncio
+    async def test_deconstruct_hypothesis_async_rule_based(self, deconstructor):
+        """Test the async path builds rule-based plans inline"""
+        hypothesis = "Customers from California are more profitable than customers from New York"
+
+        response = await deconstructor.deconstruct_hypothesis_async(hypothesis)
+        expected = deconstructor.deconstruct_hypothesis(hypothesis)
+
+        assert response.success
+        assert response.test_plan.to_dict() == expected.test_plan.to_dict()
+        assert deconstructor._executor is None
+
+    @pytest.mark.asyncio
+    async def test_deconstruct_hypothesis_async_empty(self, deconstructor):
+        """Test the async path rejects empty hypotheses"""
+        response = await deconstructor.deconstruct_hypothesis_async("  ")
+
+        assert not response.success
+        assert response.error == "EMPTY_HYPOTHESIS"
+
+    @pytest.mark.asyncio
+    async def test_deconstruct_hypothesis_async_bounds_model_concurrency(self):
+        """Test model calls run off the event loop, at most max_concurrency at a time"""
+        import threading
+        import time
+
+        deconstructor = HypothesisDeconstructor(max_concurrency=2)
+        deconstructor.initialized = True
+        lock = threading.Lock()
+        active = {"now": 0, "peak": 0}
+
+        def slow_pipeline(prompt, **kwargs):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return [{"generated_text": "{}"}]
+
+        deconstructor.pipeline = slow_pipeline
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        with patch('core.hypothesis_deconstructor.TRANSFORMERS_AVAILABLE', True):
+            tick_task = asyncio.create_task(ticker())
+            try:
+                responses = await asyncio.gather(*[
+                    deconstructor.deconstruct_hypothesis_async(f"Revenue is higher than plan {i}")
+                    for i in range(6)
+                ])
+            finally:
+                tick_task.cancel()
+                deconstructor.close()
+
+        assert all(r.success for r in responses)
+        assert responses[0].test_plan.sql_queries[0]["name"] == "ai_generated_query"
+        assert active["peak"] == 2
+        assert ticks > 5
+
+    def test_max_concurrency_must_be_positive(self):
+        """Test invalid concurrency limits are rejected"""
+        with pytest.raises(ValueError):
+            HypothesisDeconstructor(max_concurrency=0)
+
     @pytest.mark.asyncio
     async def test_initialize_model_no_transformers(self, deconstructor):
         """Test model initialization when transformers are not available"""
@@ -228,6 +326,18 @@ class TestHypothesisDeconstructor:
             assert result is True
             assert deconstructor.initialized is True
 
+    @pytest.mark.asyncio
+    async def test_missing_transformers_is_unavailable(self, deconstructor):
+        """Test a deconstructor without transformers reports no model and serves rule-based plans"""
+        with patch('core.hypothesis_deconstructor.TRANSFORMERS_AVAILABLE', False):
+            await deconstructor.initialize_model()
+            response = deconstructor.deconstruct_hypothesis("Revenue is increasing over time")
+
+        readiness = deconstructor.readiness()
+        assert (readiness["status"], readiness["ready"], readiness["path"]) == ("unavailable", False, "rule_based")
+        assert response.success
+        assert response.test_plan.sql_queries[0]["name"] != "ai_generated_query"
+
     @pytest.mark.asyncio
     async def test_initialize_model_with_transformers(self):
         """
@@ -313,6 +423,66 @@ class TestHypothesisDeconstructor:
             elif hasattr(hd_module, 'pipeline'):
                 delattr(hd_module, 'pipeline')
 
+    @pytest.mark.asyncio
+    async def test_initialize_model_is_single_flight(self):
+        """Test concurrent callers share one background load, served by rules meanwhile"""
+        import threading
+        import core.hypothesis_deconstructor as hd_module
+
+        gate = threading.Event()
+        loads = []
+
+        def from_pretrained(name):
+            loads.append(name)
+            gate.wait(5)
+            return MagicMock()
+
+        deconstructor = HypothesisDeconstructor()
+        assert deconstructor.model_status == "not_started"
+        with patch.object(hd_module, 'TRANSFORMERS_AVAILABLE', True), \
+                patch.object(hd_module, 'AutoTokenizer', MagicMock(from_pretrained=from_pretrained), create=True), \
+                patch.object(hd_module, 'AutoModelForCausalLM', MagicMock(), create=True), \
+                patch.object(hd_module, 'pipeline', MagicMock(), create=True):
+            waiters = [asyncio.create_task(deconstructor.initialize_model()) for _ in range(5)]
+            await asyncio.sleep(0.01)
+
+            assert deconstructor.model_status == "loading"
+            response = await deconstructor.deconstruct_hypothesis_async("Revenue is higher than plan")
+            assert response.success
+            assert response.test_plan.sql_queries[0]["name"] != "ai_generated_query"
+            assert deconstructor.readiness()["path"] == "rule_based"
+
+            gate.set()
+            assert await asyncio.gather(*waiters) == [True] * 5
+            assert deconstructor.start_model_initialization().result() is True
+            assert deconstructor.readiness() == {
+                "model": deconstructor.model_name, "status": "ready", "ready": True, "path": "ai", "error": None,
+            }
+
+        assert len(loads) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_initialization_is_retried(self):
+        """Test a failed load is reported and a later call loads again"""
+        import core.hypothesis_deconstructor as hd_module
+
+        tokenizer_class = MagicMock()
+        tokenizer_class.from_pretrained.side_effect = OSError("weights not found")
+        deconstructor = HypothesisDeconstructor()
+        with patch.object(hd_module, 'TRANSFORMERS_AVAILABLE', True), \
+                patch.object(hd_module, 'AutoTokenizer', tokenizer_class, create=True), \
+                patch.object(hd_module, 'AutoModelForCausalLM', MagicMock(), create=True), \
+                patch.object(hd_module, 'pipeline', MagicMock(), create=True):
+            assert await deconstructor.initialize_model() is False
+            readiness = deconstructor.readiness()
+            assert (readiness["status"], readiness["path"]) == ("failed", "rule_based")
+            assert readiness["error"] == "weights not found"
+
+            tokenizer_class.from_pretrained.side_effect = None
+            assert await deconstructor.initialize_model() is True
+            assert deconstructor.model_status == "ready"
+            assert deconstructor.readiness()["error"] is None
+
     def test_test_plan_to_dict(self):
         """Test TestPlan serialization to dictionary"""
         test_plan = TestPlan(
@@ -0,0 +1,267 @@
+"""
+Unit tests for the inference backends and the micro-batching scheduler
+"""
+
+import asyncio
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks.stand_in_model import StandInModel
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.inference import MicroBatcher, PipelineBackend, backend_name
+from core.metrics import DeconstructorMetrics
+
+
+PROMPTS = [f"Revenue in region {index} is higher than plan" for index in range(8)]
+
+
+class Recording:
+    """Backend that records its batches and echoes the prompts"""
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+
+    def generate(self, prompts, max_length):
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append(list(prompts))
+        return [prompt.upper() for prompt in prompts]
+
+
+class TestStandInModel:
+    """Test suite for the local stand-in model"""
+
+    def test_text_does_not_depend_on_the_batch(self):
+        model = StandInModel()
+
+        batched = model.generate(PROMPTS, 400)
+
+        assert batched == [model.generate([prompt], 400)[0] for prompt in PROMPTS]
+        assert all(text.startswith(prompt + " ") for prompt, text in zip(PROMPTS, batched))
+        assert len(set(batched)) > 1
+
+    def test_one_forward_pass_per_token(self):
+        """Test a batch costs the forward passes of one prompt"""
+        model = StandInModel(new_tokens=5)
+        text = model.generate(PROMPTS, 400)[0]
+
+        assert model.forward_passes == 5
+        assert len(text.split()) == len(PROMPTS[0].split()) + 5
+        # The prompt's bytes count towards max_length
+        assert len(model.generate(["x" * 10], 12)[0].split()) == 3
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            StandInModel(layers=0)
+        with pytest.raises(ValueError):
+            StandInModel(pass_seconds=-1)
+
+
+class TestMicroBatcher:
+    """Test suite for collecting concurrent prompts into batches"""
+
+    def test_concurrent_prompts_share_batches(self):
+        """Test prompts arriving together run as batches of at most max_batch_size"""
+        backend = Recording(gate=threading.Event())
+        with MicroBatcher(backend, max_batch_size=4, max_wait_ms=50) as batcher:
+            futures = [batcher.submit(prompt) for prompt in PROMPTS]
+            backend.gate.set()
+            texts = [future.result(timeout=5) for future in futures]
+
+        assert texts == [prompt.upper() for prompt in PROMPTS]
+        assert [len(batch) for batch in backend.batches] == [4, 4]
+        assert batcher.stats.to_dict() == {
+            "batches": 2, "prompts": 8, "largest_batch": 4, "failed_batches": 0, "mean_batch_size": 4.0,
+        }
+
+    def test_lone_prompt_runs_after_max_wait(self):
+        backend = Recording()
+        with MicroBatcher(backend, max_batch_size=16, max_wait_ms=1) as batcher:
+            assert batcher.generate("alone", timeout=5) == "ALONE"
+
+        assert backend.batches == [["alone"]]
+
+    def test_throughput_grows_with_load(self):
+        """Test concurrent callers need far fewer forward passes than sequential ones"""
+        model = StandInModel(new_tokens=4, pass_seconds=0.001)
+        with MicroBatcher(model, max_batch_size=16, max_wait_ms=20) as batcher:
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                texts = list(pool.map(batcher.generate, PROMPTS * 4))
+
+        assert texts == model.generate(PROMPTS, 400) * 4
+        assert batcher.stats.mean_batch_size > 2
+        # 4 passes per batch, plus the 4 of the reference call above
+        assert model.forward_passes == 4 * batcher.stats.batches + 4
+
+    def test_failed_batch_fails_every_prompt(self):
+        backend = SimpleNamespace(generate=MagicMock(side_effect=RuntimeError("out of memory")))
+        with MicroBatcher(backend, max_wait_ms=50) as batcher:
+            futures = [batcher.submit(prompt) for prompt in PROMPTS[:3]]
+            for future in futures:
+                with pytest.raises(RuntimeError, match="out of memory"):
+                    future.result(timeout=5)
+
+        assert batcher.stats.failed_batches >= 1
+        assert batcher.stats.batches == 0
+
+    def test_wrong_number_of_texts_is_an_error(self):
+        backend = SimpleNamespace(generate=lambda prompts, max_length: ["only one"])
+        with MicroBatcher(backend, max_wait_ms=50) as batcher:
+            futures = [batcher.submit(prompt) for prompt in PROMPTS[:2]]
+            with pytest.raises(RuntimeError, match="1 texts for 2 prompts"):
+                futures[0].result(timeout=5)
+
+    def test_cancelled_prompts_are_dropped(self):
+        """Test a caller that gave up before its batch ran is left out of it"""
+        gate = threading.Event()
+        backend = Recording(gate=gate)
+        with MicroBatcher(backend, max_batch_size=1) as batcher:
+            first = batcher.submit("first")
+            second = batcher.submit("second")
+            third = batcher.submit("third")
+            assert second.cancel()
+            gate.set()
+            assert third.result(timeout=5) == "THIRD"
+            assert first.result(timeout=5) == "FIRST"
+            with pytest.raises(CancelledError):
+                second.result()
+
+        assert backend.batches == [["first"], ["third"]]
+
+    def test_close_runs_queued_prompts(self):
+        gate = threading.Event()
+        backend = Recording(gate=gate)
+        batcher = MicroBatcher(backend, max_batch_size=1)
+        futures = [batcher.submit(prompt) for prompt in PROMPTS[:3]]
+        gate.set()
+        batcher.close()
+
+        assert [future.result(timeout=0) for future in futures] == [p.upper() for p in PROMPTS[:3]]
+        with pytest.raises(RuntimeError, match="closed"):
+            batcher.submit("late")
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            MicroBatcher(Recording(), max_batch_size=0)
+        with pytest.raises(ValueError):
+            MicroBatcher(Recording(), max_wait_ms=-1)
+
+
+class TestPipelineBackend:
+    """Test suite for the transformers pipeline adapter"""
+
+    def test_batch_is_one_pipeline_call(self):
+        tokenizer = SimpleNamespace(pad_token=None, eos_token="<eos>", padding_side="right")
+        pipeline = MagicMock(tokenizer=tokenizer)
+        pipeline.return_value = [[{"generated_text": "a!"}], [{"generated_text": "b!"}]]
+
+        texts = PipelineBackend(pipeline).generate(["a", "b"], 400)
+
+        assert texts == ["a!", "b!"]
+        pipeline.assert_called_once_with(["a", "b"], max_length=400, num_return_sequences=1, batch_size=2)
+        assert tokenizer.pad_token == "<eos>"
+        assert tokenizer.padding_side == "left"
+
+
+class TestBatchedDeconstructor:
+    """Test suite for model-backed plans through a MicroBatcher"""
+
+    HYPOTHESIS = "Revenue is higher than plan in region {}"
+
+    @pytest.mark.asyncio
+    async def test_async_requests_are_batched(self):
+        """Test concurrent async deconstructions share forward passes"""
+        model = StandInModel(new_tokens=2)
+        with MicroBatcher(model, max_batch_size=8, max_wait_ms=50) as batcher:
+            deconstructor = HypothesisDeconstructor(batcher=batcher)
+            responses = await asyncio.gather(*[
+                deconstructor.deconstruct_hypothesis_async(self.HYPOTHESIS.format(index))
+                for index in range(8)
+            ])
+
+        assert all(response.success for response in responses)
+        assert responses[0].test_plan.sql_queries[0]["name"] == "ai_generated_query"
+        assert batcher.stats.batches == 1
+        assert model.forward_passes == 2
+
+    def test_sync_requests_from_threads_are_batched(self):
+        model = StandInModel(new_tokens=2)
+        with MicroBatcher(model, max_batch_size=8, max_wait_ms=50) as batcher:
+            deconstructor = HypothesisDeconstructor(batcher=batcher)
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                responses = list(pool.map(deconstructor.deconstruct_hypothesis,
+                                          [self.HYPOTHESIS.format(index) for index in range(8)]))
+
+        assert all(response.test_plan.sql_queries[0]["name"] == "ai_generated_query" for response in responses)
+        assert batcher.stats.largest_batch > 1
+
+    @pytest.mark.asyncio
+    async def test_failed_generation_falls_back_to_rules(self):
+        backend = SimpleNamespace(generate=MagicMock(side_effect=RuntimeError("model unavailable")))
+        metrics = DeconstructorMetrics(sample_every=1)
+        with MicroBatcher(backend, max_wait_ms=0) as batcher:
+            deconstructor = HypothesisDeconstructor(batcher=batcher, metrics=metrics)
+            response = await deconstructor.deconstruct_hypothesis_async(self.HYPOTHESIS.format(1))
+
+        assert response.success
+        assert response.test_plan.sql_queries[0]["name"] != "ai_generated_query"
+        assert metrics.fallbacks.value("model_error") == 1
+        assert metrics.stage_seconds.count("extract_entities") == 1
+
+    def test_supplied_batcher_is_a_ready_model(self):
+        with MicroBatcher(StandInModel(new_tokens=2)) as batcher:
+            deconstructor = HypothesisDeconstructor(batcher=batcher)
+
+            assert deconstructor.start_model_initialization().result(timeout=0) is True
+            assert deconstructor.readiness() == {
+                "model": deconstructor.model_name, "status": "ready", "ready": True, "path": "ai", "error": None,
+            }
+
+    def test_plans_are_keyed_by_the_batchers_backend(self):
+        """Test plans from different backends never share a cache variant"""
+        backends = [StandInModel(new_tokens=2), StandInModel(new_tokens=3), Recording()]
+        variants = []
+        for backend in backends:
+            with MicroBatcher(backend) as batcher:
+                variants.append(HypothesisDeconstructor(batcher=batcher).model_variant)
+
+        assert len(set(variants)) == 3
+        assert variants[2] == f"model:{backend_name(backends[2])}"
+        assert PipelineBackend(MagicMock(model=SimpleNamespace(name_or_path="gpt2"))).name == "gpt2"
+
+    def test_loaded_model_is_batched(self, monkeypatch):
+        """Test a model loaded in the background serves its requests through a MicroBatcher"""
+        import core.hypothesis_deconstructor as hd_module
+
+        sizes = []
+
+        def generate(prompts, **kwargs):
+            sizes.append(len(prompts))
+            return [[{"generated_text": prompt}] for prompt in prompts]
+
+        tokenizer = SimpleNamespace(pad_token=None, eos_token="<eos>", padding_side="right")
+        monkeypatch.setattr(hd_module, "TRANSFORMERS_AVAILABLE", True)
+        monkeypatch.setattr(hd_module, "AutoTokenizer", MagicMock(), raising=False)
+        monkeypatch.setattr(hd_module, "AutoModelForCausalLM", MagicMock(), raising=False)
+        monkeypatch.setattr(hd_module, "pipeline", MagicMock(return_value=MagicMock(
+            side_effect=generate, tokenizer=tokenizer)), raising=False)
+        deconstructor = HypothesisDeconstructor(batch_size=8, batch_wait_ms=50)
+
+        assert deconstructor.readiness()["path"] == "rule_based"
+        assert deconstructor.start_model_initialization().result(timeout=5) is True
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                responses = list(pool.map(deconstructor.deconstruct_hypothesis,
+                                          [self.HYPOTHESIS.format(index) for index in range(8)]))
+        finally:
+            deconstructor.close()
+
+        assert all(response.test_plan.sql_queries[0]["name"] == "ai_generated_query" for response in responses)
+        assert deconstructor.batcher.max_batch_size == 8
+        assert deconstructor.batcher.stats.largest_batch > 1
+        assert sum(sizes) == 8
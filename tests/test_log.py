@@ -0,0 +1,179 @@
+"""
+Unit tests for structured, rate-limited logging
+"""
+
+import json
+import logging
+import timeit
+
+import pytest
+
+from core import hypothesis_deconstructor, log
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core import log
+from core.log import Logger, StructuredFormatter, get_logger, joint_sampler, sampler
+
+
+class Renders:
+    """Value that counts how often it is converted to text"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "rendered"
+
+
+@pytest.fixture
+def records():
+    """Capture the records of the test logger at DEBUG"""
+    captured = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            captured.append(record)
+
+    handler = Collect()
+    target = logging.getLogger("tests.log")
+    target.addHandler(handler)
+    target.setLevel(logging.DEBUG)
+    yield captured
+    target.removeHandler(handler)
+    target.setLevel(logging.NOTSET)
+
+
+class TestLogger:
+    """Test suite for the structured logger"""
+
+    def test_message_is_rendered_on_demand(self, records):
+        """Test fields are formatted only when a handler asks for the message"""
+        value = Renders()
+        get_logger("tests.log").info("query_streamed", query="daily sales", rows=3, value=value)
+
+        record = records[0]
+        # pytest's capture handlers format the record too, so check the message is still deferred
+        assert isinstance(record.msg, log._Message)
+        assert record.fields["value"] is value
+        assert record.event == "query_streamed"
+        assert record.fields["rows"] == 3
+        assert record.getMessage() == 'query_streamed query="daily sales" rows=3 value=rendered'
+        assert record.funcName == "test_message_is_rendered_on_demand"
+
+    def test_disabled_level_formats_nothing(self, records):
+        value = Renders()
+        logging.getLogger("tests.log").setLevel(logging.WARNING)
+
+        get_logger("tests.log").info("ignored", value=value)
+
+        assert records == []
+        assert value.calls == 0
+
+    def test_long_values_are_cut(self, records):
+        get_logger("tests.log").info("long", text="x" * (log.MAX_VALUE_LENGTH + 50))
+
+        assert records[0].getMessage() == f'long text="{"x" * log.MAX_VALUE_LENGTH}...(+50 chars)"'
+
+    def test_rate_limit_counts_suppressed_records(self, records, monkeypatch):
+        """Test each event gets a burst, then per_second, and reports what it dropped"""
+        now = [100.0]
+        monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+        logger = get_logger("tests.log", per_second=1.0, burst=2)
+
+        for _ in range(5):
+            logger.error("query_failed")
+        logger.error("other_event")
+        now[0] += 1.0
+        logger.error("query_failed")
+
+        assert [record.event for record in records] == ["query_failed"] * 2 + ["other_event", "query_failed"]
+        assert records[-1].fields == {"suppressed": 3}
+        with pytest.raises(ValueError):
+            Logger(logging.getLogger("tests.log"), per_second=0)
+
+    def test_structured_formatter(self, records):
+        """Test JSON lines carry the event and fields as keys"""
+        get_logger("tests.log").warning("pool_exhausted", waiting=4)
+        logging.getLogger("tests.log").warning("plain %s", "text")
+
+        formatter = StructuredFormatter()
+        structured, plain = (json.loads(formatter.format(record)) for record in records)
+        assert structured["event"] == "pool_exhausted"
+        assert structured["waiting"] == 4
+        assert structured["level"] == "WARNING"
+        assert plain["message"] == "plain text"
+
+    def test_sampler(self):
+        sample = sampler(3)
+
+        assert [sample() for _ in range(6)] == [False, False, True] * 2
+        assert not sampler(0)()
+        with pytest.raises(ValueError):
+            sampler(-1)
+
+    @pytest.mark.parametrize("max_cycle", [log.MAX_JOINT_CYCLE, 1])
+    def test_joint_sampler(self, max_cycle, monkeypatch):
+        """Test one draw makes each sampler's decision, and None when none fires"""
+        monkeypatch.setattr(log, "MAX_JOINT_CYCLE", max_cycle)
+        draw = joint_sampler(2, 3, 0)
+        separate = [sampler(2), sampler(3), sampler(0)]
+
+        for _ in range(12):
+            decisions = tuple(sample() for sample in separate)
+            assert draw() == (decisions if any(decisions) else None)
+        assert joint_sampler(0, 0)() is None
+        with pytest.raises(ValueError):
+            joint_sampler(2, -1)
+
+
+class TestDeconstructorLogging:
+    """Test suite for the deconstructor's request logs"""
+
+    HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+    @pytest.fixture
+    def deconstructor_records(self):
+        captured = []
+
+        class Collect(logging.Handler):
+            def emit(self, record):
+                captured.append(record)
+
+        handler = Collect()
+        target = logging.getLogger(hypothesis_deconstructor.__name__)
+        target.addHandler(handler)
+        target.setLevel(logging.INFO)
+        yield captured
+        target.removeHandler(handler)
+        target.setLevel(logging.NOTSET)
+
+    def test_requests_are_sampled(self, deconstructor_records):
+        """Test one request in REQUEST_LOG_SAMPLE_EVERY logs its hypothesis and pattern"""
+        deconstructor = HypothesisDeconstructor()
+        deconstructor_records.clear()
+
+        for _ in range(hypothesis_deconstructor.REQUEST_LOG_SAMPLE_EVERY):
+            deconstructor.deconstruct_hypothesis(self.HYPOTHESIS)
+
+        assert len(deconstructor_records) == 1
+        record = deconstructor_records[0]
+        assert record.event == "deconstructing_hypothesis"
+        assert record.fields["pattern"] == "segment"
+        assert record.fields["hypothesis"] == self.HYPOTHESIS
+
+    def test_disabled_logging_cost(self):
+        """Test a sampled-out request log costs a small part of a request"""
+        deconstructor = HypothesisDeconstructor()
+        sample = sampler(hypothesis_deconstructor.REQUEST_LOG_SAMPLE_EVERY)
+        logger = get_logger("tests.log.disabled")
+
+        def disabled_logging():
+            if sample():
+                logger.info("deconstructing_hypothesis", pattern="segment")
+
+        cost = min(timeit.repeat(disabled_logging, number=2000, repeat=5)) / 2000
+        request = min(timeit.repeat(lambda: deconstructor.deconstruct_hypothesis(self.HYPOTHESIS),
+                                    number=20, repeat=5)) / 20
+
+        # Close to zero in practice; the margin absorbs timing noise
+        assert cost < request * 0.02
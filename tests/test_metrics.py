@@ -0,0 +1,149 @@
+"""
+Unit tests for the deconstructor metrics
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.metrics import DeconstructorMetrics, Histogram, MetricsRegistry
+from core.plan_cache import PlanCache
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+class TestMetricsRegistry:
+    """Test suite for the counters, histograms and exposition text"""
+
+    def test_counter_exposition(self):
+        """Test counters are exact per label combination and escaped"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ("path",))
+        counter.inc("a")
+        counter.inc("a")
+        counter.labels('b"\n').inc()
+        children = counter.children()
+        children["c"].inc()
+
+        text = registry.render()
+
+        assert counter.value("a") == 2
+        assert counter.value("a") == 2
+        assert counter.value("missing") == 0
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{path="a"} 2' in text
+        assert 'requests_total{path="b\\"\\n"} 1' in text
+        assert 'requests_total{path="c"} 1' in text
+        assert registry.render() == text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket lines count observations at or below each bound"""
+        histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, "x")
+        histogram.observe_many([("x", 0.01)])
+
+        lines = histogram.expose()
+
+        assert lines == [
+            'latency_seconds_bucket{stage="x",le="0.1"} 3',
+            'latency_seconds_bucket{stage="x",le="1.0"} 4',
+            'latency_seconds_bucket{stage="x",le="+Inf"} 5',
+            f'latency_seconds_sum{{stage="x"}} {repr(0.05 + 0.1 + 0.5 + 2.0 + 0.01)}',
+            'latency_seconds_count{stage="x"} 5',
+        ]
+
+    def test_registration_conflicts(self):
+        """Test a name is shared by equal registrations and refused otherwise"""
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "Events", ("kind",))
+
+        assert registry.counter("events_total", "Events", ("kind",)) is counter
+        with pytest.raises(ValueError, match="already registered"):
+            registry.histogram("events_total", "Events", ("kind",))
+        with pytest.raises(ValueError, match="already registered"):
+            registry.counter("events_total", "Events", ("other",))
+
+    def test_sampling(self):
+        """Test one request in sample_every gets a timer"""
+        metrics = DeconstructorMetrics(sample_every=4)
+
+        assert [metrics.timer() is not None for _ in range(8)] == [False, False, False, True] * 2
+        assert DeconstructorMetrics(sample_every=0).timer() is None
+        with pytest.raises(ValueError):
+            DeconstructorMetrics(sample_every=-1)
+
+
+class TestDeconstructorMetrics:
+    """Test suite for the metrics recorded by HypothesisDeconstructor"""
+
+    @pytest.fixture
+    def metrics(self):
+        """Metrics that time every request"""
+        return DeconstructorMetrics(sample_every=1)
+
+    def test_rule_based_stages(self, metrics):
+        """Test each rule-based stage and the total are timed once"""
+        deconstructor = HypothesisDeconstructor(metrics=metrics)
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        for stage in ("identify_pattern", "extract_entities", "load_catalog", "generate_sql_queries",
+                      "determine_statistical_methods", "generate_statistics_queries", "total"):
+            assert metrics.stage_seconds.count(stage) == 1
+        assert metrics.requests.value("rule_based", "segment") == 1
+
+    def test_cache_hits_are_counted(self, metrics):
+        """Test a cached plan counts under the cache path"""
+        deconstructor = HypothesisDeconstructor(plan_cache=PlanCache(), metrics=metrics)
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        assert metrics.requests.value("rule_based", "segment") == 1
+        assert metrics.requests.value("cache", "") == 1
+        assert metrics.stage_seconds.count("plan_cache") == 2
+
+    def test_model_fallback_is_counted(self, metrics):
+        """Test a failing model call counts a fallback and still times the rule-based stages"""
+        deconstructor = HypothesisDeconstructor(metrics=metrics)
+        deconstructor.initialized = True
+
+        def failing_pipeline(prompt, **kwargs):
+            raise RuntimeError("model unavailable")
+
+        deconstructor.pipeline = failing_pipeline
+        with patch('core.hypothesis_deconstructor.TRANSFORMERS_AVAILABLE', True):
+            response = deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        assert response.success
+        assert metrics.requests.value("ai", "segment") == 1
+        assert metrics.fallbacks.value("model_error") == 1
+        assert metrics.stage_seconds.count("extract_entities") == 1
+
+    def test_errors_are_counted(self, metrics):
+        """Test failed requests count by error code"""
+        deconstructor = HypothesisDeconstructor(metrics=metrics)
+        deconstructor.deconstruct_hypothesis("   ")
+
+        assert metrics.errors.value("EMPTY_HYPOTHESIS") == 1
+        assert 'deconstructor_errors_total{error="EMPTY_HYPOTHESIS"} 1' in metrics.render()
+
+    def test_counts_from_threads_are_exact(self):
+        """Test concurrent increments are never lost and reads do not change the count"""
+        counter = MetricsRegistry().counter("requests_total", "Requests", ("path",))
+        series = counter.labels("a")
+
+        def count():
+            for _ in range(10000):
+                series.inc()
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value("a") == 80000
+        assert counter.expose() == counter.expose() == ["requests_total{path=\"a\"} 80000"]
@@ -0,0 +1,220 @@
+"""
+Unit tests for the in-process test plan cache
+"""
+
+import json
+import pickle
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.hypothesis_deconstructor import FrozenTestPlan, HypothesisDeconstructor, StatisticalMethod, TestPlan
+from core.entity_extractor import EntityExtractor
+from benchmarks.stand_in_model import StandInModel
+from core.inference import MicroBatcher
+from core.plan_cache import PlanCache, normalize_hypothesis, plan_cache_key
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+class TestPlanCache:
+    """Test suite for PlanCache"""
+
+    @pytest.fixture
+    def cache(self):
+        """Create a small PlanCache"""
+        return PlanCache(max_entries=2)
+
+    @pytest.fixture
+    def deconstructor(self, cache):
+        """Create a HypothesisDeconstructor backed by the cache"""
+        return HypothesisDeconstructor(plan_cache=cache)
+
+    def test_normalize_hypothesis(self):
+        """Test case, whitespace and edge punctuation are normalized"""
+        assert normalize_hypothesis("  Revenue IS\n growing. ") == "revenue is growing"
+        assert normalize_hypothesis("Is revenue growing?") == "is revenue growing"
+
+    def test_key_depends_on_schema(self):
+        """Test the same hypothesis against different schemas uses different keys"""
+        assert plan_cache_key(HYPOTHESIS, None) == plan_cache_key(HYPOTHESIS, "")
+        assert plan_cache_key(HYPOTHESIS, None) != plan_cache_key(HYPOTHESIS, "Table: sales")
+        assert plan_cache_key(HYPOTHESIS, None) != plan_cache_key(HYPOTHESIS, None, "model:gpt2")
+
+    def test_repeat_hypothesis_hits_cache(self, deconstructor, cache):
+        """Test resubmitting a reworded hypothesis is served from the cache"""
+        first = deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+        second = deconstructor.deconstruct_hypothesis(HYPOTHESIS.upper() + "!")
+
+        assert first.success and second.success
+        assert second.test_plan.hypothesis == HYPOTHESIS.upper() + "!"
+        assert second.test_plan.sql_queries == first.test_plan.sql_queries
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_cached_plans_compare_the_same_groups(self, deconstructor, cache):
+        """Test a hypothesis differing only in case is served a plan filtered on the same groups"""
+        uncached = HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS.lower())
+        plan = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+        grouped = [query for query in plan.sql_queries if query.get("statistics") == "grouped_moments"]
+
+        assert cache.stats()["hits"] == 1
+        assert grouped[0]["groups"] == "California,New York"
+        assert plan.sql_queries == uncached.sql_queries
+
+    def test_cached_plans_match_generated_plans(self, deconstructor):
+        """Test a cached plan has the container types of a freshly generated one"""
+        generated = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+        cached = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+
+        for plan in (generated, cached):
+            assert type(plan.required_data) is list
+            assert type(plan.statistical_methods) is list
+            assert type(plan.sql_queries) is list
+            assert all(type(query) is dict for query in plan.sql_queries)
+        assert cached == generated
+
+    def test_cached_plans_are_not_corrupted_by_callers(self, deconstructor):
+        """Test mutating a served plan leaves the shared cache entry intact"""
+        plan = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+
+        plan.required_data.append("other_data")
+        plan.sql_queries[0]["sql"] = "DROP TABLE customers"
+        plan.statistical_methods.clear()
+        plan.hypothesis = "rebound"
+
+        again = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+        assert again.hypothesis == HYPOTHESIS
+        assert again.sql_queries[0]["sql"] != "DROP TABLE customers"
+        assert again.statistical_methods == [StatisticalMethod.T_TEST, StatisticalMethod.DESCRIPTIVE]
+        assert again.to_dict()["required_data"] == ["sales_data", "customer_data"]
+
+    def test_frozen_plans_share_contents(self):
+        """Test plans frozen from the same templates share their queries and tuples"""
+        generated = HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan
+        payload = json.dumps(generated.to_dict())
+        first = TestPlan.from_dict(json.loads(payload)).freeze()
+        second = TestPlan.from_dict(json.loads(payload)).freeze()
+        unpickled = pickle.loads(pickle.dumps(first))
+
+        assert isinstance(first, FrozenTestPlan)
+        assert first.to_dict() == generated.to_dict()
+        assert second.sql_queries is first.sql_queries
+        assert second.statistical_methods is first.statistical_methods
+        assert unpickled == first and unpickled.sql_queries is first.sql_queries
+        with pytest.raises(AttributeError):
+            first.hypothesis = "rebound"
+
+        thawed = first.thaw("Another wording")
+        assert thawed.hypothesis == "Another wording"
+        assert thawed.sql_queries == list(first.sql_queries)
+        assert thawed.to_dict() == {**generated.to_dict(), "hypothesis": "Another wording"}
+
+    def test_frozen_plans_are_compact(self):
+        """Test a frozen plan costs a fraction of a freshly parsed one"""
+        generated = HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan
+        payloads = [json.dumps({**generated.to_dict(), "hypothesis": f"{HYPOTHESIS} ({index})"})
+                    for index in range(200)]
+
+        def traced(build):
+            tracemalloc.start()
+            try:
+                plans = build()
+                return plans, tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+
+        _, parsed = traced(lambda: [TestPlan.from_dict(json.loads(payload)) for payload in payloads])
+        _, frozen = traced(lambda: [TestPlan.from_dict(json.loads(payload)).freeze() for payload in payloads])
+
+        assert frozen * 4 < parsed
+
+    def test_lru_eviction(self, deconstructor, cache):
+        """Test the least recently used plan is evicted at capacity"""
+        deconstructor.deconstruct_hypothesis("Revenue is increasing")
+        deconstructor.deconstruct_hypothesis("Sales correlate with churn")
+        deconstructor.deconstruct_hypothesis("Revenue is increasing")
+        deconstructor.deconstruct_hypothesis("Profit is higher than last year")
+
+        variant = deconstructor.rule_based_variant
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+        assert cache.get("Revenue is increasing", variant=variant) is not None
+        assert cache.get("Sales correlate with churn", variant=variant) is None
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test plans expire after the TTL"""
+        import core.plan_cache as plan_cache_module
+
+        now = [1000.0]
+        monkeypatch.setattr(plan_cache_module.time, "monotonic", lambda: now[0])
+        cache = PlanCache(ttl_seconds=10)
+        deconstructor = HypothesisDeconstructor(plan_cache=cache)
+
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+        assert cache.get(HYPOTHESIS, variant=deconstructor.rule_based_variant) is not None
+        now[0] += 11
+        assert cache.get(HYPOTHESIS, variant=deconstructor.rule_based_variant) is None
+
+    def test_invalidate_and_clear(self, deconstructor, cache):
+        """Test explicit invalidation"""
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        assert cache.invalidate(HYPOTHESIS, variant=deconstructor.rule_based_variant)
+        assert not cache.invalidate(HYPOTHESIS, variant=deconstructor.rule_based_variant)
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.stats()["hits"] == 0
+
+    def test_failed_deconstructions_are_not_cached(self, deconstructor, cache):
+        """Test error responses never populate the cache"""
+        deconstructor.deconstruct_hypothesis("   ")
+        assert len(cache) == 0
+
+    def test_rule_based_plans_are_not_served_once_the_model_is_ready(self, deconstructor, cache):
+        """Test plans cached while the model warms up give way to model plans"""
+        warming = deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+        with MicroBatcher(StandInModel(new_tokens=2), max_wait_ms=0) as batcher:
+            ready_deconstructor = HypothesisDeconstructor(plan_cache=cache, batcher=batcher)
+            ready = ready_deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+            repeat = ready_deconstructor.deconstruct_hypothesis(HYPOTHESIS).test_plan
+
+        assert warming.sql_queries[0]["name"] == "comparison_analysis"
+        assert ready.sql_queries[0]["name"] == "ai_generated_query"
+        assert repeat.sql_queries == ready.sql_queries
+        assert cache.stats()["hits"] == 1
+
+    def test_fallback_plans_are_cached_as_rule_based(self, cache):
+        """Test a failed model generation does not pin its fallback plan to the model"""
+        backend = SimpleNamespace(generate=MagicMock(side_effect=RuntimeError("out of memory")))
+        with MicroBatcher(backend, max_wait_ms=0) as batcher:
+            deconstructor = HypothesisDeconstructor(plan_cache=cache, batcher=batcher)
+            deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+            deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        assert backend.generate.call_count == 2
+        assert cache.get(HYPOTHESIS, variant=deconstructor.rule_based_variant) is not None
+        assert cache.get(HYPOTHESIS, variant=deconstructor.model_variant) is None
+
+    def test_vocabulary_changes_retire_plans(self, cache):
+        """Test plans built from one vocabulary are not served with another"""
+        vocabulary = {"concepts": [{"name": "revenue", "terms": ["revenue"],
+                                    "entities": {"metrics": ["revenue"]}}]}
+        edited = {"concepts": [{"name": "revenue", "terms": ["revenue", "sales"],
+                                "entities": {"metrics": ["revenue"]}}]}
+        first = HypothesisDeconstructor(plan_cache=cache, entity_extractor=EntityExtractor.from_dict(vocabulary))
+        same = HypothesisDeconstructor(plan_cache=cache, entity_extractor=EntityExtractor.from_dict(vocabulary))
+        second = HypothesisDeconstructor(plan_cache=cache, entity_extractor=EntityExtractor.from_dict(edited))
+
+        first.deconstruct_hypothesis("Revenue is increasing")
+        same.deconstruct_hypothesis("Revenue is increasing")
+        second.deconstruct_hypothesis("Revenue is increasing")
+
+        assert first.rule_based_variant == same.rule_based_variant != second.rule_based_variant
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
@@ -0,0 +1,135 @@
+"""
+Unit tests for the streaming plan executor
+"""
+
+import sqlite3
+import statistics
+
+import pytest
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.plan_executor import PlanExecutor, RunningStats
+
+
+SCHEMA = """
+Table: customers
+  - customer_id: INTEGER
+  - state: TEXT
+  - revenue: REAL
+  - visits: INTEGER
+"""
+
+ROWS = [
+    (index, "California" if index % 3 else "New York",
+     None if index % 11 == 0 else 100.0 + (index * 37) % 50, (index * 7) % 13)
+    for index in range(1, 201)
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    """SQLite database with a customers table"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, revenue REAL, visits INTEGER)")
+    connection.executemany("INSERT INTO customers VALUES (?, ?, ?, ?)", ROWS)
+    connection.commit()
+    connection.close()
+    return path
+
+
+class TestRunningStats:
+    """Test suite for the online statistics"""
+
+    def test_batches_match_whole_sample(self):
+        """Test merging batches gives the statistics of the whole sample"""
+        values = [float((index * 53) % 97) for index in range(500)]
+        stats = RunningStats()
+        for start in range(0, len(values), 37):
+            stats.add_batch(values[start:start + 37])
+
+        assert stats.count == 500
+        assert stats.mean == pytest.approx(statistics.fmean(values))
+        assert stats.variance == pytest.approx(statistics.variance(values))
+        assert (stats.minimum, stats.maximum) == (min(values), max(values))
+
+
+class TestPlanExecutor:
+    """Test suite for PlanExecutor"""
+
+    @pytest.mark.parametrize("batch_size", [1, 7, 10000])
+    def test_column_statistics(self, database, batch_size):
+        """Test statistics are independent of the fetch batch size"""
+        result = PlanExecutor(database, batch_size=batch_size).execute_query(
+            "all", "SELECT * FROM customers"
+        )
+        revenue = [row[2] for row in ROWS if row[2] is not None]
+        visits = [row[3] for row in ROWS]
+
+        assert result.success
+        assert result.row_count == len(ROWS)
+        assert set(result.column_stats) == {"customer_id", "revenue", "visits"}
+        assert result.column_stats["revenue"].count == len(revenue)
+        assert result.column_stats["revenue"].mean == pytest.approx(statistics.fmean(revenue))
+        assert result.column_stats["revenue"].variance == pytest.approx(statistics.variance(revenue))
+
+        paired = [(row[2], row[3]) for row in ROWS if row[2] is not None]
+        covariance = result.covariances[("revenue", "visits")]
+        assert covariance.count == len(paired)
+        assert covariance.correlation == pytest.approx(
+            statistics.correlation([x for x, _ in paired], [y for _, y in paired])
+        )
+        assert covariance.covariance == pytest.approx(
+            statistics.covariance([x for x, _ in paired], [y for _, y in paired])
+        )
+
+    def test_preview_and_row_sink(self, database):
+        """Test only a preview is kept while the sink sees every row"""
+        seen = []
+        executor = PlanExecutor(database, batch_size=16, preview_rows=5,
+                                row_sink=lambda name, columns, rows: seen.extend(rows))
+
+        result = executor.execute_query("all", "SELECT * FROM customers")
+
+        assert result.preview == ROWS[:5]
+        assert seen == ROWS
+
+    def test_failed_query_does_not_stop_plan(self, database):
+        """Test a bad query is reported and later queries still run"""
+        plan = HypothesisDeconstructor().deconstruct_hypothesis("Revenue is higher than expected").test_plan
+        plan.sql_queries = [
+            {"name": "broken", "sql": "SELECT * FROM missing_table"},
+            {"name": "count", "sql": "SELECT COUNT(*) AS n FROM customers"},
+        ]
+
+        execution = PlanExecutor(database).execute(plan)
+
+        assert not execution.success
+        assert "missing_table" in execution.results[0].error
+        assert execution.results[1].preview == [(len(ROWS),)]
+
+    def test_database_is_read_only(self, database):
+        """Test plan queries cannot modify the data"""
+        result = PlanExecutor(database).execute_query("delete", "DELETE FROM customers")
+
+        assert not result.success
+        assert PlanExecutor(database).execute_query("n", "SELECT COUNT(*) FROM customers").preview == [(len(ROWS),)]
+
+    def test_executes_generated_plan(self, database):
+        """Test a plan generated against the schema runs end to end"""
+        plan = HypothesisDeconstructor().deconstruct_hypothesis(
+            "Customers from California are more profitable than customers from New York", SCHEMA
+        ).test_plan
+
+        execution = PlanExecutor(database).execute(plan)
+
+        assert execution.success
+        comparison = execution.results[0]
+        assert comparison.columns[0] == "state"
+        assert {row[0] for row in comparison.preview} == {"California", "New York"}
+        assert execution.to_dict()["results"][0]["row_count"] == 2
+
+    def test_invalid_batch_size(self, database):
+        """Test batch sizes below one are rejected"""
+        with pytest.raises(ValueError):
+            PlanExecutor(database, batch_size=0)
@@ -0,0 +1,182 @@
+"""
+Unit tests for the dependency-aware plan scheduler
+"""
+
+import sqlite3
+
+import pytest
+
+from core.connection_pool import PoolTimeoutError, enable_wal
+from core.hypothesis_deconstructor import HypothesisDeconstructor, StatisticalMethod, TestPlan
+from core.plan_executor import PlanExecutor
+from core.plan_scheduler import PlanScheduler, build_steps
+from core.stats_engine import StatsEngine
+
+
+SCHEMA = """
+Table: customers
+  - customer_id: INTEGER
+  - state: TEXT
+  - revenue: REAL
+  - visits: INTEGER
+"""
+
+# A recursive count that keeps SQLite busy for a noticeable time
+SLOW_SQL = """
+    WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 400000)
+    SELECT COUNT(*) FROM counter
+"""
+
+
+@pytest.fixture
+def database(tmp_path):
+    """SQLite database with a customers table"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, revenue REAL, visits INTEGER)")
+    connection.executemany("INSERT INTO customers VALUES (?, ?, ?, ?)", [
+        (index, ["California", "New York"][index % 2],
+         None if index % 17 == 0 else 100.0 + (index * 37) % 50 + 5 * (index % 2), (index * 7) % 13)
+        for index in range(1, 401)
+    ])
+    connection.commit()
+    connection.close()
+    return path
+
+
+def _plan(queries, methods=()):
+    return TestPlan(
+        hypothesis="Customers from California spend more than customers from New York",
+        required_data=["customer_data"],
+        sql_queries=queries,
+        statistical_methods=list(methods),
+        expected_outcome="",
+        confidence_threshold=0.05
+    )
+
+
+class TestBuildSteps:
+    """Test suite for the plan DAG"""
+
+    def test_stats_steps_depend_on_their_statistics_queries(self):
+        """Test each method waits only on the aggregate it is computed from"""
+        plan = HypothesisDeconstructor().deconstruct_hypothesis(
+            "Customers from California are more profitable than customers from New York", SCHEMA
+        ).test_plan
+
+        steps = {step.name: step for step in build_steps(plan)}
+
+        assert steps["comparison_analysis"].depends_on == ()
+        assert steps["stats:t_test"].depends_on == ("grouped_moments",)
+        assert steps["stats:descriptive"].depends_on == ("moments",)
+
+    def test_unknown_dependency(self):
+        plan = _plan([{"name": "a", "sql": "SELECT 1", "depends_on": "missing"}])
+
+        with pytest.raises(ValueError, match="unknown query missing"):
+            build_steps(plan)
+
+    def test_cycle(self):
+        plan = _plan([
+            {"name": "a", "sql": "SELECT 1", "depends_on": "c"},
+            {"name": "b", "sql": "SELECT 1", "depends_on": "a"},
+            {"name": "c", "sql": "SELECT 1", "depends_on": "b"},
+        ])
+
+        with pytest.raises(ValueError, match="cycle in plan: a -> c -> b -> a"):
+            build_steps(plan)
+
+
+class TestPlanScheduler:
+    """Test suite for PlanScheduler"""
+
+    def test_matches_sequential_execution(self, database):
+        """Test scheduled results equal the executor and stats engine run one by one"""
+        plan = HypothesisDeconstructor().deconstruct_hypothesis(
+            "Customers from California are more profitable than customers from New York", SCHEMA
+        ).test_plan
+
+        scheduled = PlanScheduler(database).run(plan)
+        sequential = PlanExecutor(database).execute(plan)
+        report = StatsEngine().evaluate_in_database(plan, database)
+
+        assert scheduled.success
+        assert [result.name for result in scheduled.results] == [query["name"] for query in plan.sql_queries]
+        assert [result.row_count for result in scheduled.results] == [
+            result.row_count for result in sequential.results
+        ]
+        assert scheduled.results[0].column_stats["avg_revenue"].to_dict() == \
+            sequential.results[0].column_stats["avg_revenue"].to_dict()
+        assert [result.to_dict() for result in scheduled.stats.results] == [
+            result.to_dict() for result in report.results
+        ]
+
+    def test_independent_queries_overlap(self, database):
+        """Test independent queries run at the same time"""
+        plan = _plan([{"name": f"slow_{index}", "sql": SLOW_SQL} for index in range(3)])
+
+        result = PlanScheduler(database, max_workers=3).run(plan)
+
+        timings = list(result.timings.values())
+        assert max(timing.started for timing in timings) < min(timing.finished for timing in timings)
+
+    def test_dependencies_are_ordered(self, database):
+        """Test a query starts only after the queries it depends on"""
+        plan = _plan([
+            {"name": "first", "sql": SLOW_SQL},
+            {"name": "second", "sql": "SELECT COUNT(*) FROM customers", "depends_on": "first"},
+        ])
+
+        result = PlanScheduler(database, max_workers=2).run(plan)
+
+        assert result.timings["second"].started >= result.timings["first"].finished
+
+    def test_failure_propagates_to_dependents(self, database):
+        """Test steps fed by a failing query report its error and the rest still run"""
+        plan = _plan([
+            {"name": "broken", "sql": "SELECT nope FROM customers", "statistics": "moments",
+             "variables": "revenue"},
+            {"name": "after", "sql": "SELECT 1", "depends_on": "broken"},
+            {"name": "independent", "sql": "SELECT COUNT(*) FROM customers"},
+        ], [StatisticalMethod.DESCRIPTIVE])
+
+        result = PlanScheduler(database).run(plan)
+        outcome = {query.name: query for query in result.results}
+
+        assert "no such column" in outcome["broken"].error
+        assert outcome["after"].error == outcome["broken"].error
+        assert outcome["independent"].success
+        assert result.stats.results[0].error == outcome["broken"].error
+
+    def test_raising_step_fails_only_its_dependents(self, database, monkeypatch):
+        """Test an exception outside the driver's errors fails its step instead of the run"""
+        execute_query = PlanExecutor.execute_query
+
+        def starved(executor, name, sql, parameters=()):
+            if name == "starved":
+                raise PoolTimeoutError("no connection within 1.0s")
+            return execute_query(executor, name, sql, parameters)
+
+        monkeypatch.setattr(PlanExecutor, "execute_query", starved)
+        plan = _plan([
+            {"name": "starved", "sql": "SELECT revenue FROM customers", "statistics": "moments",
+             "variables": "revenue"},
+            {"name": "after", "sql": "SELECT 1", "depends_on": "starved"},
+            {"name": "independent", "sql": "SELECT COUNT(*) FROM customers"},
+        ], [StatisticalMethod.DESCRIPTIVE])
+
+        result = PlanScheduler(database).run(plan)
+        outcome = {query.name: query for query in result.results}
+
+        assert outcome["starved"].error == "no connection within 1.0s"
+        assert outcome["after"].error == outcome["starved"].error
+        assert outcome["independent"].preview == [(400,)]
+        assert result.stats.results[0].error == outcome["starved"].error
+
+    def test_wal(self, database):
+        assert enable_wal(database) == "wal"
+
+        plan = _plan([{"name": "count", "sql": "SELECT COUNT(*) FROM customers"}])
+        result = PlanScheduler(database, wal=True).run(plan)
+
+        assert result.results[0].preview == [(400,)]
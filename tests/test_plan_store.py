@@ -0,0 +1,110 @@
+"""
+Unit tests for the persistent test plan store
+"""
+
+import sqlite3
+
+import pytest
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor, TestPlan
+from core.plan_cache import PlanCache
+from core.plan_store import PersistentPlanStore
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+class TestPersistentPlanStore:
+    """Test suite for PersistentPlanStore"""
+
+    @pytest.fixture
+    def store_path(self, tmp_path):
+        """Path of a throwaway plan store"""
+        return tmp_path / "plans.sqlite3"
+
+    def test_from_dict_round_trip(self):
+        """Test TestPlan.from_dict inverts to_dict"""
+        plan = HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan
+
+        rebuilt = TestPlan.from_dict(plan.to_dict())
+
+        assert rebuilt == plan
+
+    def test_plans_survive_a_new_process(self, store_path):
+        """Test a cold store instance answers a repeat hypothesis"""
+        first = PersistentPlanStore(store_path)
+        response = HypothesisDeconstructor(plan_cache=first).deconstruct_hypothesis(HYPOTHESIS)
+        first.close()
+
+        cold = PersistentPlanStore(store_path)
+        deconstructor = HypothesisDeconstructor(plan_cache=cold)
+        deconstructor._generate_rule_based_test_plan = None  # any rebuild would fail
+        repeat = deconstructor.deconstruct_hypothesis(HYPOTHESIS + ".")
+
+        assert repeat.success
+        assert repeat.test_plan.hypothesis == HYPOTHESIS + "."
+        assert repeat.test_plan.to_dict()["sql_queries"] == response.test_plan.to_dict()["sql_queries"]
+        assert cold.stats()["hits"] == 1
+
+    def test_other_versions_are_ignored(self, store_path):
+        """Test plans from another deconstructor version are never served"""
+        old = PersistentPlanStore(store_path, version="0")
+        old.put(HYPOTHESIS, None, HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan)
+        old.close()
+
+        current = PersistentPlanStore(store_path)
+
+        assert current.get(HYPOTHESIS) is None
+        assert len(current) == 0
+        # Opening a store does not rewrite the file; old rows wait for LRU pruning
+        with sqlite3.connect(store_path) as conn:
+            assert conn.execute("SELECT version FROM plans").fetchall() == [("0",)]
+
+    def test_sqlite_errors_do_not_fail_requests(self, store_path):
+        """Test a broken store degrades to misses and skipped writes"""
+        store = PersistentPlanStore(store_path)
+        store._conn.close()
+        deconstructor = HypothesisDeconstructor(plan_cache=store)
+
+        first = deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+        second = deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        assert first.success and second.success
+        assert second.test_plan.sql_queries == first.test_plan.sql_queries
+        assert store.get(HYPOTHESIS) is None
+        assert store.hits == 0 and store.misses == 3
+
+    def test_size_bounded_eviction(self, store_path):
+        """Test the least recently used plans are evicted past max_entries"""
+        store = PersistentPlanStore(store_path, max_entries=2)
+        deconstructor = HypothesisDeconstructor(plan_cache=store)
+
+        for hypothesis in ["Revenue is increasing", "Sales correlate with churn", "Profit is higher than plan"]:
+            deconstructor.deconstruct_hypothesis(hypothesis)
+
+        assert len(store) == 2
+        assert store.get("Revenue is increasing", variant=deconstructor.rule_based_variant) is None
+        assert store.get("Profit is higher than plan", variant=deconstructor.rule_based_variant) is not None
+
+    def test_unreadable_rows_are_dropped(self, store_path):
+        """Test a corrupt row is treated as a miss and removed"""
+        store = PersistentPlanStore(store_path)
+        store.put(HYPOTHESIS, None, HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan)
+        with sqlite3.connect(store_path) as conn:
+            conn.execute("UPDATE plans SET plan = '{\"hypothesis\": 1}'")
+
+        assert store.get(HYPOTHESIS) is None
+        assert len(store) == 0
+
+    def test_plan_cache_uses_store_as_second_tier(self, store_path):
+        """Test memory misses are promoted from the persistent tier"""
+        store = PersistentPlanStore(store_path)
+        HypothesisDeconstructor(plan_cache=PlanCache(store=store)).deconstruct_hypothesis(HYPOTHESIS)
+
+        cache = PlanCache(store=store)
+        response = HypothesisDeconstructor(plan_cache=cache).deconstruct_hypothesis(HYPOTHESIS)
+        HypothesisDeconstructor(plan_cache=cache).deconstruct_hypothesis(HYPOTHESIS)
+
+        assert response.success
+        assert cache.stats()["store_hits"] == 1
+        assert cache.stats()["hits"] == 2
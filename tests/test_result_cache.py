@@ -0,0 +1,226 @@
+"""
+Unit tests for the query result cache
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from core.plan_executor import PlanExecutor, QueryResult
+from core.result_cache import ResultCache, normalize_sql, sqlite_data_version
+
+
+@pytest.fixture
+def database(tmp_path):
+    """SQLite database with a small table"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, revenue REAL)")
+    connection.executemany("INSERT INTO customers VALUES (?, ?, ?)", [
+        (index, ["California", "New York"][index % 2], 10.0 * index) for index in range(50)
+    ])
+    connection.commit()
+    connection.close()
+    return path
+
+
+def _append_customer(database):
+    connection = sqlite3.connect(database)
+    connection.execute("INSERT INTO customers VALUES (1000, 'Texas', 1.0)")
+    connection.commit()
+    connection.close()
+
+
+def _result(name, rows=1):
+    return QueryResult(name=name, sql="SELECT 1", columns=["one"], row_count=rows, preview=[(1,)])
+
+
+class TestNormalizeSql:
+    """Test suite for SQL normalization"""
+
+    def test_whitespace_and_semicolons(self):
+        assert normalize_sql("\n  SELECT  a,\n\tb FROM t ;  ") == "SELECT a, b FROM t"
+
+    def test_literals_are_kept(self):
+        sql = "SELECT * FROM t WHERE state = 'New   York' AND \"odd  name\" = 1"
+        assert normalize_sql(sql) == sql
+
+
+class TestResultCache:
+    """Test suite for ResultCache"""
+
+    def test_hit_for_reformatted_sql(self):
+        cache = ResultCache(lambda: 1)
+        cache.put("SELECT 1", (), _result("first"))
+
+        cached = cache.get("  SELECT   1;")
+
+        assert cached.result.name == "first"
+        assert cache.stats()["hits"] == 1
+
+    def test_version_change_invalidates(self):
+        version = [1]
+        cache = ResultCache(lambda: version[0])
+        cache.put("SELECT 1", (), _result("first"))
+
+        version[0] = 2
+
+        assert cache.get("SELECT 1") is None
+        assert (cache.stats()["stale"], len(cache)) == (1, 0)
+
+    def test_parameters_and_variant_are_part_of_the_key(self):
+        cache = ResultCache(lambda: 1)
+        cache.put("SELECT ?", (1,), _result("one"), variant="a")
+
+        assert cache.get("SELECT ?", (2,), "a") is None
+        assert cache.get("SELECT ?", (1,), "b") is None
+        assert cache.get("SELECT ?", (1,), "a") is not None
+
+    def test_memory_bound_evicts_least_recently_used(self):
+        cache = ResultCache(lambda: 1, max_bytes=10000)
+        rows = [(index, "x" * 20) for index in range(20)]
+        for index in range(5):
+            cache.put(f"SELECT {index}", (), _result(str(index)), rows=rows)
+            cache.get("SELECT 0")
+
+        stats = cache.stats()
+        assert stats["bytes"] <= 10000
+        assert stats["evictions"] > 0
+        assert cache.get("SELECT 0") is not None
+        assert cache.get("SELECT 1") is None
+
+    def test_large_results_keep_only_the_summary(self):
+        cache = ResultCache(lambda: 1, max_rows_per_entry=3)
+        cache.put("SELECT 1", (), _result("big", rows=4), rows=[(1,)] * 4)
+
+        assert cache.get("SELECT 1", need_rows=True) is None
+        assert cache.get("SELECT 1").rows is None
+
+    def test_failed_results_are_not_cached(self):
+        cache = ResultCache(lambda: 1)
+        failed = _result("broken")
+        failed.error = "no such table"
+        cache.put("SELECT 1", (), failed)
+
+        assert len(cache) == 0
+
+    def test_cached_result_is_a_copy(self):
+        cache = ResultCache(lambda: 1)
+        cache.put("SELECT 1", (), _result("first"))
+
+        cache.get("SELECT 1").result.preview.append((2,))
+
+        assert cache.get("SELECT 1").result.preview == [(1,)]
+
+    def test_spill_to_disk(self, tmp_path):
+        """Test entries evicted from memory are served from the spill file"""
+        spill = tmp_path / "spill.sqlite3"
+        cache = ResultCache(lambda: 1, max_bytes=4000, spill_path=spill)
+        rows = [(index, "y" * 40) for index in range(10)]
+        cache.put("SELECT 1", (), _result("first"), rows=rows)
+        cache.put("SELECT 2", (), _result("second"), rows=rows)
+
+        assert cache.stats()["spilled"] == 1
+        cached = cache.get("SELECT 1", need_rows=True)
+
+        assert cached.rows == rows
+        assert cache.stats()["spill_hits"] == 1
+
+    def test_spilled_entries_are_plain_json(self, database, tmp_path):
+        """Test spilled results round-trip their statistics and binary values without pickle"""
+        spill = tmp_path / "spill.sqlite3"
+        cache = ResultCache(lambda: 1, max_bytes=4000, spill_path=spill)
+        executor = PlanExecutor(database, preview_rows=2)
+        summary = executor.execute_query("summary", "SELECT customer_id, revenue FROM customers")
+        executor.close()
+        rows = [(index, b"\x00\x80" * index, None, 0.1 * index) for index in range(10)]
+        cache.put("SELECT 1", (), summary, rows=rows)
+        cache.put("SELECT 2", (), _result("second"), rows=[(index, "y" * 40) for index in range(10)])
+        connection = sqlite3.connect(spill)
+        (payload,), = connection.execute("SELECT payload FROM results").fetchall()
+        connection.execute("UPDATE results SET payload = ?", (b"\x80\x04not json",))
+        connection.commit()
+        connection.close()
+
+        assert json.loads(payload)[0] == "summary"
+        assert cache.get("SELECT 1") is None
+
+        cache.put("SELECT 1", (), summary, rows=rows)
+        cache.put("SELECT 2", (), _result("second"), rows=[(index, "y" * 40) for index in range(10)])
+        cached = cache.get("SELECT 1", need_rows=True)
+
+        assert cache.stats()["spill_hits"] == 1
+        assert cached.rows == rows
+        assert cached.result.to_dict() == summary.to_dict()
+
+    def test_spilled_entries_respect_the_version(self, tmp_path):
+        version = [1]
+        cache = ResultCache(lambda: version[0], max_bytes=1500, spill_path=tmp_path / "spill.sqlite3")
+        cache.put("SELECT 1", (), _result("first"))
+        cache.put("SELECT 2", (), _result("second"))
+
+        version[0] = 2
+
+        assert cache.get("SELECT 1") is None
+        assert cache.stats()["spilled"] == 0
+
+
+class TestExecutorCaching:
+    """Test suite for result caching in PlanExecutor"""
+
+    def test_repeat_query_is_served_until_data_changes(self, database):
+        cache = ResultCache.for_sqlite(database)
+        executor = PlanExecutor(database, cache=cache)
+        sql = "SELECT state, AVG(revenue) AS avg_revenue FROM customers GROUP BY state"
+
+        first = executor.execute_query("comparison_analysis", sql)
+        second = executor.execute_query("same_sql", "  " + sql + ";")
+
+        assert second.name == "same_sql"
+        assert second.preview == first.preview
+        assert second.column_stats["avg_revenue"].to_dict() == first.column_stats["avg_revenue"].to_dict()
+        assert cache.stats()["hits"] == 1
+
+        _append_customer(database)
+        third = executor.execute_query("after_change", sql)
+
+        assert third.row_count == 3
+        assert cache.stats()["stale"] == 1
+
+    def test_rows_are_replayed_to_the_sink(self, database):
+        cache = ResultCache.for_sqlite(database)
+        batches = []
+        executor = PlanExecutor(database, batch_size=7, cache=cache,
+                                row_sink=lambda name, columns, rows: batches.append((name, list(rows))))
+        sql = "SELECT customer_id FROM customers ORDER BY customer_id"
+
+        executor.execute_query("first", sql)
+        streamed = [row for _, rows in batches for row in rows]
+        batches.clear()
+        executor.execute_query("second", sql)
+
+        assert [row for _, rows in batches for row in rows] == streamed
+        assert {name for name, _ in batches} == {"second"}
+        assert max(len(rows) for _, rows in batches) == 7
+
+    def test_summary_settings_are_not_mixed(self, database):
+        cache = ResultCache.for_sqlite(database)
+        sql = "SELECT revenue FROM customers"
+
+        PlanExecutor(database, summarize=False, cache=cache).execute_query("raw", sql)
+        summarized = PlanExecutor(database, cache=cache).execute_query("summary", sql)
+
+        assert "revenue" in summarized.column_stats
+
+    def test_data_version_tracks_the_wal(self, database):
+        connection = sqlite3.connect(database)
+        connection.execute("PRAGMA journal_mode=WAL")
+        before = sqlite_data_version(database)
+        connection.execute("INSERT INTO customers VALUES (2000, 'Ohio', 2.0)")
+        connection.commit()
+
+        assert os.path.exists(f"{database}-wal")
+        assert sqlite_data_version(database) != before
+        connection.close()
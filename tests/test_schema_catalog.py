@@ -0,0 +1,219 @@
+"""
+Unit tests for the indexed schema catalog
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.schema_catalog import (
+    Column,
+    SchemaCatalog,
+    clear_catalog_cache,
+    load_catalog,
+    parse_schema_text,
+    quote_identifier,
+)
+
+
+LISTING = """
+Database Schema:
+Table: customers
+  - customer_id: INTEGER
+  - name: TEXT
+  - state: TEXT
+  - revenue: REAL
+Table: sales
+  - sale_id: INTEGER
+  - customer_id: INTEGER
+  - amount: REAL
+  - date: TEXT
+"""
+
+DDL = """
+CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, region TEXT);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER,
+    customer_id INTEGER,
+    amount DECIMAL(10, 2),
+    discount REAL,
+    FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+);
+"""
+
+HEADLINE = "Customers from California are more profitable than customers from New York"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    """Start every test with an empty catalog cache"""
+    clear_catalog_cache()
+    yield
+    clear_catalog_cache()
+
+
+class TestSchemaParsing:
+    """Test suite for schema parsing"""
+
+    def test_parse_listing(self):
+        """Test the Table:/- column: TYPE listing format"""
+        tables = parse_schema_text(LISTING)
+
+        assert list(tables) == ["customers", "sales"]
+        assert tables["customers"][3] == Column("customers", "revenue", "REAL")
+
+    def test_parse_ddl(self):
+        """Test CREATE TABLE statements, skipping constraints and type arguments"""
+        tables = parse_schema_text(DDL)
+
+        assert [column.name for column in tables["orders"]] == ["order_id", "customer_id", "amount", "discount"]
+        assert tables["orders"][2].type == "DECIMAL"
+
+    def test_load_sqlite_file(self, tmp_path):
+        """Test a SQLite database path is read table by table"""
+        path = str(tmp_path / "warehouse.db")
+        connection = sqlite3.connect(path)
+        connection.executescript(DDL)
+        connection.close()
+
+        catalog = load_catalog(path, [str(tmp_path)])
+
+        assert set(catalog.tables) == {"customers", "orders"}
+        assert catalog.columns_for("discount") == [Column("orders", "discount", "REAL")]
+
+    def test_sqlite_paths_need_an_allowed_directory(self, tmp_path):
+        """Test a database path is not opened unless its directory is allow-listed"""
+        allowed, other = tmp_path / "allowed", tmp_path / "other"
+        allowed.mkdir()
+        other.mkdir()
+        path = str(other / "warehouse.db")
+        connection = sqlite3.connect(path)
+        connection.executescript(DDL)
+        connection.close()
+
+        assert load_catalog(path) is None
+        assert load_catalog(path, [str(allowed)]) is None
+        assert load_catalog(str(allowed / ".." / "other" / "warehouse.db"), [str(allowed)]) is None
+        assert load_catalog(path, [str(other)]) is not None
+
+        deconstructor = HypothesisDeconstructor()
+        assert deconstructor._load_catalog(path) is None
+        assert HypothesisDeconstructor(schema_database_dirs=[str(other)])._load_catalog(path) is not None
+
+    def test_altered_sqlite_file_is_reread(self, tmp_path):
+        """Test the cache notices a changed database file"""
+        path = str(tmp_path / "warehouse.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE a (x INTEGER)")
+        connection.commit()
+        first = load_catalog(path, [str(tmp_path)])
+
+        connection.execute("CREATE TABLE b (y INTEGER)")
+        connection.commit()
+        connection.close()
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+        assert set(load_catalog(path, [str(tmp_path)]).tables) == {"a", "b"}
+        assert set(first.tables) == {"a"}
+
+    def test_catalog_is_cached_by_content(self):
+        """Test equal schema text is parsed once"""
+        assert load_catalog(LISTING) is load_catalog("".join(LISTING))
+        assert load_catalog(None) is None
+        assert load_catalog("no tables here") is None
+
+    def test_quote_identifier(self):
+        """Test unusual identifiers are quoted"""
+        assert quote_identifier("revenue") == "revenue"
+        assert quote_identifier('Net "Sales"') == '"Net ""Sales"""'
+
+
+class TestSchemaCatalog:
+    """Test suite for SchemaCatalog lookups"""
+
+    @pytest.fixture
+    def catalog(self):
+        """Catalog of the DDL schema"""
+        return SchemaCatalog(parse_schema_text(DDL))
+
+    def test_synonyms_and_tokens(self, catalog):
+        """Test entities resolve through synonyms and name tokens"""
+        assert catalog.columns_for("revenue") == [Column("orders", "amount", "DECIMAL")]
+        assert catalog.columns_for("state") == [Column("customers", "region", "TEXT")]
+        assert catalog.tables_for("sales_data") == ["orders"]
+        assert catalog.tables_for("customer") == ["customers"]
+
+    def test_resolve_joins_tables(self, catalog):
+        """Test terms spread over two tables resolve to joinable columns"""
+        resolved = catalog.resolve(["revenue", "state"])
+
+        assert resolved["revenue"].qualified_name == "orders.amount"
+        assert resolved["state"].qualified_name == "customers.region"
+        assert catalog.join_key("orders", "customers") == "customer_id"
+
+    def test_time_columns(self):
+        """Test date columns are found by type or by name"""
+        catalog = SchemaCatalog(parse_schema_text(LISTING + "  - created_at: TIMESTAMP\n  - fiscal_year: INTEGER\n"))
+
+        assert [column.name for column in catalog.time_columns("sales")] == ["date", "created_at", "fiscal_year"]
+        assert catalog.time_columns("customers") == []
+
+    def test_resolve_prefers_single_table(self):
+        """Test a table holding every term wins over a join"""
+        catalog = SchemaCatalog(parse_schema_text(LISTING))
+
+        resolved = catalog.resolve(["revenue", "state"], numeric_first=True)
+
+        assert {column.table for column in resolved.values()} == {"customers"}
+
+    def test_large_warehouse(self):
+        """Test lookups on a warehouse with thousands of tables"""
+        tables = {
+            f"fact_{index}": [Column(f"fact_{index}", f"metric_{index}", "REAL"), Column(f"fact_{index}", "day", "TEXT")]
+            for index in range(10000)
+        }
+        tables["customers"] = list(parse_schema_text(LISTING)["customers"])
+        catalog = SchemaCatalog(tables)
+
+        assert catalog.columns_for("metric_9876") == [Column("fact_9876", "metric_9876", "REAL")]
+        assert catalog.resolve(["revenue", "state"])["state"].table == "customers"
+
+
+class TestCatalogSqlGeneration:
+    """Test suite for SQL generated against a schema catalog"""
+
+    @pytest.fixture
+    def deconstructor(self):
+        """Create a HypothesisDeconstructor instance for testing"""
+        return HypothesisDeconstructor()
+
+    def test_comparison_uses_real_columns(self, deconstructor):
+        """Test a comparison query targets the schema's table and columns"""
+        sql = deconstructor.deconstruct_hypothesis(HEADLINE, LISTING).test_plan.sql_queries[0]["sql"]
+
+        assert "FROM customers" in sql
+        assert "AVG(revenue)" in sql
+        assert "GROUP BY state" in sql
+
+    def test_comparison_joins_across_tables(self, deconstructor):
+        """Test metric and dimension in different tables are joined"""
+        sql = deconstructor.deconstruct_hypothesis(HEADLINE, DDL).test_plan.sql_queries[0]["sql"]
+
+        assert "orders JOIN customers ON orders.customer_id = customers.customer_id" in sql
+        assert "AVG(orders.amount)" in sql
+
+    def test_correlation_selects_numeric_columns(self, deconstructor):
+        """Test a correlation query selects the measure and its numeric neighbours"""
+        entities = deconstructor._extract_entities("Revenue correlates with discount")
+        queries = deconstructor._generate_sql_queries(entities, "correlation", load_catalog(DDL))
+
+        assert "amount,\n                    discount" in queries[0]["sql"]
+        assert "FROM orders" in queries[0]["sql"]
+
+    def test_unresolvable_schema_falls_back_to_templates(self, deconstructor):
+        """Test schemas without the needed columns keep the generic templates"""
+        response = deconstructor.deconstruct_hypothesis(HEADLINE, "Table: logs\n  - line: TEXT")
+
+        assert "customer_sales_data" in response.test_plan.sql_queries[0]["sql"]
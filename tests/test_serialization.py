@@ -0,0 +1,126 @@
+"""
+Unit tests for test plan serialization
+"""
+
+import json
+
+import pytest
+
+from core import serialization
+from core.hypothesis_deconstructor import HypothesisDeconstructor, TestPlan
+from core.serialization import (
+    PLAN_SCHEMA_VERSION,
+    SerializationError,
+    decode_binary,
+    decode_json,
+    decode_plan,
+    encode_binary,
+    encode_json,
+)
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+@pytest.fixture
+def plan():
+    return HypothesisDeconstructor().deconstruct_hypothesis(HYPOTHESIS).test_plan
+
+
+class TestSerialization:
+    """Test suite for the plan encodings"""
+
+    def test_json_round_trip(self, plan):
+        """Test JSON encoding is versioned and inverts exactly"""
+        payload = encode_json(plan)
+
+        assert json.loads(payload)["schema_version"] == PLAN_SCHEMA_VERSION
+        assert decode_json(payload) == plan
+        assert decode_json(payload.decode("utf-8")) == plan
+        assert decode_json(encode_json(plan.freeze())) == plan
+
+    def test_json_matches_standard_library(self, plan, monkeypatch):
+        """Test the orjson and json writers produce the same document"""
+        fast = encode_json(plan)
+        monkeypatch.setattr(serialization, "orjson", None)
+
+        assert json.loads(encode_json(plan)) == json.loads(fast)
+        assert decode_json(fast) == plan
+
+    def test_binary_round_trip(self, plan):
+        """Test the MessagePack encoding inverts exactly and is smaller than JSON"""
+        payload = encode_binary(plan)
+
+        assert payload[:1] == b"\x87"
+        assert decode_binary(payload) == plan
+        assert encode_binary(plan.freeze()) == payload
+        assert len(payload) < len(encode_json(plan))
+
+    def test_binary_value_types(self):
+        """Test the reader handles every width the msgpack writer may choose"""
+        samples = {
+            b"\x05": 5, b"\xff": -1, b"\xcc\xc8": 200, b"\xcd\x01\x00": 256,
+            b"\xd0\x80": -128, b"\xd1\xff\x7f": -129, b"\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00": 1.5,
+            b"\xc0": None, b"\xc3": True, b"\xd9\x20" + b"x" * 32: "x" * 32,
+            b"\xdc\x00\x10" + b"\x01" * 16: [1] * 16,
+        }
+        for data, value in samples.items():
+            assert serialization._unpack(data, 0, 0) == (value, len(data))
+
+    def test_decode_plan_detects_format(self, plan):
+        """Test either encoding, and legacy to_dict JSON, decode through one entry point"""
+        legacy = json.dumps(plan.to_dict())
+
+        assert decode_plan(encode_binary(plan)) == plan
+        assert decode_plan(encode_json(plan)) == plan
+        assert decode_plan(legacy) == plan
+
+    def test_newer_schema_is_rejected(self, plan):
+        """Test payloads from a future schema version are refused"""
+        payload = dict(plan.to_dict(), schema_version=PLAN_SCHEMA_VERSION + 1)
+
+        with pytest.raises(SerializationError, match="newer than supported"):
+            decode_json(json.dumps(payload))
+
+    def test_malformed_payloads(self, plan):
+        """Test corrupt data raises SerializationError, a ValueError"""
+        binary = encode_binary(plan)
+
+        for data in (b"{not json", binary[:-5], binary + b"\x00", b"\xc1"):
+            with pytest.raises(SerializationError):
+                decode_plan(data)
+        with pytest.raises(ValueError):
+            decode_plan(json.dumps([plan.to_dict()]))
+
+    def test_hostile_binary_payloads(self):
+        """Test unhashable map keys and deep nesting are SerializationErrors"""
+        for data in (b"\x81\x90\x00", b"\x81\x80\x00", b"\x91" * 100000 + b"\x00"):
+            with pytest.raises(SerializationError):
+                decode_binary(data)
+
+
+class TestPlanValidation:
+    """Test suite for TestPlan.from_dict validation"""
+
+    @pytest.mark.parametrize("change, message", [
+        ({"hypothesis": 1}, "hypothesis must be a str"),
+        ({"required_data": "sales"}, "required_data must be a list"),
+        ({"required_data": ["sales", None]}, "only strings"),
+        ({"sql_queries": [{"name": "q"}]}, "need a name and sql"),
+        ({"sql_queries": [{"name": "q", "sql": 3}]}, "strings to strings"),
+        ({"statistical_methods": ["t_test", "magic"]}, "unknown statistical method"),
+        ({"confidence_threshold": 0}, "confidence_threshold"),
+        ({"confidence_threshold": True}, "confidence_threshold"),
+    ])
+    def test_invalid_fields(self, plan, change, message):
+        """Test each malformed field is reported by name"""
+        with pytest.raises(ValueError, match=message):
+            TestPlan.from_dict({**plan.to_dict(), **change})
+
+    def test_missing_field(self, plan):
+        """Test a missing required field is reported"""
+        data = plan.to_dict()
+        del data["expected_outcome"]
+
+        with pytest.raises(ValueError, match="missing expected_outcome"):
+            TestPlan.from_dict(data)
@@ -0,0 +1,125 @@
+"""
+Unit tests for the hypothesis deconstruction HTTP service
+"""
+
+import sqlite3
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+import core.hypothesis_deconstructor as hd_module
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.metrics import DeconstructorMetrics
+from core.service import MAX_BATCH_SIZE, create_app
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+class TestService:
+    """Test suite for the FastAPI service"""
+
+    @pytest.fixture
+    def client(self):
+        """Create a test client; entering it runs the startup warm-up"""
+        with TestClient(create_app(HypothesisDeconstructor())) as client:
+            yield client
+
+    def test_startup_without_transformers(self, client):
+        """Test a model that cannot be loaded is reported as unavailable, never ready"""
+        client.app.state.deconstructor.start_model_initialization().result(timeout=5)
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert response.json()["model_ready"] is False
+        assert response.json()["model_status"] == "unavailable"
+        assert client.get("/ready", params={"model": "true"}).status_code == 503
+        assert client.post("/deconstruct", json={"hypothesis": HYPOTHESIS}).json()["success"]
+
+    def test_requests_are_served_while_the_model_loads(self, monkeypatch):
+        """Test startup does not wait for the model and /ready reports it"""
+        monkeypatch.setattr(hd_module, "TRANSFORMERS_AVAILABLE", True)
+        for name in ("AutoTokenizer", "AutoModelForCausalLM", "pipeline"):
+            monkeypatch.setattr(hd_module, name, MagicMock(), raising=False)
+        loading = threading.Event()
+        deconstructor = HypothesisDeconstructor()
+        load_model = deconstructor._load_model
+
+        def slow_load():
+            loading.wait(5)
+            return load_model()
+
+        deconstructor._load_model = slow_load
+        with TestClient(create_app(deconstructor)) as client:
+            assert client.get("/ready").status_code == 200
+            assert client.get("/ready", params={"model": "true"}).status_code == 503
+            assert client.get("/ready").json()["status"] == "loading"
+            assert client.post("/deconstruct", json={"hypothesis": HYPOTHESIS}).json()["success"]
+
+            loading.set()
+            deconstructor.start_model_initialization().result(timeout=5)
+            response = client.get("/ready", params={"model": "true"})
+
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+
+    def test_deconstruct(self, client):
+        """Test a single hypothesis is deconstructed"""
+        response = client.post("/deconstruct", json={"hypothesis": HYPOTHESIS})
+
+        body = response.json()
+        assert response.status_code == 200
+        assert body["success"]
+        assert body["test_plan"]["hypothesis"] == HYPOTHESIS
+        assert body["test_plan"]["statistical_methods"] == ["t_test", "descriptive"]
+
+    def test_schema_paths_are_not_opened(self, client, tmp_path):
+        """Test a schema_context naming a local database is treated as text"""
+        path = tmp_path / "warehouse.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE ledger (customer_id INTEGER, state TEXT, revenue REAL)")
+        connection.close()
+
+        body = client.post("/deconstruct", json={"hypothesis": HYPOTHESIS, "schema_context": str(path)}).json()
+
+        assert body["success"]
+        assert all("ledger" not in query["sql"] for query in body["test_plan"]["sql_queries"])
+
+    def test_deconstruct_empty(self, client):
+        """Test empty hypotheses return an error response, not an HTTP error"""
+        body = client.post("/deconstruct", json={"hypothesis": ""}).json()
+
+        assert not body["success"]
+        assert body["error"] == "EMPTY_HYPOTHESIS"
+
+    def test_deconstruct_validation(self, client):
+        """Test malformed bodies are rejected"""
+        assert client.post("/deconstruct", json={}).status_code == 422
+
+    def test_deconstruct_batch(self, client):
+        """Test batches keep input order"""
+        hypotheses = [HYPOTHESIS, "", "Revenue is increasing over time"]
+
+        body = client.post("/deconstruct/batch", json={"hypotheses": hypotheses}).json()
+
+        assert [r["success"] for r in body["responses"]] == [True, False, True]
+        assert body["responses"][2]["test_plan"]["hypothesis"] == hypotheses[2]
+
+    def test_deconstruct_batch_limit(self, client):
+        """Test oversized batches are refused"""
+        response = client.post("/deconstruct/batch", json={"hypotheses": ["x"] * (MAX_BATCH_SIZE + 1)})
+
+        assert response.status_code == 413
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves the deconstructor's counters in the text format"""
+        engine = HypothesisDeconstructor(metrics=DeconstructorMetrics(sample_every=1))
+        with TestClient(create_app(engine)) as client:
+            client.post("/deconstruct", json={"hypothesis": HYPOTHESIS})
+            response = client.get("/metrics")
+
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'deconstructor_requests_total{path="rule_based",pattern="segment"} 1' in response.text
+        assert 'deconstructor_stage_seconds_count{stage="total"} 1' in response.text
@@ -0,0 +1,105 @@
+"""
+Unit tests for the Tauri sidecar worker
+"""
+
+import io
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import core
+from core.sidecar import ProtocolError, Sidecar, read_frame, write_frame
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+
+def _frames(*messages):
+    stream = io.BytesIO()
+    for message in messages:
+        write_frame(stream, message)
+    stream.seek(0)
+    return stream
+
+
+def _read_all(stream):
+    stream.seek(0)
+    responses = []
+    while True:
+        frame = read_frame(stream)
+        if frame is None:
+            return responses
+        responses.append(frame)
+
+
+class TestSidecar:
+    """Test suite for the sidecar protocol and dispatch"""
+
+    @pytest.fixture
+    def sidecar(self):
+        """Create a Sidecar instance"""
+        return Sidecar()
+
+    def test_frame_round_trip(self):
+        """Test frames are length prefixed and decode to the same message"""
+        stream = _frames({"id": 1, "method": "ping"})
+
+        assert struct.unpack(">I", stream.getvalue()[:4])[0] == len(stream.getvalue()) - 4
+        assert read_frame(stream) == {"id": 1, "method": "ping"}
+        assert read_frame(stream) is None
+
+    def test_truncated_frame(self):
+        """Test truncated frames raise ProtocolError"""
+        with pytest.raises(ProtocolError):
+            read_frame(io.BytesIO(struct.pack(">I", 10) + b"{}"))
+
+    def test_pipelined_requests(self, sidecar):
+        """Test several queued requests each get a response in order"""
+        stdin = _frames(
+            {"id": 1, "method": "ping"},
+            {"id": 2, "method": "deconstruct", "params": {"hypothesis": HYPOTHESIS}},
+            {"id": 3, "method": "deconstruct_batch", "params": {"hypotheses": [HYPOTHESIS, ""]}},
+        )
+        stdout = io.BytesIO()
+
+        sidecar.serve(stdin, stdout)
+        responses = _read_all(stdout)
+
+        assert [r["id"] for r in responses] == [1, 2, 3]
+        assert responses[0]["result"] == "pong"
+        assert responses[1]["result"]["success"]
+        assert responses[1]["result"]["test_plan"]["hypothesis"] == HYPOTHESIS
+        batch = responses[2]["result"]["responses"]
+        assert batch[0]["success"]
+        assert batch[1]["error"] == "EMPTY_HYPOTHESIS"
+
+    def test_errors_are_returned_per_request(self, sidecar):
+        """Test bad requests produce error responses without stopping the worker"""
+        assert sidecar.handle({"id": 7, "method": "nope"})["error"]["code"] == "UNKNOWN_METHOD"
+        assert sidecar.handle({"id": 8})["error"]["code"] == "INVALID_REQUEST"
+        assert sidecar.handle({"id": 9, "method": "deconstruct", "params": []})["error"]["code"] == "INVALID_PARAMS"
+        assert sidecar.handle({"id": 10, "method": "ping"})["result"] == "pong"
+
+    def test_subprocess_worker(self):
+        """Test the worker answers framed requests over real stdin/stdout"""
+        ai_core_dir = Path(core.__file__).resolve().parent.parent
+        stdin = _frames(
+            {"id": 1, "method": "hello"},
+            {"id": 2, "method": "deconstruct", "params": {"hypothesis": HYPOTHESIS}},
+        ).getvalue()
+
+        completed = subprocess.run(
+            [sys.executable, "-m", "core.sidecar"],
+            cwd=ai_core_dir,
+            input=stdin,
+            capture_output=True,
+            timeout=60,
+            check=True,
+        )
+        responses = _read_all(io.BytesIO(completed.stdout))
+
+        assert responses[0] == {"id": 1, "result": "Hello from ai_core"}
+        assert responses[1]["result"]["success"]
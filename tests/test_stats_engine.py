@@ -0,0 +1,423 @@
+"""
+Unit tests for the vectorized statistics engine
+"""
+
+import json
+import math
+import sqlite3
+import statistics
+import time
+
+import numpy as np
+import pytest
+
+from core.distributions import betainc, chi2_sf, f_sf, t_two_sided_p
+from core.entity_extractor import DEFAULT_VOCABULARY_PATH, EntityExtractor
+from core.hypothesis_deconstructor import HypothesisDeconstructor, StatisticalMethod, TestPlan
+from core.stats_engine import ColumnData, StatsEngine, collect_columns
+from core.sufficient_statistics import contingency_query
+
+
+def _plan(methods, threshold=0.05):
+    return TestPlan(
+        hypothesis="Customers from California spend more than customers from New York",
+        required_data=["customer_data"],
+        sql_queries=[],
+        statistical_methods=methods,
+        expected_outcome="",
+        confidence_threshold=threshold
+    )
+
+
+class TestDistributions:
+    """Test suite for the tail probability functions"""
+
+    def test_known_critical_values(self):
+        """Test p-values at textbook critical values"""
+        assert t_two_sided_p(2.228139, 10) == pytest.approx(0.05, abs=1e-6)
+        assert f_sf(3.492828, 2, 20) == pytest.approx(0.05, abs=1e-6)
+        assert chi2_sf(3.841459, 1) == pytest.approx(0.05, abs=1e-6)
+        assert chi2_sf(11.070498, 5) == pytest.approx(0.05, abs=1e-6)
+        assert betainc(2, 3, 0.4) == pytest.approx(0.5248)
+
+    def test_edges(self):
+        """Test degenerate statistics"""
+        assert t_two_sided_p(0.0, 5) == pytest.approx(1.0)
+        assert t_two_sided_p(float("inf"), 5) == 0.0
+        assert f_sf(0.0, 1, 1) == 1.0
+        assert chi2_sf(0.0, 3) == 1.0
+
+
+class TestStatsEngine:
+    """Test suite for StatsEngine"""
+
+    @pytest.fixture
+    def engine(self):
+        return StatsEngine()
+
+    @pytest.fixture
+    def grouped(self):
+        """Two groups of spend with a clear difference"""
+        rows = [("California", 10.0 + index % 5) for index in range(40)]
+        rows += [("New York", 8.0 + index % 5) for index in range(30)]
+        rows.append((None, 100.0))
+        return ColumnData.from_rows(["state", "spend"], rows)
+
+    def test_welch_t_test(self, engine, grouped):
+        """Test Welch's t statistic and its p-value"""
+        california = [10.0 + index % 5 for index in range(40)]
+        new_york = [8.0 + index % 5 for index in range(30)]
+        se2 = statistics.variance(california) / 40 + statistics.variance(new_york) / 30
+        expected_t = (statistics.fmean(california) - statistics.fmean(new_york)) / se2 ** 0.5
+
+        result = engine.run_method(StatisticalMethod.T_TEST, grouped)
+
+        assert result.statistic == pytest.approx(expected_t)
+        assert result.details["groups"] == ["California", "New York"]
+        assert result.p_value < 1e-6
+        assert result.significant
+
+    def test_anova(self, engine):
+        """Test one-way ANOVA on a textbook example"""
+        data = ColumnData.from_rows(
+            ["group", "value"],
+            [(group, value) for group, values in (("a", [1, 2, 3]), ("b", [4, 5, 6]), ("c", [7, 8, 9]))
+             for value in values]
+        )
+
+        result = engine.run_method(StatisticalMethod.ANOVA, data)
+
+        assert result.statistic == pytest.approx(27.0)
+        assert result.p_value == pytest.approx(0.001)
+
+    def test_chi_square(self, engine):
+        """Test chi-square independence on a 2x2 table"""
+        rows = [("ca", "yes")] * 10 + [("ca", "no")] * 20 + [("ny", "yes")] * 20 + [("ny", "no")] * 10
+        data = ColumnData.from_rows(["state", "renewed"], rows)
+
+        result = engine.run_method(StatisticalMethod.CHI_SQUARE, data)
+
+        assert result.statistic == pytest.approx(20 / 3)
+        assert result.p_value == pytest.approx(0.009823, abs=1e-5)
+
+    def test_correlation_and_regression(self, engine):
+        """Test Pearson correlation and simple regression agree with the stdlib"""
+        xs = [float(index) for index in range(50)]
+        ys = [2.0 * x + (x * 7) % 5 for x in xs]
+        data = ColumnData.from_rows(["customer_id", "visits", "revenue"],
+                                    [(index, x, y) for index, (x, y) in enumerate(zip(xs, ys))])
+
+        correlation = engine.run_method(StatisticalMethod.CORRELATION, data)
+        regression = engine.run_method(StatisticalMethod.REGRESSION, data, roles={"y": "revenue"})
+
+        assert correlation.details["columns"] == ["visits", "revenue"]
+        assert correlation.statistic == pytest.approx(statistics.correlation(xs, ys))
+        slope, intercept = statistics.linear_regression(xs, ys)
+        assert regression.details["coefficients"]["visits"] == pytest.approx(slope)
+        assert regression.details["intercept"] == pytest.approx(intercept)
+        assert regression.p_value == pytest.approx(correlation.p_value, rel=1e-6)
+
+    def test_trend_regresses_on_row_order(self, engine):
+        """Test a single ordered measure is regressed on its position"""
+        data = ColumnData.from_rows(["revenue"], [(float(index) * 3 + 1,) for index in range(20)])
+
+        result = engine.run_method(StatisticalMethod.REGRESSION, data)
+
+        assert result.details["predictors"] == ["row_order"]
+        assert result.details["coefficients"]["row_order"] == pytest.approx(3.0)
+
+    def test_descriptive_and_missing_columns(self, engine, grouped):
+        """Test descriptive output and methods the data cannot support"""
+        descriptive = engine.run_method(StatisticalMethod.DESCRIPTIVE, grouped)
+        chi_square = engine.run_method(StatisticalMethod.CHI_SQUARE, grouped)
+
+        assert descriptive.details["columns"]["spend"]["count"] == 71
+        assert descriptive.significant is None
+        assert chi_square.error is not None
+        assert chi_square.significant is None
+
+    def test_evaluate_uses_confidence_threshold(self, engine, grouped):
+        """Test significance is judged against the plan's threshold"""
+        lenient = engine.evaluate(_plan([StatisticalMethod.T_TEST, StatisticalMethod.DESCRIPTIVE]), grouped)
+        strict = engine.evaluate(_plan([StatisticalMethod.T_TEST], threshold=1e-30), grouped)
+
+        assert lenient.supported is True
+        assert strict.supported is False
+        assert lenient.to_dict()["results"][0]["method"] == "t_test"
+        assert json.loads(json.dumps(lenient.to_dict()))["supported"] is True
+
+    def test_collect_columns_from_sqlite(self, engine, tmp_path):
+        """Test query results are collected column-wise with NULLs preserved"""
+        path = tmp_path / "warehouse.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE sales (state TEXT, amount REAL)")
+        connection.executemany("INSERT INTO sales VALUES (?, ?)",
+                               [(None, None)] * 3 + [("CA", 5.0), ("NY", None), ("CA", 7.0)])
+        connection.commit()
+        connection.close()
+
+        data = collect_columns(path, "SELECT state, amount FROM sales", batch_size=2)
+
+        codes, labels = data.categorical["state"]
+        assert labels == ["CA", "NY"]
+        assert codes.tolist() == [-1, -1, -1, 0, 1, 0]
+        assert np.isnan(data.numeric["amount"]).sum() == 4
+
+    def test_million_rows_well_under_a_second(self, engine):
+        """Test a grouped test over a million rows is vectorized"""
+        rng = np.random.default_rng(0)
+        size = 1_000_000
+        data = ColumnData(
+            numeric={"revenue": rng.normal(100.0, 15.0, size)},
+            categorical={"state": (rng.integers(0, 2, size), ["CA", "NY"])},
+            order=["state", "revenue"],
+        )
+
+        start = time.perf_counter()
+        for method in (StatisticalMethod.T_TEST, StatisticalMethod.ANOVA, StatisticalMethod.REGRESSION):
+            assert engine.run_method(method, data).error is None
+        assert time.perf_counter() - start < 1.0
+
+
+class TestSufficientStatistics:
+    """Test suite for tests computed from SQL aggregates"""
+
+    SCHEMA = """
+    Table: customers
+      - customer_id: INTEGER
+      - state: TEXT
+      - tier: TEXT
+      - revenue: REAL
+      - visits: INTEGER
+    """
+
+    @pytest.fixture
+    def database(self, tmp_path):
+        """Customers with revenue depending on state and visits"""
+        rng = np.random.default_rng(3)
+        rows = []
+        for index in range(5000):
+            state = ["California", "New York", "Texas"][index % 3]
+            visits = int(rng.integers(0, 20))
+            revenue = None if index % 97 == 0 else float(
+                1000.0 + 2.0 * visits + (5.0 if state == "California" else 0.0) + rng.normal(0, 10)
+            )
+            rows.append((index, state, ["gold", "silver"][index % 2], revenue, visits))
+        path = tmp_path / "warehouse.db"
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE customers (customer_id INTEGER, state TEXT, tier TEXT, revenue REAL, visits INTEGER)"
+        )
+        connection.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?)", rows)
+        connection.commit()
+        connection.close()
+        return path
+
+    @pytest.fixture
+    def engine(self):
+        return StatsEngine()
+
+    def _plan(self, hypothesis):
+        return HypothesisDeconstructor().deconstruct_hypothesis(hypothesis, self.SCHEMA).test_plan
+
+    def test_generator_tags_statistics_queries(self):
+        """Test plans carry aggregate queries for their methods"""
+        plan = self._plan("Customers from California are more profitable than customers from New York")
+        kinds = {query.get("statistics"): query for query in plan.sql_queries}
+
+        assert kinds["grouped_moments"]["variables"] == "revenue"
+        assert "(1.0 * revenue - (SELECT revenue FROM customers" in kinds["grouped_moments"]["sql"]
+        assert "moments" in kinds
+        assert plan.sql_queries[0]["name"] == "comparison_analysis"
+
+    def test_pushdown_matches_raw_rows(self, engine, database):
+        """Test tests from aggregates equal tests from the raw rows"""
+        plan = self._plan("Customers from California are more profitable than customers from New York")
+        raw = collect_columns(
+            database, "SELECT state, revenue FROM customers WHERE state IN ('California', 'New York')"
+        )
+
+        pushed = engine.evaluate_in_database(plan, database)
+        direct = engine.evaluate(plan, raw)
+
+        for from_sql, from_rows in zip(pushed.results, direct.results):
+            assert from_sql.error is None
+            assert from_sql.statistic == from_rows.statistic or from_sql.statistic == pytest.approx(from_rows.statistic)
+            assert from_sql.p_value == from_rows.p_value or from_sql.p_value == pytest.approx(from_rows.p_value)
+        assert pushed.results[1].details["columns"]["revenue"]["mean"] == pytest.approx(
+            direct.results[1].details["columns"]["revenue"]["mean"]
+        )
+
+    def test_large_offset_keeps_variance(self, engine, tmp_path):
+        """Test sums shifted by a pivot keep the spread of values far from zero"""
+        rng = np.random.default_rng(5)
+        states = ["California", "New York"] * 500
+        revenue = 1e9 + rng.normal(0.0, 0.01, len(states)) + np.where(np.array(states) == "California", 0.005, 0.0)
+        visits = 1e8 + 2.0 * (revenue - 1e9) + rng.normal(0.0, 0.001, len(states))
+        path = tmp_path / "offset.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, tier TEXT, revenue REAL, visits INTEGER)")
+        connection.executemany("INSERT INTO customers (state, revenue, visits) VALUES (?, ?, ?)",
+                               zip(states, revenue.tolist(), visits.tolist()))
+        connection.commit()
+        connection.close()
+        comparison = self._plan("Customers from California are more profitable than customers from New York")
+        correlation = self._plan("Revenue correlates with visits")
+
+        t_test, descriptive = engine.evaluate_in_database(comparison, path).results
+        pearson = engine.evaluate_in_database(correlation, path).results[0]
+        raw = collect_columns(path, "SELECT state, revenue FROM customers")
+        in_memory = engine.evaluate(comparison, raw).results[0]
+        first, second = (revenue[np.array(states) == state] - 1e9 for state in ("California", "New York"))
+        exact = (first.mean() - second.mean()) / math.sqrt(
+            first.var(ddof=1) / len(first) + second.var(ddof=1) / len(second)
+        )
+
+        assert descriptive.details["columns"]["revenue"]["stddev"] == pytest.approx(np.std(revenue, ddof=1), rel=1e-4)
+        assert t_test.statistic == pytest.approx(exact, rel=1e-4)
+        assert in_memory.statistic == pytest.approx(exact, rel=1e-4)
+        assert pearson.statistic == pytest.approx(np.corrcoef(revenue, visits)[0, 1], rel=1e-4)
+
+    def test_named_groups_are_compared(self, engine, tmp_path):
+        """Test the t-test compares the groups the hypothesis names, not the largest ones"""
+        rows = [(state, float(revenue))
+                for state, size, revenue in [("Texas", 300, 50), ("Florida", 200, 10),
+                                             ("California", 40, 100), ("New York", 30, 90)]
+                for revenue in range(revenue, revenue + size)]
+        path = tmp_path / "skewed.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, tier TEXT, revenue REAL, visits INTEGER)")
+        connection.executemany("INSERT INTO customers (state, revenue) VALUES (?, ?)", rows)
+        connection.commit()
+        connection.close()
+        plan = self._plan("Customers from California are more profitable than customers from New York")
+        grouped = next(query for query in plan.sql_queries if query.get("statistics") == "grouped_moments")
+
+        t_test, descriptive = engine.evaluate_in_database(plan, path).results
+
+        assert grouped["groups"] == "California,New York"
+        assert "IN ('California', 'New York')" in grouped["sql"]
+        assert t_test.details["groups"] == ["California", "New York"]
+        assert t_test.details["counts"] == [40, 30]
+        assert descriptive.details["columns"]["revenue"]["count"] == 70
+
+    def test_named_group_without_rows(self, engine, database):
+        vocabulary = json.loads(DEFAULT_VOCABULARY_PATH.read_text())
+        geography = next(concept for concept in vocabulary["concepts"] if concept["name"] == "geography")
+        geography["terms"].append("Oregon")
+        deconstructor = HypothesisDeconstructor(entity_extractor=EntityExtractor.from_dict(vocabulary))
+        plan = deconstructor.deconstruct_hypothesis(
+            "Customers from California are more profitable than customers from Oregon", self.SCHEMA
+        ).test_plan
+
+        t_test = engine.evaluate_in_database(plan, database).results[0]
+
+        assert "Oregon" in t_test.error
+
+    def test_co_moment_pushdown_matches_raw_rows(self, engine, database):
+        """Test correlation and regression from cross-products equal the raw computation"""
+        plan = self._plan("Revenue correlates with visits")
+        raw = collect_columns(database, "SELECT revenue, visits FROM customers")
+
+        pushed = engine.evaluate_in_database(plan, database)
+        direct = engine.evaluate(plan, raw)
+
+        assert [result.method for result in pushed.results] == [
+            StatisticalMethod.CORRELATION, StatisticalMethod.REGRESSION
+        ]
+        for from_sql, from_rows in zip(pushed.results, direct.results):
+            assert from_sql.statistic == pytest.approx(from_rows.statistic, rel=1e-9)
+        assert pushed.results[1].details["coefficients"]["visits"] == pytest.approx(2.0, abs=0.1)
+
+    def test_trend_pushdown_matches_raw_rows(self, engine, database):
+        """Test a trend without a time column is regressed on insertion order"""
+        plan = self._plan("Revenue is increasing over time")
+        raw = collect_columns(database, "SELECT revenue FROM customers ORDER BY rowid")
+
+        pushed = engine.evaluate_in_database(plan, database)
+        direct = engine.evaluate(plan, raw)
+
+        assert [result.method for result in pushed.results] == [
+            StatisticalMethod.REGRESSION, StatisticalMethod.DESCRIPTIVE
+        ]
+        assert pushed.results[0].statistic == pytest.approx(direct.results[0].statistic, rel=1e-6)
+        assert pushed.results[0].details["coefficients"]["row_order"] == pytest.approx(
+            direct.results[0].details["coefficients"]["row_order"], rel=1e-6
+        )
+        assert pushed.results[1].details["columns"]["revenue"]["mean"] == pytest.approx(
+            direct.results[1].details["columns"]["revenue"]["mean"]
+        )
+
+    def test_trend_regresses_on_time_column(self, engine, tmp_path):
+        path = tmp_path / "orders.db"
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE orders (order_id INTEGER, order_date TEXT, revenue REAL)")
+        connection.executemany("INSERT INTO orders VALUES (?, ?, ?)", [
+            (day, f"2024-01-{day:02d}", 100.0 + 3.0 * day + (day % 2)) for day in range(1, 31)
+        ])
+        connection.commit()
+        connection.close()
+        schema = "Table: orders\n  - order_id: INTEGER\n  - order_date: DATE\n  - revenue: REAL"
+        plan = HypothesisDeconstructor().deconstruct_hypothesis("Revenue is increasing over time", schema).test_plan
+
+        regression, descriptive = engine.evaluate_in_database(plan, path).results
+
+        assert regression.details["coefficients"]["order_date"] == pytest.approx(3.0, abs=0.01)
+        assert regression.significant
+        assert descriptive.details["columns"]["revenue"]["count"] == 30
+
+    @pytest.mark.parametrize("hypothesis", [
+        "Sales performance of the loyalty program is strong",
+        "Loyalty members churn sooner",
+    ])
+    def test_descriptive_patterns_have_statistics(self, engine, database, hypothesis):
+        """Test performance and general plans summarize their measure in the database"""
+        plan = self._plan(hypothesis)
+        raw = collect_columns(database, "SELECT revenue FROM customers")
+
+        pushed = engine.evaluate_in_database(plan, database)
+        direct = engine.evaluate(plan, raw)
+
+        assert [result.method for result in pushed.results] == [StatisticalMethod.DESCRIPTIVE]
+        assert pushed.results[0].error is None
+        assert pushed.results[0].details["columns"]["revenue"]["mean"] == pytest.approx(
+            direct.results[0].details["columns"]["revenue"]["mean"]
+        )
+
+    def test_contingency_pushdown(self, engine, database):
+        """Test chi-square from grouped counts equals the raw computation"""
+        query = contingency_query("customers", "state", "tier", ["state", "tier"])
+        plan = _plan([StatisticalMethod.CHI_SQUARE])
+        plan.sql_queries = [query]
+        raw = collect_columns(database, "SELECT state, tier FROM customers")
+
+        pushed = engine.evaluate_in_database(plan, database)
+
+        assert pushed.results[0].statistic == pytest.approx(
+            engine.run_method(StatisticalMethod.CHI_SQUARE, raw).statistic
+        )
+
+    def test_missing_statistics_query(self, engine, database):
+        """Test a method without an aggregate query is reported, not guessed"""
+        plan = _plan([StatisticalMethod.ANOVA])
+
+        report = engine.evaluate_in_database(plan, database)
+
+        assert report.results[0].error == "no sufficient statistics for this method"
+        assert report.supported is None
+
+    def test_unknown_names_are_not_groups(self):
+        """Test capitalized names that are not known states leave the comparison unfiltered"""
+        plan = self._plan("Revenue in Q1 is higher than revenue in Q2")
+        grouped = next(query for query in plan.sql_queries if query.get("statistics") == "grouped_moments")
+
+        assert "groups" not in grouped
+        assert "Q1" not in grouped["sql"]
+        assert all("Q1" not in query["sql"] for query in plan.sql_queries)
+
+    def test_groups_ignore_case(self):
+        """Test groups are found regardless of case and spelled as in the vocabulary"""
+        plan = self._plan("customers from CALIFORNIA are more profitable than customers from new  york")
+        grouped = next(query for query in plan.sql_queries if query.get("statistics") == "grouped_moments")
+
+        assert grouped["groups"] == "California,New York"
@@ -0,0 +1,250 @@
+"""
+Unit tests for sampled tracing spans and the OTLP JSON exporter
+"""
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from core.hypothesis_deconstructor import HypothesisDeconstructor
+from core.metrics import DeconstructorMetrics
+from core.plan_executor import PlanExecutor
+from core.plan_scheduler import PlanScheduler
+from core.stats_engine import StatsEngine
+from core.tracing import RingBufferExporter, Tracer, child_span, current_span
+
+
+HYPOTHESIS = "Customers from California are more profitable than customers from New York"
+
+SCHEMA = """
+Table: customers
+  - customer_id: INTEGER
+  - state: TEXT
+  - revenue: REAL
+"""
+
+STAGES = ["identify_pattern", "extract_entities", "load_catalog", "generate_sql_queries",
+          "determine_statistical_methods", "generate_statistics_queries"]
+
+
+@pytest.fixture
+def database(tmp_path):
+    """SQLite database with a customers table"""
+    path = tmp_path / "warehouse.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE customers (customer_id INTEGER, state TEXT, revenue REAL)")
+    connection.executemany("INSERT INTO customers VALUES (?, ?, ?)", [
+        (index, ["California", "New York"][index % 2], 100.0 + (index * 37) % 50 + 5 * (index % 2))
+        for index in range(1, 201)
+    ])
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+def tracer():
+    """Tracer recording every trace"""
+    return Tracer(sample_every=1)
+
+
+def _by_name(tracer):
+    spans = {}
+    for span in tracer.exporter.spans():
+        spans.setdefault(span.name, []).append(span)
+    return spans
+
+
+class TestTracer:
+    """Test suite for spans, sampling and context propagation"""
+
+    def test_children_join_the_current_trace(self, tracer):
+        """Test nested spans share the trace and point at their parent"""
+        with tracer.span("root") as root:
+            with tracer.span("child") as child:
+                grandchild = child_span("grandchild")
+                grandchild.end()
+            assert current_span() is root
+        assert current_span() is None
+
+        assert child.trace_id == root.trace_id == grandchild.trace_id
+        assert child.parent_id == root.span_id
+        assert grandchild.parent_id == child.span_id
+        assert root.parent_id is None
+        assert [span.name for span in tracer.exporter.spans()] == ["grandchild", "child", "root"]
+
+    def test_head_sampling(self):
+        """Test the root decides for the whole trace"""
+        tracer = Tracer(sample_every=2)
+
+        assert tracer.start_span("unsampled") is None
+        assert child_span("orphan") is None
+        with tracer.span("sampled") as root:
+            # The next root would be unsampled, but children follow the root
+            assert tracer.start_span("child").parent_id == root.span_id
+
+        assert Tracer(sample_every=0).start_span("never") is None
+        with pytest.raises(ValueError):
+            Tracer(sample_every=-1)
+
+    def test_errors_mark_the_span(self, tracer):
+        """Test an exception escaping a span sets its error status"""
+        with pytest.raises(RuntimeError):
+            with tracer.span("failing"):
+                raise RuntimeError("boom")
+
+        span = tracer.exporter.spans()[0].to_otlp()
+        assert span["status"] == {"code": 2, "message": "boom"}
+
+    def test_marks_become_stage_spans(self, tracer):
+        """Test consecutive marks become back-to-back child spans"""
+        with tracer.span("request") as root:
+            root.mark("first")
+            root.mark("second")
+
+        first, second, request = tracer.exporter.spans()
+        assert (first.name, second.name) == ("first", "second")
+        assert first.parent_id == second.parent_id == request.span_id
+        assert request.start_ns == first.start_ns <= first.end_ns == second.start_ns <= request.end_ns
+
+    def test_async_tasks_keep_their_own_current_span(self, tracer):
+        """Test concurrent tasks each parent their spans under their own root"""
+        async def request(name):
+            with tracer.span(name) as root:
+                await asyncio.sleep(0)
+                with tracer.span("inner") as inner:
+                    return root, inner
+
+        async def main():
+            return await asyncio.gather(request("a"), request("b"))
+
+        for root, inner in asyncio.run(main()):
+            assert inner.parent_id == root.span_id
+
+
+class TestRingBufferExporter:
+    """Test suite for the in-memory buffer and its OTLP JSON output"""
+
+    def test_buffer_keeps_most_recent_spans(self):
+        tracer = Tracer(RingBufferExporter(capacity=3), sample_every=1)
+        for index in range(5):
+            with tracer.span(f"span_{index}"):
+                pass
+
+        assert [span.name for span in tracer.exporter.spans()] == ["span_2", "span_3", "span_4"]
+        with pytest.raises(ValueError):
+            RingBufferExporter(capacity=0)
+
+    def test_write_otlp_json(self, tracer, tmp_path):
+        """Test the file is an ExportTraceServiceRequest with typed attributes"""
+        with tracer.span("root", {"rows": 3, "ratio": 0.5, "cached": True, "name": "q"}):
+            child_span("child").end()
+
+        path = tracer.exporter.write(tmp_path / "traces.json")
+        document = json.loads(path.read_text())
+
+        resource = document["resourceSpans"][0]
+        assert resource["resource"]["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "shelby-ai-core"}}
+        ]
+        child, root = resource["scopeSpans"][0]["spans"]
+        assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+        assert "parentSpanId" not in root
+        assert child["parentSpanId"] == root["spanId"]
+        assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+        assert root["attributes"] == [
+            {"key": "rows", "value": {"intValue": "3"}},
+            {"key": "ratio", "value": {"doubleValue": 0.5}},
+            {"key": "cached", "value": {"boolValue": True}},
+            {"key": "name", "value": {"stringValue": "q"}},
+        ]
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_write_needs_a_path(self, tracer):
+        with pytest.raises(ValueError, match="no path"):
+            tracer.exporter.write()
+
+
+class TestTracedPipeline:
+    """Test suite for the spans of deconstruction, execution and statistics"""
+
+    def test_deconstruct_stage_spans(self, tracer):
+        """Test a deconstruction is a root span with one child per stage"""
+        deconstructor = HypothesisDeconstructor(tracer=tracer, metrics=DeconstructorMetrics(sample_every=1))
+        deconstructor.deconstruct_hypothesis(HYPOTHESIS)
+
+        *stages, root = tracer.exporter.spans()
+        assert root.name == "deconstruct_hypothesis"
+        assert root.attributes == {"pattern": "segment"}
+        assert [span.name for span in stages] == STAGES
+        assert all(span.parent_id == root.span_id for span in stages)
+        assert deconstructor.metrics.stage_seconds.count("extract_entities") == 1
+
+    def test_async_deconstruct_is_traced(self, tracer):
+        deconstructor = HypothesisDeconstructor(tracer=tracer)
+        asyncio.run(deconstructor.deconstruct_hypothesis_async(HYPOTHESIS))
+
+        assert [span.name for span in tracer.exporter.spans()] == STAGES + ["deconstruct_hypothesis"]
+
+    def test_one_trace_from_hypothesis_to_statistics(self, tracer, database):
+        """Test queries and stats steps nest under the request that planned them"""
+        deconstructor = HypothesisDeconstructor(tracer=tracer)
+        with tracer.span("analysis") as root:
+            plan = deconstructor.deconstruct_hypothesis(HYPOTHESIS, SCHEMA).test_plan
+            with PlanScheduler(database, max_workers=2) as scheduler:
+                scheduler.run(plan)
+
+        spans = _by_name(tracer)
+        assert {span.trace_id for span in tracer.exporter.spans()} == {root.trace_id}
+        assert spans["deconstruct_hypothesis"][0].parent_id == root.span_id
+        schedule = spans["schedule_plan"][0]
+        assert schedule.parent_id == root.span_id
+
+        steps = {span.attributes["step.name"]: span for span in spans["plan_step"]}
+        assert set(steps) == {query["name"] for query in plan.sql_queries} | {
+            f"stats:{method.value}" for method in plan.statistical_methods
+        }
+        assert all(step.parent_id == schedule.span_id for step in steps.values())
+        for query in spans["sql_query"]:
+            assert steps[query.attributes["query.name"]].span_id == query.parent_id
+            assert query.attributes["db.rows"] >= 1
+        for method in spans["stats_method"]:
+            assert steps[f"stats:{method.attributes['stats.method']}"].span_id == method.parent_id
+
+    def test_executor_and_engine_spans(self, tracer, database):
+        """Test sequential execution and in-database evaluation are traced too"""
+        plan = HypothesisDeconstructor(tracer=Tracer(sample_every=0)).deconstruct_hypothesis(
+            HYPOTHESIS, SCHEMA
+        ).test_plan
+        with tracer.span("analysis"):
+            with PlanExecutor(database) as executor:
+                executor.execute(plan)
+            StatsEngine().evaluate_in_database(plan, database)
+
+        spans = _by_name(tracer)
+        execute = spans["execute_plan"][0]
+        evaluate = spans["evaluate_in_database"][0]
+        parents = [query.parent_id for query in spans["sql_query"]]
+        assert parents.count(execute.span_id) == len(plan.sql_queries)
+        assert parents.count(evaluate.span_id) == sum("statistics" in query for query in plan.sql_queries)
+        assert {method.parent_id for method in spans["stats_method"]} == {evaluate.span_id}
+
+    def test_failed_query_span(self, tracer, database):
+        with tracer.span("analysis"):
+            with PlanExecutor(database) as executor:
+                result = executor.execute_query("broken", "SELECT * FROM missing_table")
+
+        query = _by_name(tracer)["sql_query"][0].to_otlp()
+        assert query["status"] == {"code": 2, "message": result.error}
+
+    def test_untraced_calls_record_nothing(self, database):
+        """Test components outside a recorded trace create no spans"""
+        tracer = Tracer(sample_every=0)
+        deconstructor = HypothesisDeconstructor(tracer=tracer)
+        plan = deconstructor.deconstruct_hypothesis(HYPOTHESIS, SCHEMA).test_plan
+        with PlanScheduler(database) as scheduler:
+            scheduler.run(plan)
+
+        assert tracer.exporter.spans() == []